@@ -0,0 +1,65 @@
+# -*- coding: utf-8 -*-
+"""
+Benchmark: nightly analysis of a capture directory with wifi.ba + wifi.qos.
+
+Compares one ``nexus-core analyze`` process per (capture, plugin), as the
+nightly script did, with ``nexus-core batch`` (plugins imported once per
+worker, decoded captures shared between the two plugins through the
+cache), and a second ``batch`` run where every result is up to date.
+
+Usage:
+    python benchmarks/bench_batch.py [capture_count] [packets_per_capture] [jobs]
+"""
+import os
+import sys
+import shutil
+import subprocess
+import time
+import tempfile
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from bench_pcap_reader import make_air_capture
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+PLUGINS = ("wifi.ba", "wifi.qos")
+
+
+def cli(*args):
+    start = time.perf_counter()
+    subprocess.run([sys.executable, '-m', 'nexus_core.cli', *args], cwd=ROOT, check=True,
+                   stdout=subprocess.DEVNULL)
+    return time.perf_counter() - start
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 40
+    packets = int(sys.argv[2]) if len(sys.argv) > 2 else 20000
+    jobs = sys.argv[3] if len(sys.argv) > 3 else "0"
+
+    tmp = tempfile.mkdtemp()
+    try:
+        pcaps = os.path.join(tmp, 'pcap')
+        os.makedirs(pcaps)
+        for i in range(count):
+            make_air_capture(os.path.join(pcaps, f'cap{i:03d}.pcap'), packets)
+        print(f"{count} captures x {packets} packets, plugins {', '.join(PLUGINS)}, "
+              f"batch jobs={jobs} ({os.cpu_count()} CPUs)")
+
+        single = 0.0
+        for name in sorted(os.listdir(pcaps)):
+            for plugin in PLUGINS:
+                out = os.path.join(tmp, 'single', os.path.splitext(name)[0], plugin)
+                single += cli('analyze', '--plugin', plugin, '--input', os.path.join(pcaps, name), '--output', out)
+        print(f"  analyze per capture/plugin : {single:7.2f} s")
+
+        batch = ['batch', '--plugin', ','.join(PLUGINS), '--input', pcaps,
+                 '--output', os.path.join(tmp, 'batch'), '--jobs', jobs]
+        print(f"  batch                      : {cli(*batch):7.2f} s")
+        print(f"  batch, all up to date      : {cli(*batch):7.2f} s")
+    finally:
+        shutil.rmtree(tmp)
+
+
+if __name__ == '__main__':
+    main()
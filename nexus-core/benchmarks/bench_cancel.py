@@ -0,0 +1,87 @@
+# -*- coding: utf-8 -*-
+"""
+Benchmark: cancellation latency and the cost of the per-batch checks.
+
+A Pipeline (decode_dot11 subscriber) runs over a synthetic capture in a
+worker thread; the main thread calls ``cancel()`` after a delay and times
+how long the run takes to raise ``AnalysisCancelled``. The same pass is
+timed without a token, with a token that never fires, and with a deadline
+(how close the truncated run stays to it).
+
+Usage:
+    python benchmarks/bench_cancel.py [packet_count]
+"""
+import os
+import sys
+import time
+import tempfile
+import threading
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from nexus_core.cancel import AnalysisCancelled, CancelToken, cancellable
+from nexus_core.decoders import decode_dot11, DOT11_SNAPLEN
+from nexus_core.engine import Pipeline
+from bench_pcap_reader import make_air_capture
+
+
+def run_pipeline(path, token):
+    pipe = Pipeline(path)
+    pipe.subscribe('seq', decode_dot11, ('seq', 'tid'), snaplen=DOT11_SNAPLEN)
+    with cancellable(token):
+        return pipe.run()
+
+
+def timed(path, token):
+    start = time.perf_counter()
+    run_pipeline(path, token)
+    return time.perf_counter() - start
+
+
+def cancel_latency(path, delay):
+    token = CancelToken()
+    raised = []
+
+    def worker():
+        try:
+            run_pipeline(path, token)
+        except AnalysisCancelled:
+            raised.append(time.perf_counter())
+
+    thread = threading.Thread(target=worker)
+    thread.start()
+    time.sleep(delay)
+    cancelled_at = time.perf_counter()
+    token.cancel()
+    thread.join()
+    return (raised[0] - cancelled_at) * 1000 if raised else None
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 1000000
+
+    fd, path = tempfile.mkstemp(suffix='.pcap')
+    os.close(fd)
+    try:
+        make_air_capture(path, count)
+        print(f"{count} packets, {os.path.getsize(path) / 1024 / 1024:.0f} MB")
+        timed(path, None)
+        base = min(timed(path, None) for _ in range(3))
+        checked = min(timed(path, CancelToken()) for _ in range(3))
+        print(f"  full pass          {base:6.3f} s, with token {checked:6.3f} s ({(checked / base - 1) * 100:+.1f} %)")
+
+        latencies = sorted(ms for ms in (cancel_latency(path, base * f / 10) for f in range(1, 10))
+                           if ms is not None)
+        print(f"  cancel -> raised   median {latencies[len(latencies) // 2]:.1f} ms, "
+              f"max {latencies[-1]:.1f} ms ({len(latencies)} runs)")
+
+        deadline = base / 2
+        token = CancelToken(deadline)
+        t = timed(path, token)
+        print(f"  deadline {deadline:.3f} s  returned after {t:.3f} s (truncated={token.truncated})")
+    finally:
+        os.remove(path)
+
+
+if __name__ == '__main__':
+    main()
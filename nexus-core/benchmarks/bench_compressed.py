@@ -0,0 +1,98 @@
+# -*- coding: utf-8 -*-
+"""
+Benchmark: 802.11 decoding of a plain capture vs. the same capture read
+through transparent (background thread) decompression, and vs. the old
+workflow of decompressing to disk first.
+
+Usage:
+    python benchmarks/bench_compressed.py [packet_count] [existing.pcap]
+"""
+import os
+import sys
+import gzip
+import shutil
+import time
+import tempfile
+
+import numpy as np
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from nexus_core.pcap_reader import PcapEngine
+from nexus_core.decoders import decode_dot11, DOT11_SNAPLEN
+from bench_pcap_reader import make_air_capture
+
+
+def decode(path):
+    return PcapEngine(path, use_index=False).decode(decode_dot11, snaplen=DOT11_SNAPLEN)
+
+
+def bench(name, fn, size):
+    start = time.perf_counter()
+    cols = fn()
+    elapsed = time.perf_counter() - start
+    count = len(cols.get('packet_no', []))
+    print(f"{name:<24} {elapsed:8.3f} s  {count / elapsed:>12,.0f} pkts/s  "
+          f"{size / elapsed / 1024 / 1024:8.1f} MB/s (decompressed)")
+    return cols
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 500000
+    tmp_dir = tempfile.mkdtemp()
+    path = sys.argv[2] if len(sys.argv) > 2 else os.path.join(tmp_dir, 'bench_air.pcap')
+    if len(sys.argv) <= 2:
+        make_air_capture(path, count)
+
+    size = os.path.getsize(path)
+    variants = [('gzip', '.gz', lambda src, dst: _gzip(src, dst))]
+    try:
+        import zstandard
+        variants.append(('zstd', '.zst', lambda src, dst: _via(zstandard.ZstdCompressor().stream_writer, src, dst)))
+    except ImportError:
+        print("zstandard not installed, skipping .zst")
+    try:
+        import lz4.frame
+        variants.append(('lz4', '.lz4', lambda src, dst: _via(lz4.frame.open, src, dst, mode='wb')))
+    except ImportError:
+        print("lz4 not installed, skipping .lz4")
+
+    print(f"Capture: {path} ({size / 1024 / 1024:.1f} MB)")
+    expected = bench('plain', lambda: decode(path), size)
+    for name, suffix, compress in variants:
+        packed = os.path.join(tmp_dir, 'bench_air.pcap' + suffix)
+        compress(path, packed)
+        ratio = os.path.getsize(packed) / size
+        cols = bench(f'{name} streaming', lambda: decode(packed), size)
+        bench(f'{name} to disk + read', lambda: _unpack_then_decode(packed, tmp_dir), size)
+        same = all(np.array_equal(cols[k], expected[k]) for k in expected)
+        print(f"  ratio {ratio:.2f}, identical: {same}")
+
+    shutil.rmtree(tmp_dir, ignore_errors=True)
+
+
+def _gzip(src, dst):
+    with open(src, 'rb') as fin, gzip.open(dst, 'wb', compresslevel=6) as fout:
+        shutil.copyfileobj(fin, fout, 1 << 20)
+
+
+def _via(opener, src, dst, **kwargs):
+    with open(src, 'rb') as fin, open(dst, 'wb') as raw:
+        writer = opener(raw, **kwargs)
+        shutil.copyfileobj(fin, writer, 1 << 20)
+        writer.close()
+
+
+def _unpack_then_decode(packed, tmp_dir):
+    from nexus_core.pcap_stream import detect_compression, open_decompressed
+    plain = os.path.join(tmp_dir, 'unpacked.pcap')
+    with open_decompressed(packed, detect_compression(packed)) as fin, open(plain, 'wb') as fout:
+        shutil.copyfileobj(fin, fout, 1 << 20)
+    try:
+        return decode(plain)
+    finally:
+        os.remove(plain)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,46 @@
+# -*- coding: utf-8 -*-
+"""
+Benchmark: LTTB / min-max downsampling of long series to a chart-sized
+payload, and JSON payload size before / after.
+
+Usage:
+    python benchmarks/bench_downsample.py [points] [max_points]
+"""
+import os
+import sys
+import json
+import time
+
+import numpy as np
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from nexus_core.downsample import lttb, minmax
+
+REPEATS = 5
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 5000000
+    max_points = int(sys.argv[2]) if len(sys.argv) > 2 else 2000
+    rng = np.random.default_rng(0)
+    x = np.sort(rng.uniform(0, 7200, count))
+    y = np.cumsum(rng.normal(0, 1, count))
+
+    for name, fn in (("lttb", lttb), ("minmax", minmax)):
+        times = []
+        for _ in range(REPEATS):
+            start = time.perf_counter()
+            idx = fn(x, y, max_points)
+            times.append(time.perf_counter() - start)
+        print(f"{name:<7} {count:>9} -> {len(idx):>5} points   median {np.median(times) * 1000:8.1f} ms")
+
+    sample = min(count, 200000)
+    full = len(json.dumps({"x": x[:sample].tolist(), "y": y[:sample].tolist()})) * count / sample
+    idx = lttb(x, y, max_points)
+    small = len(json.dumps({"x": x[idx].tolist(), "y": y[idx].tolist()}))
+    print(f"payload  full ~{full / 2 ** 20:8.1f} MB   downsampled {small / 2 ** 10:8.1f} KB")
+
+
+if __name__ == '__main__':
+    main()
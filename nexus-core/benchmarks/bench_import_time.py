@@ -0,0 +1,94 @@
+# -*- coding: utf-8 -*-
+"""
+Benchmark: cold import time of nexus_core / nexus_sdk entry points.
+
+Each target is imported in a fresh interpreter (median of ``runs``); only
+the import itself is timed, not interpreter startup. Targets with a budget
+fail the run (exit code 1) when they exceed it or load one of the heavy
+modules they must defer (NumPy, pandas, pydantic, Scapy, matplotlib).
+Every CLI analysis is a new process, so this cost is paid per call.
+
+Usage:
+    python benchmarks/bench_import_time.py [runs] [budget_scale]
+"""
+import os
+import sys
+import json
+import statistics
+import subprocess
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+SDK_SRC = os.path.abspath(os.path.join(ROOT, '..', 'nexus-sdk', 'src'))
+
+HEAVY = ("numpy", "pandas", "pydantic", "scapy", "scapy.all", "matplotlib")
+
+# (模块, 预算 ms 或 None 仅记录, 不得加载的重量级模块)
+TARGETS = [
+    ("nexus_core", 30, HEAVY),
+    ("nexus_core.dispatcher", 30, HEAVY),
+    ("nexus_core.cli", 50, HEAVY),
+    ("nexus_sdk", 30, HEAVY),
+    ("nexus_core.pcap_reader", None, ("pandas", "scapy")),
+    ("nexus_core.plugins.wifi.ba_analyzer", None, ("pandas", "scapy")),
+]
+
+PROBE = '''
+import json, sys, time
+start = time.perf_counter()
+import {module}
+elapsed = time.perf_counter() - start
+print(json.dumps({{"ms": elapsed * 1000, "modules": len(sys.modules),
+                  "heavy": [m for m in {heavy!r} if m in sys.modules]}}))
+'''
+
+
+def measure(module, heavy, runs, env):
+    samples = []
+    for _ in range(runs):
+        out = subprocess.run([sys.executable, '-c', PROBE.format(module=module, heavy=heavy)], cwd=ROOT, env=env,
+                             capture_output=True, text=True)
+        if out.returncode != 0:
+            return None, out.stderr.strip().splitlines()[-1]
+        samples.append(json.loads(out.stdout))
+    ms = statistics.median(s["ms"] for s in samples)
+    return {"ms": ms, "modules": samples[0]["modules"], "heavy": samples[0]["heavy"]}, None
+
+
+def main():
+    runs = int(sys.argv[1]) if len(sys.argv) > 1 else 5
+    scale = float(sys.argv[2]) if len(sys.argv) > 2 else 1.0
+
+    env = dict(os.environ)
+    # 工作区内的 nexus-sdk 源码 (未 pip install 时)
+    env["PYTHONPATH"] = os.pathsep.join(p for p in (ROOT, SDK_SRC, env.get("PYTHONPATH")) if p)
+    # 每个目标先导入一次以生成 .pyc: 计时的是冷进程, 不是首次编译
+    env.pop("PYTHONDONTWRITEBYTECODE", None)
+
+    failures = []
+    print(f"{'module':<40} {'ms':>8} {'budget':>8} {'modules':>8}  heavy modules loaded")
+    for module, budget, heavy in TARGETS:
+        measure(module, heavy, 1, env)
+        result, error = measure(module, heavy, runs, env)
+        if result is None:
+            print(f"{module:<40} {'-':>8} {'-':>8} {'-':>8}  import failed: {error}")
+            if budget is not None:
+                failures.append(f"{module}: import failed")
+            continue
+        limit = budget * scale if budget is not None else None
+        print(f"{module:<40} {result['ms']:8.1f} {limit if limit is not None else '-':>8} "
+              f"{result['modules']:8d}  {', '.join(result['heavy']) or '-'}")
+        if limit is not None and result["ms"] > limit:
+            failures.append(f"{module}: {result['ms']:.1f} ms > {limit:.0f} ms budget")
+        if result["heavy"]:
+            failures.append(f"{module}: imports {', '.join(result['heavy'])} at import time")
+
+    if failures:
+        print("\nImport-time budget exceeded:")
+        for failure in failures:
+            print(f"  {failure}")
+        sys.exit(1)
+    print("\nAll import-time budgets met.")
+
+
+if __name__ == '__main__':
+    main()
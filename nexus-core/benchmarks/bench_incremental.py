@@ -0,0 +1,69 @@
+# -*- coding: utf-8 -*-
+"""
+Benchmark: re-analysing a growing capture (BlockAck consistency + frames
+trace) from scratch on every poll vs. ba_analyzer.analyze_incremental,
+which resumes from the checkpoint and only reads the appended records.
+
+The capture grows in ``steps`` equal byte slices (records may be cut in
+half at a slice boundary, as with a live writer).
+
+Usage:
+    python benchmarks/bench_incremental.py [packet_count] [steps]
+"""
+import os
+import sys
+import shutil
+import time
+import tempfile
+from contextlib import redirect_stdout
+from io import StringIO
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from nexus_core.plugins.wifi import ba_analyzer
+from bench_pcap_reader import make_air_capture
+
+
+def poll(pcap, out, incremental):
+    if not incremental:
+        shutil.rmtree(out, ignore_errors=True)
+    os.makedirs(out, exist_ok=True)
+    start = time.perf_counter()
+    with redirect_stdout(StringIO()):
+        reports = ba_analyzer.analyze_incremental(pcap, out)
+    return time.perf_counter() - start, reports
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 500000
+    steps = int(sys.argv[2]) if len(sys.argv) > 2 else 10
+
+    tmp_dir = tempfile.mkdtemp()
+    try:
+        full = os.path.join(tmp_dir, 'full.pcap')
+        make_air_capture(full, count)
+        size = os.path.getsize(full)
+        print(f"Capture: {count} packets, {size / 1024 / 1024:.1f} MB, {steps} growth steps")
+
+        totals = {}
+        for incremental in (False, True):
+            label = "incremental" if incremental else "full"
+            pcap = os.path.join(tmp_dir, f'growing_{label}.pcap')
+            out = os.path.join(tmp_dir, f'out_{label}')
+            elapsed = []
+            with open(full, 'rb') as src, open(pcap, 'wb') as dst:
+                for step in range(1, steps + 1):
+                    dst.write(src.read(size * step // steps - src.tell()))
+                    dst.flush()
+                    seconds, reports = poll(pcap, out, incremental)
+                    elapsed.append(seconds)
+            totals[label] = sum(elapsed)
+            print(f"  {label:<12} last poll {elapsed[-1]:7.3f} s  total {sum(elapsed):7.3f} s  "
+                  f"rows {reports['trace']}")
+        print(f"  speedup (total): {totals['full'] / totals['incremental']:.1f}x")
+    finally:
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+
+
+if __name__ == '__main__':
+    main()
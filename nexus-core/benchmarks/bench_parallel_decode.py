@@ -0,0 +1,55 @@
+# -*- coding: utf-8 -*-
+"""
+Benchmark: sequential vs. sharded (process pool) 802.11 decoding.
+
+Usage:
+    python benchmarks/bench_parallel_decode.py [packet_count] [jobs] [existing.pcap]
+"""
+import os
+import sys
+import shutil
+import time
+import tempfile
+
+import numpy as np
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from nexus_core.pcap_reader import PcapEngine
+from nexus_core.decoders import decode_dot11, DOT11_SNAPLEN
+from bench_pcap_reader import make_air_capture
+
+
+def run(path, jobs):
+    start = time.perf_counter()
+    cols = PcapEngine(path).decode(decode_dot11, snaplen=DOT11_SNAPLEN, jobs=jobs)
+    elapsed = time.perf_counter() - start
+    count = len(cols.get('packet_no', []))
+    print(f"jobs={jobs:<4} {count:>10} pkts  {elapsed:8.3f} s  {count / elapsed:>12,.0f} pkts/s")
+    return cols, elapsed
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 500000
+    jobs = int(sys.argv[2]) if len(sys.argv) > 2 else (os.cpu_count() or 1)
+    path = sys.argv[3] if len(sys.argv) > 3 else None
+
+    tmp_dir = None
+    if path is None:
+        tmp_dir = tempfile.mkdtemp()
+        path = os.path.join(tmp_dir, 'bench_air.pcap')
+        make_air_capture(path, count)
+
+    print(f"Capture: {path} ({os.path.getsize(path) / 1024 / 1024:.1f} MB), {os.cpu_count()} CPUs")
+    seq, t_seq = run(path, 1)
+    par, t_par = run(path, jobs)
+    same = seq.keys() == par.keys() and all(np.array_equal(seq[k], par[k]) for k in seq)
+    print(f"Speed-up: {t_seq / t_par:.1f}x, identical: {same}")
+
+    if tmp_dir:
+        # 连同首次读取时生成的 .nxidx 索引一起删除
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,82 @@
+# -*- coding: utf-8 -*-
+"""
+Benchmark: running the air-side analyzers of a Miracast freeze diagnosis
+(QoS statistics, BlockAck report, Miracast link metrics) as separate decode
+passes vs. one Pipeline pass fanning the decoded batches out to all of them.
+
+Usage:
+    python benchmarks/bench_pipeline.py [packet_count] [existing.pcap]
+"""
+import os
+import sys
+import shutil
+import time
+import tempfile
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from nexus_core.engine import Pipeline
+from nexus_core.pcap_reader import PcapEngine
+from nexus_core.decoders import decode_dot11, DOT11_SNAPLEN
+from nexus_core.plugins.wifi import ba_analyzer, qos_analyzer_v2
+from bench_pcap_reader import make_air_capture
+
+AIR_COLUMNS = ('packet_no', 'ts_ns', 'addr1', 'addr2', 'caplen', 'has_signal', 'rt_signal', 'rt_rate', 'retry')
+
+
+def _select_qos_data(cols):
+    return cols['is_dot11'] & (cols['fc_type'] == 2) & (cols['fc_subtype'] == 8)
+
+
+# (名称, 行筛选, 读取的列): 与 qos_analyzer_v2 / ba_analyzer / miracast_analyzer 的声明一致
+ANALYZERS = [
+    ('qos', qos_analyzer_v2._select_dot11, qos_analyzer_v2.QOS_COLUMNS),
+    ('ba', ba_analyzer._select_qos_ba, ba_analyzer.BA_COLUMNS),
+    ('miracast_air', _select_qos_data, AIR_COLUMNS),
+]
+
+
+def run_separate(path):
+    return {name: PcapEngine(path).decode(decode_dot11, snaplen=DOT11_SNAPLEN, select=select)
+            for name, select, _ in ANALYZERS}
+
+
+def run_pipeline(path):
+    pipe = Pipeline(path)
+    for name, select, columns in ANALYZERS:
+        pipe.subscribe(name, decode_dot11, columns, select=select, snaplen=DOT11_SNAPLEN)
+    return pipe.run()
+
+
+def bench(label, fn):
+    start = time.perf_counter()
+    result = fn()
+    elapsed = time.perf_counter() - start
+    rows = ', '.join(f"{name}={len(cols.get('packet_no', []))}" for name, cols in result.items())
+    print(f"{label:<10} {elapsed:8.3f} s  ({rows})")
+    return elapsed
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 500000
+    path = sys.argv[2] if len(sys.argv) > 2 else None
+
+    tmp_dir = None
+    if path is None:
+        tmp_dir = tempfile.mkdtemp()
+        path = os.path.join(tmp_dir, 'bench_air.pcap')
+        make_air_capture(path, count)
+
+    print(f"Capture: {path} ({os.path.getsize(path) / 1024 / 1024:.1f} MB), {len(ANALYZERS)} analyzers")
+    # 先建好索引, 两种方式都不含首次建索引的开销
+    PcapEngine(path).index()
+    separate = bench('separate', lambda: run_separate(path))
+    single = bench('pipeline', lambda: run_pipeline(path))
+    print(f"Speed-up: {separate / single:.1f}x")
+
+    if tmp_dir:
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+
+
+if __name__ == '__main__':
+    main()
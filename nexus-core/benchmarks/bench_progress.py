@@ -0,0 +1,59 @@
+# -*- coding: utf-8 -*-
+"""
+Benchmark: cost of progress reporting on the PcapEngine read paths.
+
+Each pass runs without a reporter and with one that emits on every update
+(``interval=0``) and with the default half-second rate limit; events are
+counted, not printed.
+
+Usage:
+    python benchmarks/bench_progress.py [packet_count]
+"""
+import os
+import sys
+import time
+import tempfile
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from nexus_core.pcap_reader import PcapEngine
+from nexus_core.progress import ProgressReporter, reporting
+from bench_pcap_reader import make_air_capture
+
+
+def timed(fn, reporter):
+    start = time.perf_counter()
+    if reporter is None:
+        fn()
+    else:
+        with reporting(reporter):
+            fn()
+    return time.perf_counter() - start
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 1000000
+
+    fd, path = tempfile.mkstemp(suffix='.pcap')
+    os.close(fd)
+    try:
+        make_air_capture(path, count)
+        print(f"{count} packets, {os.path.getsize(path) / 1024 / 1024:.0f} MB")
+        passes = {
+            "iter_batches": lambda: sum(len(b) for b in PcapEngine(path, use_index=False).iter_batches()),
+            "iter_raw": lambda: sum(1 for _ in PcapEngine(path, mode="raw").iter_raw()),
+        }
+        for name, fn in passes.items():
+            fn()
+            base = min(timed(fn, None) for _ in range(5))
+            for label, interval in (("every update", 0), ("0.5 s limit", 0.5)):
+                events = []
+                t = min(timed(fn, ProgressReporter(emit=events.append, interval=interval)) for _ in range(5))
+                print(f"  {name:<12} {label:<13} {base:6.3f} s -> {t:6.3f} s "
+                      f"({(t / base - 1) * 100:+5.1f} %, {len(events) // 5} events)")
+    finally:
+        os.remove(path)
+
+
+if __name__ == '__main__':
+    main()
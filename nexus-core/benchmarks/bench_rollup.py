@@ -0,0 +1,84 @@
+# -*- coding: utf-8 -*-
+"""
+Benchmark: zooming into random windows of a 2-hour series through the
+rollup pyramid (coarsest level meeting the pixel density) vs. re-binning
+the raw points for every request.
+
+Usage:
+    python benchmarks/bench_rollup.py [points_per_second] [pixels]
+"""
+import os
+import sys
+import shutil
+import time
+import tempfile
+
+import numpy as np
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from nexus_core.rollup import Rollup, query_rollup, write_rollups
+
+DURATION_NS = 2 * 3600 * 10 ** 9
+QUERIES = 200
+BATCH = 1 << 16
+
+
+def main():
+    rate = int(sys.argv[1]) if len(sys.argv) > 1 else 1000
+    pixels = int(sys.argv[2]) if len(sys.argv) > 2 else 1200
+    count = DURATION_NS // 10 ** 9 * rate
+    rng = np.random.default_rng(0)
+    t_start = 1700000000 * 10 ** 9
+    ts = t_start + np.sort(rng.integers(0, DURATION_NS, count))
+    size = rng.integers(60, 1500, count).astype(np.float64)
+
+    start = time.perf_counter()
+    rollup = Rollup(("bytes",))
+    for i in range(0, count, BATCH):
+        rollup.update(ts[i:i + BATCH], {"bytes": size[i:i + BATCH]})
+    cols = rollup.columns()
+    print(f"{count} points over 2 h: pyramid of {cols['level'].max() + 1} levels, "
+          f"{len(cols['bin'])} bins, built in {time.perf_counter() - start:.2f} s")
+
+    windows = []
+    for _ in range(QUERIES):
+        span = int(DURATION_NS * 10 ** rng.uniform(-4, 0))
+        t0 = t_start + int(rng.integers(0, DURATION_NS - span + 1))
+        windows.append((t0, t0 + span))
+
+    def raw(t0, t1):
+        # 基线: 每次从原始点重新分桶
+        lo, hi = np.searchsorted(ts, [t0, t1])
+        width = max((t1 - t0) // pixels, 1)
+        bins, inv = np.unique((ts[lo:hi] - t0) // width, return_inverse=True)
+        return np.bincount(inv, weights=size[lo:hi])
+
+    tmp_dir = tempfile.mkdtemp()
+    backends = ["sqlite"]
+    try:
+        import pyarrow  # noqa: F401
+        backends.append("parquet")
+    except ImportError:
+        pass
+
+    def bench(label, fn):
+        times = []
+        for t0, t1 in windows:
+            start = time.perf_counter()
+            fn(t0, t1)
+            times.append((time.perf_counter() - start) * 1000)
+        print(f"{label:<10} median {np.median(times):7.2f} ms   max {max(times):7.2f} ms")
+
+    bench("raw", raw)
+    for backend in backends:
+        out = os.path.join(tmp_dir, backend)
+        os.makedirs(out)
+        write_rollups(out, {"bench": rollup}, backend=backend)
+        bench(backend, lambda t0, t1: query_rollup(out, "bench", t0, t1, pixels))
+
+    shutil.rmtree(tmp_dir, ignore_errors=True)
+
+
+if __name__ == '__main__':
+    main()
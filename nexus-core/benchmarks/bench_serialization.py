@@ -0,0 +1,77 @@
+# -*- coding: utf-8 -*-
+"""
+Benchmark: writing an analyzer summary (frame list + per-packet arrays)
+with ``json.dump(..., indent=2)`` after ``.tolist()`` vs.
+``serialization.dump`` (orjson if installed, arrays to the binary sidecar).
+
+Usage:
+    python benchmarks/bench_serialization.py [frames] [array_points]
+"""
+import os
+import sys
+import json
+import shutil
+import time
+import tempfile
+
+import numpy as np
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from nexus_core.serialization import dump, dumps, orjson
+
+
+def make_summary(frames, points):
+    rng = np.random.default_rng(0)
+    raw_frames = [{"seq": np.int64(i), "rtp_ts": np.int64(i * 3000), "size": np.int64(s), "type": "P",
+                   "packets": np.int64(s // 1400 + 1), "end_time": np.float64(i / 30), "nal_types": [1]}
+                  for i, s in enumerate(rng.integers(500, 60000, frames))]
+    arrays = {"ts_ns": np.arange(points, dtype=np.int64) * 1000, "iat_ms": rng.exponential(1.0, points),
+              "seq": np.arange(points, dtype=np.uint16)}
+    return {"frame_stats": {"raw_frames_list": raw_frames}, "packets": arrays}
+
+
+def plain(obj):
+    """Baseline: what callers had to do before (NumPy -> Python via tolist / item)."""
+    if isinstance(obj, dict):
+        return {k: plain(v) for k, v in obj.items()}
+    if isinstance(obj, list):
+        return [plain(v) for v in obj]
+    if isinstance(obj, (np.ndarray, np.generic)):
+        return obj.tolist()
+    return obj
+
+
+def main():
+    frames = int(sys.argv[1]) if len(sys.argv) > 1 else 200000
+    points = int(sys.argv[2]) if len(sys.argv) > 2 else 2000000
+    data = make_summary(frames, points)
+    tmp_dir = tempfile.mkdtemp()
+    print(f"backend: {'orjson ' + orjson.__version__ if orjson else 'json (stdlib)'}")
+
+    path = os.path.join(tmp_dir, "baseline.json")
+    start = time.perf_counter()
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(plain(data), f, indent=2, ensure_ascii=False)
+    base = time.perf_counter() - start
+    print(f"json.dump + tolist      {base:6.2f} s   {os.path.getsize(path) / 2 ** 20:7.1f} MB")
+
+    path = os.path.join(tmp_dir, "summary.json")
+    start = time.perf_counter()
+    dump(data, path, indent=True)
+    fast = time.perf_counter() - start
+    side = os.path.join(tmp_dir, "summary.arrays.bin")
+    print(f"serialization.dump      {fast:6.2f} s   {os.path.getsize(path) / 2 ** 20:7.1f} MB json"
+          f" + {os.path.getsize(side) / 2 ** 20:.1f} MB sidecar   ({base / fast:.1f}x)")
+
+    batch = [{"type": "iperf-data", "detail": {"id": 1, "bps": np.float64(9.4e8), "jitter": np.float32(0.1)}}] * 50
+    start = time.perf_counter()
+    for _ in range(2000):
+        dumps(batch)
+    print(f"event batch (50 msgs)   {(time.perf_counter() - start) / 2000 * 1e6:6.1f} us")
+
+    shutil.rmtree(tmp_dir, ignore_errors=True)
+
+
+if __name__ == '__main__':
+    main()
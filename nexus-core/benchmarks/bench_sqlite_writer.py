@@ -0,0 +1,90 @@
+# -*- coding: utf-8 -*-
+"""
+Benchmark: loading the per-frame BA / QoS trace tables into trace.sqlite
+with SQLiteWriter (multi-row INSERT, WAL, deferred indexes) vs. a plain
+row-by-row executemany with indexes in place.
+
+The capture is decoded once up front; only the database load is timed.
+
+Usage:
+    python benchmarks/bench_sqlite_writer.py [packet_count] [existing.pcap]
+"""
+import os
+import sys
+import shutil
+import sqlite3
+import time
+import tempfile
+
+import numpy as np
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from nexus_core.pcap_reader import PcapEngine
+from nexus_core.database import SQLiteWriter
+from nexus_core.decoders import decode_dot11, DOT11_SNAPLEN
+from nexus_core.plugins.wifi import ba_analyzer, qos_analyzer_v2
+from bench_pcap_reader import make_air_capture
+
+SCHEMAS = [('ba', ba_analyzer.TRACE_SCHEMA, ba_analyzer._select_qos_ba),
+           ('qos', qos_analyzer_v2.TRACE_SCHEMA, qos_analyzer_v2._select_dot11)]
+
+
+def load_naive(db_path, schema, batches):
+    # 每行重复完整的流键 (地址与 TID), 逐行 executemany, 索引在插入前已建好
+    columns = [(name, source) for name, source, _ in schema.columns if source is not None]
+    columns += list(schema.flow_columns.items())
+    conn = sqlite3.connect(db_path)
+    conn.execute(f"CREATE TABLE {schema.name} ({', '.join(name + ' INTEGER' for name, _ in columns)})")
+    conn.execute(f"CREATE INDEX idx_timestamp ON {schema.name} (timestamp)")
+    conn.execute(f"CREATE INDEX idx_flow ON {schema.name} ({', '.join(schema.flow_columns)}, timestamp)")
+    insert = f"INSERT INTO {schema.name} VALUES ({', '.join('?' * len(columns))})"
+    for cols in batches:
+        conn.executemany(insert, zip(*[cols[source].astype(np.int64).tolist() for _, source in columns]))
+    conn.commit()
+    conn.close()
+
+
+def load_writer(db_path, schema, batches, rows):
+    start = time.perf_counter()
+    writer = SQLiteWriter(db_path, [schema])
+    for cols in batches:
+        writer.write(schema.name, cols)
+    loaded = time.perf_counter()
+    writer.close()
+    print(f"  {'(insert':<8} {loaded - start:8.3f} s  {rows / (loaded - start) / 1e6:6.2f} M rows/s, "
+          f"flows + indexes {time.perf_counter() - loaded:.3f} s)")
+
+
+def bench(label, fn, rows):
+    start = time.perf_counter()
+    fn()
+    elapsed = time.perf_counter() - start
+    print(f"  {label:<8} {elapsed:8.3f} s  {rows / elapsed / 1e6:6.2f} M rows/s")
+    return elapsed
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 1000000
+    path = sys.argv[2] if len(sys.argv) > 2 else None
+
+    tmp_dir = tempfile.mkdtemp()
+    if path is None:
+        path = os.path.join(tmp_dir, 'bench_air.pcap')
+        make_air_capture(path, count)
+    print(f"Capture: {path} ({os.path.getsize(path) / 1024 / 1024:.1f} MB)")
+
+    for name, schema, select in SCHEMAS:
+        batches = [{source: cols[source] for source in schema.sources}
+                   for cols in PcapEngine(path).iter_decode(decode_dot11, snaplen=DOT11_SNAPLEN, select=select)]
+        rows = sum(len(cols['packet_no']) for cols in batches)
+        print(f"{name}: {rows} rows x {len(schema.columns)} columns")
+        naive = bench('naive', lambda: load_naive(os.path.join(tmp_dir, f'{name}_naive.sqlite'), schema, batches), rows)
+        bulk = bench('writer', lambda: load_writer(os.path.join(tmp_dir, f'{name}.sqlite'), schema, batches, rows), rows)
+        print(f"  Speed-up: {naive / bulk:.1f}x")
+
+    shutil.rmtree(tmp_dir, ignore_errors=True)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,92 @@
+# -*- coding: utf-8 -*-
+"""
+Benchmark: loading a chart series (timestamp / seq / retry of one flow in a
+time window) from trace.sqlite vs. the Parquet trace store with column
+projection and row-group pruning.
+
+Usage:
+    python benchmarks/bench_trace_store.py [frame_count]
+"""
+import os
+import sys
+import shutil
+import sqlite3
+import time
+import tempfile
+
+import numpy as np
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from nexus_core.database import SQLiteWriter
+from nexus_core.trace_store import ParquetWriter, read_trace, find_flows
+from nexus_core.plugins.wifi import ba_analyzer
+
+BATCH = 65536
+
+
+def make_batches(count):
+    rng = np.random.default_rng(0)
+    macs = np.array([0x001122334455, 0xAABBCCDDEEFF, 0x020000000001, 0x020000000002], dtype=np.uint64)
+    for start in range(0, count, BATCH):
+        n = min(BATCH, count - start)
+        i = np.arange(start, start + n)
+        pair = rng.integers(0, 2, n)
+        yield {"packet_no": i + 1, "ts_ns": i * 100000, "seq": (i % 4096).astype(np.int32),
+               "retry": rng.random(n) < 0.1, "ba_ssn": (i % 4096).astype(np.int32),
+               "ba_bitmap": np.zeros(n, dtype=np.uint64),
+               "addr2": macs[pair * 2], "addr1": macs[pair * 2 + 1], "tid": rng.integers(0, 8, n).astype(np.int8)}
+
+
+def bench(label, fn):
+    start = time.perf_counter()
+    result = fn()
+    elapsed = time.perf_counter() - start
+    print(f"{label:<10} {elapsed * 1000:9.1f} ms  ({len(result)} rows)")
+    return elapsed
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 2000000
+    tmp_dir = tempfile.mkdtemp()
+    schema = ba_analyzer.TRACE_SCHEMA
+    db_path = os.path.join(tmp_dir, 'trace.sqlite')
+    with SQLiteWriter(db_path, [schema]) as sql_writer, ParquetWriter(tmp_dir, [schema]) as pq_writer:
+        for cols in make_batches(count):
+            sql_writer.write("frames", cols)
+            pq_writer.write("frames", cols)
+    print(f"{count} frames: sqlite {os.path.getsize(db_path) / 1024 / 1024:.1f} MB, parquet "
+          f"{os.path.getsize(os.path.join(tmp_dir, 'trace.frames.parquet')) / 1024 / 1024:.1f} MB")
+
+    # 图表查询: 一个流在中间 10% 时间窗内的 timestamp / seq / is_retry
+    t0, t1 = count * 45000, count * 55000
+    key = {"sa": 0x001122334455, "tid": 5}
+
+    def sqlite_query():
+        conn = sqlite3.connect(db_path)
+        rows = conn.execute("SELECT f.timestamp, f.seq, f.is_retry FROM frames f JOIN frames_flows l "
+                            "ON f.flow = l.flow WHERE l.sa = ? AND l.tid = ? AND f.timestamp >= ? "
+                            "AND f.timestamp < ?", (key["sa"], key["tid"], t0, t1)).fetchall()
+        conn.close()
+        return rows
+
+    def parquet_query():
+        cols = read_trace(tmp_dir, "frames", columns=["timestamp", "seq", "is_retry"],
+                          t0_ns=t0, t1_ns=t1, flows=find_flows(tmp_dir, **key))
+        return cols["timestamp"]
+
+    sqlite_time = bench('sqlite', sqlite_query)
+    parquet_time = bench('parquet', parquet_query)
+    print(f"Speed-up: {sqlite_time / parquet_time:.1f}x")
+
+    # 全表扫描三列
+    full_sqlite = bench('sqlite*', lambda: sqlite3.connect(db_path).execute(
+        "SELECT timestamp, seq, is_retry FROM frames").fetchall())
+    full_parquet = bench('parquet*', lambda: read_trace(tmp_dir, "frames", columns=["timestamp", "seq", "is_retry"])["seq"])
+    print(f"Full scan speed-up: {full_sqlite / full_parquet:.1f}x")
+
+    shutil.rmtree(tmp_dir, ignore_errors=True)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,32 @@
+"""
+Nexus Analyzer Core
+
+The main classes are importable from the package; each is loaded from its
+module on first access, so ``import nexus_core`` (and the CLI) does not
+pull in NumPy or any plugin:
+
+    from nexus_core import PcapEngine, Pipeline
+"""
+from .lazy import lazy_exports
+
+_EXPORTS = {
+    "PcapEngine": ".pcap_reader",
+    "ReadPosition": ".pcap_reader",
+    "PacketFilter": ".pcap_filter",
+    "Pipeline": ".engine",
+    "Subscriber": ".engine",
+    "PluginDispatcher": ".dispatcher",
+    "DatabaseManager": ".database",
+    "TableSchema": ".database",
+    "DecodeCache": ".decode_cache",
+    "Checkpoint": ".checkpoint",
+    "ProgressReporter": ".progress",
+    "reporting": ".progress",
+    "CancelToken": ".cancel",
+    "AnalysisCancelled": ".cancel",
+    "save_summary": ".utils",
+}
+
+__all__ = list(_EXPORTS)
+
+__getattr__, __dir__ = lazy_exports(__name__, _EXPORTS)
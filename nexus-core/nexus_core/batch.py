@@ -0,0 +1,229 @@
+"""
+Nexus Analyzer Core - Batch Analysis
+Runs plugins over every capture of a directory or glob in a process pool.
+
+Each (capture, plugin) pair writes to ``<output>/<capture>/<plugin_id>/``;
+``<output>/batch_manifest.json`` records its status, timing and KPIs and
+is rewritten after every finished pair. A pair is skipped while its entry
+is ``ok``, the capture identity (size, mtime, hash of its first and last
+64 KB), the plugin version and the parameters are unchanged and the
+summary is still there, so re-running an interrupted batch resumes it:
+
+    runner = BatchRunner(["wifi.ba", "wifi.qos"], "out/", jobs=8)
+    counts = runner.run(find_captures("backend/data/pcap"))
+
+Workers decode with one process each (``--jobs`` parallelizes files, not
+packets) and share the decoded capture cache under ``<output>``.
+"""
+import glob
+import json
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from .cancel import CancelToken, cancellable
+from .decode_cache import file_identity
+from .dispatcher import PluginDispatcher, PluginError
+
+MANIFEST_FILE = "batch_manifest.json"
+MANIFEST_VERSION = 1
+
+# 抓包后缀 (可再带压缩后缀, 解压由 PcapEngine 按文件头识别)
+CAPTURE_SUFFIXES = (".pcap", ".pcapng", ".cap")
+COMPRESSED_SUFFIXES = (".gz", ".zst", ".lz4")
+
+
+def is_capture(path):
+    name = path.lower()
+    for suffix in COMPRESSED_SUFFIXES:
+        if name.endswith(suffix):
+            name = name[:-len(suffix)]
+            break
+    return name.endswith(CAPTURE_SUFFIXES)
+
+
+def find_captures(pattern):
+    """
+    (base, captures) of a directory (its capture files, not recursive) or
+    a glob (``**`` recurses); ``base`` is what output names are relative to.
+    """
+    if os.path.isdir(pattern):
+        base = os.path.abspath(pattern)
+        paths = [os.path.join(base, name) for name in os.listdir(base)]
+    else:
+        # 通配符之前的目录部分作为输出命名的基准
+        head = pattern
+        while glob.has_magic(head):
+            head = os.path.dirname(head)
+        base = os.path.abspath(head or ".")
+        paths = [os.path.abspath(p) for p in glob.glob(pattern, recursive=True)]
+    return base, sorted(p for p in paths if os.path.isfile(p) and is_capture(p))
+
+
+def summary_kpis(summary):
+    """Top-level scalar values of a plugin summary, plus the number of alerts."""
+    kpis = {}
+    if not isinstance(summary, dict):
+        return kpis
+    for name, value in summary.items():
+        if name == "alerts" and isinstance(value, (list, tuple)):
+            kpis["alerts"] = len(value)
+            continue
+        # NumPy 标量
+        if hasattr(value, "item") and getattr(value, "ndim", None) == 0:
+            value = value.item()
+        if isinstance(value, (bool, int, float)):
+            kpis[name] = value
+    return kpis
+
+
+class BatchManifest:
+    """``batch_manifest.json``: one entry per (plugin, capture), written atomically."""
+
+    def __init__(self, path):
+        self.path = path
+        self.entries = {}
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return
+        if isinstance(data, dict) and data.get("version") == MANIFEST_VERSION:
+            self.entries = data.get("entries", {})
+
+    @staticmethod
+    def key(plugin_id, input_path):
+        return f"{plugin_id}:{input_path}"
+
+    def is_current(self, plugin_id, input_path, identity, version, config):
+        entry = self.entries.get(self.key(plugin_id, input_path))
+        return (entry is not None and entry.get("status") == "ok"
+                and entry.get("identity") == list(identity)
+                and entry.get("plugin_version") == version
+                and entry.get("config") == config
+                and os.path.exists(os.path.join(entry.get("output", ""), "summary.json")))
+
+    def record(self, entry):
+        self.entries[self.key(entry["plugin"], entry["input"])] = entry
+
+    def save(self):
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        tmp = f"{self.path}.{os.getpid()}.tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump({"version": MANIFEST_VERSION, "updated": time.time(), "entries": self.entries},
+                      f, indent=1, ensure_ascii=False)
+        os.replace(tmp, self.path)
+
+
+def _init_worker(settings):
+    """Engine defaults of a worker process (the pool may spawn rather than fork)."""
+    from .pcap_reader import PcapEngine
+    from .database import DatabaseManager
+    from .decode_cache import DecodeCache
+
+    PcapEngine.default_jobs = 1
+    if settings.get("memory_limit"):
+        PcapEngine.memory_limit = settings["memory_limit"]
+    if settings.get("trace_format"):
+        DatabaseManager.default_backend = settings["trace_format"]
+    if settings.get("cache_dir"):
+        PcapEngine.default_cache = DecodeCache(settings["cache_dir"], settings["cache_bytes"])
+
+
+def _run_task(task):
+    """Run one (plugin, capture) pair; returns its manifest entry, never raises."""
+    entry = {key: task[key] for key in ("plugin", "plugin_version", "input", "output", "identity", "config")}
+    entry["started"] = time.time()
+    start = time.perf_counter()
+    token = CancelToken(task["deadline_s"]) if task["deadline_s"] is not None else None
+    try:
+        with cancellable(token):
+            summary = PluginDispatcher(task["root"], task["package"]).run_plugin(
+                task["plugin"], task["input"], task["output"], task["params"])
+        entry.update(status="ok", kpis=summary_kpis(summary), truncated=bool(token and token.truncated))
+    except Exception as e:
+        entry.update(status="failed", error=f"{type(e).__name__}: {e}")
+    entry["elapsed_s"] = round(time.perf_counter() - start, 3)
+    return entry
+
+
+class BatchRunner:
+    """
+    Runs ``plugin_ids`` over captures with ``jobs`` worker processes
+    (0 = all CPUs, 1 = in this process) and keeps the batch manifest.
+    ``settings`` holds the engine defaults of the workers: ``cache_dir`` /
+    ``cache_bytes``, ``memory_limit`` (bytes) and ``trace_format``, and
+    ``deadline_s``, the read deadline of each (capture, plugin) pair.
+    """
+
+    def __init__(self, plugin_ids, output_dir, params=None, jobs=1, settings=None, dispatcher=None, force=False):
+        self.dispatcher = dispatcher or PluginDispatcher()
+        self.manifests = [self.dispatcher.get(plugin_id) for plugin_id in plugin_ids]
+        if isinstance(params, str):
+            try:
+                params = json.loads(params)
+            except json.JSONDecodeError as e:
+                raise PluginError(f"--params is not valid JSON: {e}") from None
+        self.params = dict(params or {})
+        self.output_dir = output_dir
+        self.jobs = jobs if jobs and jobs > 0 else (os.cpu_count() or 1)
+        self.settings = dict(settings or {})
+        self.force = force
+        self.manifest = BatchManifest(os.path.join(output_dir, MANIFEST_FILE))
+
+    def plan(self, base, captures):
+        """(tasks to run, number of pairs already up to date)."""
+        # 改变输出内容的配置: 参数、trace 格式与截止时间
+        config = {"params": self.params, "trace_format": self.settings.get("trace_format"),
+                  "deadline_s": self.settings.get("deadline_s")}
+        tasks, current = [], 0
+        for path in captures:
+            identity = file_identity(path)
+            name = os.path.splitext(os.path.relpath(path, base))[0]
+            for m in self.manifests:
+                if not self.force and self.manifest.is_current(m.plugin_id, path, identity, m.version, config):
+                    current += 1
+                    continue
+                tasks.append({"plugin": m.plugin_id, "plugin_version": m.version, "input": path,
+                              "output": os.path.join(os.path.abspath(self.output_dir), name, m.plugin_id),
+                              "identity": list(identity), "config": config, "params": self.params,
+                              "deadline_s": self.settings.get("deadline_s"),
+                              "root": self.dispatcher.root, "package": self.dispatcher.package})
+        return tasks, current
+
+    def run(self, found, report=None):
+        """
+        Analyze ``found`` (``find_captures`` result). ``report(entry, done,
+        total)`` is called as each pair finishes. Returns counts of
+        ``ok`` / ``failed`` / ``up_to_date`` pairs.
+        """
+        tasks, current = self.plan(*found)
+        counts = {"ok": 0, "failed": 0, "up_to_date": current}
+        if not tasks:
+            return counts
+
+        def finish(entry, done):
+            self.manifest.record(entry)
+            # 每完成一项即落盘: 中断后重跑从这里继续
+            self.manifest.save()
+            counts[entry["status"]] += 1
+            if report:
+                report(entry, done, len(tasks))
+
+        if self.jobs == 1:
+            _init_worker(self.settings)
+            for done, task in enumerate(tasks, 1):
+                finish(_run_task(task), done)
+            return counts
+
+        with ProcessPoolExecutor(min(self.jobs, len(tasks)), initializer=_init_worker,
+                                 initargs=(self.settings,)) as pool:
+            futures = [pool.submit(_run_task, task) for task in tasks]
+            try:
+                for done, future in enumerate(as_completed(futures), 1):
+                    finish(future.result(), done)
+            except BaseException:
+                # Ctrl-C: 不再启动排队中的任务, 已完成的已写入清单
+                pool.shutdown(wait=False, cancel_futures=True)
+                raise
+        return counts
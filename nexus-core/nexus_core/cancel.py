@@ -0,0 +1,78 @@
+"""
+Nexus Analyzer Core - Cancellation and Deadlines
+Cooperative stop of in-process analyses, checked by ``PcapEngine`` once per batch.
+
+    token = CancelToken(deadline_s=60)
+    with cancellable(token):
+        summary = dispatcher.run_plugin("wifi.ba", "air.pcapng", "out/")
+    summary["truncated"]            # True if the deadline cut the read short
+
+    token.cancel()                  # from another thread: the run raises AnalysisCancelled
+
+``cancel()`` aborts the run: the next check raises ``AnalysisCancelled``.
+A deadline instead ends the pass over the capture early, as if the file
+ended there, so the analysis finishes on the packets read so far and
+``save_summary`` records ``"truncated": true``. A truncated pass does not
+build the packet index, fill the decode cache or advance the read
+position. The active token is per thread / task (``contextvars``).
+"""
+import contextlib
+import contextvars
+import threading
+import time
+
+_current = contextvars.ContextVar("nexus_cancel", default=None)
+
+
+class AnalysisCancelled(Exception):
+    """The analysis was stopped through its ``CancelToken``."""
+
+
+class CancelToken:
+    """Cancellation flag of one run, with an optional deadline ``deadline_s`` seconds from now."""
+
+    def __init__(self, deadline_s=None):
+        self._event = threading.Event()
+        self.reason = None
+        self.deadline = None if deadline_s is None else time.monotonic() + deadline_s
+        # 截止时间到达后读取被截断
+        self.truncated = False
+
+    def cancel(self, reason="cancelled"):
+        """Request the run to stop (thread-safe); it raises at its next check."""
+        self.reason = reason
+        self._event.set()
+
+    @property
+    def cancelled(self):
+        return self._event.is_set()
+
+    def expired(self):
+        """Whether the deadline has passed; marks the run as truncated when it has."""
+        if self.deadline is not None and time.monotonic() >= self.deadline:
+            self.truncated = True
+        return self.truncated
+
+    def check(self):
+        """
+        Raise ``AnalysisCancelled`` if cancelled; return True if the deadline
+        has passed (the caller stops reading), False otherwise.
+        """
+        if self._event.is_set():
+            raise AnalysisCancelled(self.reason)
+        return self.expired()
+
+
+def current():
+    """The token active in this context, or None."""
+    return _current.get()
+
+
+@contextlib.contextmanager
+def cancellable(token):
+    """Make ``token`` the active token (``PcapEngine`` passes check it) inside the block."""
+    reset = _current.set(token)
+    try:
+        yield token
+    finally:
+        _current.reset(reset)
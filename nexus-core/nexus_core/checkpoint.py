@@ -0,0 +1,86 @@
+"""
+Nexus Analyzer Core - Incremental Checkpoints
+Resume an analysis of a capture that is still being written.
+
+A checkpoint stores where the last pass over the capture stopped
+(``ReadPosition``) and the state of every analyzer at that point
+(``Subscriber.state()``: flow tables, BlockAck acked-SN sets, RTP sequence
+unwrap state, ...). The next run restores the analyzers, reads only the
+records added since and appends to the trace output:
+
+    checkpoint = Checkpoint.load(output_dir, "air.pcapng", name="ba")
+    with DatabaseManager(output_dir).writer([TRACE_SCHEMA], append=checkpoint.resuming) as writer:
+        pipe = Pipeline("air.pcapng")
+        pipe.subscribe("trace", trace_subscriber(writer))
+        reports = pipe.run(checkpoint=checkpoint)
+    checkpoint.save()       # after the writer is closed: rows are on disk
+
+Checkpoints live in ``<output>/checkpoint.<name>.pkl``; one that belongs
+to another capture, or to a capture that was rewritten, is ignored.
+"""
+import os
+import pickle
+
+from .pcap_reader import ReadPosition
+
+# 状态格式变化时递增, 旧检查点即被忽略
+CHECKPOINT_VERSION = 1
+
+
+def checkpoint_path(output_dir, name):
+    return os.path.join(output_dir, f"checkpoint.{name}.pkl")
+
+
+class Checkpoint:
+    """Read position plus analyzer states (name -> picklable object) of one capture."""
+
+    def __init__(self, path, source, position=None, state=None):
+        self.path = path
+        self.source = source
+        self.position = position
+        self.state = dict(state or {})
+
+    @property
+    def resuming(self):
+        """True when the previous run's state is restored (trace tables are appended to)."""
+        return self.position is not None
+
+    @classmethod
+    def load(cls, output_dir, capture, name="pipeline"):
+        """
+        Checkpoint of ``capture`` in ``output_dir``; an empty one (full
+        re-read) if there is none, it is unreadable, or the capture no
+        longer starts with the bytes it was taken from.
+        """
+        path = checkpoint_path(output_dir, name)
+        source = os.path.abspath(capture)
+        try:
+            with open(path, "rb") as f:
+                data = pickle.load(f)
+        except (OSError, EOFError, pickle.UnpicklingError, AttributeError, ImportError):
+            return cls(path, source)
+        if (not isinstance(data, dict) or data.get("version") != CHECKPOINT_VERSION
+                or data.get("source") != source):
+            return cls(path, source)
+        position = ReadPosition.from_dict(data["position"])
+        if not position.matches(capture):
+            return cls(path, source)
+        return cls(path, source, position, data["state"])
+
+    def save(self):
+        """Write the checkpoint atomically (a crash keeps the previous one)."""
+        if self.position is None:
+            return
+        data = {"version": CHECKPOINT_VERSION, "source": self.source,
+                "position": self.position.to_dict(), "state": self.state}
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        with open(self.path + ".tmp", "wb") as f:
+            pickle.dump(data, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(self.path + ".tmp", self.path)
+
+    def clear(self):
+        """Forget the saved state: the next run re-reads the capture from the start."""
+        self.position = None
+        self.state = {}
+        if os.path.exists(self.path):
+            os.remove(self.path)
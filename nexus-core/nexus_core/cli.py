@@ -2,30 +2,166 @@
 Nexus Analyzer Core - CLI Entry Point
 """
 import argparse
+import os
 import sys
-from .engine import PluginDispatcher
+import time
+# 只导入标准库模块: list-plugins 不加载 NumPy 与任何插件, 其余依赖在用到的分支中导入
+from .dispatcher import PluginDispatcher, PluginError
+
+MB = 1024 * 1024
+
+
+def show_cache(cache, purge=False):
+    """`cache` 子命令: 列出或清空 <output>/.nexus_cache"""
+    if purge:
+        count, freed = cache.purge()
+        print(f"Purged {count} entries ({freed / 1024 / 1024:.1f} MB) from {cache.cache_dir}")
+        return
+
+    entries = cache.entries()
+    total = sum(e["bytes"] for e in entries)
+    print(f"Cache: {cache.cache_dir} ({len(entries)} entries, {total / 1024 / 1024:.1f} MB "
+          f"of {cache.max_bytes / 1024 / 1024:.0f} MB)")
+    # 最近使用的在前
+    for e in reversed(entries):
+        meta = e["meta"]
+        used = time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(e["last_used"]))
+        print(f"  {e['key'][:12]}  {e['bytes'] / 1024 / 1024:8.1f} MB  {meta.get('rows', '?'):>10} rows  "
+              f"{used}  {meta.get('decoder', '?')}  {meta.get('source', '?')}")
+
+
+def list_plugins(dispatcher):
+    """`list-plugins` 子命令: 只读取 plugin.yaml 清单, 不导入插件代码"""
+    plugins = dispatcher.list_plugins()
+    print(f"Available plugins ({len(plugins)}):")
+    width = max((len(m.plugin_id) for m in plugins), default=0)
+    for m in plugins:
+        print(f"  {m.plugin_id:<{width}}  {m.version:<8} {m.category:<10} {m.name}")
+        if m.description:
+            print(f"  {'':<{width}}  {m.description}")
+    for error in dispatcher.errors:
+        print(f"Warning: skipped invalid plugin manifest {error}", file=sys.stderr)
+
+
+def run_batch(args, settings):
+    """`batch` 子命令: 目录 / 通配符下的每个抓包 x 每个插件, 跳过结果已是最新的"""
+    from .batch import BatchRunner, find_captures, MANIFEST_FILE
+
+    runner = BatchRunner([p.strip() for p in args.plugin.split(",") if p.strip()], args.output,
+                         params=args.params, jobs=args.jobs, settings=settings, force=args.force)
+    found = find_captures(args.input)
+    if not found[1]:
+        print(f"Error: no capture files match {args.input}", file=sys.stderr)
+        sys.exit(1)
+
+    def report(entry, done, total):
+        name = os.path.relpath(entry["input"], found[0])
+        line = f"[{done}/{total}] {entry['status']:<6} {entry['plugin']:<12} {name}  {entry['elapsed_s']:.1f} s"
+        print(line if entry["status"] == "ok" else f"{line}  {entry['error']}", flush=True)
+
+    start = time.perf_counter()
+    try:
+        counts = runner.run(found, report)
+    except KeyboardInterrupt:
+        print(f"Interrupted; finished results are kept in {os.path.join(args.output, MANIFEST_FILE)}, "
+              f"re-run the same command to resume", file=sys.stderr)
+        sys.exit(130)
+    print(f"Batch: {counts['ok']} ok, {counts['failed']} failed, {counts['up_to_date']} up to date "
+          f"in {time.perf_counter() - start:.1f} s; manifest: {os.path.join(args.output, MANIFEST_FILE)}")
+    if counts["failed"]:
+        sys.exit(1)
+
 
 def main():
     parser = argparse.ArgumentParser(description="Nexus Analyzer Core CLI")
-    parser.add_argument("command", choices=["analyze", "list-plugins"], help="Command to execute")
-    parser.add_argument("--plugin", help="Plugin identifier (e.g., wifi.qos)")
-    parser.add_argument("--input", help="Path to input file (e.g., capture.pcap)")
+    parser.add_argument("command", choices=["analyze", "batch", "list-plugins", "cache"], help="Command to execute")
+    parser.add_argument("--plugin", help="Plugin identifier (e.g., wifi.qos); batch: comma-separated list")
+    parser.add_argument("--input", help="Path to input file (e.g., capture.pcap); batch: directory or glob")
     parser.add_argument("--output", help="Path to output directory")
     parser.add_argument("--params", help="JSON string of parameters")
+    parser.add_argument("--jobs", type=int, default=1,
+                        help="Worker processes (0 = all CPUs): pcap decoding for analyze, "
+                             "captures analyzed in parallel for batch")
+    parser.add_argument("--force", action="store_true",
+                        help="batch: re-analyze captures whose results are up to date")
+    parser.add_argument("--no-cache", action="store_true",
+                        help="Do not read or write the decoded capture cache in the output directory")
+    parser.add_argument("--cache-size", type=int, default=None,
+                        help="Size limit of the decoded capture cache in MB, default 2048 "
+                             "(least recently used entries are evicted)")
+    parser.add_argument("--purge", action="store_true", help="cache: delete every cached entry")
+    parser.add_argument("--memory-limit", type=int, default=None,
+                        help="Memory ceiling in MB for the decoded columns an analysis collects "
+                             "(abort instead of exhausting RAM; streaming analyses keep no columns)")
+    parser.add_argument("--deadline", type=float, default=None,
+                        help="Seconds an analysis may read for; the result then covers the packets read so far "
+                             "and summary.json has \"truncated\": true (batch: per capture and plugin)")
+    parser.add_argument("--no-progress", action="store_true",
+                        help="analyze: do not print JSON progress lines on stdout")
+    parser.add_argument("--trace-format", default="sqlite",
+                        help="Per-frame trace output: sqlite (trace.sqlite) or parquet (requires pyarrow)")
     
     args = parser.parse_args()
-    
+
     if args.command == "list-plugins":
-        print("Available plugins: (TODO)")
+        list_plugins(PluginDispatcher())
+        return
+
+    from .pcap_reader import PcapEngine
+    from .decode_cache import DecodeCache, CACHE_DIRNAME, DEFAULT_CACHE_BYTES
+    from .database import DatabaseManager, BACKENDS
+    from .progress import ProgressReporter, reporting
+    from .cancel import CancelToken, cancellable
+    from .memory import MemoryLimitError
+
+    if args.trace_format not in BACKENDS:
+        parser.error(f"argument --trace-format: invalid choice: '{args.trace_format}' "
+                     f"(choose from {', '.join(BACKENDS)})")
+    cache_bytes = args.cache_size * MB if args.cache_size is not None else DEFAULT_CACHE_BYTES
+    PcapEngine.default_jobs = args.jobs
+    if args.memory_limit:
+        PcapEngine.memory_limit = args.memory_limit * MB
+    DatabaseManager.default_backend = args.trace_format
+
+    if args.command == "cache":
+        if not args.output:
+            print("Error: --output is required for 'cache'")
+            sys.exit(1)
+        show_cache(DecodeCache(os.path.join(args.output, CACHE_DIRNAME), cache_bytes), purge=args.purge)
+        return
+
+    if args.command == "batch":
+        if not args.plugin or not args.input or not args.output:
+            print("Error: --plugin, --input, and --output are required for 'batch'")
+            sys.exit(1)
+        settings = {"trace_format": args.trace_format, "deadline_s": args.deadline,
+                    "memory_limit": args.memory_limit * MB if args.memory_limit else None}
+        if not args.no_cache:
+            settings.update(cache_dir=os.path.join(args.output, CACHE_DIRNAME), cache_bytes=cache_bytes)
+        try:
+            run_batch(args, settings)
+        except PluginError as e:
+            print(f"Error: {e}", file=sys.stderr)
+            sys.exit(1)
         return
 
     if args.command == "analyze":
         if not args.plugin or not args.input or not args.output:
             print("Error: --plugin, --input, and --output are required for 'analyze'")
             sys.exit(1)
+
+        PcapEngine.default_cache = (None if args.no_cache else
+                                    DecodeCache(os.path.join(args.output, CACHE_DIRNAME), cache_bytes))
             
-        dispatcher = PluginDispatcher()
-        dispatcher.run_plugin(args.plugin, args.input, args.output, args.params)
+        # 进度: stdout 上限频的 JSON 行 (见 nexus_core.progress), 由 PcapEngine 按读取偏移驱动
+        reporter = None if args.no_progress else ProgressReporter()
+        token = CancelToken(args.deadline) if args.deadline is not None else None
+        try:
+            with reporting(reporter), cancellable(token):
+                PluginDispatcher().run_plugin(args.plugin, args.input, args.output, args.params)
+        except (PluginError, MemoryLimitError) as e:
+            print(f"Error: {e}", file=sys.stderr)
+            sys.exit(1)
 
 if __name__ == "__main__":
     main()
@@ -1,18 +1,320 @@
 """
 Nexus Analyzer Core - Database Manager
 Handles SQLite interactions for trace data.
+
+Per-frame detail goes to ``<output>/trace.sqlite``. Each analyzer declares
+its tables as ``TableSchema`` (SQL column -> decoder column) and loads
+columnar batches through ``SQLiteWriter``:
+
+    with DatabaseManager(output_dir).writer([TRACE_SCHEMA]) as writer:
+        for cols in engine.iter_decode(decode_dot11, snaplen=DOT11_SNAPLEN):
+            writer.write("frames", cols)
+
+During the load the database runs in WAL mode with ``synchronous=OFF`` and
+rows are inserted inside large transactions; indexes are only built once
+the load has finished.
+
+Insert cost grows with the number of bound values, so frame tables stay
+narrow: instead of repeating the flow key (MACs, TID, ...) in every row a
+schema may declare a flow key; each frame then carries one ``flow`` id and
+the keys plus per-flow counters go to a ``<table>_flows`` side table.
 """
 import sqlite3
 import os
 
+import numpy as np
+
+from .engine import Subscriber
+from .flow_table import FlowTable
+
+# 每个事务最多写入的行数
+COMMIT_ROWS = 1 << 20
+
+# 单条 INSERT 的绑定参数上限 (兼容 SQLITE_MAX_VARIABLE_NUMBER 的旧默认值 999)
+MAX_VARIABLES = 999
+
+
+class TableSchema:
+    """
+    One trace table: ``columns`` are ``(sql_name, source_column, sql_type)``
+    (``sql_type`` defaults to INTEGER), ``indexes`` are tuples of SQL column
+    names, built after the load.
+
+    ``flow_key`` (a ``FlowTable`` key dtype) with ``flow_columns`` (key field
+    -> source column) adds a ``flow`` column holding the flow id of each row
+    and a ``<name>_flows`` table (``flow``, key fields, ``packets``,
+    ``bytes`` from ``flow_bytes``, ``first_ts`` / ``last_ts`` from the
+    ``ts_ns`` column).
+
+    ``row_group_rows`` overrides the Parquet row group size of this table
+    (small groups make lookups on small, sorted tables cheaper).
+    """
+
+    def __init__(self, name, columns, indexes=(), flow_key=None, flow_columns=None, flow_bytes=None,
+                 row_group_rows=None):
+        self.name = name
+        self.row_group_rows = row_group_rows
+        self.columns = [tuple(c) if len(c) == 3 else (c[0], c[1], "INTEGER") for c in columns]
+        self.indexes = [tuple(ix) for ix in indexes]
+        self.flow_key = None if flow_key is None else np.dtype(flow_key)
+        self.flow_columns = dict(flow_columns or {})
+        self.flow_bytes = flow_bytes
+        if self.flow_key is not None:
+            self.columns.append(("flow", None, "INTEGER"))
+
+    @property
+    def flows_table(self):
+        return f"{self.name}_flows"
+
+    @property
+    def sources(self):
+        """Decoder columns the table reads."""
+        sources = [source for _, source, _ in self.columns if source is not None]
+        if self.flow_key is not None:
+            sources += list(self.flow_columns.values()) + ["ts_ns"]
+            if self.flow_bytes:
+                sources.append(self.flow_bytes)
+        return tuple(dict.fromkeys(sources))
+
+    def create_sql(self):
+        cols = ", ".join(f"{name} {sql_type}" for name, _, sql_type in self.columns)
+        return f"CREATE TABLE {self.name} ({cols})"
+
+    def flows_sql(self):
+        cols = ", ".join(f"{name} INTEGER" for name in self.flow_key.names)
+        return (f"CREATE TABLE {self.flows_table} (flow INTEGER PRIMARY KEY, {cols}, "
+                f"packets INTEGER, bytes INTEGER, first_ts INTEGER, last_ts INTEGER)")
+
+    def index_sql(self):
+        return [f"CREATE INDEX IF NOT EXISTS idx_{self.name}_{'_'.join(ix)} ON {self.name} ({', '.join(ix)})"
+                for ix in self.indexes]
+
+
+def _rows_matrix(arrays):
+    """
+    Stack columns into one 2-D array whose ``tolist()`` gives SQLite-ready
+    Python values. Integer / bool columns go through int64 (uint64 keeps its
+    bit pattern), anything else through an object array.
+    """
+    n = len(arrays[0]) if arrays else 0
+    if all(a.dtype.kind in "biu" for a in arrays):
+        out = np.empty((n, len(arrays)), dtype=np.int64)
+    else:
+        out = np.empty((n, len(arrays)), dtype=object)
+    for j, a in enumerate(arrays):
+        out[:, j] = a.astype(np.int64) if a.dtype.kind in "bu" else a
+    return out
+
+
+class TraceWriter:
+    """
+    Common part of the trace backends: maps decoder columns to table
+    columns, assigns flow ids and keeps the per-table row counts.
+    """
+
+    def __init__(self, schemas, append=False):
+        self.schemas = {schema.name: schema for schema in schemas}
+        # append: 保留已有的行, 继续写入 (增量分析, 流表与行数由 TraceSubscriber.restore 恢复)
+        self.append = append
+        self.rows = dict.fromkeys(self.schemas, 0)
+        self._flows = {name: FlowTable(schema.flow_key)
+                       for name, schema in self.schemas.items() if schema.flow_key is not None}
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+    def _table_arrays(self, table, cols):
+        """Arrays of one batch in ``schema.columns`` order (``flow`` ids included)."""
+        schema = self.schemas[table]
+        flows = self._flows.get(table)
+        flow_ids = None
+        if flows is not None:
+            keys = np.empty(len(cols["ts_ns"]), dtype=schema.flow_key)
+            for field, source in schema.flow_columns.items():
+                keys[field] = cols[source]
+            nbytes = cols[schema.flow_bytes] if schema.flow_bytes else None
+            flow_ids = flows.update(keys, nbytes=nbytes, ts_ns=cols["ts_ns"])
+        # source 为 None 的列即 flow 列
+        arrays = [np.asarray(cols[source]) if source is not None else flow_ids
+                  for _, source, _ in schema.columns]
+        self.rows[table] += len(arrays[0]) if arrays else 0
+        return arrays
+
+    def _flow_arrays(self, table):
+        """(names, arrays) of the ``<table>_flows`` rows, ``flow`` first."""
+        schema = self.schemas[table]
+        flows = self._flows[table]
+        cols = flows.columns()
+        names = list(schema.flow_key.names) + ["packets", "bytes", "first_ts", "last_ts"]
+        return ["flow"] + names, [np.arange(len(flows), dtype=np.int64)] + [cols[name] for name in names]
+
+    def write(self, table, cols):
+        raise NotImplementedError
+
+    def close(self):
+        raise NotImplementedError
+
+
+class SQLiteWriter(TraceWriter):
+    """
+    Bulk loader for ``trace.sqlite``: tables of ``schemas`` are (re)created
+    on open (kept with ``append``), ``write`` inserts one columnar batch,
+    ``close`` commits, builds the indexes and switches back to durable
+    settings.
+    """
+
+    def __init__(self, db_path, schemas, commit_rows=COMMIT_ROWS, append=False):
+        super().__init__(schemas, append)
+        self.db_path = db_path
+        self.commit_rows = commit_rows
+        self._pending = 0
+        self._statements = {}
+        # isolation_level=None: 事务由本类显式控制
+        self.conn = sqlite3.connect(db_path, isolation_level=None)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=OFF")
+        self.conn.execute("PRAGMA temp_store=MEMORY")
+        self.conn.execute("PRAGMA cache_size=-262144")
+        # 建索引时的外部排序可用多个辅助线程
+        self.conn.execute(f"PRAGMA threads={min(os.cpu_count() or 1, 8)}")
+        for schema in self.schemas.values():
+            if not append:
+                self.conn.execute(f"DROP TABLE IF EXISTS {schema.name}")
+            self.conn.execute(schema.create_sql().replace("CREATE TABLE", "CREATE TABLE IF NOT EXISTS", 1))
+            if schema.flow_key is not None:
+                # 流表总是按完整的 FlowTable 重写
+                self.conn.execute(f"DROP TABLE IF EXISTS {schema.flows_table}")
+                self.conn.execute(schema.flows_sql())
+        self.conn.execute("BEGIN")
+
+    def _insert_sql(self, schema, rows):
+        key = (schema.name, rows)
+        sql = self._statements.get(key)
+        if sql is None:
+            values = "(" + ", ".join("?" * len(schema.columns)) + ")"
+            sql = f"INSERT INTO {schema.name} VALUES " + ", ".join([values] * rows)
+            self._statements[key] = sql
+        return sql
+
+    def write(self, table, cols):
+        """Insert one batch of decoder columns (dict name -> array) into ``table``."""
+        schema = self.schemas[table]
+        matrix = _rows_matrix(self._table_arrays(table, cols))
+        n = len(matrix)
+        if n == 0:
+            return
+
+        # 多行 VALUES: 每条语句插入 per_stmt 行, 摊薄逐行执行的开销
+        per_stmt = max(1, MAX_VARIABLES // len(schema.columns))
+        full = n // per_stmt * per_stmt
+        if full:
+            self.conn.executemany(self._insert_sql(schema, per_stmt),
+                                  matrix[:full].reshape(-1, per_stmt * len(schema.columns)).tolist())
+        if full < n:
+            self.conn.executemany(self._insert_sql(schema, 1), matrix[full:].tolist())
+
+        self._pending += n
+        if self._pending >= self.commit_rows:
+            self.conn.execute("COMMIT")
+            self.conn.execute("BEGIN")
+            self._pending = 0
+
+    def _write_flows(self, table):
+        names, arrays = self._flow_arrays(table)
+        values = ", ".join("?" * len(names))
+        self.conn.executemany(f"INSERT INTO {self.schemas[table].flows_table} VALUES ({values})",
+                              _rows_matrix(arrays).tolist())
+
+    def close(self):
+        if self.conn is None:
+            return
+        try:
+            for table in self._flows:
+                self._write_flows(table)
+            if self.conn.in_transaction:
+                self.conn.execute("COMMIT")
+            # 加载完成后再建索引, 避免每次插入都维护 B-tree
+            for schema in self.schemas.values():
+                for sql in schema.index_sql():
+                    self.conn.execute(sql)
+            self.conn.execute("PRAGMA synchronous=NORMAL")
+            self.conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+        finally:
+            self.conn.close()
+            self.conn = None
+
+
+class TraceSubscriber(Subscriber):
+    """``Pipeline`` subscriber streaming its rows into one ``TraceWriter`` table; reports the row count."""
+
+    def __init__(self, writer, schema, decoder, select=None, snaplen=None):
+        super().__init__(decoder, schema.sources, select=select, snaplen=snaplen)
+        self.writer = writer
+        self.table = schema.name
+
+    def on_batch(self, cols):
+        self.writer.write(self.table, cols)
+
+    def finish(self):
+        return self.writer.rows[self.table]
+
+    def state(self):
+        return {"rows": self.writer.rows[self.table], "flows": self.writer._flows.get(self.table)}
+
+    def restore(self, state):
+        # 流编号接着上次的 FlowTable 分配, 追加的行与已有的流表一致
+        self.writer.rows[self.table] = state["rows"]
+        if state["flows"] is not None:
+            self.writer._flows[self.table] = state["flows"]
+
+
+# trace 输出后端: trace.sqlite 或每表一个 Parquet 文件 (见 trace_store)
+BACKENDS = ("sqlite", "parquet")
+
+
 class DatabaseManager:
-    def __init__(self, output_dir):
+    # CLI --trace-format 设置的进程默认后端
+    default_backend = "sqlite"
+
+    def __init__(self, output_dir, backend=None):
+        self.output_dir = output_dir
+        self.backend = backend or self.default_backend
+        if self.backend not in BACKENDS:
+            raise ValueError(f"Unknown trace backend '{self.backend}', expected one of {BACKENDS}")
         self.db_path = os.path.join(output_dir, "trace.sqlite")
         self.conn = None
+        self._schemas = []
 
     def connect(self):
         self.conn = sqlite3.connect(self.db_path)
-    
+
+    def writer(self, schemas, commit_rows=COMMIT_ROWS, append=False):
+        """
+        ``TraceWriter`` of the configured backend for the given table schemas;
+        ``append`` keeps the rows of an earlier run (incremental analysis).
+        """
+        self._schemas = list(schemas)
+        if self.backend == "parquet":
+            from .trace_store import ParquetWriter
+            return ParquetWriter(self.output_dir, self._schemas, append=append)
+        return SQLiteWriter(self.db_path, self._schemas, commit_rows, append=append)
+
+    def describe(self):
+        """Trace part of the output contract (``save_summary(..., trace=db)``): backend and files."""
+        if self.backend == "parquet":
+            from .trace_store import trace_path
+            files = []
+            for schema in self._schemas:
+                files.append(os.path.basename(trace_path(self.output_dir, schema.name)))
+                if schema.flow_key is not None:
+                    files.append(os.path.basename(trace_path(self.output_dir, schema.flows_table)))
+        else:
+            files = [os.path.basename(self.db_path)]
+        return {"backend": self.backend, "files": files}
+
     def close(self):
         if self.conn:
             self.conn.close()
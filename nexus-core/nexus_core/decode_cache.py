@@ -0,0 +1,173 @@
+"""
+Nexus Analyzer Core - Decoded Capture Cache
+Columnar decoder output persisted under the output directory, so running
+several analyses over the same capture parses its packets only once.
+
+    cache = DecodeCache(os.path.join(output_dir, CACHE_DIRNAME))
+    cols = PcapEngine("air.pcapng", cache=cache).decode(decode_dot11, snaplen=DOT11_SNAPLEN)
+
+Entries are ``.npz`` files named by a content address: the capture identity
+(size, mtime, hash of its first and last 64 KB), the decoder and
+``DECODER_VERSION``, and every argument that changes the rows (snaplen,
+``select``, ``PacketFilter``). A hit touches the entry's mtime; the total
+size is kept below ``max_bytes`` by evicting the least recently used entries.
+"""
+import hashlib
+import json
+import os
+import time
+
+import numpy as np
+
+from .decoders.common import DECODER_VERSION
+
+CACHE_DIRNAME = ".nexus_cache"
+CACHE_SUFFIX = ".npz"
+DEFAULT_CACHE_BYTES = 2 * 1024 * 1024 * 1024
+
+# 参与文件指纹的首尾字节数
+IDENTITY_BYTES = 64 * 1024
+
+_META = "__meta__"
+
+
+def file_identity(file_path):
+    """(size, mtime_ns, sha1 of the first and last ``IDENTITY_BYTES``) of a file."""
+    st = os.stat(file_path)
+    digest = hashlib.sha1()
+    with open(file_path, "rb") as f:
+        digest.update(f.read(IDENTITY_BYTES))
+        if st.st_size > IDENTITY_BYTES:
+            f.seek(max(IDENTITY_BYTES, st.st_size - IDENTITY_BYTES))
+            digest.update(f.read(IDENTITY_BYTES))
+    return st.st_size, st.st_mtime_ns, digest.hexdigest()
+
+
+def _callable_name(fn):
+    """Stable name of a module level function; None for lambdas / closures."""
+    name = f"{fn.__module__}.{fn.__qualname__}"
+    return None if "<" in name else name
+
+
+class DecodeCache:
+    """Size-bounded LRU store of decoded column dicts in ``cache_dir``."""
+
+    def __init__(self, cache_dir, max_bytes=DEFAULT_CACHE_BYTES):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+
+    def key(self, file_path, decoder, snaplen=None, select=None, packet_filter=None, columns=None):
+        """
+        Content address of one ``PcapEngine.decode`` call, or None when the
+        call cannot be cached (``decoder`` / ``select`` is a lambda or closure).
+        ``columns`` narrows the entry to those columns (a ``Pipeline``
+        subscriber's input).
+        """
+        decoder_name = _callable_name(decoder)
+        select_name = None if select is None else _callable_name(select)
+        if decoder_name is None or (select is not None and select_name is None):
+            return None
+        parts = {
+            "file": file_identity(file_path),
+            "decoder": decoder_name,
+            "version": DECODER_VERSION,
+            "snaplen": snaplen,
+            "select": select_name,
+            "filter": None if packet_filter is None else packet_filter.cache_key(),
+        }
+        # decode 的键保持不变; 订阅者的投影另成条目
+        if columns is not None:
+            parts["columns"] = list(columns)
+        return hashlib.sha256(json.dumps(parts, sort_keys=True, default=str).encode("utf-8")).hexdigest()
+
+    def _path(self, key):
+        return os.path.join(self.cache_dir, key + CACHE_SUFFIX)
+
+    def load(self, key):
+        """Cached columns for ``key`` or None."""
+        path = self._path(key)
+        try:
+            with np.load(path, allow_pickle=False) as npz:
+                cols = {name: npz[name] for name in npz.files if name != _META}
+            os.utime(path)
+        except (OSError, ValueError, KeyError):
+            return None
+        return cols
+
+    def store(self, key, cols, **meta):
+        """
+        Persist ``cols`` (``meta`` is kept for ``entries``) and evict old
+        entries; returns False when the entry does not fit or cannot be written.
+        """
+        nbytes = sum(col.nbytes for col in cols.values())
+        if nbytes > self.max_bytes:
+            return False
+        meta.update(rows=len(next(iter(cols.values()))) if cols else 0, created=time.time())
+        path = self._path(key)
+        tmp = f"{path}.{os.getpid()}.tmp"
+        try:
+            os.makedirs(self.cache_dir, exist_ok=True)
+            with open(tmp, "wb") as f:
+                np.savez(f, **cols, **{_META: np.array(json.dumps(meta))})
+            os.replace(tmp, path)
+        except OSError:
+            try:
+                os.remove(tmp)
+            except OSError:
+                pass
+            return False
+        self.evict()
+        return True
+
+    def entries(self):
+        """Cache entries, least recently used first: dicts with key / path / bytes / last_used / meta."""
+        if not os.path.isdir(self.cache_dir):
+            return []
+        out = []
+        for name in os.listdir(self.cache_dir):
+            if not name.endswith(CACHE_SUFFIX):
+                continue
+            path = os.path.join(self.cache_dir, name)
+            try:
+                st = os.stat(path)
+            except OSError:
+                continue
+            try:
+                with np.load(path, allow_pickle=False) as npz:
+                    meta = json.loads(str(npz[_META]))
+            except (OSError, ValueError, KeyError):
+                # 损坏或被其他进程改写的条目: 仍按大小参与淘汰
+                meta = {}
+            out.append({"key": name[:-len(CACHE_SUFFIX)], "path": path, "bytes": st.st_size,
+                        "last_used": st.st_mtime, "meta": meta})
+        out.sort(key=lambda e: e["last_used"])
+        return out
+
+    def evict(self, max_bytes=None):
+        """Drop least recently used entries until the cache fits ``max_bytes``; returns the count removed."""
+        max_bytes = self.max_bytes if max_bytes is None else max_bytes
+        entries = self.entries()
+        total = sum(e["bytes"] for e in entries)
+        removed = 0
+        for entry in entries:
+            if total <= max_bytes:
+                break
+            try:
+                os.remove(entry["path"])
+            except OSError:
+                continue
+            total -= entry["bytes"]
+            removed += 1
+        return removed
+
+    def purge(self):
+        """Remove every entry; returns (count, bytes) freed."""
+        count = freed = 0
+        for entry in self.entries():
+            try:
+                os.remove(entry["path"])
+            except OSError:
+                continue
+            count += 1
+            freed += entry["bytes"]
+        return count, freed
@@ -0,0 +1,26 @@
+"""
+Nexus Analyzer Core - Vectorized Header Decoders
+Each decoder takes a ``PacketBatch`` and returns a dict of NumPy columns.
+"""
+from .common import concat_columns, take_columns
+from .dot11 import decode_dot11, mac_to_int, int_to_mac, format_macs, DOT11_SNAPLEN
+from .ip import decode_ip, ip_to_str, format_ips, top_source_flow, IP_SNAPLEN
+from .rtp import decode_rtp, SeqUnwrapper, RTP_SNAPLEN
+
+__all__ = [
+    "decode_dot11",
+    "DOT11_SNAPLEN",
+    "mac_to_int",
+    "int_to_mac",
+    "format_macs",
+    "decode_ip",
+    "IP_SNAPLEN",
+    "ip_to_str",
+    "format_ips",
+    "top_source_flow",
+    "decode_rtp",
+    "RTP_SNAPLEN",
+    "SeqUnwrapper",
+    "concat_columns",
+    "take_columns",
+]
@@ -0,0 +1,95 @@
+"""
+Nexus Analyzer Core - Decoder Helpers
+Vectorized byte gathering over a PacketBatch buffer.
+
+All helpers take absolute positions into ``batch.data`` plus a ``valid`` mask
+and return 0 where the mask is False, so decoders never read out of bounds.
+"""
+import numpy as np
+
+# 解码结果的格式版本: 任一解码器的输出列或语义变化时递增, 使已缓存的解码结果失效
+DECODER_VERSION = 2
+
+
+def packet_bounds(batch):
+    """Return (start, end) absolute buffer positions of every packet (int64)."""
+    start = batch.records["buf_off"].astype(np.int64)
+    end = start + batch.records["buf_len"].astype(np.int64)
+    return start, end
+
+
+def fits(pos, width, end, valid=None):
+    """Mask of packets where ``width`` bytes at ``pos`` lie before ``end``."""
+    ok = (pos >= 0) & (pos + width <= end)
+    if valid is not None:
+        ok &= valid
+    return ok
+
+
+def u8(data, pos, valid):
+    if data.size == 0:
+        return np.zeros(len(pos), dtype=np.uint8)
+    out = data[np.where(valid, pos, 0)]
+    out[~valid] = 0
+    return out
+
+
+def u16le(data, pos, valid):
+    return u8(data, pos, valid).astype(np.uint16) | (u8(data, pos + 1, valid).astype(np.uint16) << 8)
+
+
+def u16be(data, pos, valid):
+    return (u8(data, pos, valid).astype(np.uint16) << 8) | u8(data, pos + 1, valid).astype(np.uint16)
+
+
+def u32le(data, pos, valid):
+    out = np.zeros(len(pos), dtype=np.uint32)
+    for i in range(4):
+        out |= u8(data, pos + i, valid).astype(np.uint32) << np.uint32(8 * i)
+    return out
+
+
+def u32be(data, pos, valid):
+    out = np.zeros(len(pos), dtype=np.uint32)
+    for i in range(4):
+        out = (out << np.uint32(8)) | u8(data, pos + i, valid).astype(np.uint32)
+    return out
+
+
+def u64le(data, pos, valid):
+    out = np.zeros(len(pos), dtype=np.uint64)
+    for i in range(8):
+        out |= u8(data, pos + i, valid).astype(np.uint64) << np.uint64(8 * i)
+    return out
+
+
+def be_uint(data, pos, valid, width):
+    """Big-endian unsigned integer of ``width`` (<= 8) bytes as uint64."""
+    out = np.zeros(len(pos), dtype=np.uint64)
+    for i in range(width):
+        out = (out << np.uint64(8)) | u8(data, pos + i, valid).astype(np.uint64)
+    return out
+
+
+def record_columns(batch):
+    """Per-packet record columns every decoder result carries."""
+    return {
+        "packet_no": batch.packet_no,
+        "ts_ns": batch.records["ts_ns"].copy(),
+        "caplen": batch.records["caplen"].copy(),
+        "offset": batch.records["offset"].copy(),
+        "interface_id": batch.records["interface_id"].copy(),
+    }
+
+
+def concat_columns(parts):
+    """Concatenate a list of column dicts (decoder outputs) into one dict."""
+    parts = [p for p in parts if p]
+    if not parts:
+        return {}
+    return {k: np.concatenate([p[k] for p in parts]) for k in parts[0]}
+
+
+def take_columns(cols, mask):
+    """Apply a boolean mask / index array to every column."""
+    return {k: v[mask] for k, v in cols.items()}
@@ -0,0 +1,220 @@
+"""
+Nexus Analyzer Core - 802.11 Header Decoder
+Vectorized replacement for per-packet ``pkt[Dot11]`` / ``pkt[Dot11QoS]`` access.
+
+``decode_dot11(batch)`` returns one NumPy array per field for the whole batch:
+frame control, retry, addresses (MACs as uint64), SC -> SN/FN, QoS TID,
+BlockAck / BlockAckReq control, SSC and bitmap, plus the Radiotap rate and
+antenna signal used by the airtime / RSSI statistics.
+"""
+import numpy as np
+
+from .common import (packet_bounds, fits, u8, u16le, u32le, u32be, u64le, be_uint,
+                     record_columns)
+
+LINKTYPE_IEEE802_11 = 105
+LINKTYPE_PRISM = 119
+LINKTYPE_RADIOTAP = 127
+LINKTYPE_AVS = 163
+LINKTYPE_PPI = 192
+
+DOT11_LINKTYPES = (LINKTYPE_IEEE802_11, LINKTYPE_PRISM, LINKTYPE_RADIOTAP,
+                   LINKTYPE_AVS, LINKTYPE_PPI)
+
+# Frame Control 类型
+TYPE_MGMT = 0
+TYPE_CTRL = 1
+TYPE_DATA = 2
+
+SUBTYPE_QOS_DATA = 8
+SUBTYPE_BAR = 8
+SUBTYPE_BA = 9
+
+# FCfield 标志位
+FLAG_TO_DS = 0x01
+FLAG_FROM_DS = 0x02
+FLAG_RETRY = 0x08
+
+# Radiotap Flags 字段中 "帧尾带 FCS" 标志
+RADIOTAP_F_FCS = 0x10
+
+# 解码只需要封装头 + MAC 头 + BA 帧体, 每包拷贝这么多字节即可
+DOT11_SNAPLEN = 512
+
+# 带 addr2 (TA) 的控制帧子类型: BF Poll, VHT NDPA, BAR, BA, PS-Poll, RTS, CF-End, CF-End+Ack
+_CTRL_SUBTYPES_WITH_TA = (4, 5, 8, 9, 10, 11, 14, 15)
+
+
+def mac_to_int(mac):
+    """'aa:bb:cc:dd:ee:ff' -> int (same packing as the decoder's uint64 columns)."""
+    return int(mac.replace(":", "").replace("-", ""), 16)
+
+
+def int_to_mac(value):
+    """int -> 'aa:bb:cc:dd:ee:ff' (lower case, as Scapy prints it)."""
+    h = f"{int(value):012x}"
+    return ":".join(h[i:i + 2] for i in range(0, 12, 2))
+
+
+def format_macs(values):
+    """Vector of uint64 MACs -> object array of strings (formats each unique value once)."""
+    values = np.asarray(values, dtype=np.uint64)
+    if values.size == 0:
+        return np.empty(0, dtype=object)
+    uniq, inverse = np.unique(values, return_inverse=True)
+    names = np.array([int_to_mac(v) for v in uniq], dtype=object)
+    return names[inverse]
+
+
+def _radiotap(data, start, end, is_rt):
+    """
+    Decode Radiotap length, Flags, Rate and dBm_AntSignal.
+    Only the fields of the first present word (bits 0-5) are needed, and they
+    always come first, right after the chain of present words.
+    """
+    n = len(start)
+    ok = fits(start, 8, end, is_rt)
+    rt_len = u16le(data, start + 2, ok).astype(np.int64)
+
+    # 统计 present 位图的个数 (bit31 表示后面还有一个扩展位图)
+    present = u32le(data, start + 4, ok)
+    words = np.ones(n, dtype=np.int64)
+    more = ok & ((present >> np.uint32(31)) & np.uint32(1)).astype(bool)
+    for _ in range(8):
+        if not more.any():
+            break
+        nxt = fits(start + 4 + 4 * words, 4, end, more)
+        word = u32le(data, start + 4 + 4 * words, nxt)
+        words += more
+        more = nxt & ((word >> np.uint32(31)) & np.uint32(1)).astype(bool)
+
+    def bit(b):
+        return ok & ((present >> np.uint32(b)) & np.uint32(1)).astype(bool)
+
+    pos = 4 + 4 * words
+    tsft = bit(0)
+    pos = np.where(tsft, ((pos + 7) & ~7) + 8, pos)
+
+    has_flags = bit(1)
+    flags = u8(data, start + pos, fits(start + pos, 1, end, has_flags & (pos < rt_len)))
+    pos = pos + has_flags
+
+    has_rate = bit(2)
+    rate = u8(data, start + pos, fits(start + pos, 1, end, has_rate & (pos < rt_len)))
+    pos = pos + has_rate
+
+    has_channel = bit(3)
+    pos = np.where(has_channel, ((pos + 1) & ~1) + 4, pos)
+    pos = pos + 2 * bit(4)
+
+    has_signal = bit(5) & (pos < rt_len)
+    signal_ok = fits(start + pos, 1, end, has_signal)
+    signal = u8(data, start + pos, signal_ok).view(np.int8)
+
+    rt_len = np.where(ok, rt_len, 0)
+    return rt_len, flags, rate, signal, signal_ok
+
+
+def decode_dot11(batch):
+    """
+    Decode the 802.11 MAC header of every packet in ``batch``.
+
+    Returns a dict of equally long NumPy arrays. Rows whose ``is_dot11`` is
+    False (other link types / truncated headers) carry zeros; optional fields
+    use -1 (``seq``, ``frag``, ``tid``) or a companion ``has_*`` mask.
+    """
+    data = batch.data
+    start, end = packet_bounds(batch)
+    linktype = batch.records["linktype"]
+    caplen = batch.records["caplen"].astype(np.int64)
+    n = len(batch)
+
+    # 1. 链路层封装头 -> 802.11 头起始位置
+    is_rt = linktype == LINKTYPE_RADIOTAP
+    rt_len, rt_flags, rate, signal, has_signal = _radiotap(data, start, end, is_rt)
+
+    is_ppi = fits(start, 4, end, linktype == LINKTYPE_PPI)
+    is_prism = fits(start, 8, end, linktype == LINKTYPE_PRISM)
+    is_avs = fits(start, 8, end, linktype == LINKTYPE_AVS)
+
+    hdr = np.zeros(n, dtype=np.int64)
+    hdr = np.where(is_rt, rt_len, hdr)
+    hdr = np.where(is_ppi, u16le(data, start + 2, is_ppi), hdr)
+    hdr = np.where(is_prism, u32le(data, start + 4, is_prism), hdr)
+    hdr = np.where(is_avs, u32be(data, start + 4, is_avs), hdr)
+
+    # FCS 不属于 802.11 payload, 对齐 Scapy Dot11FCS 的长度语义
+    fcs_len = np.where(is_rt & ((rt_flags & RADIOTAP_F_FCS) != 0), 4, 0)
+    limit = np.minimum(end, start + caplen - fcs_len)
+
+    h = start + hdr
+    is_dot11 = fits(h, 10, limit, np.isin(linktype, DOT11_LINKTYPES))
+
+    # 2. Frame Control
+    fc0 = u8(data, h, is_dot11)
+    fc_flags = u8(data, h + 1, is_dot11)
+    fc_type = (fc0 >> 2) & 0x3
+    fc_subtype = (fc0 >> 4) & 0xF
+    retry = (fc_flags & FLAG_RETRY) != 0
+
+    is_ctrl = is_dot11 & (fc_type == TYPE_CTRL)
+    is_data = is_dot11 & (fc_type == TYPE_DATA)
+
+    # 3. 地址
+    addr1 = be_uint(data, h + 4, is_dot11, 6)
+    has_addr2 = fits(h + 10, 6, limit, is_dot11 & (~is_ctrl | np.isin(fc_subtype, _CTRL_SUBTYPES_WITH_TA)))
+    addr2 = be_uint(data, h + 10, has_addr2, 6)
+    has_addr3 = fits(h + 16, 6, limit, is_dot11 & ~is_ctrl)
+    addr3 = be_uint(data, h + 16, has_addr3, 6)
+
+    # 4. Sequence Control (仅管理帧/数据帧)
+    has_sc = fits(h + 22, 2, limit, is_dot11 & ~is_ctrl)
+    sc = u16le(data, h + 22, has_sc)
+    seq = np.where(has_sc, (sc >> 4).astype(np.int32), -1).astype(np.int32)
+    frag = np.where(has_sc, (sc & 0xF).astype(np.int8), -1).astype(np.int8)
+
+    # 5. QoS Control: QoS 数据帧 (subtype bit3), 四地址帧时后移 6 字节
+    four_addr = (fc_flags & (FLAG_TO_DS | FLAG_FROM_DS)) == (FLAG_TO_DS | FLAG_FROM_DS)
+    qos_pos = h + 24 + np.where(four_addr, 6, 0)
+    has_qos = fits(qos_pos, 2, limit, is_data & ((fc_subtype & 0x8) != 0))
+    tid = np.where(has_qos, (u8(data, qos_pos, has_qos) & 0xF).astype(np.int8), -1).astype(np.int8)
+
+    # 6. BlockAck / BlockAckReq 帧体 (紧跟 16 字节控制帧头)
+    body = h + 16
+    is_ba = fits(body, 12, limit, is_ctrl & (fc_subtype == SUBTYPE_BA))
+    is_bar = fits(body, 4, limit, is_ctrl & (fc_subtype == SUBTYPE_BAR))
+    has_ba_ctrl = is_ba | is_bar
+    ba_control = u16le(data, body, has_ba_ctrl)
+    ba_ssc = u16le(data, body + 2, has_ba_ctrl)
+    ba_bitmap = u64le(data, body + 4, is_ba)
+
+    cols = record_columns(batch)
+    cols.update({
+        "is_dot11": is_dot11,
+        "hdr_off": hdr.astype(np.int32),
+        # 802.11 帧长度 (MAC 头起至帧尾, 不含 FCS), 对应 len(pkt[Dot11])
+        "dot11_len": np.where(is_dot11, start + caplen - fcs_len - h, 0).astype(np.int32),
+        "fc_type": fc_type,
+        "fc_subtype": fc_subtype,
+        "fc_flags": fc_flags,
+        "retry": retry,
+        "addr1": addr1,
+        "addr2": addr2,
+        "addr3": addr3,
+        "has_addr2": has_addr2,
+        "seq": seq,
+        "frag": frag,
+        "tid": tid,
+        "is_ba": is_ba,
+        "is_bar": is_bar,
+        "ba_control": ba_control,
+        "ba_ssc": ba_ssc,
+        "ba_ssn": ((ba_ssc >> 4) & 0x0FFF).astype(np.int32),
+        # TID_INFO 位于 BA/BAR Control 的 bit 12-15
+        "ba_tid": ((ba_control >> 12) & 0xF).astype(np.int8),
+        "ba_bitmap": ba_bitmap,
+        "rt_rate": rate,
+        "rt_signal": signal,
+        "has_signal": has_signal,
+    })
+    return cols
@@ -0,0 +1,211 @@
+"""
+Nexus Analyzer Core - Link / IP / UDP Decoder
+Vectorized replacement for ``IP in pkt and UDP in pkt`` / ``pkt[UDP].payload``.
+
+``decode_ip(batch)`` strips the link layer (Ethernet incl. VLAN tags, Linux
+SLL / SLL2, raw IP, 802.11 data frames with LLC/SNAP), then decodes IPv4 or
+IPv6 and the UDP header. IP addresses are split into two uint64 halves
+(``*_ip_hi`` / ``*_ip_lo``); for IPv4 the address lives in ``*_ip_lo``.
+"""
+import ipaddress
+
+import numpy as np
+
+from ..flow_table import FlowTable, UDP_SOURCE_KEY, udp_flow_keys
+from .common import packet_bounds, fits, u8, u16be, u32be, be_uint, record_columns
+from .dot11 import decode_dot11, DOT11_LINKTYPES, TYPE_DATA
+
+LINKTYPE_ETHERNET = 1
+LINKTYPE_RAW = 101
+LINKTYPE_LINUX_SLL = 113
+LINKTYPE_IPV4 = 228
+LINKTYPE_IPV6 = 229
+LINKTYPE_LINUX_SLL2 = 276
+
+# 部分平台上 DLT_RAW 的取值
+_RAW_LINKTYPES = (LINKTYPE_RAW, LINKTYPE_IPV4, LINKTYPE_IPV6, 12, 14)
+
+ETHERTYPE_IPV4 = 0x0800
+ETHERTYPE_IPV6 = 0x86DD
+_ETHERTYPE_VLAN = (0x8100, 0x88A8, 0x9100)
+
+IPPROTO_TCP = 6
+IPPROTO_UDP = 17
+
+# IPv6 扩展头: Hop-by-Hop, Routing, Destination Options (长度以 8 字节为单位)
+_IPV6_EXT_HEADERS = (0, 43, 60)
+_IPV6_FRAGMENT = 44
+
+# 802.11 数据帧里的 LLC/SNAP 头: AA AA 03 00 00 00 + EtherType
+_SNAP_PREFIX = (0xAA, 0xAA, 0x03, 0x00, 0x00, 0x00)
+
+# 解码到 UDP 头为止所需的字节数 (含 VLAN / IPv6 扩展头余量)
+IP_SNAPLEN = 192
+
+
+def _ethertype(data, start, end, linktype, batch):
+    """Return (ethertype, l3_off) relative to each packet start; 0 when unknown."""
+    n = len(start)
+    etype = np.zeros(n, dtype=np.int64)
+    l3 = np.zeros(n, dtype=np.int64)
+
+    # Ethernet (+ 最多两层 VLAN / QinQ)
+    eth = fits(start, 14, end, linktype == LINKTYPE_ETHERNET)
+    etype = np.where(eth, u16be(data, start + 12, eth), etype)
+    l3 = np.where(eth, 14, l3)
+    for _ in range(2):
+        vlan = fits(start + l3, 4, end, eth & np.isin(etype, _ETHERTYPE_VLAN))
+        if not vlan.any():
+            break
+        etype = np.where(vlan, u16be(data, start + l3 + 2, vlan), etype)
+        l3 = np.where(vlan, l3 + 4, l3)
+
+    # Linux cooked capture v1 / v2
+    sll = fits(start, 16, end, linktype == LINKTYPE_LINUX_SLL)
+    etype = np.where(sll, u16be(data, start + 14, sll), etype)
+    l3 = np.where(sll, 16, l3)
+    sll2 = fits(start, 20, end, linktype == LINKTYPE_LINUX_SLL2)
+    etype = np.where(sll2, u16be(data, start, sll2), etype)
+    l3 = np.where(sll2, 20, l3)
+
+    # Raw IP: 由版本号决定
+    raw = fits(start, 1, end, np.isin(linktype, _RAW_LINKTYPES))
+    version = u8(data, start, raw) >> 4
+    etype = np.where(raw & (version == 4), ETHERTYPE_IPV4, etype)
+    etype = np.where(raw & (version == 6), ETHERTYPE_IPV6, etype)
+
+    # 802.11 数据帧 (未加密) + LLC/SNAP
+    is_air = np.isin(linktype, DOT11_LINKTYPES)
+    if is_air.any():
+        d = decode_dot11(batch)
+        flags = d["fc_flags"]
+        subtype = d["fc_subtype"]
+        # subtype bit2 为 Null 类 (无帧体); Protected 帧无法解析
+        ok = d["is_dot11"] & (d["fc_type"] == TYPE_DATA) & ((subtype & 0x4) == 0) & ((flags & 0x40) == 0)
+        qos = (subtype & 0x8) != 0
+        mac_len = (24 + np.where((flags & 0x03) == 0x03, 6, 0) + np.where(qos, 2, 0)
+                   + np.where(qos & ((flags & 0x80) != 0), 4, 0))
+        llc = start + d["hdr_off"].astype(np.int64) + mac_len
+        ok = fits(llc, 8, end, ok)
+        for i, b in enumerate(_SNAP_PREFIX):
+            ok &= u8(data, llc + i, ok) == b
+        etype = np.where(ok, u16be(data, llc + 6, ok), etype)
+        l3 = np.where(ok, llc + 8 - start, l3)
+
+    return etype, l3
+
+
+def decode_ip(batch):
+    """
+    Decode link layer, IPv4/IPv6 and UDP headers of every packet in ``batch``.
+
+    ``udp_off`` is the UDP payload offset from the start of the packet and
+    ``udp_len`` its length (bounded by the UDP length field and caplen), so
+    ``batch.packet(i)[udp_off:udp_off + udp_len]`` equals Scapy's
+    ``bytes(pkt[UDP].payload)`` for un-truncated batches. ``l4_off`` points at
+    the transport header for any protocol.
+    """
+    data = batch.data
+    start, end = packet_bounds(batch)
+    linktype = batch.records["linktype"]
+    caplen = batch.records["caplen"].astype(np.int64)
+
+    etype, l3 = _ethertype(data, start, end, linktype, batch)
+    ip = start + l3
+
+    # IPv4
+    is_v4 = fits(ip, 20, end, etype == ETHERTYPE_IPV4)
+    b0 = u8(data, ip, is_v4)
+    ihl = (b0 & 0x0F).astype(np.int64) * 4
+    is_v4 &= ((b0 >> 4) == 4) & (ihl >= 20)
+    # 非首片分片不带 UDP 头
+    first_frag = (u16be(data, ip + 6, is_v4) & 0x1FFF) == 0
+    v4_proto = u8(data, ip + 9, is_v4)
+
+    # IPv6 (+ 扩展头)
+    is_v6 = fits(ip, 40, end, etype == ETHERTYPE_IPV6)
+    is_v6 &= (u8(data, ip, is_v6) >> 4) == 6
+    v6_proto = u8(data, ip + 6, is_v6)
+    v6_l4 = ip + 40
+    for _ in range(4):
+        ext = fits(v6_l4, 8, end, is_v6 & np.isin(v6_proto, _IPV6_EXT_HEADERS))
+        frag = fits(v6_l4, 8, end, is_v6 & (v6_proto == _IPV6_FRAGMENT))
+        hop = ext | frag
+        if not hop.any():
+            break
+        ext_len = (u8(data, v6_l4 + 1, ext).astype(np.int64) + 1) * 8
+        first_frag &= ~frag | ((u16be(data, v6_l4 + 2, frag) >> 3) == 0)
+        v6_proto = np.where(hop, u8(data, v6_l4, hop), v6_proto)
+        v6_l4 = np.where(ext, v6_l4 + ext_len, np.where(frag, v6_l4 + 8, v6_l4))
+
+    is_ip = is_v4 | is_v6
+    ip_version = np.where(is_v4, 4, np.where(is_v6, 6, 0)).astype(np.uint8)
+    ip_proto = np.where(is_v4, v4_proto, np.where(is_v6, v6_proto, 0)).astype(np.uint8)
+    l4 = np.where(is_v4, ip + ihl, np.where(is_v6, v6_l4, 0))
+
+    src_hi = np.where(is_v6, be_uint(data, ip + 8, is_v6, 8), 0).astype(np.uint64)
+    src_lo = np.where(is_v6, be_uint(data, ip + 16, is_v6, 8),
+                      u32be(data, ip + 12, is_v4).astype(np.uint64)).astype(np.uint64)
+    dst_hi = np.where(is_v6, be_uint(data, ip + 24, is_v6, 8), 0).astype(np.uint64)
+    dst_lo = np.where(is_v6, be_uint(data, ip + 32, is_v6, 8),
+                      u32be(data, ip + 16, is_v4).astype(np.uint64)).astype(np.uint64)
+
+    # UDP
+    is_udp = fits(l4, 8, end, is_ip & first_frag & (ip_proto == IPPROTO_UDP))
+    sport = u16be(data, l4, is_udp)
+    dport = u16be(data, l4 + 2, is_udp)
+    ulen = u16be(data, l4 + 4, is_udp).astype(np.int64)
+    udp_off = l4 + 8 - start
+    udp_len = np.maximum(caplen - udp_off, 0)
+    udp_len = np.where(ulen >= 8, np.minimum(ulen - 8, udp_len), udp_len)
+
+    cols = record_columns(batch)
+    cols.update({
+        "is_ip": is_ip,
+        "ip_version": ip_version,
+        "ip_proto": ip_proto,
+        "src_ip_hi": src_hi,
+        "src_ip_lo": src_lo,
+        "dst_ip_hi": dst_hi,
+        "dst_ip_lo": dst_lo,
+        "l4_off": np.where(is_ip, l4 - start, 0).astype(np.int32),
+        "is_udp": is_udp,
+        "sport": sport,
+        "dport": dport,
+        "udp_off": np.where(is_udp, udp_off, 0).astype(np.int32),
+        "udp_len": np.where(is_udp, udp_len, 0).astype(np.int32),
+    })
+    return cols
+
+
+def ip_to_str(version, hi, lo):
+    """One address -> text form ('192.168.1.2' / compressed IPv6)."""
+    if int(version) == 6:
+        return str(ipaddress.IPv6Address((int(hi) << 64) | int(lo)))
+    return str(ipaddress.IPv4Address(int(lo) & 0xFFFFFFFF))
+
+
+def format_ips(version, hi, lo):
+    """Vectors of (ip_version, *_ip_hi, *_ip_lo) -> object array of strings."""
+    keys = np.empty(len(lo), dtype=[("v", "u1"), ("hi", "<u8"), ("lo", "<u8")])
+    keys["v"], keys["hi"], keys["lo"] = version, hi, lo
+    if keys.size == 0:
+        return np.empty(0, dtype=object)
+    uniq, inverse = np.unique(keys, return_inverse=True)
+    names = np.array([ip_to_str(*k) for k in uniq.tolist()], dtype=object)
+    return names[inverse.ravel()]
+
+
+def top_source_flow(cols):
+    """
+    Busiest IPv4 UDP source endpoint (``src_ip:sport``) by packet count; ties
+    go to the endpoint seen first. Returns (key string, row mask) or (None, None).
+    """
+    table = FlowTable(UDP_SOURCE_KEY)
+    slots = table.update(udp_flow_keys(cols, UDP_SOURCE_KEY),
+                         mask=cols["is_udp"] & (cols["ip_version"] == 4))
+    top = table.top("packets")
+    if top is None:
+        return None, None
+    flows = table.columns()
+    return f"{ip_to_str(4, 0, flows['src_lo'][top])}:{flows['sport'][top]}", slots == top
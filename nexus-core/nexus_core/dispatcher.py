@@ -0,0 +1,223 @@
+"""
+Nexus Analyzer Core - Plugin Dispatcher
+Finds plugins through their ``plugin.yaml`` manifests and runs them.
+
+Listing plugins reads only the manifests; a plugin's module (and with it
+Scapy, pandas, matplotlib, ...) is imported when that plugin runs:
+
+    dispatcher = PluginDispatcher()
+    for manifest in dispatcher.list_plugins():
+        print(manifest.plugin_id, manifest.version)
+    summary = dispatcher.run_plugin("wifi.ba", "air.pcapng", "out/", {"target_tid": 5})
+
+A plugin package has a ``plugin.yaml``; a plugin that is a single module
+next to others has ``<name>.plugin.yaml``. ``entry_point`` is
+``module:function`` relative to the manifest's directory. The function
+receives ``input_path`` / ``output_dir`` if it declares them, and
+``params`` as keyword arguments.
+
+This module only uses the standard library, so importing it (and the
+``list-plugins`` command) stays fast.
+"""
+import importlib
+import json
+import os
+
+# 内置插件目录与其包名
+PLUGIN_ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "plugins")
+PLUGIN_PACKAGE = "nexus_core.plugins"
+
+MANIFEST_NAME = "plugin.yaml"
+MANIFEST_SUFFIX = ".plugin.yaml"
+
+REQUIRED_FIELDS = ("plugin_id", "entry_point", "version")
+
+
+class PluginError(Exception):
+    """Unknown plugin, invalid manifest or parameters that do not fit the entry point."""
+
+
+def _scalar(text):
+    text = text.strip()
+    if len(text) >= 2 and text[0] == text[-1] and text[0] in "\"'":
+        return text[1:-1]
+    return text
+
+
+def parse_manifest(text, path="<manifest>"):
+    """
+    Fields of a manifest: flat ``key: value`` lines, values are (quoted)
+    strings or ``[a, "b"]`` lists. Anything else, such as nested mappings,
+    is rejected instead of pulling in a YAML parser.
+    """
+    fields = {}
+    for lineno, line in enumerate(text.splitlines(), 1):
+        stripped = line.strip()
+        if not stripped or stripped.startswith("#"):
+            continue
+        key, sep, value = stripped.partition(":")
+        if not sep or line[0].isspace() or not key.strip().isidentifier():
+            raise PluginError(f"{path}:{lineno}: expected 'key: value', got {stripped!r}")
+        value = value.strip()
+        if value.startswith("[") and value.endswith("]"):
+            inner = value[1:-1].strip()
+            fields[key.strip()] = [_scalar(v) for v in inner.split(",")] if inner else []
+        elif not value:
+            raise PluginError(f"{path}:{lineno}: nested values are not supported in plugin manifests")
+        else:
+            fields[key.strip()] = _scalar(value)
+    missing = [name for name in REQUIRED_FIELDS if not fields.get(name)]
+    if missing:
+        raise PluginError(f"{path}: missing required field(s) {', '.join(missing)}")
+    if fields["entry_point"].count(":") != 1:
+        raise PluginError(f"{path}: entry_point must be 'module:function', got {fields['entry_point']!r}")
+    return fields
+
+
+class PluginManifest:
+    """Metadata of one plugin, available without importing it."""
+
+    def __init__(self, fields, path, package):
+        self.fields = fields
+        self.path = path
+        # entry_point 的模块相对于清单所在目录对应的包
+        self.package = package
+        self.module_name, self.function_name = fields["entry_point"].split(":")
+
+    @property
+    def plugin_id(self):
+        return self.fields["plugin_id"]
+
+    @property
+    def version(self):
+        return self.fields["version"]
+
+    @property
+    def name(self):
+        return self.fields.get("name", self.plugin_id)
+
+    @property
+    def category(self):
+        return self.fields.get("category", "")
+
+    @property
+    def description(self):
+        return self.fields.get("description", "")
+
+    @property
+    def module(self):
+        """Dotted name of the entry point's module."""
+        return f"{self.package}.{self.module_name}" if self.package else self.module_name
+
+    def load(self):
+        """Import the plugin module and return its entry point function."""
+        module = importlib.import_module(self.module)
+        try:
+            return getattr(module, self.function_name)
+        except AttributeError:
+            raise PluginError(f"Plugin '{self.plugin_id}': {self.module} has no '{self.function_name}'") from None
+
+    def to_dict(self):
+        return {**self.fields, "manifest": self.path}
+
+    def __repr__(self):
+        return f"PluginManifest({self.plugin_id!r}, {self.version!r}, {self.module}:{self.function_name})"
+
+
+def discover(root=PLUGIN_ROOT, package=PLUGIN_PACKAGE):
+    """
+    (manifests, errors) of every manifest under ``root``, whose directory
+    maps to ``package``; ``errors`` lists the files that could not be used.
+    """
+    manifests, errors = [], []
+    for dirpath, dirnames, filenames in os.walk(root):
+        dirnames[:] = sorted(d for d in dirnames if not d.startswith((".", "__")))
+        rel = os.path.relpath(dirpath, root)
+        dir_package = package if rel == "." else ".".join(filter(None, [package] + rel.split(os.sep)))
+        for filename in sorted(filenames):
+            if filename != MANIFEST_NAME and not filename.endswith(MANIFEST_SUFFIX):
+                continue
+            path = os.path.join(dirpath, filename)
+            try:
+                with open(path, encoding="utf-8") as f:
+                    manifests.append(PluginManifest(parse_manifest(f.read(), path), path, dir_package))
+            except PluginError as e:
+                errors.append(str(e))
+            except (OSError, UnicodeDecodeError) as e:
+                errors.append(f"{path}: {e}")
+    return manifests, errors
+
+
+class PluginDispatcher:
+    """Registry of the plugins under ``root`` (id -> ``PluginManifest``) and their runner."""
+
+    def __init__(self, root=PLUGIN_ROOT, package=PLUGIN_PACKAGE):
+        self.root = root
+        self.package = package
+        self.plugins = {}
+        self.errors = []
+        self._loaded = False
+
+    def load_plugins(self):
+        """Read the manifests (no plugin code is imported); returns ``{plugin_id: manifest}``."""
+        manifests, self.errors = discover(self.root, self.package)
+        self.plugins = {}
+        for manifest in manifests:
+            other = self.plugins.get(manifest.plugin_id)
+            if other is not None:
+                self.errors.append(f"{manifest.path}: duplicate plugin_id '{manifest.plugin_id}' "
+                                   f"(already defined in {other.path})")
+                continue
+            self.plugins[manifest.plugin_id] = manifest
+        self._loaded = True
+        return self.plugins
+
+    def list_plugins(self):
+        """Manifests sorted by plugin id."""
+        if not self._loaded:
+            self.load_plugins()
+        return [self.plugins[plugin_id] for plugin_id in sorted(self.plugins)]
+
+    def get(self, plugin_id):
+        if not self._loaded:
+            self.load_plugins()
+        try:
+            return self.plugins[plugin_id]
+        except KeyError:
+            known = ", ".join(sorted(self.plugins)) or "none"
+            raise PluginError(f"Unknown plugin '{plugin_id}' (available: {known})") from None
+
+    def metadata(self, plugin_id):
+        """Manifest fields of ``plugin_id`` (the plugin is not imported)."""
+        return self.get(plugin_id).to_dict()
+
+    def run_plugin(self, plugin_id, input_path, output_dir, params=None):
+        """
+        Import ``plugin_id`` and call its entry point; returns what it returns
+        (analysis plugins write ``summary.json`` / the trace to ``output_dir``
+        and return the summary). ``params`` is a dict or a JSON object string.
+        """
+        manifest = self.get(plugin_id)
+        if isinstance(params, str):
+            try:
+                params = json.loads(params)
+            except json.JSONDecodeError as e:
+                raise PluginError(f"--params is not valid JSON: {e}") from None
+        params = dict(params or {})
+
+        import inspect
+        entry = manifest.load()
+        signature = inspect.signature(entry)
+        takes_any = any(p.kind is p.VAR_KEYWORD for p in signature.parameters.values())
+        kwargs = dict(params)
+        for name, value in (("input_path", input_path), ("output_dir", output_dir)):
+            if value is not None and (name in signature.parameters or takes_any):
+                kwargs.setdefault(name, value)
+        try:
+            signature.bind(**kwargs)
+        except TypeError as e:
+            raise PluginError(f"Plugin '{plugin_id}' ({manifest.fields['entry_point']}): {e}") from None
+
+        if output_dir and "output_dir" in kwargs:
+            os.makedirs(output_dir, exist_ok=True)
+        return entry(**kwargs)
@@ -0,0 +1,214 @@
+"""
+Nexus Analyzer Core - Downsampling
+Bounded chart payloads: pick at most ``max_points`` points of a series.
+
+``lttb`` (Largest-Triangle-Three-Buckets) keeps the points that preserve
+the visual shape of a line; ``minmax`` keeps the lowest and highest point
+of every time bucket, so no spike (retry burst, latency peak) is lost:
+
+    idx = lttb(ts, rtt, 2000)
+    x, y = downsample(ts, rtt, 2000, method="minmax")
+    series = read_series("out/", "frames", "rssi", t0_ns, t1_ns, max_points=2000)
+
+Both return indices into the input, in order; ``x`` must be sorted.
+``LiveSeries`` keeps a bounded history of a live stream (iperf bandwidth,
+ping latency) for the same kind of chart request.
+"""
+import os
+import sqlite3
+
+import numpy as np
+
+# Api.get_series 未指定时的点数上限, 约等于图表宽度的像素数
+DEFAULT_MAX_POINTS = 2000
+
+
+def lttb(x, y, max_points):
+    """
+    Indices of ``max_points`` points chosen by Largest-Triangle-Three-Buckets:
+    first and last point, plus per bucket the point spanning the largest
+    triangle with the previously chosen point and the next bucket's mean.
+    """
+    x = np.asarray(x, dtype=np.float64)
+    y = np.asarray(y, dtype=np.float64)
+    n = len(x)
+    if max_points >= n or n <= 2:
+        return np.arange(n)
+    if max_points < 3:
+        return np.array([0, n - 1])[:max(max_points, 0)]
+
+    # 中间的 n-2 个点均分为 max_points-2 个桶, 每桶至少一个点
+    edges = np.linspace(1, n - 1, max_points - 1).astype(np.intp)
+    counts = np.diff(edges)
+    csx = np.concatenate(([0.0], np.cumsum(x)))
+    csy = np.concatenate(([0.0], np.cumsum(y)))
+    mean_x = (csx[edges[1:]] - csx[edges[:-1]]) / counts
+    mean_y = (csy[edges[1:]] - csy[edges[:-1]]) / counts
+    # 最后一个桶的 "下一桶" 是终点本身
+    mean_x = np.append(mean_x[1:], x[-1])
+    mean_y = np.append(mean_y[1:], y[-1])
+
+    out = np.empty(max_points, dtype=np.intp)
+    out[0] = 0
+    out[-1] = n - 1
+    a = 0
+    for i in range(max_points - 2):
+        lo, hi = edges[i], edges[i + 1]
+        ax, ay = x[a], y[a]
+        # 三角形面积的两倍 (常数因子不影响 argmax)
+        area = np.abs((ax - mean_x[i]) * (y[lo:hi] - ay) - (ax - x[lo:hi]) * (mean_y[i] - ay))
+        a = lo + int(np.argmax(area))
+        out[i + 1] = a
+    return out
+
+
+def minmax(x, y, max_points):
+    """
+    Indices of the minimum and maximum of ``y`` in each of ``max_points // 2``
+    equal-width ``x`` buckets (at most ``max_points`` points, in order).
+    """
+    x = np.asarray(x, dtype=np.float64)
+    y = np.asarray(y, dtype=np.float64)
+    n = len(x)
+    if max_points >= n:
+        return np.arange(n)
+    buckets = max(max_points // 2, 1)
+    span = x[-1] - x[0]
+    if span > 0:
+        bucket = np.minimum(((x - x[0]) * (buckets / span)).astype(np.intp), buckets - 1)
+    else:
+        bucket = np.arange(n) * buckets // n
+    # x 有序, 每个桶是连续的一段: reduceat 求段内最值 (忽略 NaN), 再取段内首个取到最值的位置
+    starts = np.flatnonzero(np.concatenate(([True], bucket[1:] != bucket[:-1])))
+    counts = np.diff(np.append(starts, n))
+    segment = np.repeat(np.arange(len(starts)), counts)
+    out = []
+    for reduce in (np.fmin, np.fmax):
+        hit = np.flatnonzero(y == np.repeat(reduce.reduceat(y, starts), counts))
+        _, first = np.unique(segment[hit], return_index=True)
+        out.append(hit[first])
+    return np.unique(np.concatenate(out))
+
+
+METHODS = {"lttb": lttb, "minmax": minmax}
+
+
+def downsample(x, y, max_points, method="lttb"):
+    """(x, y) reduced to at most ``max_points`` points; rows with a non-finite ``y`` are dropped."""
+    if method not in METHODS:
+        raise ValueError(f"Unknown downsampling method '{method}', expected one of {tuple(METHODS)}")
+    x = np.asarray(x)
+    y = np.asarray(y)
+    finite = np.isfinite(y) if y.dtype.kind == "f" else None
+    if finite is not None and not finite.all():
+        x, y = x[finite], y[finite]
+    idx = METHODS[method](x, y, max_points)
+    return x[idx], y[idx]
+
+
+class LiveSeries:
+    """
+    Bounded history of a live series, appended one point at a time: holds
+    at most ``capacity`` points; when full, the history is halved with
+    ``minmax``, so older points get coarser but peaks survive (NaN points
+    do not survive a merge).
+    """
+
+    def __init__(self, capacity=DEFAULT_MAX_POINTS):
+        self.capacity = max(int(capacity), 4)
+        self.x = np.empty(self.capacity, dtype=np.float64)
+        self.y = np.empty(self.capacity, dtype=np.float64)
+        self.size = 0
+        # 追加过的点数 (含已被合并掉的)
+        self.total = 0
+
+    def append(self, x, y):
+        """Add one point; ``y=None`` (e.g. a lost ping) is stored as NaN."""
+        if self.size == self.capacity:
+            keep = minmax(self.x, self.y, self.capacity // 2)
+            self.size = len(keep)
+            self.x[:self.size] = self.x[keep]
+            self.y[:self.size] = self.y[keep]
+        self.x[self.size] = x
+        self.y[self.size] = np.nan if y is None else y
+        self.size += 1
+        self.total += 1
+
+    def series(self, max_points=DEFAULT_MAX_POINTS, method="lttb"):
+        """Same shape as ``read_series``: ``x``, ``y`` (finite points only) and ``total``."""
+        x, y = downsample(self.x[:self.size], self.y[:self.size], max_points, method)
+        return {"x": x, "y": y, "total": self.total}
+
+
+def _read_sqlite(db_path, table, time_column, column, t0_ns, t1_ns):
+    conn = sqlite3.connect(db_path)
+    try:
+        # 表名 / 列名来自前端, 只接受库中已有的名字
+        tables = {row[0] for row in conn.execute("SELECT name FROM sqlite_master WHERE type = 'table'")}
+        if table not in tables:
+            raise ValueError(f"Unknown trace table '{table}'")
+        names = [row[1] for row in conn.execute(f"PRAGMA table_info({table})")]
+        for name in (time_column, column):
+            if name not in names:
+                raise ValueError(f"Unknown column '{name}' in trace table '{table}'")
+        where, args = [], []
+        if t0_ns is not None:
+            where.append(f"{time_column} >= ?")
+            args.append(int(t0_ns))
+        if t1_ns is not None:
+            where.append(f"{time_column} < ?")
+            args.append(int(t1_ns))
+        sql = f"SELECT {time_column}, {column} FROM {table}"
+        if where:
+            sql += " WHERE " + " AND ".join(where)
+        rows = conn.execute(sql + f" ORDER BY {time_column}", args).fetchall()
+    finally:
+        conn.close()
+    x = np.array([r[0] for r in rows], dtype=np.int64)
+    y = np.array([np.nan if r[1] is None else r[1] for r in rows], dtype=np.float64)
+    return x, y
+
+
+def read_series(output_dir, table, column, t0_ns=None, t1_ns=None, max_points=DEFAULT_MAX_POINTS,
+                method="lttb"):
+    """
+    One column of a trace table over ``[t0_ns, t1_ns)``, downsampled to at
+    most ``max_points`` points: dict with ``x`` (ns), ``y`` and ``total``
+    (points in the window before downsampling).
+
+    ``rollup_<series>`` tables are read through ``query_rollup`` at the
+    level matching ``max_points``; other tables use the ``timestamp`` column
+    of the Parquet trace if present, otherwise of ``trace.sqlite``.
+    """
+    from .database import DatabaseManager
+    from .trace_store import trace_path
+
+    if table.startswith("rollup_"):
+        from .rollup import query_rollup, rollup_extent
+        series = table[len("rollup_"):]
+        # 未给出的窗口边界取汇总覆盖的范围, 以便按实际时长选级
+        extent = rollup_extent(output_dir, series) if t0_ns is None or t1_ns is None else None
+        if extent is not None:
+            t0_ns = extent[0] if t0_ns is None else t0_ns
+            t1_ns = extent[1] if t1_ns is None else t1_ns
+        cols = query_rollup(output_dir, series, t0_ns or 0, t1_ns or 0, pixels=max_points)
+        if column not in cols:
+            raise ValueError(f"Unknown column '{column}' in trace table '{table}'")
+        x, y = cols["bin"], np.asarray(cols[column], dtype=np.float64)
+    elif os.path.exists(trace_path(output_dir, table)):
+        from .trace_store import open_reader
+        reader = open_reader(trace_path(output_dir, table))
+        if column not in reader.columns:
+            raise ValueError(f"Unknown column '{column}' in trace table '{table}'")
+        cols = reader.read([reader.time_column, column], t0_ns, t1_ns)
+        order = np.argsort(cols[reader.time_column], kind="stable")
+        x, y = cols[reader.time_column][order], cols[column][order].astype(np.float64)
+    else:
+        db_path = DatabaseManager(output_dir, "sqlite").db_path
+        if not os.path.exists(db_path):
+            raise FileNotFoundError(f"No trace output in {output_dir}")
+        x, y = _read_sqlite(db_path, table, "timestamp", column, t0_ns, t1_ns)
+
+    total = len(x)
+    x, y = downsample(x, y, max_points, method)
+    return {"x": x, "y": y, "total": total}
@@ -1,17 +1,237 @@
 """
 Nexus Analyzer Core - Plugin Engine
 """
+import os
 
-class PluginDispatcher:
-    def __init__(self):
-        self.plugins = {}
+from .pcap_reader import PcapEngine, DEFAULT_BATCH_SIZE
+from .decoders.common import concat_columns
+from .memory import MemoryBudget, MemoryLimitError, columns_nbytes
+from .progress import current as current_progress
+from .cancel import AnalysisCancelled, current as current_token
+# 插件调度只依赖标准库, 在 dispatcher 中实现; 此处保留原有的导入路径
+from .dispatcher import PluginDispatcher  # noqa: F401
 
-    def load_plugins(self):
-        # TODO: Dynamic loading of plugins
-        pass
+# 一遍读取中为写入解码缓存而保留的订阅者输入上限; 更大的输入不缓存
+PIPELINE_CACHE_BYTES = 512 * 1024 * 1024
 
-    def run_plugin(self, plugin_id, input_path, output_dir, params=None):
-        print(f"Running plugin: {plugin_id}")
-        print(f"Input: {input_path}")
-        print(f"Output: {output_dir}")
-        # TODO: Implement actual execution
+
+class Subscriber:
+    """
+    One analyzer attached to a ``Pipeline``.
+
+    ``decoder`` / ``snaplen`` / ``select`` mean the same as for
+    ``PcapEngine.decode``; ``columns`` lists the decoded columns the analyzer
+    reads, only those are handed to it. By default the selected rows of every
+    batch are collected and ``report(cols)`` runs once on their concatenation
+    (the same dict ``decode`` would have returned, restricted to ``columns``).
+    Streaming analyzers override ``on_batch`` / ``finish`` instead.
+
+    ``state()`` / ``restore(state)`` carry an analyzer across incremental
+    runs (see ``checkpoint``): the default keeps the rows collected so far,
+    streaming analyzers return their running aggregates.
+
+    Collected rows are charged to ``budget`` (set by ``Pipeline.run`` from
+    ``PcapEngine.memory_limit``), so ``MemoryLimitError`` is raised before
+    they outgrow the ceiling; analyzers over whole captures should stream.
+    """
+
+    def __init__(self, decoder, columns, report=None, select=None, snaplen=None):
+        self.decoder = decoder
+        self.columns = tuple(columns)
+        self.select = select
+        self.snaplen = snaplen
+        self._report = report
+        self._parts = []
+        # 收集的行计入的 MemoryBudget, None 不限
+        self.budget = None
+
+    def on_batch(self, cols):
+        if self.budget is not None:
+            self.budget.charge(columns_nbytes(cols))
+        self._parts.append(cols)
+
+    def finish(self):
+        cols = concat_columns(self._parts)
+        self._parts = []
+        return self.report(cols)
+
+    def report(self, cols):
+        return self._report(cols) if self._report is not None else cols
+
+    def state(self):
+        """Picklable state after the batches seen so far (taken before ``finish``)."""
+        cols = concat_columns(self._parts)
+        self._parts = [cols] if cols else []
+        return cols
+
+    def restore(self, state):
+        """Continue from ``state()`` of an earlier run."""
+        if state and self.budget is not None:
+            self.budget.charge(columns_nbytes(state))
+        self._parts = [state] if state else []
+
+
+class Pipeline:
+    """
+    Single-pass fan-out: the capture is read once, each distinct decoder runs
+    once per batch and every subscriber gets its selected rows / declared
+    columns of that batch.
+
+        pipe = Pipeline("air.pcapng")
+        pipe.subscribe("qos", decode_dot11, QOS_COLUMNS, qos_report, select=_select_dot11, snaplen=DOT11_SNAPLEN)
+        pipe.subscribe("ba", decode_dot11, BA_COLUMNS, ba_report, select=_select_qos_ba, snaplen=DOT11_SNAPLEN)
+        reports = pipe.run()    # {"qos": ..., "ba": ...}
+    """
+
+    def __init__(self, file_path, packet_filter=None):
+        self.file_path = file_path
+        # 所有订阅者共用的读取阶段过滤条件
+        self.packet_filter = packet_filter
+        self.subscribers = {}
+
+    def subscribe(self, name, decoder, columns=None, report=None, select=None, snaplen=None):
+        """
+        Register an analyzer (a ``Subscriber`` instance, or the arguments to
+        build one); returns the subscriber.
+        """
+        if isinstance(decoder, Subscriber):
+            subscriber = decoder
+        else:
+            subscriber = Subscriber(decoder, columns, report, select, snaplen)
+        if name in self.subscribers:
+            raise ValueError(f"Subscriber '{name}' is already registered")
+        self.subscribers[name] = subscriber
+        return subscriber
+
+    def _snaplen(self):
+        # 任一订阅者需要完整包时不截断, 否则按最大需求拷贝
+        snaplens = [sub.snaplen for sub in self.subscribers.values()]
+        if not snaplens or any(s is None for s in snaplens):
+            return None
+        return max(snaplens)
+
+    def run(self, batch_size=DEFAULT_BATCH_SIZE, checkpoint=None):
+        """
+        Read and decode the capture once; returns ``{name: report}``.
+
+        With a ``Checkpoint`` the subscribers are restored from it, only the
+        records after its read position are processed, and the checkpoint is
+        updated in memory (the caller saves it once its outputs are closed).
+
+        The engine defaults apply as for ``PcapEngine.decode``: with
+        ``PcapEngine.default_jobs`` > 1 shards are decoded in a process pool
+        and handed to the subscribers in file order; with
+        ``PcapEngine.default_cache`` the input of every subscriber is looked
+        up in the decode cache, and when all of them hit the capture is not
+        read at all. Incremental runs read sequentially and bypass the cache.
+        """
+        subscribers = list(self.subscribers.values())
+        decoders = list(dict.fromkeys(sub.decoder for sub in subscribers))
+        engine = PcapEngine(self.file_path)
+        # 各订阅者收集的行共用一个内存上限
+        budget = MemoryBudget(engine.memory_limit, "rows collected by pipeline subscribers")
+        for sub in subscribers:
+            sub.budget = budget
+        resume = None
+        if checkpoint is not None and checkpoint.resuming:
+            resume = checkpoint.position
+            for name, sub in self.subscribers.items():
+                if name in checkpoint.state:
+                    sub.restore(checkpoint.state[name])
+
+        cache = PcapEngine.default_cache if checkpoint is None else None
+        keys = self._cache_keys(cache) if cache else None
+        cached = self._load_cached(cache, keys, engine.memory_limit) if keys else None
+        if cached is not None:
+            for sub, cols in zip(subscribers, cached):
+                _feed(sub, cols, batch_size)
+        else:
+            outputs = [(decoders.index(sub.decoder), sub.select, sub.columns) for sub in subscribers]
+            record = _Recording(cache, engine.memory_limit, len(subscribers)) if keys else None
+            # 增量运行需要顺序读取结束后的 engine.position
+            for parts in engine.iter_fanout(decoders, outputs, batch_size, self._snaplen(),
+                                            self.packet_filter, resume,
+                                            jobs=1 if checkpoint is not None else None):
+                for sub, cols in zip(subscribers, parts):
+                    sub.on_batch(cols)
+                if record is not None:
+                    record.add(parts)
+            token = current_token()
+            if token is not None and token.truncated:
+                if checkpoint is not None:
+                    # 截止时间截断了读取: 订阅者状态与读取位置对不上, 不能推进检查点
+                    raise AnalysisCancelled("Deadline reached before the new records were read; "
+                                            "checkpoint not advanced")
+            elif record is not None:
+                record.store(cache, keys, self.file_path, self.subscribers)
+        if checkpoint is not None:
+            checkpoint.state = {name: sub.state() for name, sub in self.subscribers.items()}
+            checkpoint.position = engine.position
+        progress = current_progress()
+        if progress is not None:
+            progress.set_stage("report")
+        return {name: sub.finish() for name, sub in self.subscribers.items()}
+
+    def _cache_keys(self, cache):
+        """Decode cache key of every subscriber's input, or None if one cannot be cached."""
+        keys = [cache.key(self.file_path, sub.decoder, sub.snaplen, sub.select, self.packet_filter,
+                          columns=sub.columns) for sub in self.subscribers.values()]
+        return None if None in keys else keys
+
+    @staticmethod
+    def _load_cached(cache, keys, memory_limit):
+        """Cached input of every subscriber, or None unless all hit within ``memory_limit``."""
+        budget = MemoryBudget(memory_limit, "cached subscriber input")
+        loaded = []
+        for key in keys:
+            cols = cache.load(key)
+            if cols is None:
+                return None
+            try:
+                budget.charge(columns_nbytes(cols))
+            except MemoryLimitError:
+                # 放不下就照常读取抓包
+                return None
+            loaded.append(cols)
+        return loaded
+
+
+def _feed(sub, cols, batch_size):
+    """Hand cached columns to a subscriber in ``batch_size`` row slices."""
+    rows = len(next(iter(cols.values()))) if cols else 0
+    if cols and not rows:
+        sub.on_batch(cols)
+    for lo in range(0, rows, batch_size):
+        sub.on_batch({name: col[lo:lo + batch_size] for name, col in cols.items()})
+
+
+class _Recording:
+    """
+    Subscriber input of one pass kept for the decode cache, up to
+    ``PIPELINE_CACHE_BYTES`` / the memory limit / the cache size; a larger
+    input is simply not cached (streaming subscribers stay bounded).
+    """
+
+    def __init__(self, cache, memory_limit, count):
+        limits = [PIPELINE_CACHE_BYTES, cache.max_bytes] + ([memory_limit] if memory_limit else [])
+        self.budget = MemoryBudget(min(limits))
+        self.parts = [[] for _ in range(count)]
+
+    def add(self, parts):
+        if self.parts is None:
+            return
+        try:
+            self.budget.charge(sum(columns_nbytes(cols) for cols in parts))
+        except MemoryLimitError:
+            self.parts = None
+            return
+        for kept, cols in zip(self.parts, parts):
+            kept.append(cols)
+
+    def store(self, cache, keys, file_path, subscribers):
+        if self.parts is None:
+            return
+        for key, kept, (name, sub) in zip(keys, self.parts, subscribers.items()):
+            cache.store(key, concat_columns(kept), source=os.path.abspath(file_path), decoder=sub.decoder.__name__,
+                        snaplen=sub.snaplen, select=None if sub.select is None else sub.select.__name__,
+                        subscriber=name)
@@ -0,0 +1,182 @@
+"""
+Nexus Analyzer Core - Flow Table
+One aggregation engine for every "group packets by flow" pass.
+
+Flows are keyed by packed integer tuples (rows of a NumPy structured dtype,
+e.g. ``UDP_FLOW_KEY``); per-flow counters live in growable NumPy columns and
+are updated one columnar batch at a time, so detecting flows never needs
+the packets themselves in memory:
+
+    table = FlowTable(UDP_FLOW_KEY, scores=("rtp",))
+    for cols in engine.iter_decode(decode_rtp, snaplen=RTP_SNAPLEN):
+        table.update(udp_flow_keys(cols), nbytes=cols["caplen"], ts_ns=cols["ts_ns"],
+                     scores={"rtp": cols["is_rtp"]}, mask=cols["is_udp"])
+    flows = table.columns()
+
+Flows are numbered (``slot``) in order of first appearance.
+"""
+import numpy as np
+
+# 常用流键: IP 地址按 decode_ip 的方式拆成高低两个 uint64
+UDP_FLOW_KEY = np.dtype([("ip_version", "u1"), ("src_hi", "<u8"), ("src_lo", "<u8"), ("sport", "<u2"),
+                         ("dst_hi", "<u8"), ("dst_lo", "<u8"), ("dport", "<u2")])
+UDP_SOURCE_KEY = np.dtype([("ip_version", "u1"), ("src_hi", "<u8"), ("src_lo", "<u8"), ("sport", "<u2")])
+DOT11_FLOW_KEY = np.dtype([("sa", "<u8"), ("da", "<u8"), ("tid", "<i8")])
+
+# 流键字段 -> decode_ip 列名
+_IP_COLUMNS = {"ip_version": "ip_version", "src_hi": "src_ip_hi", "src_lo": "src_ip_lo", "sport": "sport",
+               "dst_hi": "dst_ip_hi", "dst_lo": "dst_ip_lo", "dport": "dport"}
+
+
+# 组合编码超过该值前先压缩, 避免 int64 溢出
+_CODE_LIMIT = 1 << 31
+
+
+def _factorize(keys):
+    """
+    Group identical key rows: returns (first, inverse, last) like np.unique's
+    return_index / return_inverse plus the last occurrence of each group.
+
+    Structured rows are sorted as raw bytes by np.unique, which is slow; instead
+    each field is factorized on its own and the codes are combined into one int64.
+    """
+    codes = np.zeros(len(keys), dtype=np.int64)
+    size = 1
+    for name in keys.dtype.names:
+        uniq, inv = np.unique(keys[name], return_inverse=True)
+        if size * len(uniq) >= _CODE_LIMIT:
+            uniq_codes, codes = np.unique(codes, return_inverse=True)
+            size = len(uniq_codes)
+        codes = codes * len(uniq) + inv.ravel()
+        size *= len(uniq)
+    _, first, inverse = np.unique(codes, return_index=True, return_inverse=True)
+    _, rev_first = np.unique(codes[::-1], return_index=True)
+    return first, inverse.ravel(), len(codes) - 1 - rev_first
+
+
+def udp_flow_keys(cols, key=UDP_FLOW_KEY):
+    """Build ``key`` rows (``UDP_FLOW_KEY`` / ``UDP_SOURCE_KEY``) from decode_ip columns."""
+    keys = np.empty(len(cols["sport"]), dtype=key)
+    for name in key.names:
+        keys[name] = cols[_IP_COLUMNS[name]]
+    return keys
+
+
+class FlowTable:
+    """
+    Per-flow ``packets`` / ``bytes`` / ``first_ts`` / ``last_ts`` counters
+    plus one counter per protocol score name.
+
+    ``first_ts`` / ``last_ts`` are the timestamps of the first and last
+    packet of the flow in capture order (as a per-packet loop would see them).
+    """
+
+    def __init__(self, key_dtype, scores=(), capacity=1024):
+        self.key_dtype = np.dtype(key_dtype)
+        self.score_names = tuple(scores)
+        self._slots = {}
+        self._size = 0
+        self._cols = {"key": np.zeros(capacity, dtype=self.key_dtype)}
+        for name in ("packets", "bytes", "first_ts", "last_ts") + self.score_names:
+            self._cols[name] = np.zeros(capacity, dtype=np.int64)
+
+    def __len__(self):
+        return self._size
+
+    def _grow(self, need):
+        capacity = len(self._cols["key"])
+        if need <= capacity:
+            return
+        while capacity < need:
+            capacity *= 2
+        for name, col in self._cols.items():
+            grown = np.zeros(capacity, dtype=col.dtype)
+            grown[:self._size] = col[:self._size]
+            self._cols[name] = grown
+
+    def update(self, keys, nbytes=None, ts_ns=None, scores=None, mask=None):
+        """
+        Add one batch: ``keys`` is an array of ``key_dtype`` rows, the other
+        arguments are per-row vectors (``scores``: name -> bool mask). Rows
+        where ``mask`` is False are ignored.
+
+        Returns the flow slot of every row (-1 for masked rows), e.g. to pick
+        the rows of one flow out of the batch.
+        """
+        out = np.full(len(keys), -1, dtype=np.int64)
+        idx = None if mask is None else np.flatnonzero(mask)
+
+        def rows(values):
+            return values if idx is None else np.asarray(values)[idx]
+
+        keys = rows(keys)
+        n = len(keys)
+        if n == 0:
+            return out
+
+        # first / last: 每个流在本批中的第一个和最后一个包
+        first, inverse, last = _factorize(keys)
+        uniq = keys[first]
+        if ts_ns is not None:
+            ts_ns = np.asarray(rows(ts_ns), dtype=np.int64)
+
+        slots = np.empty(len(uniq), dtype=np.int64)
+        new = []
+        for j, key in enumerate(uniq.tolist()):
+            slot = self._slots.get(key)
+            if slot is None:
+                new.append(j)
+            else:
+                slots[j] = slot
+        cols = self._cols
+        if new:
+            # 新流按首次出现的顺序编号
+            new.sort(key=lambda j: first[j])
+            self._grow(self._size + len(new))
+            cols = self._cols
+            for j in new:
+                self._slots[uniq[j].item()] = self._size
+                slots[j] = self._size
+                self._size += 1
+            new = np.array(new)
+            cols["key"][slots[new]] = uniq[new]
+            if ts_ns is not None:
+                cols["first_ts"][slots[new]] = ts_ns[first[new]]
+
+        cols["packets"][slots] += np.bincount(inverse, minlength=len(uniq))
+        if nbytes is not None:
+            weights = np.asarray(rows(nbytes), dtype=np.float64)
+            cols["bytes"][slots] += np.bincount(inverse, weights=weights, minlength=len(uniq)).astype(np.int64)
+        if ts_ns is not None:
+            cols["last_ts"][slots] = ts_ns[last]
+        for name, hits in (scores or {}).items():
+            weights = np.asarray(rows(hits), dtype=np.float64)
+            cols[name][slots] += np.bincount(inverse, weights=weights, minlength=len(uniq)).astype(np.int64)
+
+        if idx is None:
+            return slots[inverse]
+        out[idx] = slots[inverse]
+        return out
+
+    def slot(self, key):
+        """Slot of a key tuple, or None."""
+        return self._slots.get(tuple(key))
+
+    def top(self, by="packets"):
+        """Slot of the flow with the largest ``by`` counter (ties: first seen), or None."""
+        if self._size == 0:
+            return None
+        return int(np.argmax(self._cols[by][:self._size]))
+
+    def columns(self):
+        """
+        Dict of per-flow arrays in slot order: one entry per key field plus
+        ``packets``, ``bytes``, ``first_ts``, ``last_ts`` and the scores.
+        """
+        size = self._size
+        keys = self._cols["key"][:size]
+        out = {name: keys[name].copy() for name in self.key_dtype.names}
+        for name, col in self._cols.items():
+            if name != "key":
+                out[name] = col[:size].copy()
+        return out
@@ -0,0 +1,71 @@
+"""
+Nexus Analyzer Core - Lazy Imports
+Defer heavy third-party imports (pandas, matplotlib, Scapy) to first use.
+
+Every analysis runs in its own CLI process, so import time is paid on
+every call; a module that only needs pandas for its text report should
+not pay ~0.5 s for it on the streaming path:
+
+    pd = lazy_import("pandas")              # imported on the first pd.<attr>
+    plt = lazy_import("matplotlib.pyplot")
+
+    # package __init__: names resolved from submodules on first access (PEP 562)
+    __getattr__, __dir__ = lazy_exports(__name__, {"PcapEngine": ".pcap_reader"})
+
+Only the standard library is imported here.
+"""
+import importlib
+import sys
+
+
+class LazyModule:
+    """Stand-in for a module that is imported when one of its attributes is first read."""
+
+    def __init__(self, name):
+        self.__dict__["_lazy_name"] = name
+        self.__dict__["_lazy_module"] = None
+
+    def _load(self):
+        module = self.__dict__["_lazy_module"]
+        if module is None:
+            module = importlib.import_module(self.__dict__["_lazy_name"])
+            self.__dict__["_lazy_module"] = module
+        return module
+
+    def __getattr__(self, attr):
+        return getattr(self._load(), attr)
+
+    def __setattr__(self, attr, value):
+        setattr(self._load(), attr, value)
+
+    def __dir__(self):
+        return dir(self._load())
+
+    def __repr__(self):
+        state = "loaded" if self.__dict__["_lazy_module"] is not None else "not loaded"
+        return f"<lazy module '{self.__dict__['_lazy_name']}' ({state})>"
+
+
+def lazy_import(name):
+    """Module ``name`` if it is already imported, otherwise a ``LazyModule`` for it."""
+    module = sys.modules.get(name)
+    return module if module is not None else LazyModule(name)
+
+
+def lazy_exports(package, exports):
+    """
+    Module ``__getattr__`` / ``__dir__`` of ``package`` that import
+    ``exports`` (name -> relative module) on first access.
+    """
+    def __getattr__(name):
+        if name not in exports:
+            raise AttributeError(f"module '{package}' has no attribute '{name}'")
+        value = getattr(importlib.import_module(exports[name], package), name)
+        # 之后的访问不再经过 __getattr__
+        setattr(sys.modules[package], name, value)
+        return value
+
+    def __dir__():
+        return sorted(set(vars(sys.modules[package])) | set(exports))
+
+    return __getattr__, __dir__
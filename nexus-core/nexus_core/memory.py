@@ -0,0 +1,87 @@
+"""
+Nexus Analyzer Core - Memory Accounting
+Peak RSS reporting and the decode memory ceiling.
+
+Analyzers print ``format_peak_rss()`` in their summaries so memory
+regressions show up next to the results. ``PcapEngine.memory_limit`` (CLI:
+``--memory-limit``) bounds the decoded columns an analysis may collect; when
+a capture would exceed it, ``MemoryLimitError`` is raised instead of running
+the machine out of memory.
+"""
+import sys
+
+
+class MemoryLimitError(MemoryError):
+    """Collected decoder output would exceed the configured memory ceiling."""
+
+
+def peak_rss_bytes():
+    """Peak resident set size of this process in bytes, or None if unknown."""
+    if sys.platform == "win32":
+        return _peak_working_set()
+    try:
+        import resource
+    except ImportError:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux 以 KB 为单位, macOS 以字节为单位
+    return peak if sys.platform == "darwin" else peak * 1024
+
+
+def _peak_working_set():
+    import ctypes
+    from ctypes import wintypes
+
+    class PROCESS_MEMORY_COUNTERS(ctypes.Structure):
+        _fields_ = [("cb", wintypes.DWORD),
+                    ("PageFaultCount", wintypes.DWORD),
+                    ("PeakWorkingSetSize", ctypes.c_size_t),
+                    ("WorkingSetSize", ctypes.c_size_t),
+                    ("QuotaPeakPagedPoolUsage", ctypes.c_size_t),
+                    ("QuotaPagedPoolUsage", ctypes.c_size_t),
+                    ("QuotaPeakNonPagedPoolUsage", ctypes.c_size_t),
+                    ("QuotaNonPagedPoolUsage", ctypes.c_size_t),
+                    ("PagefileUsage", ctypes.c_size_t),
+                    ("PeakPagefileUsage", ctypes.c_size_t)]
+
+    counters = PROCESS_MEMORY_COUNTERS()
+    counters.cb = ctypes.sizeof(counters)
+    try:
+        process = ctypes.windll.kernel32.GetCurrentProcess()
+        if not ctypes.windll.psapi.GetProcessMemoryInfo(process, ctypes.byref(counters), counters.cb):
+            return None
+    except (AttributeError, OSError):
+        return None
+    return counters.PeakWorkingSetSize
+
+
+def peak_rss_mb():
+    """Peak RSS in MB (rounded to 0.1), or None if unknown."""
+    peak = peak_rss_bytes()
+    return None if peak is None else round(peak / 1024 / 1024, 1)
+
+
+def format_peak_rss():
+    """'Peak RSS: 123.4 MB' for analyzer summaries."""
+    peak = peak_rss_mb()
+    return "Peak RSS: n/a" if peak is None else f"Peak RSS: {peak:.1f} MB"
+
+
+def columns_nbytes(cols):
+    return sum(col.nbytes for col in cols.values())
+
+
+class MemoryBudget:
+    """Running total of collected bytes checked against ``limit`` (None = unlimited)."""
+
+    def __init__(self, limit, what="decoded columns"):
+        self.limit = limit
+        self.what = what
+        self.used = 0
+
+    def charge(self, nbytes):
+        self.used += nbytes
+        if self.limit is not None and self.used > self.limit:
+            raise MemoryLimitError(
+                f"{self.what} exceed the memory limit of {self.limit / 1024 / 1024:.0f} MB; "
+                f"narrow the analysis with a PacketFilter / time range, or raise --memory-limit")
@@ -0,0 +1,120 @@
+"""
+Nexus Analyzer Core - Packet Filter Pushdown
+Predicates evaluated on record headers and raw header bytes, before any
+packet is copied into a batch, decoded or dissected by Scapy.
+
+    flt = PacketFilter(macs=["aa:bb:cc:dd:ee:ff"], tid=5)
+    engine.decode(decode_dot11, packet_filter=flt)
+    for pkt in PcapEngine(path).stream_packets(packet_filter=flt): ...
+
+All given criteria must hold. The time range is checked on the record
+header (and seeks via the packet index); MAC / TID use the 802.11 header
+behind Radiotap / PPI / Prism / AVS; ports / IP pair use the UDP / IP
+headers of any link type ``decode_ip`` understands.
+"""
+import ipaddress
+
+import numpy as np
+
+from .decoders.dot11 import decode_dot11, mac_to_int, DOT11_SNAPLEN
+from .decoders.ip import decode_ip, IP_SNAPLEN
+
+
+def _ip_key(ip):
+    """'10.0.0.1' / IPv6 text -> (version, hi, lo) as in decode_ip columns."""
+    addr = ipaddress.ip_address(ip)
+    value = int(addr)
+    return addr.version, value >> 64, value & 0xFFFFFFFFFFFFFFFF
+
+
+class PacketFilter:
+    """
+    Pushdown filter for ``PcapEngine``.
+
+    ``t0_ns`` / ``t1_ns``: keep ``t0_ns <= ts_ns < t1_ns``.
+    ``macs``: keep 802.11 frames whose RA or TA is in the set.
+    ``tid``: keep QoS Data frames of this TID; frames without a QoS Control
+    field (management, control incl. BlockAck) are not affected.
+    ``udp_ports`` / ``sport`` / ``dport``: keep UDP packets with either port
+    in ``udp_ports`` and the exact source / destination port.
+    ``ip_pair``: keep IP packets between these two addresses (both directions).
+    """
+
+    def __init__(self, t0_ns=None, t1_ns=None, macs=None, tid=None,
+                 udp_ports=None, sport=None, dport=None, ip_pair=None):
+        self.t0_ns = t0_ns
+        self.t1_ns = t1_ns
+        self.macs = None
+        if macs is not None:
+            self.macs = np.array([m if isinstance(m, (int, np.integer)) else mac_to_int(m)
+                                  for m in macs], dtype=np.uint64)
+        self.tid = tid
+        self.udp_ports = None if udp_ports is None else np.array(sorted(udp_ports), dtype=np.int64)
+        self.sport = sport
+        self.dport = dport
+        self.ip_pair = None if ip_pair is None else tuple(_ip_key(ip) for ip in ip_pair)
+
+    @property
+    def has_time(self):
+        return self.t0_ns is not None or self.t1_ns is not None
+
+    @property
+    def _dot11(self):
+        return self.macs is not None or self.tid is not None
+
+    @property
+    def _ip(self):
+        return (self.udp_ports is not None or self.sport is not None
+                or self.dport is not None or self.ip_pair is not None)
+
+    @property
+    def needs_headers(self):
+        return self._dot11 or self._ip
+
+    @property
+    def snaplen(self):
+        """Bytes per packet the header predicates need to look at."""
+        return DOT11_SNAPLEN if self._dot11 else IP_SNAPLEN
+
+    def cache_key(self):
+        """JSON-serializable description of the criteria (see ``DecodeCache``)."""
+        return [self.t0_ns, self.t1_ns,
+                None if self.macs is None else self.macs.tolist(), self.tid,
+                None if self.udp_ports is None else self.udp_ports.tolist(),
+                self.sport, self.dport, self.ip_pair]
+
+    def match_time(self, ts_ns):
+        keep = np.ones(len(ts_ns), dtype=bool)
+        if self.t0_ns is not None:
+            keep &= ts_ns >= self.t0_ns
+        if self.t1_ns is not None:
+            keep &= ts_ns < self.t1_ns
+        return keep
+
+    def match_headers(self, batch):
+        """Mask over a header batch (packets copied with ``self.snaplen``)."""
+        keep = np.ones(len(batch), dtype=bool)
+        if self._dot11:
+            d = decode_dot11(batch)
+            if self.macs is not None:
+                keep &= np.isin(d["addr1"], self.macs) | (d["has_addr2"] & np.isin(d["addr2"], self.macs))
+            if self.tid is not None:
+                keep &= (d["tid"] < 0) | (d["tid"] == self.tid)
+        if self._ip:
+            c = decode_ip(batch)
+            if self.ip_pair is not None:
+                (va, ha, la), (vb, hb, lb) = self.ip_pair
+                src_a = (c["ip_version"] == va) & (c["src_ip_hi"] == ha) & (c["src_ip_lo"] == la)
+                src_b = (c["ip_version"] == vb) & (c["src_ip_hi"] == hb) & (c["src_ip_lo"] == lb)
+                dst_a = (c["ip_version"] == va) & (c["dst_ip_hi"] == ha) & (c["dst_ip_lo"] == la)
+                dst_b = (c["ip_version"] == vb) & (c["dst_ip_hi"] == hb) & (c["dst_ip_lo"] == lb)
+                keep &= c["is_ip"] & ((src_a & dst_b) | (src_b & dst_a))
+            if self.udp_ports is not None or self.sport is not None or self.dport is not None:
+                keep &= c["is_udp"]
+            if self.udp_ports is not None:
+                keep &= np.isin(c["sport"], self.udp_ports) | np.isin(c["dport"], self.udp_ports)
+            if self.sport is not None:
+                keep &= c["sport"] == self.sport
+            if self.dport is not None:
+                keep &= c["dport"] == self.dport
+        return keep
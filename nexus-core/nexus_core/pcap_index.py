@@ -0,0 +1,152 @@
+"""
+Nexus Analyzer Core - Packet Index Sidecar (.nxidx)
+Record offsets and timestamps of a capture, persisted next to it.
+
+Layout (little endian):
+    header      magic, version, stride, capture size, capture mtime_ns,
+                packet count, meta length
+    meta        JSON: reader state needed to resume a walk at any record
+                (pcap endian / linktype / ts scale, pcapng sections and
+                interface blocks), padded to 8 bytes
+    offsets     uint64[count]   record (block) offset in the capture
+    ts_ns       int64[count]    timestamp in ns
+    block_max   int64[blocks]   max(ts_ns[:(k + 1) * stride])
+    tail_min    int64[blocks]   min(ts_ns[k * stride:])
+
+``block_max`` / ``tail_min`` form the coarse time -> packet table: a time
+range is located with two binary searches over them plus one block scan,
+which also stays correct for captures whose timestamps are not sorted.
+"""
+import json
+import os
+import struct
+
+import numpy as np
+
+INDEX_SUFFIX = ".nxidx"
+INDEX_MAGIC = b"NXIDX\x00\x00\x00"
+INDEX_VERSION = 2
+
+# 粗粒度时间表的块大小 (包数)
+COARSE_STRIDE = 4096
+
+_HEADER = struct.Struct("<8sIIQqQI")
+_TS_MAX = np.iinfo(np.int64).max
+
+
+def index_path(file_path):
+    return file_path + INDEX_SUFFIX
+
+
+def _pad8(n):
+    return -n % 8
+
+
+class PacketIndex:
+    """Offsets / timestamps of every record of one capture."""
+    __slots__ = ("offsets", "ts_ns", "block_max", "tail_min", "meta", "stride")
+
+    def __init__(self, offsets, ts_ns, meta, stride=COARSE_STRIDE, block_max=None, tail_min=None):
+        self.offsets = offsets
+        self.ts_ns = ts_ns
+        self.meta = meta
+        self.stride = stride
+        if block_max is None:
+            block_max, tail_min = self._coarse_tables(ts_ns, stride)
+        self.block_max = block_max
+        self.tail_min = tail_min
+
+    def __len__(self):
+        return len(self.offsets)
+
+    @staticmethod
+    def _coarse_tables(ts_ns, stride):
+        n = len(ts_ns)
+        if n == 0:
+            return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.int64)
+        starts = np.arange(0, n, stride)
+        block_max = np.maximum.accumulate(np.maximum.reduceat(ts_ns, starts))
+        tail_min = np.minimum.accumulate(np.minimum.reduceat(ts_ns, starts)[::-1])[::-1]
+        return block_max.astype(np.int64), tail_min.astype(np.int64)
+
+    def time_range(self, t0_ns=None, t1_ns=None):
+        """
+        0-based packet range [start, stop) covering every packet with
+        ``t0_ns <= ts_ns < t1_ns``.
+
+        For time-sorted captures the range is exact; otherwise it is the
+        tightest contiguous range and callers filter on ``ts_ns``.
+        """
+        n = len(self)
+        start, stop = 0, n
+        s = self.stride
+        if t0_ns is not None and n:
+            # 第一个前缀最大值 >= t0 的包, 即第一个 ts >= t0 的包
+            k = int(np.searchsorted(self.block_max, t0_ns, side="left"))
+            if k >= len(self.block_max):
+                return n, n
+            seg = np.maximum.accumulate(np.asarray(self.ts_ns[k * s:(k + 1) * s]))
+            start = k * s + int(np.searchsorted(seg, t0_ns, side="left"))
+        if t1_ns is not None and n:
+            # 第一个 "其后所有包 ts >= t1" 的位置
+            k = int(np.searchsorted(self.tail_min, t1_ns, side="left"))
+            if k > 0:
+                nxt = self.tail_min[k] if k < len(self.tail_min) else _TS_MAX
+                seg = np.asarray(self.ts_ns[(k - 1) * s:k * s])
+                tail = np.minimum(np.minimum.accumulate(seg[::-1])[::-1], nxt)
+                stop = (k - 1) * s + int(np.searchsorted(tail, t1_ns, side="left"))
+            else:
+                stop = 0
+        return start, max(start, stop)
+
+    def save(self, path, src_size, src_mtime_ns):
+        """Write atomically; returns False when the location is not writable."""
+        meta = json.dumps(self.meta).encode("utf-8")
+        tmp = f"{path}.{os.getpid()}.tmp"
+        try:
+            with open(tmp, "wb") as f:
+                f.write(_HEADER.pack(INDEX_MAGIC, INDEX_VERSION, self.stride, src_size,
+                                     src_mtime_ns, len(self), len(meta)))
+                f.write(meta + b"\x00" * _pad8(_HEADER.size + len(meta)))
+                for arr, dtype in ((self.offsets, "<u8"), (self.ts_ns, "<i8"),
+                                   (self.block_max, "<i8"), (self.tail_min, "<i8")):
+                    f.write(np.ascontiguousarray(arr, dtype=dtype).tobytes())
+            os.replace(tmp, path)
+            return True
+        except OSError:
+            # 抓包目录只读 / 索引文件被占用: 不落盘, 仅本次使用
+            try:
+                os.remove(tmp)
+            except OSError:
+                pass
+            return False
+
+    @classmethod
+    def load(cls, path, src_size, src_mtime_ns):
+        """Load ``path`` if it describes a capture of this size / mtime, else None."""
+        try:
+            with open(path, "rb") as f:
+                head = f.read(_HEADER.size)
+                if len(head) < _HEADER.size:
+                    return None
+                magic, version, stride, size, mtime_ns, count, meta_len = _HEADER.unpack(head)
+                if (magic != INDEX_MAGIC or version != INDEX_VERSION or size != src_size
+                        or mtime_ns != src_mtime_ns or stride <= 0):
+                    return None
+                meta = json.loads(f.read(meta_len).decode("utf-8"))
+            blocks = -(-count // stride)
+            pos = _HEADER.size + meta_len + _pad8(_HEADER.size + meta_len)
+            if os.path.getsize(path) != pos + 16 * count + 16 * blocks:
+                return None
+            if count:
+                # 大数组按需映射, 打开 10GB 抓包的索引也不必全部读入内存
+                offsets = np.memmap(path, dtype="<u8", mode="r", offset=pos, shape=(count,))
+                ts_ns = np.memmap(path, dtype="<i8", mode="r", offset=pos + 8 * count, shape=(count,))
+                coarse = np.fromfile(path, dtype="<i8", count=2 * blocks, offset=pos + 16 * count)
+            else:
+                offsets = np.empty(0, dtype=np.uint64)
+                ts_ns = np.empty(0, dtype=np.int64)
+                coarse = np.empty(0, dtype=np.int64)
+            return cls(offsets, ts_ns, meta, stride, coarse[:blocks], coarse[blocks:])
+        except (OSError, ValueError):
+            return None
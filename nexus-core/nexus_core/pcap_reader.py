@@ -1,15 +1,1313 @@
 """
 Nexus Analyzer Core - PCAP Reader
 Wrapper around Scapy/DPKT for efficient packet reading.
+
+Two reading modes are available:
+    * ``scapy``: every packet is dissected into a Scapy object (flexible, slow).
+    * ``raw``:   the capture is memory-mapped and only the pcap/pcapng record
+      headers are walked with ``struct``. Packet bytes are handed out as
+      zero-copy ``memoryview`` slices, nothing is dissected.
+
+gzip / zstd / lz4 compressed captures are detected by magic bytes and
+streamed through a background decompression thread instead of mmap
+(sequential access only: no packet index, random access or sharding).
 """
-from scapy.all import rdpcap, PcapReader
+import copy
+import hashlib
+import itertools
+import mmap
+import os
+import pickle
+import struct
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+
+import numpy as np
+
+from .decode_cache import DecodeCache
+from .memory import MemoryBudget, columns_nbytes
+from .pcap_index import PacketIndex, index_path
+from .pcap_stream import ReadAhead, detect_compression, open_decompressed
+from .cancel import AnalysisCancelled, current as current_token
+from .progress import current as current_progress
+
+# 经典 pcap 的 magic (按读取到的字节序区分大小端)
+PCAP_MAGIC_USEC = 0xA1B2C3D4
+PCAP_MAGIC_NSEC = 0xA1B23C4D
+
+# pcapng 块类型
+PCAPNG_SHB = 0x0A0D0D0A
+PCAPNG_IDB = 0x00000001
+PCAPNG_PB = 0x00000002      # 已废弃的 Packet Block, 旧版工具仍会写出
+PCAPNG_SPB = 0x00000003
+PCAPNG_EPB = 0x00000006
+PCAPNG_BYTE_ORDER_MAGIC = 0x1A2B3C4D
+
+# IDB 选项
+PCAPNG_OPT_ENDOFOPT = 0
+PCAPNG_IF_TSRESOL = 9
+PCAPNG_IF_TSOFFSET = 14
+
+READ_MODES = ("scapy", "raw")
+
+DEFAULT_BATCH_SIZE = 65536
+
+# 单个批次拷贝的包数据上限: 不截断 (snaplen=None) 的大包批次按字节再切分
+MAX_BATCH_BYTES = 64 * 1024 * 1024
+
+# iter_raw / index 逐记录遍历时每隔这么多记录报告一次进度、检查一次取消
+PROGRESS_RECORDS = 4096
+
+# 并行解码时检查取消的间隔 (秒)
+CANCEL_POLL_S = 0.05
+
+# 并行解码时每个分片至少这么大, 更小的文件不值得启动进程池
+MIN_SHARD_BYTES = 16 * 1024 * 1024
+
+# iter_batches 产出的逐包记录列
+RECORD_DTYPE = np.dtype([
+    ("ts_ns", "<i8"),       # 时间戳 (纳秒, Unix epoch)
+    ("caplen", "<u4"),      # 抓包长度
+    ("wirelen", "<u4"),     # 原始线上长度
+    ("linktype", "<u2"),    # 链路类型 (LINKTYPE_*)
+    ("interface_id", "<u4"),  # pcapng 接口号 (经典 pcap 恒为 0)
+    ("offset", "<u8"),      # 记录 (块) 在文件中的起始偏移
+    ("buf_off", "<u8"),     # 包数据在 PacketBatch.data 中的起始位置
+    ("buf_len", "<u4"),     # 实际拷贝到 data 中的字节数 (受 snaplen 截断)
+])
+
+
+class PcapFormatError(ValueError):
+    """Raised when a capture is neither a valid pcap nor pcapng file."""
+    pass
+
+
+class _ReaderState:
+    """
+    Walker state for one capture.
+    Kept separate from the mmap so a walk can be resumed at any record offset.
+    """
+    __slots__ = ("kind", "endian", "linktype", "ts_scale", "interfaces", "sections", "pos")
+
+    def __init__(self, kind, endian, linktype=0, ts_scale=1000, pos=0):
+        self.kind = kind            # 'pcap' | 'pcapng'
+        self.endian = endian        # '<' | '>'
+        self.linktype = linktype    # 经典 pcap 的全局链路类型
+        self.ts_scale = ts_scale    # 经典 pcap: 秒以下部分 -> ns 的倍数
+        self.interfaces = []        # pcapng: 当前 section 内按 IDB 顺序的 (链路类型, 时间戳换算)
+        self.sections = []          # pcapng: 走过的 [SHB 偏移, 字节序, [[IDB 偏移, 接口], ...]]
+        self.pos = pos              # 第一个记录 (或块) 的文件偏移
+
+    def snapshot(self, pos):
+        """Copy of the current state that resumes walking at ``pos``."""
+        state = _ReaderState(self.kind, self.endian, self.linktype, self.ts_scale, pos)
+        state.interfaces = list(self.interfaces)
+        return state
+
+
+def _detect_format(buf):
+    """Parse the file header and return the initial walker state."""
+    if len(buf) < 4:
+        raise PcapFormatError("File too short to be a capture")
+
+    magic_le = struct.unpack_from("<I", buf, 0)[0]
+    if magic_le == PCAPNG_SHB:
+        # 字节序由 SHB 内的 Byte-Order Magic 决定
+        return _ReaderState("pcapng", "<", pos=0)
+
+    for endian in ("<", ">"):
+        magic = struct.unpack_from(endian + "I", buf, 0)[0]
+        if magic in (PCAP_MAGIC_USEC, PCAP_MAGIC_NSEC):
+            if len(buf) < 24:
+                raise PcapFormatError("Truncated pcap global header")
+            linktype = struct.unpack_from(endian + "I", buf, 20)[0] & 0x0FFFFFFF
+            ts_scale = 1000 if magic == PCAP_MAGIC_USEC else 1
+            return _ReaderState("pcap", endian, linktype, ts_scale, pos=24)
+
+    raise PcapFormatError(f"Unknown capture magic 0x{magic_le:08x}")
+
+
+def _walk_pcap(buf, pos, end, state):
+    """
+    Walk classic pcap records in ``buf[pos:end]``.
+    Yields (record_offset, data_offset, ts_ns, caplen, wirelen, linktype, interface_id).
+    Stops at the first record that does not fit completely.
+    """
+    unpack = struct.Struct(state.endian + "IIII").unpack_from
+    scale = state.ts_scale
+    linktype = state.linktype
+    while pos + 16 <= end:
+        sec, frac, caplen, wirelen = unpack(buf, pos)
+        data = pos + 16
+        nxt = data + caplen
+        if nxt > end:
+            break
+        yield pos, data, sec * 1_000_000_000 + frac * scale, caplen, wirelen, linktype, 0
+        pos = nxt
+    state.pos = pos
+
+
+def _idb_interface(buf, pos, block_len, endian):
+    """
+    Parse an Interface Description Block into ``(linktype, mul, div, offset_ns)``:
+    a raw timestamp ``ts`` of this interface is ``ts * mul // div + offset_ns``
+    nanoseconds (``if_tsresol`` / ``if_tsoffset``, default microseconds).
+    """
+    linktype = struct.unpack_from(endian + "H", buf, pos + 8)[0]
+    resol, offset_s = 6, 0
+    opt, opt_end = pos + 16, pos + block_len - 4
+    while opt + 4 <= opt_end:
+        code, length = struct.unpack_from(endian + "HH", buf, opt)
+        if code == PCAPNG_OPT_ENDOFOPT or opt + 4 + length > opt_end:
+            break
+        if code == PCAPNG_IF_TSRESOL and length >= 1:
+            resol = buf[opt + 4]
+        elif code == PCAPNG_IF_TSOFFSET and length >= 8:
+            offset_s = struct.unpack_from(endian + "q", buf, opt + 4)[0]
+        opt += 4 + length + (-length % 4)
+
+    if resol & 0x80:
+        # 最高位为 1: 2 的负幂次
+        mul, div = 1_000_000_000, 1 << (resol & 0x7F)
+    elif resol <= 9:
+        mul, div = 10 ** (9 - resol), 1
+    else:
+        mul, div = 1, 10 ** (resol - 9)
+    return linktype, mul, div, offset_s * 1_000_000_000
+
+
+# 未声明的接口: 链路类型未知, 默认微秒精度
+_NO_INTERFACE = (0, 1000, 1, 0)
+
+
+def _walk_pcapng(buf, pos, end, state):
+    """
+    Walk pcapng blocks in ``buf[pos:end]``.
+    Section headers and interface descriptions update ``state``; Enhanced,
+    Simple and (obsolete) Packet Blocks are yielded with the link type and
+    timestamp resolution of their interface. Every other block is skipped by
+    its length without being parsed.
+    """
+    while pos + 12 <= end:
+        block_type = struct.unpack_from(state.endian + "I", buf, pos)[0]
+        if block_type == PCAPNG_SHB:
+            # SHB 决定本 section 的字节序, 同时清空接口表
+            bom = struct.unpack_from("<I", buf, pos + 8)[0]
+            state.endian = "<" if bom == PCAPNG_BYTE_ORDER_MAGIC else ">"
+            state.interfaces = []
+            state.sections.append([pos, state.endian, []])
+        block_len = struct.unpack_from(state.endian + "I", buf, pos + 4)[0]
+        if block_len < 12 or pos + block_len > end:
+            break
+
+        if block_type == PCAPNG_EPB:
+            iface, ts_high, ts_low, caplen, wirelen = struct.unpack_from(
+                state.endian + "IIIII", buf, pos + 8)
+            interfaces = state.interfaces
+            linktype, mul, div, offset_ns = interfaces[iface] if iface < len(interfaces) else _NO_INTERFACE
+            ts_ns = ((ts_high << 32) | ts_low) * mul // div + offset_ns
+            yield pos, pos + 28, ts_ns, min(caplen, block_len - 32), wirelen, linktype, iface
+        elif block_type == PCAPNG_SPB:
+            # SPB 没有时间戳, 固定属于接口 0; 捕获长度由块长度决定
+            wirelen = struct.unpack_from(state.endian + "I", buf, pos + 8)[0]
+            linktype = state.interfaces[0][0] if state.interfaces else 0
+            yield pos, pos + 12, 0, min(wirelen, block_len - 16), wirelen, linktype, 0
+        elif block_type == PCAPNG_PB:
+            iface, _, ts_high, ts_low, caplen, wirelen = struct.unpack_from(
+                state.endian + "HHIIII", buf, pos + 8)
+            interfaces = state.interfaces
+            linktype, mul, div, offset_ns = interfaces[iface] if iface < len(interfaces) else _NO_INTERFACE
+            ts_ns = ((ts_high << 32) | ts_low) * mul // div + offset_ns
+            yield pos, pos + 28, ts_ns, min(caplen, block_len - 32), wirelen, linktype, iface
+        elif block_type == PCAPNG_IDB:
+            interface = _idb_interface(buf, pos, block_len, state.endian)
+            state.interfaces.append(interface)
+            if state.sections:
+                state.sections[-1][2].append([pos, list(interface)])
+
+        pos += block_len
+    state.pos = pos
+
+
+def _walk(buf, pos, end, state):
+    if state.kind == "pcap":
+        return _walk_pcap(buf, pos, end, state)
+    return _walk_pcapng(buf, pos, end, state)
+
+
+def _index_meta(state):
+    """Reader state persisted in the .nxidx sidecar (see ``_state_at``)."""
+    return {"kind": state.kind, "endian": state.endian, "linktype": state.linktype,
+            "ts_scale": state.ts_scale, "sections": state.sections, "end": state.pos}
+
+
+def _state_at(meta, pos):
+    """Rebuild the walker state for the record at ``pos`` from index meta."""
+    state = _ReaderState(meta["kind"], meta["endian"], meta["linktype"], meta["ts_scale"], pos)
+    if state.kind == "pcapng":
+        for offset, endian, interfaces in meta["sections"]:
+            if offset > pos:
+                break
+            state.endian = endian
+            state.interfaces = [tuple(interface) for block, interface in interfaces if block < pos]
+    return state
+
+
+def _split_rows(rows, snaplen):
+    """Split walker rows so that no batch copies more than ``MAX_BATCH_BYTES``."""
+    width = snaplen if snaplen is not None else 0
+    if width and width * len(rows) <= MAX_BATCH_BYTES:
+        return [rows]
+    sizes = np.fromiter((r[3] for r in rows), dtype=np.int64, count=len(rows))
+    if width:
+        np.minimum(sizes, width, out=sizes)
+    ends = np.cumsum(sizes)
+    if ends[-1] <= MAX_BATCH_BYTES:
+        return [rows]
+    parts, start = [], 0
+    while start < len(rows):
+        base = ends[start - 1] if start else 0
+        # 至少一个包, 单包超过上限时单独成批
+        stop = max(start + 1, int(np.searchsorted(ends, base + MAX_BATCH_BYTES, side="right")))
+        parts.append(rows[start:stop])
+        start = stop
+    return parts
+
+
+def _iter_batches(buf, walker, first_index, batch_size, snaplen, packet_filter=None):
+    """Yield batches of the walker rows; returns the number of the next packet (0-based)."""
+    while True:
+        rows = list(itertools.islice(walker, batch_size))
+        if not rows:
+            break
+        for part in _split_rows(rows, snaplen):
+            if packet_filter is None:
+                yield _make_batch(buf, part, first_index, snaplen)
+            else:
+                batch = _filter_rows(buf, part, first_index, snaplen, packet_filter)
+                if batch is not None:
+                    yield batch
+            first_index += len(part)
+    return first_index
+
+
+def _watched(batches, first_index, progress=None, token=None):
+    """
+    Pass ``_iter_batches`` output through. The cancel token is checked
+    before each batch: a passed deadline ends the pass and returns None,
+    otherwise the wrapped generator's return value is returned. The offset
+    and packet count reached are reported once each batch has been consumed.
+    """
+    while True:
+        if token is not None and token.check():
+            batches.close()
+            return None
+        try:
+            batch = next(batches)
+        except StopIteration as end:
+            return end.value
+        yield batch
+        if progress is not None and len(batch):
+            progress.update(int(batch.records["offset"][-1]), int(batch.packet_no[-1]) - first_index)
+
+
+def _filter_rows(buf, rows, first_index, snaplen, packet_filter):
+    """
+    Apply a ``PacketFilter`` to walker rows: the time range on the record
+    headers, then header predicates on a ``packet_filter.snaplen`` copy.
+    Only the surviving packets are copied with the caller's ``snaplen``.
+    Returns a batch with explicit packet numbers, or None when nothing matched.
+    """
+    keep = packet_filter.match_time(np.fromiter((r[2] for r in rows), dtype=np.int64, count=len(rows)))
+    if packet_filter.needs_headers and keep.any():
+        idx = np.flatnonzero(keep)
+        head = _make_batch(buf, [rows[i] for i in idx], 0, packet_filter.snaplen)
+        keep[idx] = packet_filter.match_headers(head)
+    idx = np.flatnonzero(keep)
+    if len(idx) == 0:
+        return None
+    batch = _make_batch(buf, [rows[i] for i in idx], first_index, snaplen)
+    batch.numbers = idx + first_index
+    return batch
+
+
+def _stream_chunks(fileobj):
+    """
+    Walk a decompressed capture stream chunk by chunk (see ``ReadAhead``).
+    Yields (buf, base, rows): ``rows`` are walker rows indexing into ``buf``
+    and ``base`` is the stream offset of ``buf``. A record cut by a chunk
+    boundary is carried over into the next buffer; an incomplete tail is
+    ignored, as with mapped files.
+    """
+    reader = ReadAhead(fileobj)
+    try:
+        state, carry, base = None, b"", 0
+        for chunk in reader:
+            buf = carry + chunk
+            if state is None:
+                if len(buf) < 24:
+                    carry = buf
+                    continue
+                state = _detect_format(buf)
+                pos = state.pos
+            else:
+                pos = 0
+            rows = list(_walk(buf, pos, len(buf), state))
+            if rows:
+                yield buf, base, rows
+            carry = buf[state.pos:]
+            base += state.pos
+        if state is None and carry:
+            # 不足一个全局头: 与映射文件一致地报格式错误
+            _detect_format(carry)
+    finally:
+        reader.close()
+
+
+def _plan_shards(buf, state, count):
+    """
+    Split the records of ``buf`` into ``count`` contiguous, record-aligned
+    byte ranges of roughly equal size.
+    Returns a list of (start, end, first_index, state) per shard.
+    """
+    end = len(buf)
+    step = (end - state.pos) / count
+    cuts = [state.pos + int(step * k) for k in range(1, count)]
+
+    shards = []
+    shard_start, shard_first, shard_state = state.pos, 0, state.snapshot(state.pos)
+    for index, row in enumerate(_walk(buf, state.pos, end, state)):
+        if not cuts:
+            break
+        if row[0] < cuts[0]:
+            continue
+        while cuts and cuts[0] <= row[0]:
+            cuts.pop(0)
+        if row[0] > shard_start:
+            shards.append((shard_start, row[0], shard_first, shard_state))
+            # pcapng: 接口表 / 字节序取记录所在位置的状态
+            shard_start, shard_first, shard_state = row[0], index, state.snapshot(row[0])
+    shards.append((shard_start, end, shard_first, shard_state))
+    return shards
+
+
+def _shards_from_index(index, count, end):
+    """``_plan_shards`` without a header walk: binary searches over the index."""
+    offsets = index.offsets
+    first = int(offsets[0])
+    step = (end - first) / count
+    cuts = np.searchsorted(offsets, [first + int(step * k) for k in range(1, count)])
+    starts = [0] + sorted(set(int(c) for c in cuts if 0 < c < len(offsets)))
+    shards = []
+    for k, i in enumerate(starts):
+        start = int(offsets[i])
+        stop = int(offsets[starts[k + 1]]) if k + 1 < len(starts) else end
+        shards.append((start, stop, i, _state_at(index.meta, start)))
+    return shards
+
+
+def _decode_shard(file_path, shard, decoder, batch_size, snaplen, select, packet_filter=None,
+                  memory_limit=None):
+    """Process pool worker: decode one shard and return its columns."""
+    from .decoders.common import concat_columns, take_columns
+
+    start, end, first_index, state = shard
+    budget = MemoryBudget(memory_limit)
+    with open(file_path, "rb") as f:
+        mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        try:
+            parts = []
+            walker = _walk(mm, start, end, state)
+            for batch in _iter_batches(mm, walker, first_index, batch_size, snaplen, packet_filter):
+                cols = decoder(batch)
+                if select is not None:
+                    cols = take_columns(cols, select(cols))
+                budget.charge(columns_nbytes(cols))
+                parts.append(cols)
+        finally:
+            mm.close()
+    return concat_columns(parts)
+
+
+def _project(cols, select, columns):
+    """The ``columns`` of the rows ``select`` keeps (all rows when it is None)."""
+    if select is None:
+        return {name: cols[name] for name in columns}
+    mask = select(cols)
+    return {name: cols[name][mask] for name in columns}
+
+
+def _fanout_shard(file_path, shard, decoders, outputs, batch_size, snaplen, packet_filter=None,
+                  memory_limit=None):
+    """Process pool worker of ``iter_fanout``: one column dict per output for one shard."""
+    from .decoders.common import concat_columns
+
+    start, end, first_index, state = shard
+    budget = MemoryBudget(memory_limit)
+    parts = [[] for _ in outputs]
+    with open(file_path, "rb") as f:
+        mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        try:
+            walker = _walk(mm, start, end, state)
+            for batch in _iter_batches(mm, walker, first_index, batch_size, snaplen, packet_filter):
+                decoded = [decoder(batch) for decoder in decoders]
+                for part, (k, select, columns) in zip(parts, outputs):
+                    cols = _project(decoded[k], select, columns)
+                    budget.charge(columns_nbytes(cols))
+                    part.append(cols)
+        finally:
+            mm.close()
+    return [concat_columns(part) for part in parts]
+
+
+def _picklable(*objs):
+    """Whether decoders / selects can be sent to pool workers (lambdas and closures cannot)."""
+    try:
+        pickle.dumps(objs)
+    except (pickle.PicklingError, AttributeError, TypeError):
+        return False
+    return True
+
+
+# ReadPosition 校验的字节数: 文件开头与最后一个完整记录之前各取这么多
+_DIGEST_BYTES = 4096
+
+
+def _digest(buf, offset):
+    """Identity of the first ``offset`` bytes of a capture: its head and the bytes before ``offset``."""
+    h = hashlib.sha1(buf[:min(offset, _DIGEST_BYTES)])
+    h.update(buf[max(offset - _DIGEST_BYTES, 0):offset])
+    return h.hexdigest()
+
+
+class ReadPosition:
+    """
+    Where a full pass over a capture stopped: ``packets`` records were read
+    and ``offset`` is just past the last complete one (a record still being
+    written is not counted). ``meta`` is the walker state there, in the form
+    the packet index stores it; ``digest`` identifies the bytes read, so a
+    capture that was replaced or rewritten is not resumed by mistake.
+
+    ``PcapEngine.iter_batches(resume=position)`` continues from here.
+    """
+
+    def __init__(self, packets, offset, meta, digest):
+        self.packets = packets
+        self.offset = offset
+        self.meta = meta
+        self.digest = digest
+
+    @classmethod
+    def _at(cls, buf, packets, state):
+        return cls(packets, state.pos, _index_meta(state), _digest(buf, state.pos))
+
+    def _matches(self, buf):
+        return len(buf) >= self.offset and _digest(buf, self.offset) == self.digest
+
+    def matches(self, file_path):
+        """True if ``file_path`` still starts with the bytes this position was taken from."""
+        try:
+            with open(file_path, "rb") as f:
+                head = f.read(min(self.offset, _DIGEST_BYTES))
+                f.seek(max(self.offset - _DIGEST_BYTES, 0))
+                tail = f.read(self.offset - max(self.offset - _DIGEST_BYTES, 0))
+                size = os.fstat(f.fileno()).st_size
+        except OSError:
+            return False
+        h = hashlib.sha1(head)
+        h.update(tail)
+        return size >= self.offset and h.hexdigest() == self.digest
+
+    def to_dict(self):
+        return {"packets": self.packets, "offset": self.offset, "meta": self.meta, "digest": self.digest}
+
+    @classmethod
+    def from_dict(cls, d):
+        return cls(d["packets"], d["offset"], d["meta"], d["digest"])
+
+    def __repr__(self):
+        return f"ReadPosition(packets={self.packets}, offset={self.offset})"
+
+
+class PacketBatch:
+    """
+    A group of packets in columnar form.
+
+    ``records`` is a NumPy structured array (``RECORD_DTYPE``) with one row per
+    packet; ``data`` is one contiguous ``uint8`` buffer holding the packet bytes
+    back to back, addressed by ``records['buf_off']`` / ``records['buf_len']``.
+    ``first_index`` is the 0-based packet number of the first row in the file;
+    batches produced under a ``PacketFilter`` are not contiguous and carry
+    the 0-based number of every row in ``numbers`` instead.
+    """
+    __slots__ = ("records", "data", "first_index", "numbers")
+
+    def __init__(self, records, data, first_index=0, numbers=None):
+        self.records = records
+        self.data = data
+        self.first_index = first_index
+        self.numbers = numbers
+
+    def __len__(self):
+        return len(self.records)
+
+    @property
+    def ts_ns(self):
+        return self.records["ts_ns"]
+
+    @property
+    def caplen(self):
+        return self.records["caplen"]
+
+    @property
+    def linktype(self):
+        return self.records["linktype"]
+
+    @property
+    def interface_id(self):
+        return self.records["interface_id"]
+
+    @property
+    def offset(self):
+        return self.records["offset"]
+
+    @property
+    def packet_no(self):
+        """1-based packet numbers (Wireshark 'No.' column)."""
+        if self.numbers is not None:
+            return self.numbers + 1
+        return np.arange(self.first_index + 1, self.first_index + len(self) + 1, dtype=np.int64)
+
+    def packet(self, i):
+        """Bytes of packet ``i`` as a memoryview into ``data``."""
+        start = int(self.records["buf_off"][i])
+        return memoryview(self.data)[start:start + int(self.records["buf_len"][i])]
+
+
+def _make_batch(buf, rows, first_index, snaplen):
+    """Turn walker rows into a PacketBatch, copying packet bytes into one buffer."""
+    n = len(rows)
+    cols = np.array(rows, dtype=np.int64).reshape(n, 7)
+    records = np.empty(n, dtype=RECORD_DTYPE)
+    records["offset"] = cols[:, 0]
+    records["ts_ns"] = cols[:, 2]
+    records["caplen"] = cols[:, 3]
+    records["wirelen"] = cols[:, 4]
+    records["linktype"] = cols[:, 5]
+    records["interface_id"] = cols[:, 6]
+
+    if snaplen is None:
+        buf_len = cols[:, 3]
+        data = b"".join([buf[r[1]:r[1] + r[3]] for r in rows])
+    else:
+        buf_len = np.minimum(cols[:, 3], snaplen)
+        data = b"".join([buf[r[1]:r[1] + min(r[3], snaplen)] for r in rows])
+    buf_off = np.zeros(n, dtype=np.int64)
+    np.cumsum(buf_len[:-1], out=buf_off[1:])
+    records["buf_len"] = buf_len
+    records["buf_off"] = buf_off
+    return PacketBatch(records, np.frombuffer(data, dtype=np.uint8), first_index)
+
+
+def scapy_conf():
+    """
+    Scapy ``conf`` with the protocol layers ``scapy.all`` registers
+    (``scapy.layers.all``: link / IP layers and the port-bound ones such as
+    DNS, NTP, SNMP), so packets dissect exactly as under ``scapy.all``;
+    only its pipetool / autorun extras are left out.
+    """
+    from scapy.config import conf
+    import scapy.layers.all  # noqa: F401
+
+    return conf
+
+
+_UNKNOWN = object()
+
 
 class PcapEngine:
-    def __init__(self, file_path):
+    # 进程级默认解码并行度, 由 CLI 的 --jobs 设置 (<= 0 表示使用全部 CPU)
+    default_jobs = 1
+    # 进程级默认解码缓存 (DecodeCache), 由 CLI 的 analyze 设置为 <output>/.nexus_cache
+    default_cache = None
+    # decode 可收集的解码列总字节数上限 (None 不限), 由 CLI 的 --memory-limit 设置
+    memory_limit = None
+
+    def __init__(self, file_path, mode="scapy", jobs=None, use_index=True, cache=None, progress=None,
+                 token=None):
+        if mode not in READ_MODES:
+            raise ValueError(f"Unknown read mode '{mode}', expected one of {READ_MODES}")
         self.file_path = file_path
+        self.mode = mode
+        self.jobs = jobs
+        # 是否读写 <capture>.nxidx 旁路索引
+        self.use_index = use_index
+        # DecodeCache; None 使用 PcapEngine.default_cache, False 禁用
+        self.cache = cache
+        # ProgressReporter; None 使用当前上下文中的 (progress.reporting), False 不报告
+        self.progress = progress
+        # CancelToken; None 使用当前上下文中的 (cancel.cancellable), False 不检查
+        self.token = token
+        self._index = None
+        self._compression = _UNKNOWN
+        # 最近一次完整顺序读取结束的位置 (ReadPosition), 供增量分析续读
+        self.position = None
+
+    @property
+    def compression(self):
+        """'gzip' / 'zstd' / 'lz4' for compressed captures, None otherwise."""
+        if self._compression is _UNKNOWN:
+            self._compression = detect_compression(self.file_path)
+        return self._compression
+
+    def _stream(self):
+        return _stream_chunks(open_decompressed(self.file_path, self.compression))
 
-    def stream_packets(self):
-        # Generator for memory-efficient reading
+    def _require_seekable(self):
+        if self.compression:
+            raise ValueError(f"Random access is not available for {self.compression} "
+                             f"compressed captures: {self.file_path}")
+
+    def _progress(self):
+        if self.progress is None:
+            return current_progress()
+        return self.progress or None
+
+    def _token(self):
+        if self.token is None:
+            return current_token()
+        return self.token or None
+
+    def _resolve_jobs(self, jobs):
+        jobs = self.jobs if jobs is None else jobs
+        jobs = PcapEngine.default_jobs if jobs is None else jobs
+        if jobs is None or jobs <= 0:
+            jobs = os.cpu_count() or 1
+        return jobs
+
+    def stream_packets(self, packet_filter=None):
+        """
+        Generator for memory-efficient reading.
+        Yields Scapy packets in ``scapy`` mode and raw tuples in ``raw`` mode
+        (see ``iter_raw``).
+
+        With a ``PacketFilter`` the predicates run on the raw record and
+        header bytes first; only matching packets are dissected.
+        """
+        if self.mode == "raw":
+            yield from self.iter_raw(packet_filter)
+            return
+        if packet_filter is not None or self.compression:
+            yield from self._dissect(packet_filter)
+            return
+
+        # 仅在真正需要解析时才导入 Scapy (协议层与 scapy.all 相同, 约 0.75 s)
+        scapy_conf()
+        from scapy.utils import PcapReader
+
+        progress, token = self._progress(), self._token()
         with PcapReader(self.file_path) as pcap_reader:
-            for pkt in pcap_reader:
+            if progress is None and token is None:
+                yield from pcap_reader
+                return
+            if progress is not None:
+                progress.begin("read", os.path.getsize(self.file_path))
+            for count, pkt in enumerate(pcap_reader, 1):
+                # Scapy 逐包解析很慢: 每个包都检查
+                if token is not None and token.check():
+                    return
                 yield pkt
+                if progress is not None and not count % PROGRESS_RECORDS:
+                    progress.update(pcap_reader.f.tell(), count)
+            if progress is not None:
+                progress.end()
+
+    def _dissect(self, packet_filter):
+        from decimal import Decimal
+        conf = scapy_conf()
+        from scapy.utils import EDecimal
+
+        token = self._token()
+        for ts_ns, _, wirelen, linktype, data in self.iter_raw(packet_filter):
+            if token is not None and token.check():
+                return
+            cls = conf.l2types.num2layer.get(linktype, conf.raw_layer)
+            try:
+                pkt = cls(bytes(data))
+            except Exception:
+                # 与 Scapy PcapReader 一致: 解析失败时退化为 Raw
+                pkt = conf.raw_layer(bytes(data))
+            pkt.time = EDecimal(Decimal(ts_ns) / 1000000000)
+            pkt.wirelen = wirelen
+            yield pkt
+
+    def _open_map(self):
+        """Return (file, mmap) or (None, None) for an empty file."""
+        f = open(self.file_path, "rb")
+        if os.fstat(f.fileno()).st_size == 0:
+            f.close()
+            return None, None
+        return f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+    def _stat(self):
+        st = os.stat(self.file_path)
+        return st.st_size, st.st_mtime_ns
+
+    def load_index(self):
+        """
+        The packet index of this capture if one is cached or a valid
+        ``.nxidx`` sidecar exists (same size and mtime), else None.
+        """
+        if self.compression:
+            return None
+        size, mtime_ns = self._stat()
+        if self._index is not None and self._index[:2] == (size, mtime_ns):
+            return self._index[2]
+        self._index = None
+        if not self.use_index:
+            return None
+        index = PacketIndex.load(index_path(self.file_path), size, mtime_ns)
+        if index is not None:
+            self._index = (size, mtime_ns, index)
+        return index
+
+    def index(self):
+        """
+        Load the packet index, or build it with one header-only walk and
+        persist it as ``<capture>.nxidx`` for the next run.
+        """
+        index = self.load_index()
+        if index is not None:
+            return index
+        self._require_seekable()
+        size, mtime_ns = self._stat()
+        f, mm = self._open_map()
+        if mm is None:
+            return self._keep_index([], [], None, size, mtime_ns)
+        progress, token = self._progress(), self._token()
+        try:
+            state = _detect_format(mm)
+            offsets, ts_ns = [], []
+            if progress is not None:
+                progress.begin("index", len(mm))
+            for row in _walk(mm, state.pos, len(mm), state):
+                offsets.append(row[0])
+                ts_ns.append(row[2])
+                if not len(offsets) % PROGRESS_RECORDS:
+                    if progress is not None:
+                        progress.update(row[0], len(offsets))
+                    # 索引必须完整: 只响应取消, 不因截止时间截断
+                    if token is not None:
+                        token.check()
+            if progress is not None:
+                progress.end()
+            return self._keep_index(offsets, ts_ns, _index_meta(state), size, mtime_ns)
+        finally:
+            mm.close()
+            f.close()
+
+    def _keep_index(self, offsets, ts_ns, meta, size, mtime_ns):
+        index = PacketIndex(np.asarray(offsets, dtype=np.uint64).ravel(),
+                            np.asarray(ts_ns, dtype=np.int64).ravel(), meta)
+        if self.use_index:
+            index.save(index_path(self.file_path), size, mtime_ns)
+        self._index = (size, mtime_ns, index)
+        return index
+
+    def iter_batches(self, batch_size=DEFAULT_BATCH_SIZE, snaplen=None, start=0, stop=None,
+                     packet_filter=None, resume=None):
+        """
+        Iterate the capture as ``PacketBatch`` objects of ``batch_size`` packets
+        (the last batch may be shorter).
+
+        ``snaplen`` caps how many bytes of each packet are copied into the batch
+        buffer; header decoders only need the first few hundred bytes, which
+        keeps batches small on captures full of jumbo frames.
+
+        ``start`` / ``stop`` restrict the walk to 0-based packets
+        ``[start, stop)``; the packet index is used to seek straight to
+        ``start`` instead of walking every record before it. A full pass
+        builds the index as a by-product when none exists yet.
+
+        ``packet_filter`` (a ``PacketFilter``) drops packets on their record
+        and header bytes before they are copied; a time range additionally
+        narrows the walk via the index. Batches then hold only matching
+        packets (and may be shorter than ``batch_size``).
+
+        After a complete pass over the whole file ``self.position`` holds the
+        ``ReadPosition`` after the last complete record. Passing it back as
+        ``resume`` once the capture has grown reads only the records added
+        since, numbered on from where the previous pass stopped.
+        """
+        if batch_size <= 0:
+            raise ValueError("batch_size must be positive")
+        if resume is not None:
+            yield from self._iter_resume(batch_size, snaplen, start, stop, packet_filter, resume)
+            return
+        if self.compression:
+            yield from self._iter_stream(batch_size, snaplen, start, stop, packet_filter)
+            return
+        if packet_filter is not None and packet_filter.has_time:
+            lo, hi = self.packet_range(packet_filter.t0_ns, packet_filter.t1_ns)
+            start = max(start, lo)
+            stop = hi if stop is None else min(stop, hi)
+        if start > 0 or stop is not None:
+            yield from self._iter_range(batch_size, snaplen, start, stop, packet_filter)
+            return
+
+        build = self.use_index and packet_filter is None and self.load_index() is None
+        size, mtime_ns = self._stat()
+        f, mm = self._open_map()
+        if mm is None:
+            return
+        progress, token = self._progress(), self._token()
+        try:
+            state = _detect_format(mm)
+            offsets, ts_ns = [], []
+            walker = _walk(mm, state.pos, len(mm), state)
+            batches = _iter_batches(mm, walker, 0, batch_size, snaplen, packet_filter)
+            if progress is not None:
+                progress.begin("read", len(mm), state.pos)
+            if progress is not None or token is not None:
+                batches = _watched(batches, 0, progress, token)
+            while True:
+                try:
+                    batch = next(batches)
+                except StopIteration as end:
+                    # 生成器的返回值: 读过的记录数 (截止时间截断时为 None)
+                    packets = end.value
+                    break
+                if build:
+                    offsets.append(batch.records["offset"].copy())
+                    ts_ns.append(batch.records["ts_ns"].copy())
+                yield batch
+            if packets is None:
+                # 截断的读取: 不建索引, 不记录读取位置
+                return
+            if build:
+                self._keep_index(np.concatenate(offsets) if offsets else [],
+                                 np.concatenate(ts_ns) if ts_ns else [],
+                                 _index_meta(state), size, mtime_ns)
+            self.position = ReadPosition._at(mm, packets, state)
+            if progress is not None:
+                progress.end()
+        finally:
+            mm.close()
+            f.close()
+
+    def _iter_resume(self, batch_size, snaplen, start, stop, packet_filter, resume):
+        """iter_batches from a ``ReadPosition`` of an earlier pass."""
+        if self.compression:
+            raise ValueError(f"Incremental reading is not available for {self.compression} "
+                             f"compressed captures: {self.file_path}")
+        if start or stop is not None:
+            raise ValueError("start / stop cannot be combined with resume")
+        f, mm = self._open_map()
+        if mm is None:
+            raise ValueError(f"Capture was truncated since the last read: {self.file_path}")
+        try:
+            if not resume._matches(mm):
+                raise ValueError(f"Capture changed since the last read: {self.file_path}")
+            state = _state_at(resume.meta, resume.offset)
+            # 续读时接着记录 section / 接口, 下次续读仍能恢复
+            state.sections = copy.deepcopy(resume.meta["sections"])
+            walker = _walk(mm, resume.offset, len(mm), state)
+            batches = _iter_batches(mm, walker, resume.packets, batch_size, snaplen, packet_filter)
+            progress, token = self._progress(), self._token()
+            if progress is not None:
+                progress.begin("read", len(mm), resume.offset)
+            if progress is not None or token is not None:
+                batches = _watched(batches, resume.packets, progress, token)
+            packets = yield from batches
+            if packets is None:
+                return
+            self.position = ReadPosition._at(mm, packets, state)
+            if progress is not None:
+                progress.end()
+        finally:
+            mm.close()
+            f.close()
+
+    def _iter_stream(self, batch_size, snaplen, start, stop, packet_filter):
+        """iter_batches over a compressed capture; batches end at chunk boundaries."""
+        stream = self._stream()
+        progress, token = self._progress(), self._token()
+        try:
+            index = 0
+            if progress is not None:
+                # 解压后的总长度未知: 只报告已读字节与速率
+                progress.begin("read")
+            for buf, base, rows in stream:
+                lo = max(start - index, 0)
+                hi = len(rows) if stop is None else min(stop - index, len(rows))
+                if lo < hi:
+                    walker = iter(rows[lo:hi])
+                    for batch in _iter_batches(buf, walker, index + lo, batch_size, snaplen, packet_filter):
+                        if token is not None and token.check():
+                            return
+                        # 偏移换算为解压后数据流中的位置
+                        batch.records["offset"] += base
+                        yield batch
+                index += len(rows)
+                if progress is not None:
+                    progress.update(base + len(buf), index)
+                if stop is not None and index >= stop:
+                    break
+            if progress is not None:
+                progress.end()
+        finally:
+            stream.close()
+
+    def _iter_range(self, batch_size, snaplen, start, stop, packet_filter=None):
+        index = self.index()
+        stop = len(index) if stop is None else min(stop, len(index))
+        if start >= stop:
+            return
+        pos = int(index.offsets[start])
+        f, mm = self._open_map()
+        try:
+            walker = itertools.islice(_walk(mm, pos, len(mm), _state_at(index.meta, pos)), stop - start)
+            batches = _iter_batches(mm, walker, start, batch_size, snaplen, packet_filter)
+            progress, token = self._progress(), self._token()
+            if progress is not None:
+                end = int(index.offsets[stop]) if stop < len(index) else len(mm)
+                progress.begin("read", end, pos)
+            if progress is not None or token is not None:
+                batches = _watched(batches, start, progress, token)
+            packets = yield from batches
+            if progress is not None and packets is not None:
+                progress.end()
+        finally:
+            mm.close()
+            f.close()
+
+    def packet_range(self, t0_ns=None, t1_ns=None):
+        """
+        0-based ``(start, stop)`` packet range holding every packet with
+        ``t0_ns <= ts_ns < t1_ns``, for ``iter_batches(start=, stop=)``.
+        Exact for time-ordered captures; otherwise a superset to filter on
+        ``ts_ns``.
+        """
+        return self.index().time_range(t0_ns, t1_ns)
+
+    def packet(self, packet_no):
+        """
+        Random access to one packet by its 1-based number.
+        Returns ``(ts_ns, caplen, wirelen, linktype, bytes)``.
+        """
+        index = self.index()
+        if not 1 <= packet_no <= len(index):
+            raise IndexError(f"packet {packet_no} out of range (1..{len(index)})")
+        pos = int(index.offsets[packet_no - 1])
+        f, mm = self._open_map()
+        try:
+            _, data, ts_ns, caplen, wirelen, linktype, _ = next(
+                _walk(mm, pos, len(mm), _state_at(index.meta, pos)))
+            return ts_ns, caplen, wirelen, linktype, bytes(mm[data:data + caplen])
+        finally:
+            mm.close()
+            f.close()
+
+    def decode(self, decoder, batch_size=DEFAULT_BATCH_SIZE, snaplen=None, select=None, jobs=None,
+               packet_filter=None):
+        """
+        Run a batch decoder (e.g. ``decoders.decode_dot11``) over the whole
+        capture and return the concatenated column dict.
+
+        ``select(cols) -> mask`` drops uninteresting rows batch by batch, so
+        only the frames an analyzer needs are kept in memory.
+
+        With ``jobs`` > 1 (default: ``self.jobs`` / ``PcapEngine.default_jobs``)
+        the capture is split into record-aligned shards decoded in a process
+        pool; shard results are concatenated in file order, so the output is
+        identical to the sequential path. ``decoder`` and ``select`` must then
+        be picklable (module level functions, not lambdas).
+
+        ``packet_filter`` is pushed down to the reader (see ``iter_batches``):
+        the decoder only ever sees matching packets.
+
+        With a decode cache (``cache`` / ``PcapEngine.default_cache``) the
+        result is looked up by capture identity, decoder version and the
+        arguments above; a hit skips packet parsing entirely.
+
+        The collected columns are bounded by ``memory_limit`` (instance or
+        ``PcapEngine.memory_limit``): ``MemoryLimitError`` is raised as soon
+        as they would exceed it. Analyses that only aggregate should use
+        ``iter_decode``, which never holds more than one batch.
+        """
+        cache = PcapEngine.default_cache if self.cache is None else self.cache
+        key = cache.key(self.file_path, decoder, snaplen, select, packet_filter) if cache else None
+        if key is not None:
+            cols = cache.load(key)
+            if cols is not None:
+                MemoryBudget(self.memory_limit).charge(columns_nbytes(cols))
+                return cols
+
+        cols = self._decode(decoder, batch_size, snaplen, select, jobs, packet_filter)
+        token = self._token()
+        # 截止时间截断的结果不完整, 不进缓存
+        if key is not None and not (token is not None and token.truncated):
+            cache.store(key, cols, source=os.path.abspath(self.file_path), decoder=decoder.__name__,
+                        snaplen=snaplen, select=None if select is None else select.__name__)
+        return cols
+
+    def _decode(self, decoder, batch_size, snaplen, select, jobs, packet_filter):
+        from .decoders.common import concat_columns
+
+        budget = MemoryBudget(self.memory_limit)
+        parts = []
+        shards = self._shards(self._resolve_jobs(jobs))
+        if shards is not None:
+            return self._decode_pool(shards, decoder, batch_size, snaplen, select, packet_filter, budget)
+
+        for cols in self.iter_decode(decoder, batch_size, snaplen, select, packet_filter):
+            budget.charge(columns_nbytes(cols))
+            parts.append(cols)
+        return concat_columns(parts)
+
+    def _decode_pool(self, shards, decoder, batch_size, snaplen, select, packet_filter, budget):
+        from .decoders.common import concat_columns
+
+        parts = []
+        for cols in self._iter_pool(shards, _decode_shard, decoder, batch_size, snaplen, select,
+                                    packet_filter, self.memory_limit):
+            budget.charge(columns_nbytes(cols))
+            parts.append(cols)
+        return concat_columns(parts)
+
+    def _iter_pool(self, shards, worker, *args):
+        """
+        Run ``worker(file_path, shard, *args)`` for every shard in a process
+        pool and yield the results in file order. A passed deadline ends the
+        iteration after the shards completed from the start of the file; on
+        cancellation or deadline the pool is left without waiting for running shards.
+        """
+        progress, token = self._progress(), self._token()
+        if progress is not None:
+            progress.begin("decode", shards[-1][1], shards[0][0])
+        pool = ProcessPoolExecutor(max_workers=len(shards))
+        stopped = True
+        try:
+            futures = {pool.submit(worker, self.file_path, shard, *args): k for k, shard in enumerate(shards)}
+            done = shards[0][0]
+            results = {}
+            following = 0
+            pending = set(futures)
+            while pending:
+                # 按完成顺序计入进度, 按文件顺序交出
+                finished, pending = wait(pending, timeout=CANCEL_POLL_S if token else None,
+                                         return_when=FIRST_COMPLETED)
+                for fut in finished:
+                    k = futures[fut]
+                    results[k] = fut.result()
+                    if progress is not None:
+                        done += shards[k][1] - shards[k][0]
+                        progress.update(done)
+                while following in results:
+                    yield results.pop(following)
+                    following += 1
+                if pending and token is not None and token.check():
+                    # 截止时间: 只保留从文件开头起连续完成的分片
+                    return
+            stopped = False
+        finally:
+            # 取消 / 截断时不等待仍在运行的分片 (工作进程在后台跑完当前分片后退出)
+            pool.shutdown(wait=not stopped, cancel_futures=True)
+        if progress is not None:
+            progress.end()
+
+    def iter_fanout(self, decoders, outputs, batch_size=DEFAULT_BATCH_SIZE, snaplen=None,
+                    packet_filter=None, resume=None, jobs=None):
+        """
+        The single-pass read behind ``Pipeline``: every decoder runs once per
+        batch and, for each ``(decoder index, select, columns)`` of
+        ``outputs``, the selected rows of those columns are yielded as one
+        list of column dicts per batch.
+
+        With ``jobs`` > 1 (as for ``decode``) record-aligned shards are
+        decoded in a process pool and one list per shard is yielded, still
+        in file order. Decoders and selects that cannot be pickled, and
+        ``resume`` (which needs ``self.position`` afterwards), keep the read
+        sequential.
+        """
+        shards = None
+        if resume is None and _picklable(decoders, [select for _, select, _ in outputs]):
+            shards = self._shards(self._resolve_jobs(jobs))
+        if shards is not None:
+            yield from self._iter_pool(shards, _fanout_shard, decoders, outputs, batch_size, snaplen,
+                                       packet_filter, self.memory_limit)
+            return
+        token = self._token()
+        for batch in self.iter_batches(batch_size, snaplen, packet_filter=packet_filter, resume=resume):
+            decoded = [decoder(batch) for decoder in decoders]
+            # 解码占每批的大半时间: 解码后再查一次, 取消延迟约减半
+            if token is not None and token.check():
+                return
+            yield [_project(decoded[k], select, columns) for k, select, columns in outputs]
+
+    def iter_decode(self, decoder, batch_size=DEFAULT_BATCH_SIZE, snaplen=None, select=None,
+                    packet_filter=None, resume=None):
+        """
+        Streaming form of ``decode``: yield the (selected) column dict of each
+        batch instead of concatenating them, for aggregations such as
+        ``FlowTable`` that never need every packet at once. ``resume`` as
+        for ``iter_batches``.
+        """
+        from .decoders.common import take_columns
+
+        for batch in self.iter_batches(batch_size, snaplen, packet_filter=packet_filter, resume=resume):
+            cols = decoder(batch)
+            if select is not None:
+                cols = take_columns(cols, select(cols))
+            yield cols
+
+    def _shards(self, jobs):
+        """Shard plan for ``jobs`` workers, or None when sequential is cheaper."""
+        if jobs <= 1 or self.compression:
+            return None
+        size = os.path.getsize(self.file_path)
+        count = min(jobs, size // MIN_SHARD_BYTES)
+        if count <= 1:
+            return None
+        index = self.load_index()
+        if index is not None and len(index):
+            shards = _shards_from_index(index, count, size)
+            return shards if len(shards) > 1 else None
+        f, mm = self._open_map()
+        try:
+            shards = _plan_shards(mm, _detect_format(mm), count)
+        finally:
+            mm.close()
+            f.close()
+        return shards if len(shards) > 1 else None
+
+    def iter_slices(self, packet_no, start, stop):
+        """
+        Second pass after a header-only ``decode``: yield ``bytes`` of
+        ``packet[start:stop]`` for each of the ascending 1-based
+        ``packet_no``. Skipped packets only cost a record-header walk, or
+        nothing at all when the packet index is available.
+        """
+        wanted = zip(np.asarray(packet_no).tolist(), np.asarray(start).tolist(),
+                     np.asarray(stop).tolist())
+        target = next(wanted, None)
+        if target is None:
+            return
+        if self.compression:
+            yield from self._stream_slices(target, wanted)
+            return
+        index = self.load_index()
+        f, mm = self._open_map()
+        if mm is None:
+            return
+        try:
+            if index is not None:
+                while target is not None:
+                    no, lo, hi = target
+                    pos = int(index.offsets[no - 1])
+                    _, data, _, caplen, _, _, _ = next(_walk(mm, pos, len(mm), _state_at(index.meta, pos)))
+                    yield bytes(mm[data + min(lo, caplen):data + min(hi, caplen)])
+                    target = next(wanted, None)
+                return
+            state = _detect_format(mm)
+            for no, (_, data, _, caplen, _, _, _) in enumerate(_walk(mm, state.pos, len(mm), state), 1):
+                if no < target[0]:
+                    continue
+                _, lo, hi = target
+                yield bytes(mm[data + min(lo, caplen):data + min(hi, caplen)])
+                target = next(wanted, None)
+                if target is None:
+                    break
+        finally:
+            mm.close()
+            f.close()
+
+    def _stream_slices(self, target, wanted):
+        stream = self._stream()
+        try:
+            index = 0
+            for buf, _, rows in stream:
+                while target is not None and target[0] <= index + len(rows):
+                    no, lo, hi = target
+                    _, data, _, caplen, _, _, _ = rows[no - 1 - index]
+                    yield bytes(buf[data + min(lo, caplen):data + min(hi, caplen)])
+                    target = next(wanted, None)
+                if target is None:
+                    break
+                index += len(rows)
+        finally:
+            stream.close()
+
+    def iter_raw(self, packet_filter=None):
+        """
+        Iterate records without dissecting them.
+        Yields ``(ts_ns, caplen, wirelen, linktype, memoryview)`` tuples.
+
+        The memoryview points into the memory-mapped file and is only valid
+        while iterating; use ``bytes(view)`` to keep a packet around.
+        With a ``packet_filter`` only matching packets are yielded; their
+        memoryviews point into the filtered batches and stay valid.
+        """
+        if packet_filter is not None:
+            for batch in self.iter_batches(packet_filter=packet_filter):
+                rec = batch.records
+                for i, row in enumerate(zip(rec["ts_ns"].tolist(), rec["caplen"].tolist(),
+                                            rec["wirelen"].tolist(), rec["linktype"].tolist())):
+                    yield row + (batch.packet(i),)
+            return
+        progress, token = self._progress(), self._token()
+        if self.compression:
+            stream = self._stream()
+            try:
+                if progress is not None:
+                    progress.begin("read")
+                count = 0
+                for buf, base, rows in stream:
+                    if token is not None and token.check():
+                        return
+                    view = memoryview(buf)
+                    for _, data, ts_ns, caplen, wirelen, linktype, _ in rows:
+                        yield ts_ns, caplen, wirelen, linktype, view[data:data + caplen]
+                    count += len(rows)
+                    if progress is not None:
+                        progress.update(base + len(buf), count)
+                if progress is not None:
+                    progress.end()
+            finally:
+                stream.close()
+            return
+        f, mm = self._open_map()
+        if mm is None:
+            return
+        view = memoryview(mm)
+        try:
+            state = _detect_format(mm)
+            walker = _walk(mm, state.pos, len(mm), state)
+            if progress is None and token is None:
+                for _, data, ts_ns, caplen, wirelen, linktype, _ in walker:
+                    yield ts_ns, caplen, wirelen, linktype, view[data:data + caplen]
+                return
+            if progress is not None:
+                progress.begin("read", len(mm), state.pos)
+            count = 0
+            # 按块取记录, 逐记录的循环与不报告 / 不检查时相同
+            while True:
+                if token is not None and token.check():
+                    return
+                rows = list(itertools.islice(walker, PROGRESS_RECORDS))
+                if not rows:
+                    break
+                for _, data, ts_ns, caplen, wirelen, linktype, _ in rows:
+                    yield ts_ns, caplen, wirelen, linktype, view[data:data + caplen]
+                count += len(rows)
+                if progress is not None:
+                    progress.update(rows[-1][0], count)
+            if progress is not None:
+                progress.end()
+        finally:
+            view.release()
+            try:
+                mm.close()
+            except BufferError:
+                # 调用方仍持有数据切片, 交给 GC 回收映射
+                pass
+            f.close()
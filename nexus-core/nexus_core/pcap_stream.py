@@ -0,0 +1,129 @@
+"""
+Nexus Analyzer Core - Compressed Capture Streams
+Transparent decompression of archived captures (.pcap.gz / .zst / .lz4).
+
+The format is detected by magic bytes, not by file name. Decompression runs
+in a background read-ahead thread that fills a bounded pool of chunk
+buffers, so the reader walks / decodes one chunk while the next one
+inflates (zlib, zstandard and lz4 all release the GIL while working).
+"""
+import gzip
+import queue
+import threading
+
+# 压缩格式的 magic
+GZIP_MAGIC = b"\x1f\x8b"
+ZSTD_MAGIC = b"\x28\xb5\x2f\xfd"
+LZ4_MAGIC = b"\x04\x22\x4d\x18"
+
+COMPRESSIONS = ("gzip", "zstd", "lz4")
+
+# 预读块大小与缓冲池深度: 最多占用 READ_AHEAD_DEPTH * READ_AHEAD_CHUNK 字节
+READ_AHEAD_CHUNK = 16 * 1024 * 1024
+READ_AHEAD_DEPTH = 3
+
+
+def detect_compression(file_path):
+    """Return 'gzip' / 'zstd' / 'lz4' for compressed captures, None otherwise."""
+    with open(file_path, "rb") as f:
+        head = f.read(4)
+    if head.startswith(GZIP_MAGIC):
+        return "gzip"
+    if head == ZSTD_MAGIC:
+        return "zstd"
+    if head == LZ4_MAGIC:
+        return "lz4"
+    return None
+
+
+def open_decompressed(file_path, compression):
+    """Binary file object yielding the decompressed capture."""
+    if compression == "gzip":
+        return gzip.open(file_path, "rb")
+    if compression == "zstd":
+        try:
+            import zstandard
+        except ImportError:
+            raise ImportError("Reading .zst captures requires the 'zstandard' package "
+                              "(pip install nexus-analyzer-core[zstd])") from None
+        return zstandard.ZstdDecompressor().stream_reader(open(file_path, "rb"), closefd=True)
+    if compression == "lz4":
+        try:
+            import lz4.frame
+        except ImportError:
+            raise ImportError("Reading .lz4 captures requires the 'lz4' package "
+                              "(pip install nexus-analyzer-core[lz4])") from None
+        return lz4.frame.open(file_path, "rb")
+    raise ValueError(f"Unknown compression '{compression}', expected one of {COMPRESSIONS}")
+
+
+class ReadAhead:
+    """
+    Background decompression into a bounded buffer pool.
+
+    Iterating yields memoryviews of filled chunks in stream order. A chunk
+    buffer goes back to the pool when the next one is requested, so the
+    consumer must copy what it needs to keep before advancing.
+    """
+
+    def __init__(self, fileobj, chunk_size=None, depth=None):
+        chunk_size = chunk_size or READ_AHEAD_CHUNK
+        depth = depth or READ_AHEAD_DEPTH
+        self._fileobj = fileobj
+        self._free = queue.Queue()
+        self._full = queue.Queue()
+        self._closed = threading.Event()
+        # 消费者持有一块, 其余 depth 块供后台线程填充
+        for _ in range(depth + 1):
+            self._free.put(bytearray(chunk_size))
+        self._thread = threading.Thread(target=self._run, name="nexus-read-ahead", daemon=True)
+        self._thread.start()
+
+    def _run(self):
+        try:
+            while not self._closed.is_set():
+                buf = self._free.get()
+                if buf is None:
+                    break
+                view = memoryview(buf)
+                n = 0
+                while n < len(buf):
+                    got = self._fileobj.readinto(view[n:])
+                    if not got:
+                        break
+                    n += got
+                view.release()
+                if n == 0:
+                    break
+                self._full.put((buf, n))
+                if n < len(buf):
+                    break
+            self._full.put(None)
+        except Exception as e:
+            # 损坏的压缩流: 交给消费者线程抛出
+            self._full.put(e)
+
+    def __iter__(self):
+        held = None
+        try:
+            while True:
+                item = self._full.get()
+                if held is not None:
+                    self._free.put(held)
+                    held = None
+                if item is None:
+                    return
+                if isinstance(item, Exception):
+                    raise item
+                held, n = item
+                yield memoryview(held)[:n]
+        finally:
+            if held is not None:
+                self._free.put(held)
+
+    def close(self):
+        self._closed.set()
+        # 唤醒可能在等待空闲缓冲的后台线程
+        self._free.put(None)
+        self._thread.join()
+        self._fileobj.close()
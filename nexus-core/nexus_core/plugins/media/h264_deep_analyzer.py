@@ -4,48 +4,20 @@ Deep Media Analyzer for Miracast (RTP/MPEG2-TS/H.264)
 Author: Maxwell's Demon
 """
 import struct
-import pandas as pd
 import numpy as np
-from scapy.all import rdpcap, IP, UDP
+
+from nexus_core.pcap_reader import PcapEngine
+from nexus_core.decoders import decode_rtp, top_source_flow, RTP_SNAPLEN
+from nexus_core.memory import format_peak_rss
+from nexus_core.lazy import lazy_import
+
+pd = lazy_import("pandas")
 
 FILE_WIRE = r"data\capture.pcap"
 
-def parse_rtp(payload):
-    """
-    Parse RTP Header
-    0                   1                   2                   3
-    0 1 2 3 4 5 6 7 8 9 0 1 2 3 4 5 6 7 8 9 0 1 2 3 4 5 6 7 8 9 0 1
-   +-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+
-   |V=2|P|X|  CC   |M|     PT      |       Sequence Number         |
-   +-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+
-   |                           Timestamp                           |
-   +-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+
-   |           Synchronization Source (SSRC) identifier            |
-   +=+=+=+=+=+=+=+=+=+=+=+=+=+=+=+=+=+=+=+=+=+=+=+=+=+=+=+=+=+=+=+=+
-    """
-    if len(payload) < 12:
-        return None
-    
-    first_byte = payload[0]
-    if (first_byte & 0xC0) != 0x80: # Version 2
-        return None
-        
-    seq = struct.unpack('>H', payload[2:4])[0]
-    ts = struct.unpack('>I', payload[4:8])[0]
-    marker = (payload[1] & 0x80) >> 7
-    payload_type = payload[1] & 0x7F
-    
-    # Header len usually 12 bytes (if CC=0)
-    cc = first_byte & 0x0F
-    header_len = 12 + (cc * 4)
-    
-    return {
-        'Seq': seq,
-        'RTP_TS': ts,
-        'Marker': marker,
-        'PT': payload_type,
-        'Payload': payload[header_len:]
-    }
+def _select_udp_v4(cols):
+    # 只有 IPv4 UDP 包参与主流识别, 其余行不必留在内存里
+    return cols['is_udp'] & (cols['ip_version'] == 4)
 
 def analyze_mpeg2_ts(rtp_payload, packet_idx):
     """
@@ -144,30 +116,33 @@ def analyze_mpeg2_ts(rtp_payload, packet_idx):
 
 def deep_analyze(fpath):
     print(f"Reading {fpath}...")
-    packets = rdpcap(fpath)
+    engine = PcapEngine(fpath)
+    cols = engine.decode(decode_rtp, snaplen=RTP_SNAPLEN, select=_select_udp_v4)
     
     # Filter for the main UDP flow (known from previous step)
     # We'll just take the highest volume UDP flow
-    flow_map = {}
-    for i, pkt in enumerate(packets):
-        if IP in pkt and UDP in pkt:
-            key = f"{pkt[IP].src}:{pkt[UDP].sport}"
-            if key not in flow_map: flow_map[key] = []
-            flow_map[key].append(pkt)
-            
-    target_key = max(flow_map, key=lambda k: len(flow_map[k]))
-    target_pkts = flow_map[target_key]
-    print(f"Target Flow: {target_key}, Packets: {len(target_pkts)}")
+    target_key, in_flow = top_source_flow(cols)
+    if target_key is None:
+        print("No UDP packets.")
+        return
+    print(f"Target Flow: {target_key}, Packets: {int(in_flow.sum())}")
+    
+    # 头部字段直接来自解码列; 只有 TS/NAL 分析需要回读 RTP 负载
+    rows = np.flatnonzero(in_flow & cols['is_rtp'])
+    payload_off = cols['rtp_payload_off'][rows]
+    payloads = engine.iter_slices(cols['packet_no'][rows], payload_off,
+                                  payload_off + cols['rtp_payload_len'][rows])
+    times = (cols['ts_ns'][rows] / 1e9).tolist()
+    seqs = cols['rtp_seq'][rows].tolist()
+    rtp_ts = cols['rtp_ts'][rows].tolist()
+    markers = cols['rtp_marker'][rows].tolist()
+    sizes = cols['udp_len'][rows].tolist()
     
     data = []
     
-    for i, pkt in enumerate(target_pkts):
+    for i, rtp_payload in enumerate(payloads):
         try:
-            udp_payload = bytes(pkt[UDP].payload)
-            rtp = parse_rtp(udp_payload)
-            if not rtp: continue
-            
-            ts_info = analyze_mpeg2_ts(rtp['Payload'], i)
+            ts_info = analyze_mpeg2_ts(rtp_payload, i)
             
             # Aggregate NAL types found in this RTP packet
             nal_types = [x['NAL_Type'] for x in ts_info if x['NAL_Type'] is not None]
@@ -179,11 +154,11 @@ def deep_analyze(fpath):
             video_pids = [x['PID'] for x in ts_info if x['NAL_Type'] is not None]
             
             data.append({
-                'Time': float(pkt.time),
-                'Seq': rtp['Seq'],
-                'RTP_TS': rtp['RTP_TS'],
-                'Marker': rtp['Marker'],
-                'Size': len(udp_payload),
+                'Time': times[i],
+                'Seq': seqs[i],
+                'RTP_TS': rtp_ts[i],
+                'Marker': markers[i],
+                'Size': sizes[i],
                 'NALs': nal_types,
                 'IsIDR': has_idr,
                 'IsSPS': has_sps,
@@ -260,4 +235,7 @@ def deep_analyze(fpath):
     if len(unique_ts_tail) < 5:
         print("CRITICAL: RTP Timestamp stuck! Encoder stopped producing new frames.")
 
-deep_analyze(FILE_WIRE)
+    print(f"\n{format_peak_rss()}")
+
+if __name__ == "__main__":
+    deep_analyze(FILE_WIRE)
@@ -3,69 +3,65 @@
 Micro-Jitter & Stall Analyzer for Miracast
 Focus: Inter-Arrival Times (IAT) and Instantaneous Throughput
 """
-import struct
-import pandas as pd
 import numpy as np
-import matplotlib.pyplot as plt
-from scapy.all import rdpcap, IP, UDP
+
+from nexus_core.pcap_reader import PcapEngine
+from nexus_core.decoders import decode_rtp, top_source_flow, RTP_SNAPLEN
+from nexus_core.engine import Subscriber
+from nexus_core.memory import format_peak_rss
+from nexus_core.rollup import Rollup
+from nexus_core.lazy import lazy_import
+
+pd = lazy_import("pandas")
+plt = lazy_import("matplotlib.pyplot")
 
 FILE_WIRE = r"data\capture.pcap"
 
-def parse_rtp_basic(payload):
-    if len(payload) < 12: return None
-    if (payload[0] & 0xC0) != 0x80: return None
-    
-    seq = struct.unpack('>H', payload[2:4])[0]
-    ts = struct.unpack('>I', payload[4:8])[0]
-    marker = (payload[1] & 0x80) >> 7
-    return seq, ts, marker
+# 抖动分析读取的解码列 (单遍流水线按此投影)
+JITTER_COLUMNS = ('ts_ns', 'is_udp', 'ip_version', 'src_ip_hi', 'src_ip_lo', 'sport', 'udp_len',
+                  'is_rtp', 'rtp_seq', 'rtp_ts', 'rtp_marker')
+
+def _select_udp_v4(cols):
+    # 只有 IPv4 UDP 包参与主流识别, 其余行不必留在内存里
+    return cols['is_udp'] & (cols['ip_version'] == 4)
+
+def subscriber():
+    """Jitter analysis as a ``Pipeline`` subscriber of the wire capture."""
+    return Subscriber(decode_rtp, JITTER_COLUMNS, analyze_jitter_columns, select=_select_udp_v4,
+                      snaplen=RTP_SNAPLEN)
 
 def analyze_jitter(fpath):
     print(f"Loading {fpath} for jitter analysis...")
-    packets = rdpcap(fpath)
-    
+    # 只需要 RTP 头字段, 每包拷贝到 RTP 头为止即可
+    cols = PcapEngine(fpath).decode(decode_rtp, snaplen=RTP_SNAPLEN, select=_select_udp_v4)
+    analyze_jitter_columns(cols)
+
+def analyze_jitter_columns(cols):
     # 1. Filter Flow
     print("Filtering flow...")
-    flow_map = {}
-    for pkt in packets:
-        if IP in pkt and UDP in pkt:
-            key = f"{pkt[IP].src}:{pkt[UDP].sport}"
-            if key not in flow_map: flow_map[key] = []
-            flow_map[key].append(pkt)
+    target_key, in_flow = top_source_flow(cols)
             
-    if not flow_map:
+    if target_key is None:
         print("No UDP packets.")
         return
         
-    target_key = max(flow_map, key=lambda k: len(flow_map[k]))
-    target_pkts = flow_map[target_key]
     print(f"Target Flow: {target_key}")
 
     # 2. Extract Timing Data
-    data = []
+    times = cols['ts_ns'] / 1e9
     
     # Use global start time to normalize
-    start_time = float(target_pkts[0].time)
-    
-    for i, pkt in enumerate(target_pkts):
-        try:
-            arrival_time = float(pkt.time)
-            payload = bytes(pkt[UDP].payload)
-            res = parse_rtp_basic(payload)
-            if not res: continue
-            
-            seq, rtp_ts, marker = res
-            
-            data.append({
-                'Time': arrival_time,
-                'RelTime': arrival_time - start_time,
-                'Seq': seq,
-                'RTP_TS': rtp_ts,
-                'Marker': marker,
-                'Size': len(payload)
-            })
-        except:
-            continue
+    start_time = times[in_flow][0]
+    
+    rows = in_flow & cols['is_rtp']
+    data = {
+        'Time': times[rows],
+        'RelTime': times[rows] - start_time,
+        'Seq': cols['rtp_seq'][rows].astype(np.int64),
+        'RTP_TS': cols['rtp_ts'][rows].astype(np.int64),
+        'Marker': cols['rtp_marker'][rows].astype(np.int64),
+        'Size': cols['udp_len'][rows].astype(np.int64)
+    }
             
     df = pd.DataFrame(data)
     df = df.sort_values('Time')
@@ -75,6 +71,11 @@ def analyze_jitter(fpath):
     # --- Analysis 1: Packet Inter-Arrival Time (IAT) ---
     # High Packet IAT = Network Blockage / Sender Stall
     df['Packet_IAT_ms'] = df['Time'].diff() * 1000 # ms
+
+    # 包间隔的多分辨率汇总 (按到达时间), 供 GUI 缩放
+    ts_ns = np.sort(cols['ts_ns'][rows])
+    iat = Rollup(('iat_ms',))
+    iat.update(ts_ns[1:], {'iat_ms': np.diff(ts_ns) / 1e6})
     
     # Statistics
     print("\n--- Packet Level Statistics ---")
@@ -151,4 +152,8 @@ def analyze_jitter(fpath):
     else:
         print("✅ No 50ms silence periods found. Data is flowing continuously.")
 
-analyze_jitter(FILE_WIRE)
+    print(f"\n{format_peak_rss()}")
+    return {'frames': df_frames, 'rollup': iat}
+
+if __name__ == "__main__":
+    analyze_jitter(FILE_WIRE)
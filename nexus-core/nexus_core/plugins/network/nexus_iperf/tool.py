@@ -5,12 +5,19 @@ import json
 import time
 import re
 
+from nexus_core.downsample import LiveSeries
+
+# 同一实例两次 iperf-data 事件的最短间隔, 秒; 间隔内的点只进入历史
+DATA_EVENT_INTERVAL = 0.1
+
 class IperfTool:
     def __init__(self, base_dir):
         # We keep base_dir to locate the binary tools
         self.base_dir = base_dir
         self.iperf_processes = {}
         self.iperf_threads = {}
+        # instance_id -> 带宽历史 (LiveSeries, 点数有上限), 供 Api.get_live_series 读取
+        self.series = {}
 
     def get_versions(self):
         """Check available iPerf versions in tools/iperf."""
@@ -100,7 +107,9 @@ class IperfTool:
                 # [  5]   0.00-1.00   sec  1.18 MBytes  1.18 MBytes/sec
                 regex = r"\[\s*\d+\]\s+(\d+\.\d+-\d+\.\d+)\s+sec\s+(\d+(\.\d+)?)\s+([a-zA-Z]+)\s+(\d+(\.\d+)?)\s+([a-zA-Z]+/sec)"
                 
-                results = []
+                # 长时间运行时历史按 minmax 合并, 内存与保存的结果都有上限
+                series = self.series[instance_id] = LiveSeries()
+                last_push = 0.0
 
                 for line in iter(process.stdout.readline, ''):
                     if not line: break
@@ -129,8 +138,11 @@ class IperfTool:
                             "timestamp": time.strftime('%H:%M:%S'),
                             "bandwidth": bw_val
                         }
-                        results.append(data_point)
-                        if callback:
+                        series.append(time.time(), bw_val)
+                        # -P / 很小的 -i 下每秒可有上百行, 推送频率封顶
+                        now = time.monotonic()
+                        if callback and now - last_push >= DATA_EVENT_INTERVAL:
+                            last_push = now
                             callback('iperf-data', {'id': instance_id, 'data': data_point})
                     
                     # Removed time.sleep(0.05) to improve real-time performance
@@ -147,6 +159,8 @@ class IperfTool:
                     
                     filename = f"iperf_result_{instance_id}_{int(time.time())}.json"
                     filepath = os.path.join(results_dir, filename)
+                    results = [{"timestamp": time.strftime('%H:%M:%S', time.localtime(x)), "bandwidth": y}
+                               for x, y in zip(series.x[:series.size].tolist(), series.y[:series.size].tolist())]
                     with open(filepath, 'w') as f:
                         json.dump(results, f, indent=2)
                     
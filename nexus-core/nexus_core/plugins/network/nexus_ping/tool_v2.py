@@ -5,12 +5,15 @@ import time
 import re
 import logging
 from nexus_core.interfaces import ITool
+from nexus_core.downsample import LiveSeries
 
 class PingTool(ITool):
     def __init__(self, base_dir):
         super().__init__(base_dir)
         self.ping_processes = {}
         self.ping_threads = {}
+        # instance_id -> 时延历史 (LiveSeries, 点数有上限, 丢包为 NaN), 供 Api.get_live_series 读取
+        self.series = {}
 
     def get_metadata(self):
         return {
@@ -103,6 +106,7 @@ class PingTool(ITool):
 
                 # Regex for parsing time (Windows: time=XXms or time<1ms)
                 regex = r"time[=<](\d+)ms"
+                series = self.series[instance_id] = LiveSeries()
                 
                 for line in iter(process.stdout.readline, ''):
                     if not line: break
@@ -115,6 +119,7 @@ class PingTool(ITool):
                     match = re.search(regex, line)
                     if match:
                         latency = int(match.group(1))
+                        series.append(time.time(), latency)
                         data_point = {
                             "timestamp": time.strftime('%H:%M:%S'),
                             "latency": latency
@@ -123,6 +128,7 @@ class PingTool(ITool):
                             callback('ping-data', {'id': instance_id, 'data': data_point})
                     elif "Request timed out" in line or "Destination host unreachable" in line:
                          # Handle packet loss/timeout
+                         series.append(time.time(), None)
                          data_point = {
                             "timestamp": time.strftime('%H:%M:%S'),
                             "latency": None, # Indicate loss
@@ -4,83 +4,76 @@ Miracast Freeze Analyzer (Air vs Wire)
 """
 import sys
 import os
-import struct
-import pandas as pd
 import numpy as np
-import matplotlib.pyplot as plt
-from scapy.all import rdpcap, Packet, IP, UDP, Dot11, Dot11QoS, RadioTap
+
+from nexus_core.pcap_reader import PcapEngine
+from nexus_core.decoders import (decode_dot11, decode_rtp, format_macs, format_ips,
+                                 DOT11_SNAPLEN, RTP_SNAPLEN)
+from nexus_core.flow_table import FlowTable, UDP_FLOW_KEY, udp_flow_keys
+from nexus_core.engine import Pipeline
+from nexus_core.memory import format_peak_rss
+from nexus_core.rollup import Rollup, write_rollups
+from nexus_core.lazy import lazy_import
+
+pd = lazy_import("pandas")
+plt = lazy_import("matplotlib.pyplot")
 
 # --- Configuration ---
 FILE_AIR = r"data\unicast-from-set-up-to-frozen-1s.pcapng"
 FILE_WIRE = r"data\capture.pcap"
 BIN_SIZE = 0.5 # Seconds for aggregation
 
-def parse_rtp_sequence(payload):
-    # Minimal RTP header parse
-    # Byte 0: V(2) P(1) X(1) CC(4)
-    # Byte 1: M(1) PT(7)
-    # Byte 2-3: Sequence Number
-    if len(payload) < 12:
-        return None
-    
-    # Check Version=2 (0x80 usually)
-    b0 = payload[0]
-    if (b0 & 0xC0) != 0x80:
-        return None
-        
-    seq = struct.unpack('>H', payload[2:4])[0]
-    return seq
+def _select_udp_v4(cols):
+    return cols['is_udp'] & (cols['ip_version'] == 4)
+
+def _select_qos_data(cols):
+    # QoS Data (Type 2, Subtype 8)
+    return cols['is_dot11'] & (cols['fc_type'] == 2) & (cols['fc_subtype'] == 8)
+
+# 各分析阶段读取的解码列 (单遍流水线按此投影)
+WIRE_COLUMNS = ('packet_no', 'ts_ns', 'ip_version', 'src_ip_hi', 'src_ip_lo', 'sport',
+                'dst_ip_hi', 'dst_ip_lo', 'dport', 'udp_len', 'is_rtp', 'rtp_seq')
+AIR_COLUMNS = ('packet_no', 'ts_ns', 'addr1', 'addr2', 'caplen', 'has_signal', 'rt_signal',
+               'rt_rate', 'retry')
 
 def analyze_wire_capture(fpath):
     print(f"\n[Wire] Analyzing {os.path.basename(fpath)}...")
-    packets = rdpcap(fpath)
-    
-    # Auto-detect heavy UDP flow
-    flow_stats = {}
-    
-    events = []
-    
-    print(f"  > Loaded {len(packets)} packets. Scanning for RTP...")
-    
-    for pkt in packets:
-        if IP in pkt and UDP in pkt:
-            src = pkt[IP].src
-            dst = pkt[IP].dst
-            sport = pkt[UDP].sport
-            dport = pkt[UDP].dport
-            # payload = bytes(pkt[UDP].payload)
-            # scapy payload is complex, try raw bytes
-            try:
-                payload = bytes(pkt[UDP].payload)
-            except:
-                continue
+    cols = PcapEngine(fpath).decode(decode_rtp, snaplen=RTP_SNAPLEN, select=_select_udp_v4)
+    return analyze_wire_columns(cols)
 
-            flow_id = f"{src}:{sport}->{dst}:{dport}"
-            
-            if flow_id not in flow_stats:
-                flow_stats[flow_id] = 0
-            flow_stats[flow_id] += len(payload)
-            
-            # Extract RTP
-            seq = parse_rtp_sequence(payload)
-            
-            events.append({
-                'Time': float(pkt.time),
-                'Flow': flow_id,
-                'Len': len(payload),
-                'Seq': seq # Might be None
-            })
+def analyze_wire_columns(cols):
+    n = len(cols.get('packet_no', []))
+    print(f"  > Decoded {n} UDP/IPv4 packets. Scanning for RTP...")
             
-    if not events:
+    if n == 0:
         print("  > No UDP/IP packets found.")
         return None
 
-    # Pick top flow
-    target_flow = max(flow_stats, key=flow_stats.get)
-    print(f"  > Target RTP Flow identified: {target_flow} ({flow_stats[target_flow]/1024/1024:.2f} MB)")
+    # Auto-detect heavy UDP flow (按 UDP 负载字节数)
+    length = cols['udp_len'].astype(np.int64)
+    table = FlowTable(UDP_FLOW_KEY)
+    slots = table.update(udp_flow_keys(cols), nbytes=length)
+
+    # Pick top flow (同等流量时取先出现的流)
+    top = table.top('bytes')
+    flows = table.columns()
+    src, dst = format_ips([4, 4], [0, 0], [flows['src_lo'][top], flows['dst_lo'][top]])
+    target_flow = f"{src}:{flows['sport'][top]}->{dst}:{flows['dport'][top]}"
+    print(f"  > Target RTP Flow identified: {target_flow} ({flows['bytes'][top]/1024/1024:.2f} MB)")
     
-    df = pd.DataFrame([e for e in events if e['Flow'] == target_flow])
+    rows = slots == top
+    df = pd.DataFrame({
+        'Time': cols['ts_ns'][rows] / 1e9,
+        'Flow': target_flow,
+        'Len': length[rows],
+        # 非 RTP 包的 Seq 记为缺失
+        'Seq': pd.Series(cols['rtp_seq'][rows].astype(np.int64)).where(cols['is_rtp'][rows])
+    })
     df = df.sort_values('Time')
+
+    # 供 GUI 缩放的多分辨率汇总 (绝对时间)
+    rollup = Rollup(('bytes',))
+    rollup.update(cols['ts_ns'][rows], {'bytes': length[rows]})
     
     # Normalize Time
     df['RelTime'] = df['Time'] - df['Time'].iloc[0]
@@ -128,79 +121,57 @@ def analyze_wire_capture(fpath):
     return {
         'throughput': throughput,
         'loss_events': loss_events,
-        'df': df
+        'df': df,
+        'rollup': rollup
     }
 
 def analyze_air_capture(fpath):
     print(f"\n[Air] Analyzing {os.path.basename(fpath)}...")
-    packets = rdpcap(fpath)
-    
-    # Detect Main MAC Pair (QoS Data)
-    mac_vol = {}
-    events = []
-    
-    print(f"  > Loaded {len(packets)} packets. Parsing Wi-Fi stats...")
-    
-    for pkt in packets:
-        if not pkt.haslayer(Dot11):
-            continue
-            
-        try:
-            ts = float(pkt.time)
-            
-            # Stats for RSSI / Retry
-            rssi = 0
-            rate = 0
-            if pkt.haslayer(RadioTap):
-                rt = pkt[RadioTap]
-                if hasattr(rt, 'dBm_AntSignal'):
-                    rssi = rt.dBm_AntSignal
-                if hasattr(rt, 'Rate') and rt.Rate:
-                    rate = rt.Rate * 0.5 # Mbps
-            
-            # Dot11
-            d11 = pkt[Dot11]
-            type_val = d11.type
-            subtype_val = d11.subtype
-            
-            # QoS Data
-            if type_val == 2 and subtype_val == 8:
-                addr1 = d11.addr1 # RA
-                addr2 = d11.addr2 # TA
-                
-                # Volume count
-                pair = f"{addr2}->{addr1}"
-                if pair not in mac_vol: mac_vol[pair] = 0
-                mac_vol[pair] += len(pkt)
-                
-                # Retry
-                fc = d11.FCfield
-                # Retry is bit 3 (0x800 if big endian? No, scapy handles FCfield as int?)
-                # Actually Scapy FCfield is an object.
-                # Use int(d11.FCfield) & 0x08
-                is_retry = 1 if (int(fc) & 0x08) else 0
-                
-                events.append({
-                    'Time': ts,
-                    'Pair': pair,
-                    'RSSI': rssi,
-                    'Rate': rate,
-                    'Retry': is_retry,
-                    'Len': len(pkt)
-                })
-        except:
-            continue
+    # 只保留 QoS Data 帧
+    cols = PcapEngine(fpath).decode(decode_dot11, snaplen=DOT11_SNAPLEN, select=_select_qos_data)
+    return analyze_air_columns(cols)
+
+def analyze_air_columns(cols):
+    n = len(cols.get('packet_no', []))
+    print(f"  > Decoded {n} QoS Data frames. Parsing Wi-Fi stats...")
             
-    if not events:
+    if n == 0:
         print("  > No 802.11 frames found.")
         return None
-        
-    # Top Pair
-    target_pair = max(mac_vol, key=mac_vol.get)
-    print(f"  > Target Wi-Fi Link: {target_pair} ({mac_vol[target_pair]/1024/1024:.2f} MB)")
+
+    # Volume count per TA -> RA pair
+    pairs = np.empty(n, dtype=[('ta', '<u8'), ('ra', '<u8')])
+    pairs['ta'] = cols['addr2']
+    pairs['ra'] = cols['addr1']
+    uniq, first, inverse = np.unique(pairs, return_index=True, return_inverse=True)
+    inverse = inverse.ravel()
+    length = cols['caplen'].astype(np.int64)
+    volume = np.bincount(inverse, weights=length, minlength=len(uniq))
+
+    # Top Pair (同等流量时取先出现的一对)
+    top = np.lexsort((first, -volume))[0]
+    ta, ra = format_macs([uniq['ta'][top], uniq['ra'][top]])
+    target_pair = f"{ta}->{ra}"
+    print(f"  > Target Wi-Fi Link: {target_pair} ({volume[top]/1024/1024:.2f} MB)")
     
-    df = pd.DataFrame([e for e in events if e['Pair'] == target_pair])
+    rows = inverse == top
+    df = pd.DataFrame({
+        'Time': cols['ts_ns'][rows] / 1e9,
+        'Pair': target_pair,
+        # 无 dBm_AntSignal 时记为缺失, 不参与均值
+        'RSSI': np.where(cols['has_signal'][rows], cols['rt_signal'][rows], np.nan),
+        'Rate': cols['rt_rate'][rows] * 0.5, # Radiotap 单位 500kbps -> Mbps
+        'Retry': cols['retry'][rows].astype(np.int64),
+        'Len': length[rows]
+    })
     df = df.sort_values('Time')
+
+    # 多分辨率汇总: 重传率即 retry 的均值; RSSI 只统计带信号字段的帧
+    ts_ns = cols['ts_ns'][rows]
+    link = Rollup(('bytes', 'retry', 'rate'))
+    link.update(ts_ns, {'bytes': length[rows], 'retry': cols['retry'][rows], 'rate': cols['rt_rate'][rows] * 0.5})
+    rssi = Rollup(('rssi',))
+    rssi.update(ts_ns, {'rssi': cols['rt_signal'][rows]}, mask=cols['has_signal'][rows])
     
     df['RelTime'] = df['Time'] - df['Time'].iloc[0]
     
@@ -216,10 +187,9 @@ def analyze_air_capture(fpath):
         'Count': grouped['Len'].count()
     })
     
-    return metrics
+    return {'metrics': metrics, 'rollups': {'air_link': link, 'air_rssi': rssi}}
 
-def generate_report():
-    # Run analyses
+def _capture_paths():
     # Adjust paths if needed
     base_dir = os.getcwd()
     f_air = os.path.join(base_dir, FILE_AIR)
@@ -227,9 +197,45 @@ def generate_report():
     
     if not os.path.exists(f_air): f_air = FILE_AIR
     if not os.path.exists(f_wire): f_wire = FILE_WIRE
-    
-    wire_res = analyze_wire_capture(f_wire)
-    air_res = analyze_air_capture(f_air)
+    return f_air, f_wire
+
+def generate_report(wire_subscribers=None, air_subscribers=None, output_dir=None):
+    """
+    Miracast 卡顿诊断报告. 每个抓包只读取、解码一遍: 其他分析器可通过
+    wire_subscribers / air_subscribers ({name: Subscriber}) 搭乘同一遍读取,
+    返回它们的报告 {name: report}. 给出 output_dir 时吞吐 / 链路指标的
+    多分辨率汇总写入其 trace 输出.
+    """
+    f_air, f_wire = _capture_paths()
+
+    # Run analyses
+    wire = Pipeline(f_wire)
+    wire.subscribe('miracast', decode_rtp, WIRE_COLUMNS, analyze_wire_columns,
+                   select=_select_udp_v4, snaplen=RTP_SNAPLEN)
+    for name, sub in (wire_subscribers or {}).items():
+        wire.subscribe(name, sub)
+    print(f"\n[Wire] Analyzing {os.path.basename(f_wire)}...")
+    reports = wire.run()
+    wire_res = reports.pop('miracast')
+
+    air = Pipeline(f_air)
+    air.subscribe('miracast', decode_dot11, AIR_COLUMNS, analyze_air_columns,
+                  select=_select_qos_data, snaplen=DOT11_SNAPLEN)
+    for name, sub in (air_subscribers or {}).items():
+        air.subscribe(name, sub)
+    print(f"\n[Air] Analyzing {os.path.basename(f_air)}...")
+    air_reports = air.run()
+    air_res = air_reports.pop('miracast')
+    reports.update(air_reports)
+
+    if output_dir:
+        rollups = {}
+        if wire_res:
+            rollups['wire_throughput'] = wire_res['rollup']
+        if air_res is not None:
+            rollups.update(air_res['rollups'])
+        write_rollups(output_dir, rollups)
+    air_res = air_res['metrics'] if air_res is not None else None
     
     print("\n" + "="*60)
     print("📊 COMPREHENSIVE DIAGNOSIS (Relative Time)")
@@ -282,7 +288,30 @@ def generate_report():
         if not wire_res['loss_events'] and tp.min() > 1.0:
              print("Note: I don't see a full <1Mbps freeze in the provided Wire slice.")
              
+    print(format_peak_rss())
     print("="*60)
+    return reports
+
+def diagnose_freeze(output_dir=None):
+    """
+    完整的卡顿诊断: Miracast 报告 + 抖动 (有线) + QoS 统计与 BlockAck 报告 (空口),
+    两个抓包各只读取、解码一遍.
+    """
+    from nexus_core.plugins.media import jitter_analyzer
+    from nexus_core.plugins.wifi import ba_analyzer, qos_analyzer_v2
+
+    f_air, _ = _capture_paths()
+    reports = generate_report(
+        wire_subscribers={'jitter': jitter_analyzer.subscriber()},
+        air_subscribers={'qos': qos_analyzer_v2.subscriber(),
+                         'ba': ba_analyzer.subscriber(f_air)},
+        output_dir=output_dir)
+    if output_dir and reports['jitter']:
+        write_rollups(output_dir, {'rtp_iat': reports['jitter']['rollup']})
+    df, stats = reports['qos']
+    if not df.empty:
+        qos_analyzer_v2.print_report(df, stats, os.path.dirname(f_air) or '.', os.path.basename(f_air))
+    return reports
 
 if __name__ == "__main__":
     try:
@@ -6,68 +6,87 @@ Date: 2026-01-20
 """
 
 import sys
-import struct
 import os
-import pandas as pd
 import numpy as np
-from scapy.all import rdpcap, Dot11, Dot11QoS, RadioTap
+
+from nexus_core.pcap_reader import PcapEngine
+from nexus_core.decoders import decode_dot11, format_macs, mac_to_int, DOT11_SNAPLEN
+from nexus_core.engine import Subscriber, Pipeline
+from nexus_core.database import DatabaseManager, TableSchema, TraceSubscriber
+from nexus_core.flow_table import DOT11_FLOW_KEY
+from nexus_core.memory import format_peak_rss
+from nexus_core.utils import save_summary
+from nexus_core.lazy import lazy_import
+
+pd = lazy_import("pandas")
 
 # 配置常量
 TARGET_MACS = {'06:1a:9d:11:88:da', '74:24:ca:5e:b6:54'}
 
-def get_airtime(packet):
+def get_airtime(pkt_len, rate):
     """
-    计算单个包的空口时长 (Airtime) - 简化版
+    计算空口时长 (Airtime) - 简化版, 按列向量计算
     TODO: 考虑 Preamble/PLCP header 和 11n/ac/ax 的复杂 MCS
     目前仅使用 Radiotap Rate 字段 (Legacy Rate)
     """
-    # 默认值
-    default_rate = 6.0 # Mbps (Lowest for OFDM)
-    rate_mbps = default_rate 
-    
-    if packet.haslayer(RadioTap):
-        rt = packet[RadioTap]
-        # Scapy 解析的 Radiotap Rate 单位通常是 500kbps (0.5 Mbps)
-        # 例如 12 => 6 Mbps, 24 => 12 Mbps
-        if hasattr(rt, 'Rate') and rt.Rate and rt.Rate > 0:
-            rate_mbps = rt.Rate * 0.5
+    # Radiotap Rate 单位是 500kbps (0.5 Mbps), 例如 12 => 6 Mbps, 24 => 12 Mbps
+    # 缺失时默认 6 Mbps (Lowest for OFDM)
+    rate_mbps = np.where(rate > 0, rate * 0.5, 6.0)
     
     # Airtime (us) = (Bytes * 8) / Rate (Mbps)
-    # 1 Byte = 8 bits
     # Mbps = bits / us
     # bits / (bits/us) = us
-    pkt_len = len(packet)
-    airtime_us = (pkt_len * 8) / rate_mbps
-    
-    return airtime_us
+    return (pkt_len * 8) / rate_mbps
 
 def is_multicast_or_broadcast(mac_addr):
     """
     检查 MAC 地址是否为组播或广播
     广播: ff:ff:ff:ff:ff:ff
     组播: 第一个字节的最低位为 1 (例如 01:...)
+    mac_addr 为解码器输出的 uint64 MAC 列
     """
-    if not mac_addr: 
-        return False
-    # 解析第一个字节
-    try:
-        first_byte = int(mac_addr.split(':')[0], 16)
-        return (first_byte & 1) == 1
-    except:
-        return False
+    return ((np.asarray(mac_addr, dtype=np.uint64) >> np.uint64(40)) & np.uint64(1)).astype(bool)
+
+def _select_dot11(cols):
+    return cols['is_dot11']
+
+# 统计与 QoS 解析读取的解码列 (单遍流水线按此投影)
+QOS_COLUMNS = ('packet_no', 'ts_ns', 'caplen', 'rt_rate', 'addr1', 'addr2', 'has_addr2',
+               'fc_type', 'fc_subtype', 'is_ba', 'is_bar', 'tid', 'ba_tid', 'seq', 'ba_ssn',
+               'retry', 'ba_bitmap')
+
+def subscriber():
+    """QoS / airtime statistics as a ``Pipeline`` subscriber: reports (df, stats)."""
+    return Subscriber(decode_dot11, QOS_COLUMNS, parse_columns, select=_select_dot11,
+                      snaplen=DOT11_SNAPLEN)
+
+# trace.sqlite 中的逐帧明细; 发送/接收地址与 TID 归入 frames_flows, 每帧只存流编号
+# rssi 为 Radiotap 天线信号 (dBm), 缺失时为 0; rate 单位 500 kbps
+TRACE_SCHEMA = TableSchema("frames", [
+    ("no", "packet_no"), ("timestamp", "ts_ns"), ("size", "caplen"), ("is_retry", "retry"),
+    ("rssi", "rt_signal"), ("rate", "rt_rate"),
+], indexes=[("timestamp",), ("flow", "timestamp")],
+    flow_key=DOT11_FLOW_KEY, flow_columns={"sa": "addr2", "da": "addr1", "tid": "tid"}, flow_bytes="caplen")
+
+def trace_subscriber(writer):
+    """Per-frame rows of every 802.11 frame into ``writer`` (see ``TRACE_SCHEMA``)."""
+    return TraceSubscriber(writer, TRACE_SCHEMA, decode_dot11, select=_select_dot11, snaplen=DOT11_SNAPLEN)
 
 def parse_pcap_strict(pcap_path):
     print(f"正在解析: {os.path.basename(pcap_path)} ...")
     
     try:
-        packets = rdpcap(pcap_path)
+        cols = PcapEngine(pcap_path).decode(decode_dot11, snaplen=DOT11_SNAPLEN,
+                                            select=_select_dot11)
     except Exception as e:
         print(f"读取 PCAP 失败: {e}")
         return None, None
 
-    print(f"[*] 加载了 {len(packets)} 个数据包，开始提取特征...")
-    
-    qos_events = []
+    return parse_columns(cols)
+
+def parse_columns(cols):
+    n = len(cols.get('packet_no', []))
+    print(f"[*] 解码了 {n} 个 802.11 帧，开始提取特征...")
     
     # 统计数据
     stats = {
@@ -78,143 +97,72 @@ def parse_pcap_strict(pcap_path):
         'mcast_bcast_bytes': 0,
         'mcast_bcast_airtime': 0.0
     }
-    
-    for i, pkt in enumerate(packets):
-        if not pkt.haslayer(Dot11):
-            continue
-            
-        stats['total_frames'] += 1
-        stats['total_bytes'] += len(pkt)
-        
-        # 计算 Airtime
-        airtime = get_airtime(pkt)
-        stats['total_airtime'] += airtime
-        
-        # 提取 MAC 地址
-        try:
-            addr1 = pkt.addr1 # RA (Receiver)
-            # addr2 = pkt.addr2 # TA (Transmitter) - 可能为 None
-        except AttributeError:
-            continue
+    if n == 0:
+        return pd.DataFrame(), stats
 
-        # 统计组播/广播
-        if is_multicast_or_broadcast(addr1):
-            stats['mcast_bcast_frames'] += 1
-            stats['mcast_bcast_bytes'] += len(pkt)
-            stats['mcast_bcast_airtime'] += airtime
+    pkt_len = cols['caplen'].astype(np.int64)
+    airtime = get_airtime(pkt_len, cols['rt_rate'])
+    addr1 = cols['addr1'] # RA (Receiver)
+    addr2 = cols['addr2'] # TA (Transmitter) - 可能缺失
 
-        # ---------------------------------------------------------
-        # QoS & BlockAck 解析逻辑 (仅关注特定 MAC 交互)
-        # ---------------------------------------------------------
-        
-        # 过滤非目标设备的交互 (只分析单播流的 QoS 问题)
-        # 如果是组播包，通常不需要分析 BlockAck 逻辑，所以在这里过滤
-        # 但要注意，如果 TARGET_MACS 为空，则不过滤
-        addr1 = pkt.addr1
-        addr2 = pkt.addr2
-        
-        if TARGET_MACS:
-            # 只要源或目的其一在目标列表中即可
-            sender_match = addr2 in TARGET_MACS
-            receiver_match = addr1 in TARGET_MACS
-            if not (sender_match or receiver_match):
-                continue
-
-        timestamp = float(pkt.time)
-        type_val = pkt.type
-        subtype_val = pkt.subtype
+    stats['total_frames'] = n
+    stats['total_bytes'] = int(pkt_len.sum())
+    stats['total_airtime'] = float(airtime.sum())
 
-        try:
-            # 1. QoS Data (Type 2, Subtype 8)
-            if type_val == 2 and subtype_val == 8:
-                dot11 = pkt[Dot11]
-                
-                tid = 0
-                if pkt.haslayer(Dot11QoS):
-                    tid = pkt[Dot11QoS].TID # QoS Control Bits 0-3
-                
-                sc = dot11.SC
-                seq_num = (sc >> 4) if sc is not None else -1
-                
-                fc = dot11.FCfield
-                # Retry bit is bit 3 (0x08)
-                # Scapy FCfield is an int usually
-                retry = 1 if (int(fc) & 0x08) else 0
-                
-                qos_events.append({
-                    'No': i + 1,
-                    'Time': timestamp,
-                    'Type': 'QoS-Data',
-                    'TA': addr2,
-                    'RA': addr1,
-                    'TID': tid,
-                    'SN': seq_num,
-                    'SSN': -1,
-                    'Retry': retry,
-                    'RawBitmap': 0 # 占位
-                })
+    # 统计组播/广播
+    mcast = is_multicast_or_broadcast(addr1)
+    stats['mcast_bcast_frames'] = int(mcast.sum())
+    stats['mcast_bcast_bytes'] = int(pkt_len[mcast].sum())
+    stats['mcast_bcast_airtime'] = float(airtime[mcast].sum())
 
-            # 2. BlockAck (Type 1, Subtype 9)
-            elif type_val == 1 and subtype_val == 9:
-                payload = bytes(pkt[Dot11].payload)
-                if len(payload) >= 12:
-                    # 解析 BA Control (2), BA SSC (2), Bitmap (8)
-                    ba_control, ba_ssc, bitmap = struct.unpack('<HHQ', payload[:12])
-                    
-                    # === 修复 TID 解析 Bug ===
-                    # BA Control Bits 12-15 是 TID_INFO
-                    tid = (ba_control >> 12) & 0x0F 
-                    
-                    ssn = (ba_ssc >> 4) & 0x0FFF
-                    
-                    qos_events.append({
-                        'No': i + 1,
-                        'Time': timestamp,
-                        'Type': 'BlockAck',
-                        'TA': addr2,
-                        'RA': addr1,
-                        'TID': tid,
-                        'SN': -1,
-                        'SSN': ssn,
-                        'Retry': 0,
-                        'RawBitmap': bitmap # Python 原生大整数
-                    })
+    # ---------------------------------------------------------
+    # QoS & BlockAck 解析逻辑 (仅关注特定 MAC 交互)
+    # ---------------------------------------------------------
+    
+    # 过滤非目标设备的交互 (只分析单播流的 QoS 问题)
+    # 但要注意，如果 TARGET_MACS 为空，则不过滤
+    keep = np.ones(n, dtype=bool)
+    if TARGET_MACS:
+        # 只要源或目的其一在目标列表中即可
+        macs = np.array([mac_to_int(m) for m in TARGET_MACS], dtype=np.uint64)
+        sender_match = cols['has_addr2'] & np.isin(addr2, macs)
+        receiver_match = np.isin(addr1, macs)
+        keep = sender_match | receiver_match
 
-            # 3. BlockAckRequest (Type 1, Subtype 8)
-            elif type_val == 1 and subtype_val == 8:
-                payload = bytes(pkt[Dot11].payload)
-                if len(payload) >= 4:
-                    bar_control, bar_ssc = struct.unpack('<HH', payload[:4])
-                    
-                    # === 修复 TID 解析 Bug ===
-                    tid = (bar_control >> 12) & 0x0F
-                    
-                    ssn = (bar_ssc >> 4) & 0x0FFF
-                    
-                    qos_events.append({
-                        'No': i + 1,
-                        'Time': timestamp,
-                        'Type': 'BlockAckReq',
-                        'TA': addr2,
-                        'RA': addr1,
-                        'TID': tid,
-                        'SN': -1,
-                        'SSN': ssn,
-                        'Retry': 0,
-                        'RawBitmap': 0
-                    })
-                    
-        except Exception as e:
-            # print(f"Error parsing packet {i+1}: {e}")
-            pass
+    fc_type = cols['fc_type']
+    fc_subtype = cols['fc_subtype']
+    # 1. QoS Data (Type 2, Subtype 8)
+    is_qos = keep & (fc_type == 2) & (fc_subtype == 8)
+    # 2. BlockAck (Type 1, Subtype 9)
+    is_ba = keep & cols['is_ba']
+    # 3. BlockAckRequest (Type 1, Subtype 8)
+    is_bar = keep & cols['is_bar']
 
-    # 生成 DataFrame
-    if not qos_events:
+    rows = is_qos | is_ba | is_bar
+    if not rows.any():
         return pd.DataFrame(), stats
-        
-    df = pd.DataFrame(qos_events)
+
+    q, ba, bar = is_qos[rows], is_ba[rows], is_bar[rows]
+    # QoS Control Bits 0-3; BA/BAR Control Bits 12-15 是 TID_INFO
+    tid = np.where(q, np.maximum(cols['tid'][rows], 0), cols['ba_tid'][rows])
+    bitmap = cols['ba_bitmap'][rows].astype(object) # Python 原生大整数
+    bitmap[~ba] = 0 # 占位
+
+    df = pd.DataFrame({
+        'No': cols['packet_no'][rows],
+        'Time': cols['ts_ns'][rows] / 1e9,
+        'Type': np.where(q, 'QoS-Data', np.where(ba, 'BlockAck', 'BlockAckReq')),
+        'TA': format_macs(addr2[rows]),
+        'RA': format_macs(addr1[rows]),
+        'TID': tid.astype(np.int64),
+        'SN': np.where(q, cols['seq'][rows], -1).astype(np.int64),
+        'SSN': np.where(q, -1, cols['ba_ssn'][rows]).astype(np.int64),
+        # Retry bit is bit 3 (0x08)
+        'Retry': np.where(q, cols['retry'][rows], 0).astype(np.int64),
+        'RawBitmap': bitmap,
+    })
     # === 修复精度丢失 Bug ===
-    # 强制将 RawBitmap 列转换为 object 类型，防止 pandas 自动推断为 float64 丢失精度
+    # 强制将 RawBitmap 列保持为 object 类型，防止 pandas 自动推断为 float64 丢失精度
     df['RawBitmap'] = df['RawBitmap'].astype(object)
     
     return df, stats
@@ -320,7 +268,11 @@ def main():
     if df is None or df.empty:
         print("未提取到有效数据。")
         return
-        
+
+    print_report(df, stats, target_dir, target_file)
+
+def print_report(df, stats, target_dir, target_file):
+    """打印统计与 QoS 一致性报告, 异常列表保存到 target_dir"""
     print("\n" + "="*50)
     print(f"📊 通用统计报告: {target_file}")
     print("="*50)
@@ -338,6 +290,7 @@ def main():
     print(f"   - 流量占比: {byte_ratio * 100:.2f}% (按字节计算)")
     print(f"   - 空时占比: {airtime_ratio * 100:.2f}% (按物理速率估算)")
     print("   *注: 根据 Radiotap 物理速率估算其实际空口占用时常。")
+    print(format_peak_rss())
     print("="*50)
 
     # 2. QoS 分析
@@ -364,6 +317,30 @@ def main():
         print(anomaly_df.head().to_string(index=False))
     else:
         print("🎉 未发现 BlockAck 状态翻转异常。")
+    return anomalies
+
+def run(input_path, output_dir):
+    """
+    ``wifi.qos`` plugin entry point (see ``qos.plugin.yaml``): per-frame
+    trace, statistics and QoS consistency report in one pass; the anomaly
+    list goes to ``output_dir``, the summary to ``summary.json``.
+    """
+    db = DatabaseManager(output_dir)
+    with db.writer([TRACE_SCHEMA]) as writer:
+        pipe = Pipeline(input_path)
+        pipe.subscribe("trace", trace_subscriber(writer))
+        pipe.subscribe("qos", subscriber())
+        reports = pipe.run()
+    df, stats = reports["qos"]
+    anomalies = [] if df.empty else print_report(df, stats, output_dir, os.path.basename(input_path))
+    summary = {
+        **stats,
+        "frames": reports["trace"],
+        "qos_anomalies": len(anomalies),
+        "alerts": [f"{len(anomalies)} BlockAck state flips (1 -> 0)"] if anomalies else [],
+    }
+    save_summary(output_dir, summary, trace=db)
+    return summary
 
 if __name__ == "__main__":
     main()
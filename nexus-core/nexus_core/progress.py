@@ -0,0 +1,140 @@
+"""
+Nexus Analyzer Core - Progress Reporting
+Machine-readable progress of long analyses, driven by ``PcapEngine``.
+
+While a reporter is active, every pass ``PcapEngine`` makes over a capture
+reports the byte offset it has reached; the reporter turns that into
+rate-limited events (one JSON line on stdout by default, the protocol of
+the architecture doc):
+
+    {"progress": 45.2, "stage": "read", "packets": 812000, "pkts_per_s": 402113.0,
+     "mb_per_s": 96.4, "eta_s": 5.1, "bytes": 483729408, "total_bytes": 1070596096, "elapsed_s": 5.0}
+
+    with reporting(ProgressReporter()):             # CLI analyze
+        dispatcher.run_plugin("wifi.ba", "air.pcapng", "out/")
+
+    with reporting(ProgressReporter(emit=send_event, interval=0.25)):   # GUI
+        ...
+
+``progress`` / ``eta_s`` are percent and seconds of the current pass (None
+when the total is unknown, e.g. for compressed captures). The active
+reporter is per thread / task (``contextvars``), so concurrent analyses in
+one process report separately.
+"""
+import contextlib
+import contextvars
+import json
+import sys
+import time
+
+MB = 1024 * 1024
+
+# 默认最短输出间隔 (秒)
+DEFAULT_INTERVAL = 0.5
+
+_current = contextvars.ContextVar("nexus_progress", default=None)
+
+
+def _print_line(event):
+    sys.stdout.write(json.dumps(event) + "\n")
+    sys.stdout.flush()
+
+
+class ProgressReporter:
+    """
+    Turns (bytes, packets) updates of one pass into progress events, at
+    most one per ``interval`` seconds (stage changes and the end of a pass
+    are always emitted). ``emit(event)`` defaults to a JSON line on stdout.
+    """
+
+    def __init__(self, emit=None, interval=DEFAULT_INTERVAL):
+        self.emit = emit or _print_line
+        self.interval = interval
+        self.stage = None
+        self.total = None
+        self.initial = 0
+        self.bytes = 0
+        self.packets = 0
+        self._start = self._last = 0.0
+
+    def begin(self, stage, total_bytes=None, initial_bytes=0):
+        """Start a pass over ``[initial_bytes, total_bytes)`` (``total_bytes`` None if unknown)."""
+        self.stage, self.total, self.initial = stage, total_bytes, initial_bytes
+        self.bytes, self.packets = initial_bytes, 0
+        self._start = time.monotonic()
+        self._send(self._start)
+
+    def update(self, bytes_done, packets=None):
+        """Offset reached and packets read so far in this pass; emits if ``interval`` has passed."""
+        self.bytes = bytes_done
+        if packets is not None:
+            self.packets = packets
+        now = time.monotonic()
+        if now - self._last >= self.interval:
+            self._send(now)
+
+    def end(self):
+        """The pass completed."""
+        if self.total is not None:
+            self.bytes = self.total
+        self._send(time.monotonic(), done=True)
+
+    def set_stage(self, stage):
+        """Name a step that is not a pass over the capture (e.g. "report"); emitted at once."""
+        self.begin(stage)
+
+    def event(self, now=None, done=False):
+        now = time.monotonic() if now is None else now
+        elapsed = now - self._start
+        work = self.bytes - self.initial
+        span = None if self.total is None else self.total - self.initial
+        progress = eta = None
+        if span is not None:
+            progress = 100.0 if done or span <= 0 else round(min(100.0, 100.0 * work / span), 1)
+            if elapsed > 0 and work > 0:
+                eta = round(max(0.0, (span - work) * elapsed / work), 1)
+            elif done:
+                eta = 0.0
+        rate = elapsed if elapsed > 0 else None
+        return {
+            "progress": progress,
+            "stage": self.stage,
+            "packets": self.packets,
+            "pkts_per_s": round(self.packets / rate, 1) if rate else None,
+            "mb_per_s": round(work / MB / rate, 2) if rate else None,
+            "eta_s": eta,
+            "bytes": self.bytes,
+            "total_bytes": self.total,
+            "elapsed_s": round(elapsed, 3),
+        }
+
+    def _send(self, now, done=False):
+        self._last = now
+        self.emit(self.event(now, done))
+
+
+def current():
+    """The reporter active in this context, or None."""
+    return _current.get()
+
+
+@contextlib.contextmanager
+def reporting(reporter):
+    """Make ``reporter`` the active reporter (``PcapEngine`` passes report to it) inside the block."""
+    token = _current.set(reporter)
+    try:
+        yield reporter
+    finally:
+        _current.reset(token)
+
+
+def parse_line(line):
+    """The progress event of one stdout line of ``nexus-core analyze``, or None for log lines."""
+    line = line.strip()
+    if not line.startswith("{"):
+        return None
+    try:
+        event = json.loads(line)
+    except ValueError:
+        return None
+    return event if isinstance(event, dict) and "progress" in event else None
@@ -0,0 +1,201 @@
+"""
+Nexus Analyzer Core - Time-Series Rollups
+Multi-resolution aggregates for charting million-point series.
+
+Values are aggregated into time bins of ``BASE_BIN_NS << level`` (1 ms,
+2 ms, 4 ms, ... up to the whole capture); every bin keeps ``count`` and
+per value ``sum`` / ``min`` / ``max`` / ``mean``. Bins are aligned to
+absolute time (``bin = ts_ns // width * width``), so each level is
+derived from the one below by merging pairs of bins, and a chart can ask
+for the coarsest level that still gives it enough points:
+
+    rollup = Rollup(("bytes",))
+    rollup.update(cols["ts_ns"], {"bytes": cols["udp_len"]})
+    write_rollups(output_dir, {"wire_throughput": rollup})
+    cols = query_rollup(output_dir, "wire_throughput", t0_ns, t1_ns, pixels=1200)
+
+The levels are stored as one ``rollup_<series>`` trace table (sorted by
+level, then bin) in the configured trace backend.
+"""
+import os
+import sqlite3
+
+import numpy as np
+
+from .database import DatabaseManager, TableSchema
+
+# 最细一级的时间桶: 1 ms; 第 k 级为 1 ms * 2^k
+BASE_BIN_NS = 1000000
+
+# 最多 2^40 ms, 远超任何抓包时长
+MAX_LEVELS = 41
+
+STATS = ("sum", "min", "max", "mean")
+
+# 汇总表按 (level, bin) 有序, 小 row group 让一次缩放查询只解压几千行
+ROLLUP_ROW_GROUP_ROWS = 16384
+
+
+def _reduce(bins, count, stats):
+    """Merge rows with equal ``bins``: counts and sums add up, min / max combine."""
+    order = np.argsort(bins, kind="stable")
+    bins = bins[order]
+    starts = np.flatnonzero(np.r_[True, bins[1:] != bins[:-1]]) if len(bins) else np.zeros(0, dtype=np.intp)
+    out = {}
+    for name, (s, lo, hi) in stats.items():
+        out[name] = (np.add.reduceat(s[order], starts), np.minimum.reduceat(lo[order], starts),
+                     np.maximum.reduceat(hi[order], starts))
+    return bins[starts], np.add.reduceat(count[order], starts), out
+
+
+class Rollup:
+    """
+    Pyramid of time-bin aggregates of the value series ``names``, built
+    one batch at a time (batches need not be in time order).
+    """
+
+    def __init__(self, names, base_ns=BASE_BIN_NS):
+        self.names = tuple(names)
+        self.base_ns = base_ns
+        self._parts = []
+
+    def update(self, ts_ns, values, mask=None):
+        """Add one batch: ``values`` maps each name to a per-row vector; rows where ``mask`` is False are skipped."""
+        ts_ns = np.asarray(ts_ns, dtype=np.int64)
+        rows = slice(None) if mask is None else np.asarray(mask, dtype=bool)
+        bins = ts_ns[rows] // self.base_ns
+        if len(bins) == 0:
+            return
+        stats = {}
+        for name in self.names:
+            v = np.asarray(values[name], dtype=np.float64)[rows]
+            stats[name] = (v, v, v)
+        self._parts.append(_reduce(bins, np.ones(len(bins), dtype=np.int64), stats))
+
+    def _base(self):
+        if not self._parts:
+            return None
+        if len(self._parts) > 1:
+            bins = np.concatenate([p[0] for p in self._parts])
+            count = np.concatenate([p[1] for p in self._parts])
+            stats = {name: tuple(np.concatenate([p[2][name][i] for p in self._parts]) for i in range(3))
+                     for name in self.names}
+            self._parts = [_reduce(bins, count, stats)]
+        return self._parts[0]
+
+    def levels(self):
+        """One dict of columns per level, finest first (bin indices in units of the level width)."""
+        level = self._base()
+        out = []
+        while level is not None:
+            bins, count, stats = level
+            out.append((bins, count, stats))
+            if len(bins) <= 1 or len(out) >= MAX_LEVELS:
+                break
+            level = _reduce(bins // 2, count, stats)
+        return [self._columns(k, *lv) for k, lv in enumerate(out)]
+
+    def _columns(self, k, bins, count, stats):
+        width = self.base_ns << k
+        cols = {"level": np.full(len(bins), k, dtype=np.int64), "bin": bins * width, "count": count}
+        for name, (s, lo, hi) in stats.items():
+            cols[f"{name}_sum"] = s
+            cols[f"{name}_min"] = lo
+            cols[f"{name}_max"] = hi
+            cols[f"{name}_mean"] = s / count
+        return cols
+
+    def columns(self):
+        """All levels as one table (sorted by level, then bin)."""
+        levels = self.levels()
+        if not levels:
+            return {name: np.zeros(0) for name in rollup_schema("", self.names).sources}
+        return {name: np.concatenate([lv[name] for lv in levels]) for name in levels[0]}
+
+
+def rollup_schema(series, names):
+    """``TableSchema`` of the ``rollup_<series>`` trace table."""
+    columns = [("level", "level"), ("bin", "bin"), ("count", "count")]
+    columns += [(f"{name}_{stat}", f"{name}_{stat}", "REAL") for name in names for stat in STATS]
+    return TableSchema(f"rollup_{series}", columns, indexes=[("level", "bin")],
+                       row_group_rows=ROLLUP_ROW_GROUP_ROWS)
+
+
+def write_rollups(output_dir, rollups, backend=None):
+    """Store ``{series: Rollup}`` in the trace output of ``output_dir``; returns the ``DatabaseManager``."""
+    db = DatabaseManager(output_dir, backend)
+    schemas = [rollup_schema(series, rollup.names) for series, rollup in rollups.items()]
+    with db.writer(schemas) as writer:
+        for schema, rollup in zip(schemas, rollups.values()):
+            writer.write(schema.name, rollup.columns())
+    return db
+
+
+def choose_level(t0_ns, t1_ns, pixels, max_level, base_ns=BASE_BIN_NS):
+    """Coarsest level whose bin width still gives at least ``pixels`` bins over ``[t0_ns, t1_ns)``."""
+    width = (t1_ns - t0_ns) / max(pixels, 1)
+    if width < base_ns * 2:
+        return 0
+    return int(min(max_level, np.floor(np.log2(width / base_ns))))
+
+
+def rollup_extent(output_dir, series):
+    """(first_ns, end_ns) covered by ``rollup_<series>`` (level 0 bins), or None if empty."""
+    from .trace_store import trace_path
+    table = f"rollup_{series}"
+    path = trace_path(output_dir, table)
+    if os.path.exists(path):
+        from .trace_store import open_reader
+        reader = open_reader(path, time_column="bin")
+        # 表按 (level, bin) 有序: 只看含第 0 级的 row group 的统计
+        level_lo, _, level_known = reader.bounds("level")
+        bin_lo, bin_hi, bin_known = reader.bounds("bin")
+        groups = level_known & bin_known & (level_lo == 0)
+        if not groups.any():
+            return None
+        first, last = bin_lo[groups].min().item(), bin_hi[groups].max().item()
+    else:
+        conn = sqlite3.connect(DatabaseManager(output_dir, "sqlite").db_path)
+        try:
+            first, last = conn.execute(f"SELECT MIN(bin), MAX(bin) FROM {table} WHERE level = 0").fetchone()
+        finally:
+            conn.close()
+        if first is None:
+            return None
+    return first, last + BASE_BIN_NS
+
+
+def query_rollup(output_dir, series, t0_ns, t1_ns, pixels=1000):
+    """
+    Bins of ``rollup_<series>`` overlapping ``[t0_ns, t1_ns)`` at the level
+    chosen by ``choose_level``; dict of columns (``level``, ``bin``,
+    ``count``, ``<name>_<stat>``).
+    """
+    from .trace_store import trace_path
+    table = f"rollup_{series}"
+    path = trace_path(output_dir, table)
+    if os.path.exists(path):
+        from .trace_store import open_reader
+        reader = open_reader(path, time_column="bin")
+        max_level = reader.max_value("level")
+        if max_level is None:
+            return reader.read(t0_ns=0, t1_ns=0)
+        level = choose_level(t0_ns, t1_ns, pixels, max_level)
+        # 桶的起点可能早于 t0: 向前扩展一个桶宽
+        return reader.read(t0_ns=t0_ns - (BASE_BIN_NS << level) + 1, t1_ns=t1_ns, isin={"level": [level]})
+
+    conn = sqlite3.connect(DatabaseManager(output_dir, "sqlite").db_path)
+    try:
+        (max_level,) = conn.execute(f"SELECT MAX(level) FROM {table}").fetchone()
+        level = choose_level(t0_ns, t1_ns, pixels, max_level or 0)
+        cursor = conn.execute(f"SELECT * FROM {table} WHERE level = ? AND bin > ? AND bin < ? ORDER BY bin",
+                              (level, t0_ns - (BASE_BIN_NS << level), t1_ns))
+        names = [d[0] for d in cursor.description]
+        rows = cursor.fetchall()
+    finally:
+        conn.close()
+    cols = {}
+    for j, name in enumerate(names):
+        dtype = np.int64 if name in ("level", "bin", "count") else np.float64
+        cols[name] = np.array([r[j] for r in rows], dtype=dtype)
+    return cols
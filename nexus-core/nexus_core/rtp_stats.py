@@ -0,0 +1,99 @@
+"""
+Nexus Analyzer Core - RTP Sequence Statistics
+Loss and reordering of one RTP flow, streamed through a ``Pipeline``.
+
+The flow is picked by the pipeline's ``packet_filter``; the subscriber
+unwraps the 16-bit sequence numbers batch by batch (``SeqUnwrapper``), so
+a capture that keeps growing can be analyzed incrementally:
+
+    checkpoint = Checkpoint.load(output_dir, pcap_file, name="rtp")
+    pipe = Pipeline(pcap_file, packet_filter=PacketFilter(sport=5004, dport=5004))
+    pipe.subscribe("loss", RtpLossSubscriber())
+    report = pipe.run(checkpoint=checkpoint)["loss"]
+    checkpoint.save()
+
+The checkpoint state is the unwrapper's offset / last number, the running
+counters and a fixed-size window of the most recent sequence numbers (for
+duplicate detection), so it does not grow with the capture, and a
+65535 -> 0 wrap between two runs is not counted as loss or reordering.
+"""
+import numpy as np
+
+from .decoders import decode_rtp, SeqUnwrapper, RTP_SNAPLEN
+from .engine import Subscriber
+
+RTP_LOSS_COLUMNS = ("rtp_seq",)
+
+# 重复包检测窗口 (序列号个数): 比最新包早这么多以上的重复包不再识别
+SEQ_WINDOW = 32768
+
+
+def _select_rtp(cols):
+    return cols["is_rtp"]
+
+
+class RtpLossSubscriber(Subscriber):
+    """
+    Loss / reordering counters of the RTP packets a pipeline reads, same
+    definitions as ``RTPAnalyzer``: lost = span of the unwrapped numbers
+    minus the distinct numbers received. Duplicates are recognized within
+    the last ``SEQ_WINDOW`` numbers.
+    """
+
+    def __init__(self):
+        super().__init__(decode_rtp, RTP_LOSS_COLUMNS, select=_select_rtp, snaplen=RTP_SNAPLEN)
+        self.unwrapper = SeqUnwrapper()
+        self.packets = 0
+        self.duplicates = 0
+        self.reordered = 0
+        # 展开后的最小 / 最大序列号; 小于已见最大值的包记为乱序
+        self.min_seen = None
+        self.max_seen = -1
+        self.seq_range = None
+        # 最近序列号的环形窗口: 槽位 seq % SEQ_WINDOW 存放该序列号, -1 为空
+        self.window = np.full(SEQ_WINDOW, -1, dtype=np.int64)
+
+    def on_batch(self, cols):
+        seq = cols["rtp_seq"]
+        if len(seq) == 0:
+            return
+        unwrapped = self.unwrapper(seq)
+        running = np.maximum.accumulate(np.concatenate(([self.max_seen], unwrapped)))[:-1]
+        self.reordered += int((unwrapped < running).sum())
+        distinct = np.unique(unwrapped)
+        slots = distinct % SEQ_WINDOW
+        self.duplicates += len(unwrapped) - len(distinct) + int((self.window[slots] == distinct).sum())
+        # 升序赋值: 同一槽位留下较新的序列号
+        self.window[slots] = distinct
+        self.packets += len(seq)
+        lo, hi = int(distinct[0]), int(distinct[-1])
+        self.min_seen = lo if self.min_seen is None else min(self.min_seen, lo)
+        self.max_seen = max(self.max_seen, hi)
+        lo, hi = int(seq.min()), int(seq.max())
+        self.seq_range = [lo, hi] if self.seq_range is None else [min(self.seq_range[0], lo),
+                                                                   max(self.seq_range[1], hi)]
+
+    def finish(self):
+        if not self.packets:
+            return None
+        expected = self.max_seen - self.min_seen + 1
+        lost = expected - (self.packets - self.duplicates)
+        return {
+            "packets": self.packets,
+            "seq_range": self.seq_range,
+            "packets_lost": lost,
+            "loss_rate_percent": lost / expected * 100,
+            "reordered_packets": self.reordered,
+            "duplicates": self.duplicates,
+        }
+
+    def state(self):
+        return {"offset": self.unwrapper.offset, "last": self.unwrapper.last, "packets": self.packets,
+                "duplicates": self.duplicates, "reordered": self.reordered, "min_seen": self.min_seen,
+                "max_seen": self.max_seen, "seq_range": self.seq_range, "window": self.window}
+
+    def restore(self, state):
+        self.unwrapper.offset, self.unwrapper.last = state["offset"], state["last"]
+        self.packets, self.duplicates, self.reordered = state["packets"], state["duplicates"], state["reordered"]
+        self.min_seen, self.max_seen = state["min_seen"], state["max_seen"]
+        self.seq_range, self.window = state["seq_range"], state["window"]
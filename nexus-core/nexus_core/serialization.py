@@ -0,0 +1,218 @@
+"""
+Nexus Analyzer Core - Serialization
+One JSON encoder for summaries, GUI event batches and API results.
+
+NumPy scalars / arrays and pandas objects are encoded directly, with
+``orjson`` when it is installed (``pip install nexus-analyzer-core[json]``)
+and the standard library otherwise:
+
+    text = dumps({"seq": np.arange(5), "rate": np.float32(1.5)})
+    dump(results, "out/summary.json", indent=True)     # large arrays -> summary.arrays.bin
+    results = load("out/summary.json")
+
+``dump`` moves numeric arrays of at least ``SIDECAR_MIN_ITEMS`` elements
+into a binary sidecar next to the JSON file and leaves a reference in
+their place: ``{"$array": {"file", "offset", "dtype", "shape"}}`` (raw
+little-endian, C order, readable as a typed array).
+"""
+import datetime
+import json
+import math
+import os
+
+import numpy as np
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+# 达到该元素个数的数值数组写入二进制旁路文件, 不内联到 JSON
+SIDECAR_MIN_ITEMS = 4096
+
+SIDECAR_SUFFIX = ".arrays.bin"
+
+ARRAY_REF = "$array"
+
+# 不需要再向下查找数组的值类型
+_SCALARS = frozenset((str, int, float, bool, type(None), np.int64, np.int32, np.uint8, np.uint16, np.uint32,
+                      np.uint64, np.float64, np.float32, np.bool_))
+
+
+def _default(obj):
+    """Fallback for types neither backend encodes natively."""
+    if isinstance(obj, np.ndarray):
+        # orjson 只直接编码 C 连续的基本数值类型数组
+        if obj.dtype.kind in "biuf" and not obj.flags.c_contiguous:
+            return np.ascontiguousarray(obj)
+        return obj.tolist()
+    if isinstance(obj, np.generic):
+        return obj.item()
+    if isinstance(obj, (set, frozenset)):
+        return list(obj)
+    if isinstance(obj, bytes):
+        return obj.hex()
+    if isinstance(obj, (datetime.datetime, datetime.date)):
+        return obj.isoformat()
+    if hasattr(obj, "to_dict") and hasattr(obj, "columns"):
+        # pandas DataFrame: 按行记录, 与前端表格的格式一致
+        return obj.to_dict(orient="records")
+    if hasattr(obj, "to_numpy") and hasattr(obj, "index"):
+        # pandas Series / Index
+        return obj.to_numpy()
+    if hasattr(obj, "isoformat"):
+        # pandas Timestamp
+        return obj.isoformat()
+    raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
+
+
+class _StdlibEncoder(json.JSONEncoder):
+    def default(self, obj):
+        value = _default(obj)
+        # 连续化后的数组仍需转成列表; 转换结果中的 NaN / inf 同样写为 null
+        return _plain_keys(value.tolist() if isinstance(value, np.ndarray) else value, finite=True)
+
+    def iterencode(self, obj, _one_shot=False):
+        return super().iterencode(_plain_keys(obj, finite=True), _one_shot)
+
+
+def _plain_keys(obj, finite=False):
+    """
+    Copy of ``obj`` with NumPy scalar dict keys turned into Python values;
+    with ``finite``, NaN / inf floats become ``None`` as orjson writes them.
+    """
+    if isinstance(obj, dict):
+        return {(k.item() if isinstance(k, np.generic) else k): _plain_keys(v, finite) for k, v in obj.items()}
+    if isinstance(obj, (list, tuple)):
+        return [_plain_keys(v, finite) for v in obj]
+    if finite and isinstance(obj, float) and not math.isfinite(obj):
+        return None
+    return obj
+
+
+def _stdlib_dumps(obj, indent):
+    return json.dumps(obj, cls=_StdlibEncoder, indent=2 if indent else None, ensure_ascii=False).encode("utf-8")
+
+
+if orjson is not None:
+    _OPTIONS = orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS
+
+    def _dumps(obj, indent):
+        options = _OPTIONS | (orjson.OPT_INDENT_2 if indent else 0)
+        try:
+            return orjson.dumps(obj, default=_default, option=options)
+        except TypeError:
+            pass
+        try:
+            # NumPy 标量作字典键: 转换键后重试
+            return orjson.dumps(_plain_keys(obj), default=_default, option=options)
+        except TypeError:
+            # 超过 64 位的整数等 orjson 不支持的值交给标准库
+            return _stdlib_dumps(obj, indent)
+else:
+    _dumps = _stdlib_dumps
+
+
+def dumps(obj, indent=False):
+    """JSON text of ``obj`` (NaN / inf become ``null``)."""
+    return _dumps(obj, indent).decode("utf-8")
+
+
+def jsonable(obj):
+    """
+    ``obj`` as plain dicts / lists / Python scalars, for callers that
+    serialize themselves (pywebview encodes ``Api`` return values).
+    """
+    if orjson is not None:
+        return orjson.loads(_dumps(obj, False))
+    return json.loads(_dumps(obj, False))
+
+
+class _Sidecar:
+    """Writes arrays one after another into the sidecar file as they are found."""
+
+    def __init__(self, path, min_items):
+        self.path = path
+        self.name = os.path.basename(path)
+        self.min_items = min_items
+        self._file = None
+        self._offset = 0
+
+    def take(self, obj):
+        # 按类型分派: 逐帧列表可有上百万个标量, 避免对每个值做 isinstance / hasattr
+        kind = type(obj)
+        if kind is dict or (kind not in _SCALARS and isinstance(obj, dict)):
+            return {k: v if type(v) in _SCALARS else self.take(v) for k, v in obj.items()}
+        if kind is list or kind is tuple or (kind not in _SCALARS and isinstance(obj, (list, tuple))):
+            return [v if type(v) in _SCALARS else self.take(v) for v in obj]
+        if kind in _SCALARS or isinstance(obj, np.generic):
+            return obj
+        if isinstance(obj, np.ndarray):
+            values = obj
+        elif hasattr(obj, "to_numpy") and hasattr(obj, "index") and not hasattr(obj, "columns"):
+            # pandas Series
+            values = obj.to_numpy()
+        else:
+            return obj
+        if values.dtype.kind in "biuf" and values.size >= self.min_items:
+            return {ARRAY_REF: self.write(values)}
+        return obj
+
+    def write(self, array):
+        if self._file is None:
+            self._file = open(self.path + ".tmp", "wb")
+        array = np.ascontiguousarray(array, dtype=array.dtype.newbyteorder("<"))
+        ref = {"file": self.name, "offset": self._offset, "dtype": array.dtype.str, "shape": list(array.shape)}
+        # 按 8 字节对齐, 前端可直接在其上创建 TypedArray
+        array.tofile(self._file)
+        pad = -array.nbytes % 8
+        self._file.write(b"\0" * pad)
+        self._offset += array.nbytes + pad
+        return ref
+
+    def close(self):
+        if self._file is not None:
+            self._file.close()
+            os.replace(self.path + ".tmp", self.path)
+        elif os.path.exists(self.path):
+            # 覆盖旧结果时不留下过期的旁路文件
+            os.remove(self.path)
+
+
+def dump(obj, path, indent=False, sidecar=True, min_items=SIDECAR_MIN_ITEMS):
+    """
+    Write ``obj`` as JSON to ``path``; with ``sidecar`` large numeric arrays
+    go to ``<path without .json>.arrays.bin`` (see module docstring).
+    """
+    if sidecar:
+        side = _Sidecar(os.path.splitext(path)[0] + SIDECAR_SUFFIX, min_items)
+        try:
+            obj = side.take(obj)
+        finally:
+            side.close()
+    with open(path, "wb") as f:
+        f.write(_dumps(obj, indent))
+
+
+def _resolve(obj, base_dir, mmap):
+    if isinstance(obj, dict):
+        ref = obj.get(ARRAY_REF) if len(obj) == 1 else None
+        if isinstance(ref, dict):
+            path = os.path.join(base_dir, ref["file"])
+            shape = tuple(ref["shape"])
+            if mmap:
+                return np.memmap(path, dtype=ref["dtype"], mode="r", offset=ref["offset"], shape=shape)
+            count = int(np.prod(shape))
+            return np.fromfile(path, dtype=ref["dtype"], count=count, offset=ref["offset"]).reshape(shape)
+        return {k: _resolve(v, base_dir, mmap) for k, v in obj.items()}
+    if isinstance(obj, list):
+        return [_resolve(v, base_dir, mmap) for v in obj]
+    return obj
+
+
+def load(path, mmap=False):
+    """Read a file written by ``dump``; sidecar references become NumPy arrays (memory-mapped with ``mmap``)."""
+    with open(path, "rb") as f:
+        data = f.read()
+    obj = orjson.loads(data) if orjson is not None else json.loads(data)
+    return _resolve(obj, os.path.dirname(path), mmap)
@@ -0,0 +1,288 @@
+"""
+Nexus Analyzer Core - Columnar Trace Store
+Parquet backend for the per-frame trace tables, next to ``trace.sqlite``.
+
+A table scan reads only the requested columns, and row groups whose
+time / flow statistics cannot match are skipped without being read:
+
+    with DatabaseManager(output_dir, backend="parquet").writer([TRACE_SCHEMA]) as writer:
+        ...
+    cols = read_trace(output_dir, "frames", columns=["timestamp", "seq", "is_retry"],
+                      t0_ns=t0, t1_ns=t1, flows={"sa": "aa:bb:cc:dd:ee:ff", "tid": 5})
+
+Each table goes to ``<output>/trace.<table>.parquet`` (flow side tables
+included). Requires the optional ``pyarrow`` package.
+"""
+import functools
+import os
+
+import numpy as np
+
+from .database import TraceWriter
+from .decoders import mac_to_int
+
+# 每个 row group 的行数: 太小元数据膨胀, 太大时间裁剪的粒度变粗
+ROW_GROUP_ROWS = 1 << 17
+
+# SQL 类型 -> 空表时使用的列类型
+_EMPTY_DTYPES = {"INTEGER": np.int64, "REAL": np.float64}
+
+
+def _pyarrow():
+    try:
+        import pyarrow
+        import pyarrow.parquet
+    except ImportError:
+        raise ImportError("The Parquet trace backend requires the 'pyarrow' package "
+                          "(pip install nexus-analyzer-core[parquet])") from None
+    return pyarrow
+
+
+def trace_path(output_dir, table):
+    return os.path.join(output_dir, f"trace.{table}.parquet")
+
+
+class ParquetWriter(TraceWriter):
+    """
+    ``TraceWriter`` producing one Parquet file per table. Batches are
+    buffered into row groups of ``row_group_rows``; files are written under
+    a temporary name and renamed on ``close``, so readers never see a
+    partial trace. With ``append`` the row groups already in a table's file
+    are copied into the new file ahead of the new rows.
+    """
+
+    def __init__(self, output_dir, schemas, row_group_rows=ROW_GROUP_ROWS, compression="zstd", append=False):
+        self._pa = _pyarrow()
+        super().__init__(schemas, append)
+        self.output_dir = output_dir
+        self.row_group_rows = row_group_rows
+        self.compression = compression
+        self._buffers = {name: [] for name in self.schemas}
+        self._buffered = dict.fromkeys(self.schemas, 0)
+        self._writers = {}
+
+    def _open(self, table, arrow_schema):
+        path = trace_path(self.output_dir, table)
+        writer = self._pa.parquet.ParquetWriter(path + ".tmp", arrow_schema, compression=self.compression)
+        self._writers[table] = (writer, path)
+        if self.append and os.path.exists(path):
+            # Parquet 文件不能原地追加: 先把已有的 row group 原样拷入新文件
+            with open(path, "rb") as src:
+                existing = self._pa.parquet.ParquetFile(src)
+                for group in range(existing.num_row_groups):
+                    writer.write_table(existing.read_row_group(group))
+        return writer
+
+    def _flush(self, table, final=False):
+        parts = self._buffers[table]
+        if not parts:
+            return
+        names = [name for name, _, _ in self.schemas[table].columns]
+        arrays = [np.concatenate(col) for col in zip(*parts)]
+        n = len(arrays[0])
+        group_rows = self._group_rows(table)
+        # 只写满 group_rows 的整组, 余下留到下一批 (收尾时全部写出)
+        full = n if final else n // group_rows * group_rows
+        if full == 0:
+            return
+        batch = self._pa.table([a[:full] for a in arrays], names=names)
+        writer = self._writers.get(table)
+        if writer is None:
+            writer = self._open(table, batch.schema)
+        else:
+            writer = writer[0]
+        writer.write_table(batch, row_group_size=group_rows)
+        self._buffers[table] = [[a[full:] for a in arrays]] if full < n else []
+        self._buffered[table] = n - full
+
+    def _group_rows(self, table):
+        return self.schemas[table].row_group_rows or self.row_group_rows
+
+    def write(self, table, cols):
+        """Append one batch of decoder columns (dict name -> array) to ``table``."""
+        arrays = self._table_arrays(table, cols)
+        if not arrays or len(arrays[0]) == 0:
+            return
+        self._buffers[table].append(arrays)
+        self._buffered[table] += len(arrays[0])
+        if self._buffered[table] >= self._group_rows(table):
+            self._flush(table)
+
+    def _write_empty(self, table):
+        schema = self.schemas[table]
+        arrays = [np.zeros(0, dtype=_EMPTY_DTYPES.get(sql_type, np.int64)) for _, _, sql_type in schema.columns]
+        self._open(table, self._pa.table(arrays, names=[name for name, _, _ in schema.columns]).schema)
+
+    def close(self):
+        if self._writers is None:
+            return
+        try:
+            for table in self.schemas:
+                self._flush(table, final=True)
+                # 追加模式下没有新行的表保留原文件
+                kept = self.append and os.path.exists(trace_path(self.output_dir, table))
+                if table not in self._writers and not kept:
+                    self._write_empty(table)
+            for table in self._flows:
+                names, arrays = self._flow_arrays(table)
+                path = trace_path(self.output_dir, self.schemas[table].flows_table)
+                self._pa.parquet.write_table(self._pa.table(arrays, names=names), path + ".tmp",
+                                             compression=self.compression)
+                os.replace(path + ".tmp", path)
+            for writer, path in self._writers.values():
+                writer.close()
+                os.replace(path + ".tmp", path)
+        finally:
+            self._writers = None
+
+    @property
+    def paths(self):
+        """Files this writer produces, table name -> path."""
+        out = {table: trace_path(self.output_dir, table) for table in self.schemas}
+        for table in self._flows:
+            flows_table = self.schemas[table].flows_table
+            out[flows_table] = trace_path(self.output_dir, flows_table)
+        return out
+
+
+class TraceReader:
+    """
+    Reads one Parquet trace table with column projection, time-range and
+    flow filters. Row groups are pruned using their min / max statistics
+    of ``time_column`` and the filtered columns; surviving rows are
+    filtered exactly.
+    """
+
+    def __init__(self, path, time_column="timestamp"):
+        self._pa = _pyarrow()
+        self.path = path
+        self.time_column = time_column
+        self.file = self._pa.parquet.ParquetFile(path)
+        self.columns = self.file.schema_arrow.names
+        self._bounds = {}
+
+    def __len__(self):
+        return self.file.metadata.num_rows
+
+    def bounds(self, column):
+        """
+        Per row group (min, max, known) arrays of ``column`` from the file
+        statistics; ``known`` is False where a group has no statistics.
+        """
+        if column not in self._bounds:
+            meta = self.file.metadata
+            j = self.columns.index(column)
+            lo, hi, known = [], [], []
+            for group in range(self.file.num_row_groups):
+                stats = meta.row_group(group).column(j).statistics
+                ok = stats is not None and stats.has_min_max
+                lo.append(stats.min if ok else 0)
+                hi.append(stats.max if ok else 0)
+                known.append(ok)
+            self._bounds[column] = (np.array(lo), np.array(hi), np.array(known, dtype=bool))
+        return self._bounds[column]
+
+    def max_value(self, column):
+        """Largest value of ``column`` according to the row group statistics (None if empty)."""
+        _, hi, known = self.bounds(column)
+        return hi[known].max().item() if known.any() else None
+
+    def row_groups(self, t0_ns=None, t1_ns=None, flows=None, isin=None):
+        """
+        Indices of the row groups that may hold rows with ``t0_ns <= time < t1_ns``
+        of ``flows`` whose ``isin`` columns (name -> values) match.
+        """
+        isin = {name: np.asarray(values) for name, values in (isin or {}).items()}
+        if flows is not None:
+            isin["flow"] = np.asarray(flows)
+        meta = self.file.metadata
+        keep = np.array([meta.row_group(g).num_rows > 0 for g in range(self.file.num_row_groups)], dtype=bool)
+        if self.time_column in self.columns:
+            lo, hi, known = self.bounds(self.time_column)
+            if t0_ns is not None:
+                keep &= ~known | (hi >= t0_ns)
+            if t1_ns is not None:
+                keep &= ~known | (lo < t1_ns)
+        for column, values in isin.items():
+            if column not in self.columns:
+                continue
+            lo, hi, known = self.bounds(column)
+            # 组内 [min, max] 覆盖任一取值
+            values = np.sort(values)
+            first = np.searchsorted(values, lo, side="left")
+            hit = (first < len(values)) & (values[np.minimum(first, len(values) - 1)] <= hi) if len(values) else False
+            keep &= ~known | hit
+        return np.flatnonzero(keep).tolist()
+
+    def read(self, columns=None, t0_ns=None, t1_ns=None, flows=None, isin=None):
+        """
+        Dict of NumPy arrays: ``columns`` (None = all) of the rows with
+        ``t0_ns <= time < t1_ns`` whose ``flow`` is in ``flows`` (flow ids)
+        and whose ``isin`` columns (name -> values) hold one of the values.
+        """
+        columns = list(self.columns if columns is None else columns)
+        isin = {name: np.unique(np.asarray(list(values))) for name, values in (isin or {}).items()}
+        if flows is not None:
+            isin["flow"] = np.unique(np.asarray(list(flows), dtype=np.int64))
+        filter_cols = list(isin)
+        if t0_ns is not None or t1_ns is not None:
+            filter_cols.append(self.time_column)
+        needed = list(dict.fromkeys(columns + filter_cols))
+
+        parts = []
+        for group in self.row_groups(t0_ns, t1_ns, isin=isin):
+            table = self.file.read_row_group(group, columns=needed)
+            cols = {name: table.column(name).to_numpy() for name in needed}
+            mask = None
+            if filter_cols:
+                mask = np.ones(table.num_rows, dtype=bool)
+                if t0_ns is not None:
+                    mask &= cols[self.time_column] >= t0_ns
+                if t1_ns is not None:
+                    mask &= cols[self.time_column] < t1_ns
+                for name, values in isin.items():
+                    mask &= np.isin(cols[name], values)
+            parts.append({name: cols[name] if mask is None else cols[name][mask] for name in columns})
+
+        if not parts:
+            schema = self.file.schema_arrow
+            return {name: np.zeros(0, dtype=schema.field(name).type.to_pandas_dtype()) for name in columns}
+        return {name: np.concatenate([p[name] for p in parts]) for name in columns}
+
+
+@functools.lru_cache(maxsize=16)
+def _cached_reader(path, size, mtime_ns, time_column):
+    return TraceReader(path, time_column)
+
+
+def open_reader(path, time_column="timestamp"):
+    """
+    ``TraceReader`` of ``path``, reused while the file is unchanged: the
+    footer and row group statistics are parsed once, not on every query.
+    """
+    st = os.stat(path)
+    return _cached_reader(path, st.st_size, st.st_mtime_ns, time_column)
+
+
+def find_flows(output_dir, table="frames", **key):
+    """
+    Flow ids of ``<table>_flows`` rows matching every ``field=value``
+    (a value or a list of values; MAC fields also take 'aa:bb:..' strings).
+    """
+    cols = open_reader(trace_path(output_dir, f"{table}_flows")).read()
+    mask = np.ones(len(cols["flow"]), dtype=bool)
+    for field, value in key.items():
+        values = value if isinstance(value, (list, tuple, set, np.ndarray)) else [value]
+        values = [mac_to_int(v) if isinstance(v, str) else v for v in values]
+        mask &= np.isin(cols[field], np.asarray(values, dtype=cols[field].dtype))
+    return cols["flow"][mask]
+
+
+def read_trace(output_dir, table="frames", columns=None, t0_ns=None, t1_ns=None, flows=None):
+    """
+    Read a trace table written by ``ParquetWriter``. ``flows`` is an
+    iterable of flow ids, or a dict of flow key criteria (see ``find_flows``).
+    """
+    if isinstance(flows, dict):
+        flows = find_flows(output_dir, table, **flows)
+    return open_reader(trace_path(output_dir, table)).read(columns, t0_ns, t1_ns, flows)
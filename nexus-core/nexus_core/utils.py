@@ -1,12 +1,24 @@
 """
 Nexus Analyzer Core - Utilities
 """
-import json
 import os
 
-def save_summary(output_dir, data):
-    with open(os.path.join(output_dir, "summary.json"), 'w', encoding='utf-8') as f:
-        json.dump(data, f, indent=2, ensure_ascii=False)
+from .cancel import current as current_token
+from .memory import peak_rss_mb
+from .serialization import dump
+
+def save_summary(output_dir, data, trace=None):
+    # 记录峰值内存, 便于发现内存占用的回退
+    data = {**data, "peak_rss_mb": peak_rss_mb()} if isinstance(data, dict) else data
+    # 在截止时间内运行的分析: 标记结果是否只覆盖了抓包的前一部分
+    token = current_token()
+    if token is not None and isinstance(data, dict):
+        data["truncated"] = token.truncated
+    # trace: 写出逐帧明细的 DatabaseManager, 记录后端与文件名供 GUI 定位
+    if trace is not None and isinstance(data, dict):
+        data["trace"] = trace.describe()
+    # NumPy / pandas 值直接编码; 大数组写入 summary.arrays.bin, JSON 中只留引用
+    dump(data, os.path.join(output_dir, "summary.json"), indent=True)
 
 def setup_logger():
     # TODO: Configure logging
@@ -4,11 +4,22 @@ setup(
     name="nexus-analyzer-core",
     version="0.1.0",
     packages=find_packages(),
+    # 插件清单: list-plugins 只读取这些文件
+    package_data={"": ["plugin.yaml", "*.plugin.yaml"]},
     install_requires=[
         "scapy",
         "pandas",
         "numpy",
     ],
+    extras_require={
+        # 压缩抓包 (.zst / .lz4) 的透明解压; .gz 由标准库处理
+        "zstd": ["zstandard"],
+        "lz4": ["lz4"],
+        # 列式 trace 输出 (--trace-format parquet)
+        "parquet": ["pyarrow"],
+        # summary.json / GUI 事件的快速 JSON 编码, 缺省时用标准库 json
+        "json": ["orjson"],
+    },
     entry_points={
         "console_scripts": [
             "nexus-core=nexus_core.cli:main",
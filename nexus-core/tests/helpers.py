@@ -0,0 +1,47 @@
+"""
+Capture builders shared by the tests: classic pcap files and the 802.11 /
+Ethernet-UDP frames most suites write into them.
+"""
+import struct
+
+LINKTYPE_ETHERNET = 1
+LINKTYPE_RAW = 101
+LINKTYPE_IEEE802_11 = 105
+LINKTYPE_RADIOTAP = 127
+
+STA = bytes.fromhex('001122334455')
+AP = bytes.fromhex('aabbccddeeff')
+# 最小 Radiotap 头: 无可选字段
+RADIOTAP = struct.pack('<BBHI', 0, 0, 8, 0)
+
+
+def build_pcap(frames, linktype=LINKTYPE_RADIOTAP, start=0):
+    """
+    Little-endian microsecond pcap. ``frames`` holds either the packet bytes
+    (record i is stamped ``start`` seconds + i us) or ``(ts_usec, data)``.
+    """
+    out = [struct.pack('<IHHiIII', 0xA1B2C3D4, 2, 4, 0, 0, 65535, linktype)]
+    for i, frame in enumerate(frames):
+        ts, data = frame if isinstance(frame, tuple) else (start * 1000000 + i, frame)
+        out.append(struct.pack('<IIII', ts // 1000000, ts % 1000000, len(data), len(data)))
+        out.append(data)
+    return b''.join(out)
+
+
+def qos_data(ra=AP, ta=STA, tid=5, seq=0, payload=b'data', retry=False, radiotap=RADIOTAP):
+    """QoS Data frame (addr3 = ``ra``), behind ``radiotap``."""
+    return (radiotap + struct.pack('<BBH', 0x88, 0x08 if retry else 0, 0) + ra + ta + ra
+            + struct.pack('<HH', (seq % 4096) << 4, tid) + payload)
+
+
+def block_ack(ra=STA, ta=AP, tid=5, ssn=0, bitmap=1, radiotap=RADIOTAP):
+    """Compressed BlockAck for ``tid``, behind ``radiotap``."""
+    return (radiotap + struct.pack('<BBH', 0x94, 0, 0) + ra + ta
+            + struct.pack('<HHQ', (tid << 12) | 0x04, ssn << 4, bitmap))
+
+
+def udp_packet(src, dst, sport, dport, payload=b'\x80\x60' + b'\x00' * 10):
+    """Ethernet / IPv4 / UDP; the default payload is a bare RTP header."""
+    udp = struct.pack('>HHHH', sport, dport, 8 + len(payload), 0) + payload
+    ip = struct.pack('>BBHHHBBH4s4s', 0x45, 0, 20 + len(udp), 0, 0, 64, 17, 0, bytes(src), bytes(dst))
+    return b'\xff' * 6 + b'\x00\x11\x22\x33\x44\x55' + b'\x08\x00' + ip + udp
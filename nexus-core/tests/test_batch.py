@@ -0,0 +1,161 @@
+import os
+import sys
+import json
+import shutil
+import subprocess
+import tempfile
+import unittest
+
+# Add project root to path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from nexus_core.batch import BatchRunner, find_captures, summary_kpis, MANIFEST_FILE
+from nexus_core.dispatcher import PluginDispatcher, PluginError
+from helpers import build_pcap, qos_data
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+
+MANIFEST = '''\
+plugin_id: "test.size"
+version: "{version}"
+entry_point: "size:run"
+'''
+
+# 每次运行在 <输出目录>/calls.log 中记一行, 文件名含 bad 时失败
+MODULE = '''\
+import json, os
+
+def run(input_path, output_dir, scale=1):
+    with open(os.path.join(os.path.dirname(os.path.dirname(output_dir)), "calls.log"), "a") as f:
+        f.write(os.path.basename(input_path) + "\\n")
+    if "bad" in os.path.basename(input_path):
+        raise ValueError("broken capture")
+    summary = {"bytes": os.path.getsize(input_path) * scale, "alerts": ["a"], "name": "x", "rows": [1, 2]}
+    with open(os.path.join(output_dir, "summary.json"), "w") as f:
+        json.dump(summary, f)
+    return summary
+'''
+
+
+class TestBatch(unittest.TestCase):
+    def setUp(self):
+        self.test_dir = tempfile.mkdtemp()
+        self.package = f"nx_batch_plugins_{os.getpid()}_{id(self)}"
+        self.root = os.path.join(self.test_dir, self.package)
+        os.makedirs(self.root)
+        open(os.path.join(self.root, '__init__.py'), 'w').close()
+        self.write_plugin('1.0')
+        with open(os.path.join(self.root, 'size.py'), 'w') as f:
+            f.write(MODULE)
+        sys.path.insert(0, self.test_dir)
+
+        self.captures = os.path.join(self.test_dir, 'pcap')
+        os.makedirs(self.captures)
+        for name in ('a.pcap', 'b.pcapng', 'c.pcap.gz', 'notes.txt'):
+            with open(os.path.join(self.captures, name), 'wb') as f:
+                f.write(name.encode() * 10)
+        self.out = os.path.join(self.test_dir, 'out')
+
+    def tearDown(self):
+        sys.path.remove(self.test_dir)
+        for name in [m for m in sys.modules if m.startswith(self.package)]:
+            del sys.modules[name]
+        shutil.rmtree(self.test_dir, ignore_errors=True)
+
+    def write_plugin(self, version):
+        with open(os.path.join(self.root, 'size.plugin.yaml'), 'w') as f:
+            f.write(MANIFEST.format(version=version))
+
+    def runner(self, **kwargs):
+        return BatchRunner(['test.size'], self.out, dispatcher=PluginDispatcher(self.root, self.package), **kwargs)
+
+    def calls(self):
+        path = os.path.join(self.out, 'calls.log')
+        if not os.path.exists(path):
+            return []
+        with open(path) as f:
+            return f.read().split()
+
+    def test_find_captures(self):
+        base, paths = find_captures(self.captures)
+        self.assertEqual(base, self.captures)
+        self.assertEqual([os.path.basename(p) for p in paths], ['a.pcap', 'b.pcapng', 'c.pcap.gz'])
+        _, paths = find_captures(os.path.join(self.test_dir, '**', '*.pcap'))
+        self.assertEqual([os.path.basename(p) for p in paths], ['a.pcap'])
+
+    def test_skip_up_to_date_and_rerun_on_change(self):
+        counts = self.runner().run(find_captures(self.captures))
+        self.assertEqual(counts, {"ok": 3, "failed": 0, "up_to_date": 0})
+        with open(os.path.join(self.out, MANIFEST_FILE)) as f:
+            entries = json.load(f)['entries']
+        entry = entries[f"test.size:{os.path.join(self.captures, 'a.pcap')}"]
+        self.assertEqual(entry['status'], 'ok')
+        self.assertEqual(entry['kpis'], {"bytes": 60, "alerts": 1})
+        self.assertEqual(entry['output'], os.path.join(self.out, 'a', 'test.size'))
+        self.assertIn('elapsed_s', entry)
+
+        self.assertEqual(self.runner().run(find_captures(self.captures))['up_to_date'], 3)
+        self.assertEqual(len(self.calls()), 3)
+
+        # 抓包变化 / 参数变化 / 插件版本变化 / --force 都会重新分析
+        with open(os.path.join(self.captures, 'a.pcap'), 'ab') as f:
+            f.write(b'more')
+        self.assertEqual(self.runner().run(find_captures(self.captures))['ok'], 1)
+        self.assertEqual(self.runner(params='{"scale": 2}').run(find_captures(self.captures))['ok'], 3)
+        self.write_plugin('1.1')
+        self.assertEqual(self.runner(params={"scale": 2}).run(find_captures(self.captures))['ok'], 3)
+        self.assertEqual(self.runner(params={"scale": 2}, force=True).run(find_captures(self.captures))['ok'], 3)
+        self.assertEqual(len(self.calls()), 13)
+
+    def test_failures_and_resume(self):
+        with open(os.path.join(self.captures, 'bad.pcap'), 'wb') as f:
+            f.write(b'x')
+
+        def interrupt(entry, done, total):
+            if done == 2:
+                raise KeyboardInterrupt
+
+        with self.assertRaises(KeyboardInterrupt):
+            self.runner().run(find_captures(self.captures), interrupt)
+        self.assertEqual(self.calls(), ['a.pcap', 'b.pcapng'])
+
+        # 续跑只处理剩下的; 失败的记录错误, 下次重试
+        counts = self.runner().run(find_captures(self.captures))
+        self.assertEqual(counts, {"ok": 1, "failed": 1, "up_to_date": 2})
+        self.assertEqual(self.calls()[2:], ['bad.pcap', 'c.pcap.gz'])
+        with open(os.path.join(self.out, MANIFEST_FILE)) as f:
+            entry = json.load(f)['entries'][f"test.size:{os.path.join(self.captures, 'bad.pcap')}"]
+        self.assertEqual((entry['status'], entry['error']), ('failed', 'ValueError: broken capture'))
+        self.assertEqual(self.runner().run(find_captures(self.captures))['failed'], 1)
+
+        with self.assertRaisesRegex(PluginError, 'Unknown plugin'):
+            BatchRunner(['nope'], self.out, dispatcher=PluginDispatcher(self.root, self.package))
+
+    def test_summary_kpis(self):
+        import numpy as np
+        kpis = summary_kpis({"frames": np.int64(5), "ok": True, "ratio": 0.5, "alerts": [], "x": "s"})
+        self.assertEqual(kpis, {"frames": 5, "ok": True, "ratio": 0.5, "alerts": 0})
+        self.assertIs(type(kpis["frames"]), int)
+
+    def test_cli_process_pool(self):
+        pcaps = os.path.join(self.test_dir, 'air')
+        os.makedirs(pcaps)
+        for i in range(3):
+            with open(os.path.join(pcaps, f'air{i}.pcap'), 'wb') as f:
+                f.write(build_pcap([qos_data(seq=s) for s in range(10 + i)]))
+        cmd = [sys.executable, '-m', 'nexus_core.cli', 'batch', '--plugin', 'wifi.ba,wifi.qos',
+               '--input', os.path.join(pcaps, '*.pcap'), '--output', self.out, '--jobs', '2']
+        out = subprocess.run(cmd, cwd=ROOT, capture_output=True, text=True, check=True).stdout
+        self.assertIn('Batch: 6 ok, 0 failed, 0 up to date', out)
+        with open(os.path.join(self.out, MANIFEST_FILE)) as f:
+            entries = json.load(f)['entries']
+        entry = entries[f"wifi.ba:{os.path.join(pcaps, 'air2.pcap')}"]
+        self.assertEqual((entry['plugin_version'], entry['kpis']['frames']), ('1.1.0', 12))
+        self.assertTrue(os.path.exists(os.path.join(self.out, 'air2', 'wifi.qos', 'summary.json')))
+
+        out = subprocess.run(cmd, cwd=ROOT, capture_output=True, text=True, check=True).stdout
+        self.assertIn('Batch: 0 ok, 0 failed, 6 up to date', out)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,141 @@
+import os
+import sys
+import json
+import time
+import shutil
+import subprocess
+import tempfile
+import threading
+import unittest
+
+# Add project root to path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from nexus_core.cancel import AnalysisCancelled, CancelToken, cancellable, current
+from nexus_core.checkpoint import Checkpoint
+from nexus_core.decode_cache import DecodeCache
+from nexus_core.decoders import decode_dot11, DOT11_SNAPLEN
+from nexus_core.engine import Pipeline
+from nexus_core.pcap_index import index_path
+from nexus_core.pcap_reader import PcapEngine
+from nexus_core.utils import save_summary
+from helpers import build_pcap, qos_data
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+
+
+def expire(token):
+    token.deadline = time.monotonic() - 1
+
+
+class TestCancel(unittest.TestCase):
+    def setUp(self):
+        self.test_dir = tempfile.mkdtemp()
+        self.path = os.path.join(self.test_dir, 'air.pcap')
+        with open(self.path, 'wb') as f:
+            f.write(build_pcap([qos_data(seq=i) for i in range(100)], start=1700000000))
+
+    def tearDown(self):
+        shutil.rmtree(self.test_dir)
+
+    def test_token(self):
+        token = CancelToken()
+        self.assertFalse(token.check())
+        token.cancel('user stop')
+        self.assertTrue(token.cancelled)
+        with self.assertRaisesRegex(AnalysisCancelled, 'user stop'):
+            token.check()
+
+        token = CancelToken(deadline_s=3600)
+        self.assertFalse(token.check())
+        expire(token)
+        self.assertTrue(token.check())
+        self.assertTrue(token.truncated)
+
+        self.assertIsNone(current())
+        with cancellable(token):
+            self.assertIs(current(), token)
+            # 线程各自持有自己的令牌
+            seen = []
+            thread = threading.Thread(target=lambda: seen.append(current()))
+            thread.start()
+            thread.join()
+            self.assertEqual(seen, [None])
+        self.assertIsNone(current())
+
+    def test_cancel_stops_reading(self):
+        token = CancelToken()
+        batches = 0
+        with cancellable(token), self.assertRaises(AnalysisCancelled):
+            for _ in PcapEngine(self.path).iter_batches(batch_size=10):
+                batches += 1
+                token.cancel()
+        self.assertEqual(batches, 1)
+
+        # 实例上的 token=False 不受上下文影响
+        with cancellable(token):
+            self.assertEqual(sum(len(b) for b in PcapEngine(self.path, token=False).iter_batches(10)), 100)
+
+    def test_deadline_truncates_pass(self):
+        token = CancelToken(deadline_s=3600)
+        engine = PcapEngine(self.path)
+        packets = 0
+        with cancellable(token):
+            for batch in engine.iter_batches(batch_size=10):
+                packets += len(batch)
+                expire(token)
+        self.assertEqual(packets, 10)
+        self.assertTrue(token.truncated)
+        # 截断的读取不记录读取位置, 也不写索引
+        self.assertIsNone(engine.position)
+        self.assertFalse(os.path.exists(index_path(self.path)))
+
+        engine = PcapEngine(self.path)
+        self.assertEqual(sum(len(b) for b in engine.iter_batches(batch_size=10)), 100)
+        self.assertIsNotNone(engine.position)
+
+    def test_truncated_decode_not_cached(self):
+        cache = DecodeCache(os.path.join(self.test_dir, 'cache'))
+        token = CancelToken(deadline_s=0)
+        with cancellable(token):
+            cols = PcapEngine(self.path, cache=cache).decode(decode_dot11, snaplen=DOT11_SNAPLEN)
+        self.assertTrue(token.truncated)
+        # 没有读到任何批次: 与空抓包相同
+        self.assertEqual(cols, {})
+        self.assertEqual(cache.entries(), [])
+
+        cols = PcapEngine(self.path, cache=cache).decode(decode_dot11, snaplen=DOT11_SNAPLEN)
+        self.assertEqual(len(cols['seq']), 100)
+        self.assertEqual(len(cache.entries()), 1)
+
+    def test_pipeline_checkpoint_and_summary(self):
+        pipe = Pipeline(self.path)
+        pipe.subscribe('seq', decode_dot11, ('seq',), report=lambda cols: len(cols.get('seq', ())))
+        checkpoint = Checkpoint(os.path.join(self.test_dir, 'checkpoint.pkl'), os.path.abspath(self.path))
+        # 截断的增量运行不能推进检查点
+        with cancellable(CancelToken(deadline_s=0)), self.assertRaises(AnalysisCancelled):
+            pipe.run(checkpoint=checkpoint)
+        self.assertIsNone(checkpoint.position)
+
+        token = CancelToken(deadline_s=0)
+        with cancellable(token):
+            self.assertEqual(pipe.run(), {'seq': 0})
+            save_summary(self.test_dir, {'packets': 0})
+        with open(os.path.join(self.test_dir, 'summary.json'), encoding='utf-8') as f:
+            self.assertTrue(json.load(f)['truncated'])
+
+        save_summary(self.test_dir, {'packets': 100})
+        with open(os.path.join(self.test_dir, 'summary.json'), encoding='utf-8') as f:
+            self.assertNotIn('truncated', json.load(f))
+
+    def test_cli_deadline(self):
+        out = os.path.join(self.test_dir, 'out')
+        subprocess.run([sys.executable, '-m', 'nexus_core.cli', 'analyze', '--plugin', 'wifi.ba',
+                        '--input', self.path, '--output', out, '--deadline', '0', '--no-progress'],
+                       cwd=ROOT, capture_output=True, text=True, check=True)
+        with open(os.path.join(out, 'summary.json'), encoding='utf-8') as f:
+            self.assertTrue(json.load(f)['truncated'])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,100 @@
+import os
+import sys
+import shutil
+import sqlite3
+import tempfile
+import unittest
+
+# Add project root to path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from unittest import mock
+
+import numpy as np
+
+from nexus_core import database
+from nexus_core.database import DatabaseManager, SQLiteWriter, TableSchema
+from nexus_core.engine import Pipeline
+from nexus_core.flow_table import DOT11_FLOW_KEY
+from nexus_core.pcap_reader import PcapEngine
+from nexus_core.decoders import decode_dot11, DOT11_SNAPLEN
+from nexus_core.plugins.wifi import ba_analyzer
+from helpers import AP, STA, build_pcap, qos_data, block_ack
+
+SCHEMA = TableSchema("frames", [("no", "packet_no"), ("timestamp", "ts_ns"), ("seq", "seq"),
+                                ("bitmap", "bitmap"), ("rate", "rate", "REAL")],
+                     indexes=[("timestamp",), ("flow", "timestamp")],
+                     flow_key=DOT11_FLOW_KEY, flow_columns={"sa": "ta", "da": "ra", "tid": "tid"},
+                     flow_bytes="size")
+
+
+def batch(start, n):
+    i = np.arange(start, start + n)
+    return {"packet_no": i + 1, "ts_ns": i * 1000, "seq": (i % 4096).astype(np.int32),
+            "bitmap": np.full(n, 0xFFFFFFFFFFFFFFFF, dtype=np.uint64), "rate": i * 0.5,
+            "ta": (i % 3).astype(np.uint64), "ra": np.full(n, 7, dtype=np.uint64),
+            "tid": (i % 2).astype(np.int8), "size": np.full(n, 100, dtype=np.int32)}
+
+
+class TestSQLiteWriter(unittest.TestCase):
+    def setUp(self):
+        self.test_dir = tempfile.mkdtemp()
+        self.db_path = os.path.join(self.test_dir, 'trace.sqlite')
+
+    def tearDown(self):
+        shutil.rmtree(self.test_dir, ignore_errors=True)
+
+    def test_bulk_load(self):
+        with mock.patch.object(database, 'MAX_VARIABLES', 12):
+            with SQLiteWriter(self.db_path, [SCHEMA], commit_rows=50) as writer:
+                # 每条语句 2 行: 奇数批次覆盖余下的单行插入
+                for start, n in [(0, 37), (37, 0), (37, 64)]:
+                    writer.write("frames", batch(start, n))
+                self.assertEqual(writer.conn.execute("PRAGMA journal_mode").fetchone()[0], "wal")
+                indexes = writer.conn.execute("SELECT name FROM sqlite_master WHERE type = 'index'").fetchall()
+                self.assertEqual(indexes, [])
+
+        conn = sqlite3.connect(self.db_path)
+        rows = conn.execute("SELECT no, timestamp, seq, bitmap, rate, flow FROM frames ORDER BY no").fetchall()
+        self.assertEqual(len(rows), 101)
+        self.assertEqual(rows[5], (6, 5000, 5, -1, 2.5, 5 % 6))
+        self.assertEqual(np.array([r[3] for r in rows]).astype(np.uint64)[0], 0xFFFFFFFFFFFFFFFF)
+
+        flows = conn.execute("SELECT flow, sa, da, tid, packets, bytes, first_ts, last_ts FROM frames_flows").fetchall()
+        self.assertEqual(len(flows), 6)
+        self.assertEqual(flows[0], (0, 0, 7, 0, 17, 1700, 0, 96000))
+        names = {r[0] for r in conn.execute("SELECT name FROM sqlite_master WHERE type = 'index'")}
+        self.assertEqual(names, {"idx_frames_timestamp", "idx_frames_flow_timestamp"})
+        conn.close()
+
+        # 重新加载覆盖旧数据
+        with DatabaseManager(self.test_dir).writer([SCHEMA]) as writer:
+            writer.write("frames", batch(0, 3))
+        conn = sqlite3.connect(self.db_path)
+        self.assertEqual(conn.execute("SELECT COUNT(*) FROM frames").fetchone()[0], 3)
+        conn.close()
+
+    def test_trace_subscriber(self):
+        frames = [qos_data(AP, STA, i % 2, i) if i % 3 else block_ack(STA, AP) for i in range(30)]
+        path = os.path.join(self.test_dir, 'air.pcap')
+        with open(path, 'wb') as f:
+            f.write(build_pcap(frames))
+
+        pipe = Pipeline(path)
+        with SQLiteWriter(self.db_path, [ba_analyzer.TRACE_SCHEMA]) as writer:
+            pipe.subscribe("trace", ba_analyzer.trace_subscriber(writer))
+            self.assertEqual(pipe.run(batch_size=7), {"trace": 30})
+
+        cols = PcapEngine(path).decode(decode_dot11, snaplen=DOT11_SNAPLEN)
+        conn = sqlite3.connect(self.db_path)
+        rows = conn.execute("SELECT f.no, f.seq, f.ba_ssn, l.tid FROM frames f "
+                            "JOIN frames_flows l ON f.flow = l.flow ORDER BY f.no").fetchall()
+        self.assertEqual([r[0] for r in rows], cols['packet_no'].tolist())
+        self.assertEqual([r[1] for r in rows], cols['seq'].tolist())
+        self.assertEqual([r[3] for r in rows], cols['tid'].tolist())
+        self.assertEqual(conn.execute("SELECT COUNT(*) FROM frames_flows").fetchone()[0], 3)
+        conn.close()
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,109 @@
+import io
+import os
+import sys
+import shutil
+import tempfile
+import unittest
+from contextlib import redirect_stdout
+
+# Add project root to path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from unittest import mock
+
+import numpy as np
+
+from nexus_core import cli
+from nexus_core.pcap_reader import PcapEngine
+from nexus_core.pcap_filter import PacketFilter
+from nexus_core.decode_cache import DecodeCache, CACHE_DIRNAME
+from nexus_core.decoders import decode_dot11, DOT11_SNAPLEN
+from helpers import AP, STA, build_pcap, qos_data
+
+
+def select_tid5(cols):
+    return cols['tid'] == 5
+
+
+class TestDecodeCache(unittest.TestCase):
+    def setUp(self):
+        self.test_dir = tempfile.mkdtemp()
+        self.cache = DecodeCache(os.path.join(self.test_dir, 'out', CACHE_DIRNAME))
+        self.path = self.write([qos_data(AP, STA, i % 8, i) for i in range(40)])
+
+    def tearDown(self):
+        shutil.rmtree(self.test_dir, ignore_errors=True)
+
+    def write(self, frames, name='air.pcap'):
+        path = os.path.join(self.test_dir, name)
+        with open(path, 'wb') as f:
+            f.write(build_pcap(frames))
+        return path
+
+    def decode(self, path=None, **kwargs):
+        engine = PcapEngine(path or self.path, cache=self.cache)
+        return engine.decode(decode_dot11, snaplen=DOT11_SNAPLEN, **kwargs)
+
+    def assertSameColumns(self, a, b):
+        self.assertEqual(sorted(a), sorted(b))
+        for name in a:
+            self.assertEqual(a[name].dtype, b[name].dtype, name)
+            np.testing.assert_array_equal(a[name], b[name])
+
+    def test_second_decode_skips_parsing(self):
+        first = self.decode()
+        self.assertEqual(len(self.cache.entries()), 1)
+        with mock.patch.object(PcapEngine, 'iter_batches', side_effect=AssertionError('parsed')):
+            second = self.decode()
+        self.assertSameColumns(first, second)
+        self.assertEqual(self.cache.entries()[0]['meta']['rows'], 40)
+
+    def test_key_covers_arguments(self):
+        self.decode()
+        selected = self.decode(select=select_tid5)
+        filtered = self.decode(packet_filter=PacketFilter(tid=3))
+        self.assertEqual(len(self.cache.entries()), 3)
+        self.assertEqual(list(selected['seq']), [5, 13, 21, 29, 37])
+        self.assertEqual(set(filtered['tid'].tolist()), {3})
+
+        # lambda 无法稳定命名, 不缓存
+        self.decode(select=lambda cols: cols['tid'] == 1)
+        self.assertEqual(len(self.cache.entries()), 3)
+
+    def test_invalidated_when_capture_changes(self):
+        self.decode()
+        self.write([qos_data(AP, STA, 1)] * 7)
+        cols = self.decode()
+        self.assertEqual(len(cols['seq']), 7)
+        self.assertEqual(len(self.cache.entries()), 2)
+
+    def test_lru_eviction(self):
+        paths = [self.write([qos_data(AP, STA, 0, i)] * 50, name=f'{i}.pcap') for i in range(3)]
+        self.decode(paths[0])
+        size = self.cache.entries()[0]['bytes']
+        self.cache.max_bytes = 2 * size + size // 2
+        self.decode(paths[1])
+        # 第一个条目设为最旧; 命中会刷新其使用时间, 于是被淘汰的是第二个
+        os.utime(self.cache.entries()[0]['path'], (0, 0))
+        self.decode(paths[0])
+        self.decode(paths[2])
+        sources = [e['meta']['source'] for e in self.cache.entries()]
+        self.assertEqual(sources, [os.path.abspath(paths[0]), os.path.abspath(paths[2])])
+
+    def test_cli_inspect_and_purge(self):
+        self.decode()
+        out_dir = os.path.dirname(self.cache.cache_dir)
+        buf = io.StringIO()
+        with mock.patch.object(sys, 'argv', ['nexus-core', 'cache', '--output', out_dir]), redirect_stdout(buf):
+            cli.main()
+        self.assertIn('1 entries', buf.getvalue())
+        self.assertIn('decode_dot11', buf.getvalue())
+
+        with mock.patch.object(sys, 'argv', ['nexus-core', 'cache', '--output', out_dir, '--purge']), \
+                redirect_stdout(io.StringIO()):
+            cli.main()
+        self.assertEqual(self.cache.entries(), [])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,132 @@
+import os
+import sys
+import json
+import shutil
+import subprocess
+import tempfile
+import textwrap
+import unittest
+from contextlib import redirect_stdout
+from io import StringIO
+
+# Add project root to path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from nexus_core.dispatcher import PluginDispatcher, PluginError, parse_manifest
+from helpers import build_pcap, qos_data
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+
+MANIFEST = '''\
+# 测试插件
+plugin_id: "{plugin_id}"
+name: Echo
+version: "0.1"
+entry_point: "{entry_point}"
+dependencies: [numpy, "pandas"]
+'''
+
+MODULE = '''\
+def echo(input_path, output_dir, factor=1):
+    return {"input": input_path, "output": output_dir, "factor": factor}
+
+def tool(target, count=4):
+    return {"target": target, "count": count}
+'''
+
+
+class TestPluginDispatcher(unittest.TestCase):
+    def setUp(self):
+        self.test_dir = tempfile.mkdtemp()
+        # 临时插件包: <test_dir>/<package>/{echo/, tools.plugin.yaml}
+        self.package = f"nx_test_plugins_{os.getpid()}_{id(self)}"
+        self.root = os.path.join(self.test_dir, self.package)
+        os.makedirs(os.path.join(self.root, 'echo'))
+        for d in (self.root, os.path.join(self.root, 'echo')):
+            open(os.path.join(d, '__init__.py'), 'w').close()
+        self.write('echo/plugin.yaml', MANIFEST.format(plugin_id='test.echo', entry_point='impl:echo'))
+        self.write('echo/impl.py', MODULE)
+        self.write('tools.plugin.yaml', MANIFEST.format(plugin_id='test.tool', entry_point='echo.impl:tool'))
+        sys.path.insert(0, self.test_dir)
+
+    def tearDown(self):
+        sys.path.remove(self.test_dir)
+        for name in [m for m in sys.modules if m.startswith(self.package)]:
+            del sys.modules[name]
+        shutil.rmtree(self.test_dir, ignore_errors=True)
+
+    def write(self, rel, text):
+        with open(os.path.join(self.root, rel), 'w', encoding='utf-8') as f:
+            f.write(text)
+
+    def dispatcher(self):
+        return PluginDispatcher(self.root, self.package)
+
+    def test_manifest_only_until_run(self):
+        dispatcher = self.dispatcher()
+        self.assertEqual([m.plugin_id for m in dispatcher.list_plugins()], ['test.echo', 'test.tool'])
+        meta = dispatcher.metadata('test.echo')
+        self.assertEqual((meta['name'], meta['version'], meta['dependencies']), ('Echo', '0.1', ['numpy', 'pandas']))
+        self.assertNotIn(f'{self.package}.echo.impl', sys.modules)
+
+        out_dir = os.path.join(self.test_dir, 'out')
+        result = dispatcher.run_plugin('test.echo', 'in.pcap', out_dir, '{"factor": 3}')
+        self.assertEqual(result, {"input": "in.pcap", "output": out_dir, "factor": 3})
+        self.assertTrue(os.path.isdir(out_dir))
+        self.assertIn(f'{self.package}.echo.impl', sys.modules)
+
+        # 不声明 input_path / output_dir 的入口只接收 params
+        self.assertEqual(dispatcher.run_plugin('test.tool', None, None, {"target": "h"}), {"target": "h", "count": 4})
+
+    def test_errors(self):
+        self.write('broken.plugin.yaml', 'plugin_id: "x"\nversion: 1\n')
+        self.write('dup.plugin.yaml', MANIFEST.format(plugin_id='test.echo', entry_point='echo.impl:echo'))
+        dispatcher = self.dispatcher()
+        self.assertEqual(sorted(dispatcher.load_plugins()), ['test.echo', 'test.tool'])
+        self.assertEqual(len(dispatcher.errors), 2)
+        self.assertTrue(any('entry_point' in e for e in dispatcher.errors))
+        self.assertTrue(any('duplicate' in e for e in dispatcher.errors))
+
+        with self.assertRaisesRegex(PluginError, 'Unknown plugin'):
+            dispatcher.run_plugin('nope', 'in.pcap', None)
+        out_dir = os.path.join(self.test_dir, 'out')
+        with self.assertRaisesRegex(PluginError, 'unexpected keyword'):
+            dispatcher.run_plugin('test.echo', 'in.pcap', out_dir, {"bogus": 1})
+        with self.assertRaisesRegex(PluginError, 'output_dir'):
+            dispatcher.run_plugin('test.echo', 'in.pcap', None)
+        with self.assertRaisesRegex(PluginError, 'JSON'):
+            dispatcher.run_plugin('test.echo', 'in.pcap', None, '{bad')
+        with self.assertRaises(PluginError):
+            parse_manifest('plugin_id: a\nversion: 1\nentry_point: m:f\ninputs:\n  host: str\n')
+
+    def test_builtin_plugins(self):
+        plugins = PluginDispatcher().load_plugins()
+        for plugin_id in ('wifi.ba', 'wifi.qos', 'nexus.tools.ping'):
+            self.assertIn(plugin_id, plugins)
+
+        pcap = os.path.join(self.test_dir, 'air.pcap')
+        with open(pcap, 'wb') as f:
+            f.write(build_pcap([qos_data(seq=i) for i in range(20)]))
+        out_dir = os.path.join(self.test_dir, 'ba')
+        with redirect_stdout(StringIO()):
+            summary = PluginDispatcher().run_plugin('wifi.ba', pcap, out_dir, {"target_tid": 5})
+        self.assertEqual((summary['frames'], summary['ba_anomalies']), (20, 0))
+        with open(os.path.join(out_dir, 'summary.json'), encoding='utf-8') as f:
+            self.assertEqual(json.load(f)['trace']['files'], ['trace.sqlite'])
+
+    def test_list_plugins_cli_imports_no_plugin(self):
+        code = textwrap.dedent('''
+            import sys
+            from nexus_core import cli
+            sys.argv = ["nexus-core", "list-plugins"]
+            cli.main()
+            heavy = ["numpy", "pandas", "scapy", "matplotlib", "nexus_core.plugins.wifi.ba_analyzer"]
+            print("LOADED", [m for m in heavy if m in sys.modules])
+        ''')
+        out = subprocess.run([sys.executable, '-c', code], cwd=ROOT, capture_output=True, text=True, check=True).stdout
+        self.assertIn('wifi.ba', out)
+        self.assertIn('LOADED []', out)
+
+
+if __name__ == '__main__':
+    unittest.main()
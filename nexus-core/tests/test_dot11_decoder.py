@@ -0,0 +1,99 @@
+import os
+import sys
+import struct
+import shutil
+import tempfile
+import unittest
+
+# Add project root to path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from nexus_core.pcap_reader import PcapEngine
+from nexus_core.decoders import decode_dot11, int_to_mac, mac_to_int, format_macs, DOT11_SNAPLEN
+from helpers import AP, STA, LINKTYPE_IEEE802_11, LINKTYPE_RADIOTAP, build_pcap, qos_data, block_ack
+
+
+def radiotap(rate=None, signal=None, fcs=False, tsft=False):
+    """Radiotap header with optional TSFT / Flags / Rate / dBm_AntSignal."""
+    present, body = 0, b''
+    if tsft:
+        present |= 1 << 0
+        body += struct.pack('<Q', 0x1122334455)
+    present |= 1 << 1
+    body += bytes([0x10 if fcs else 0])
+    if rate is not None:
+        present |= 1 << 2
+        body += bytes([rate])
+    if signal is not None:
+        present |= 1 << 5
+        body += struct.pack('<b', signal)
+    # TSFT 要求 8 字节对齐: 头部 8 字节正好对齐
+    return struct.pack('<BBHI', 0, 0, 8 + len(body), present) + body
+
+
+class TestDot11Decoder(unittest.TestCase):
+    def setUp(self):
+        self.test_dir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.test_dir, ignore_errors=True)
+
+    def decode(self, frames, linktype=LINKTYPE_RADIOTAP):
+        path = os.path.join(self.test_dir, 'air.pcap')
+        with open(path, 'wb') as f:
+            f.write(build_pcap(frames, linktype, start=1700000000))
+        return PcapEngine(path).decode(decode_dot11, snaplen=DOT11_SNAPLEN)
+
+    def test_qos_data_and_radiotap(self):
+        cols = self.decode([
+            qos_data(AP, STA, 5, 10, retry=True, radiotap=radiotap(rate=24, signal=-55)),
+            qos_data(STA, AP, 3, 4095, radiotap=radiotap(rate=12, tsft=True)),
+        ])
+        self.assertEqual(list(cols['fc_type']), [2, 2])
+        self.assertEqual(list(cols['fc_subtype']), [8, 8])
+        self.assertEqual(list(cols['seq']), [10, 4095])
+        self.assertEqual(list(cols['tid']), [5, 3])
+        self.assertEqual(list(cols['retry']), [True, False])
+        self.assertEqual(list(cols['rt_rate']), [24, 12])
+        self.assertEqual(list(cols['has_signal']), [True, False])
+        self.assertEqual(int(cols['rt_signal'][0]), -55)
+        self.assertEqual(int_to_mac(cols['addr1'][0]), 'aa:bb:cc:dd:ee:ff')
+        self.assertEqual(int_to_mac(cols['addr2'][0]), '00:11:22:33:44:55')
+        self.assertEqual(list(cols['packet_no']), [1, 2])
+
+    def test_block_ack(self):
+        cols = self.decode([
+            block_ack(STA, AP, 6, 100, 0xFF01, radiotap=radiotap()),
+            radiotap() + struct.pack('<BBH', 0xD4, 0, 0) + STA,  # ACK: 无 TA
+        ])
+        self.assertEqual(list(cols['is_ba']), [True, False])
+        self.assertEqual(int(cols['ba_ssn'][0]), 100)
+        self.assertEqual(int(cols['ba_tid'][0]), 6)
+        self.assertEqual(int(cols['ba_control'][0]), (6 << 12) | 0x4)
+        self.assertEqual(int(cols['ba_bitmap'][0]), 0xFF01)
+        self.assertEqual(list(cols['has_addr2']), [True, False])
+        self.assertEqual(list(cols['seq']), [-1, -1])
+
+    def test_fcs_and_plain_dot11(self):
+        frame = qos_data(AP, STA, 2, 1, payload=b'x' * 20, radiotap=b'')
+        cols = self.decode([radiotap(fcs=True) + frame + b'FCS!'])
+        self.assertEqual(int(cols['dot11_len'][0]), len(frame))
+
+        cols = self.decode([frame], linktype=LINKTYPE_IEEE802_11)
+        self.assertEqual(int(cols['hdr_off'][0]), 0)
+        self.assertEqual(int(cols['tid'][0]), 2)
+
+    def test_truncated_and_foreign_linktype(self):
+        cols = self.decode([radiotap() + b'\x88\x00'])
+        self.assertFalse(cols['is_dot11'][0])
+        cols = self.decode([b'\xff' * 60], linktype=1)
+        self.assertFalse(cols['is_dot11'][0])
+
+    def test_mac_helpers(self):
+        self.assertEqual(mac_to_int('AA:BB:CC:DD:EE:FF'), 0xAABBCCDDEEFF)
+        self.assertEqual(list(format_macs([1, 0xAABBCCDDEEFF, 1])),
+                         ['00:00:00:00:00:01', 'aa:bb:cc:dd:ee:ff', '00:00:00:00:00:01'])
+
+
+if __name__ == '__main__':
+    unittest.main()
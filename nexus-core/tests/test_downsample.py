@@ -0,0 +1,150 @@
+import os
+import sys
+import shutil
+import tempfile
+import unittest
+
+# Add project root to path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import numpy as np
+
+from nexus_core.database import DatabaseManager, TableSchema
+from nexus_core.downsample import lttb, minmax, downsample, read_series, LiveSeries
+from nexus_core.rollup import Rollup, write_rollups
+
+try:
+    import pyarrow  # noqa: F401
+    HAS_PYARROW = True
+except ImportError:
+    HAS_PYARROW = False
+
+
+def lttb_reference(x, y, threshold):
+    """逐点实现的 LTTB (与原论文的伪代码一致), 用于对照。"""
+    n = len(x)
+    if threshold >= n or n <= 2:
+        return list(range(n))
+    out = [0]
+    edges = np.linspace(1, n - 1, threshold - 1).astype(int)
+    a = 0
+    for i in range(threshold - 2):
+        lo, hi = edges[i], edges[i + 1]
+        if i + 1 < threshold - 2:
+            nlo, nhi = edges[i + 1], edges[i + 2]
+            cx, cy = np.mean(x[nlo:nhi]), np.mean(y[nlo:nhi])
+        else:
+            cx, cy = x[-1], y[-1]
+        best, best_area = lo, -1.0
+        for j in range(lo, hi):
+            area = abs((x[a] - cx) * (y[j] - y[a]) - (x[a] - x[j]) * (cy - y[a]))
+            if area > best_area:
+                best, best_area = j, area
+        out.append(best)
+        a = best
+    out.append(n - 1)
+    return out
+
+
+SCHEMA = TableSchema("frames", [("timestamp", "ts_ns"), ("rssi", "rssi")], indexes=[("timestamp",)])
+
+
+class TestDownsample(unittest.TestCase):
+    def setUp(self):
+        self.test_dir = tempfile.mkdtemp()
+        rng = np.random.default_rng(3)
+        self.x = np.sort(rng.uniform(0, 100, 20000))
+        self.y = np.sin(self.x) * 10 + rng.normal(0, 1, len(self.x))
+
+    def tearDown(self):
+        shutil.rmtree(self.test_dir, ignore_errors=True)
+
+    def test_lttb_matches_reference(self):
+        idx = lttb(self.x[:3000], self.y[:3000], 200)
+        self.assertEqual(idx.tolist(), lttb_reference(self.x[:3000], self.y[:3000], 200))
+
+    def test_lttb_bounds(self):
+        idx = lttb(self.x, self.y, 500)
+        self.assertEqual(len(idx), 500)
+        self.assertEqual((idx[0], idx[-1]), (0, len(self.x) - 1))
+        self.assertTrue(np.all(np.diff(idx) > 0))
+        self.assertEqual(lttb(self.x[:10], self.y[:10], 500).tolist(), list(range(10)))
+
+    def test_minmax_keeps_extremes(self):
+        y = self.y.copy()
+        y[12345] = 1000.0   # 孤立尖峰
+        y[777] = -1000.0
+        idx = minmax(self.x, y, 400)
+        self.assertLessEqual(len(idx), 400)
+        self.assertTrue(np.all(np.diff(idx) > 0))
+        self.assertIn(12345, idx)
+        self.assertIn(777, idx)
+        # 每个桶的最值都在结果中
+        bucket = np.minimum((self.x / 100 * 200).astype(int), 199)
+        for b in (0, 57, 199):
+            rows = np.flatnonzero(bucket == b)
+            self.assertIn(rows[np.argmax(y[rows])], idx)
+            self.assertIn(rows[np.argmin(y[rows])], idx)
+
+    def test_downsample_drops_nan(self):
+        y = self.y.copy()
+        y[::7] = np.nan
+        x, out = downsample(self.x, y, 300, method="minmax")
+        self.assertLessEqual(len(out), 300)
+        self.assertTrue(np.isfinite(out).all())
+        with self.assertRaises(ValueError):
+            downsample(self.x, self.y, 300, method="every-nth")
+
+    def test_live_series_bounded(self):
+        live = LiveSeries(capacity=100)
+        spike = 5001
+        for i in range(10000):
+            live.append(float(i), None if i % 50 == 0 else (1000.0 if i == spike else float(i % 10)))
+        self.assertLessEqual(live.size, 100)
+        self.assertEqual(live.total, 10000)
+        # 合并后仍保留尖峰与首尾
+        self.assertIn(1000.0, live.y[:live.size])
+        self.assertEqual(live.x[live.size - 1], 9999.0)
+        series = live.series(max_points=30)
+        self.assertLessEqual(len(series["x"]), 30)
+        self.assertTrue(np.isfinite(series["y"]).all())
+        self.assertEqual(series["total"], 10000)
+
+    def write_trace(self, backend):
+        ts = (1700000000 * 10 ** 9 + self.x * 1e9).astype(np.int64)
+        with DatabaseManager(self.test_dir, backend).writer([SCHEMA]) as writer:
+            # 乱序写入, 读取时按时间排序
+            for part in reversed(np.array_split(np.arange(len(ts)), 3)):
+                writer.write("frames", {"ts_ns": ts[part], "rssi": np.round(self.y[part]).astype(np.int64)})
+        return ts
+
+    def check_series(self, backend):
+        ts = self.write_trace(backend)
+        t0, t1 = int(ts[1000]), int(ts[9000])
+        series = read_series(self.test_dir, "frames", "rssi", t0, t1, max_points=250)
+        self.assertEqual(series["total"], 8000)
+        self.assertEqual(len(series["x"]), 250)
+        self.assertEqual((series["x"][0], series["x"][-1]), (ts[1000], ts[8999]))
+        with self.assertRaises(ValueError):
+            read_series(self.test_dir, "frames", "rssi; DROP TABLE frames", max_points=250)
+
+    def test_read_series_sqlite(self):
+        self.check_series("sqlite")
+
+    @unittest.skipUnless(HAS_PYARROW, "pyarrow not installed")
+    def test_read_series_parquet(self):
+        self.check_series("parquet")
+
+    def test_read_series_rollup(self):
+        ts = (1700000000 * 10 ** 9 + self.x * 1e9).astype(np.int64)
+        rollup = Rollup(("rssi",))
+        rollup.update(ts, {"rssi": self.y})
+        write_rollups(self.test_dir, {"air_rssi": rollup}, "sqlite")
+        # 未给窗口: 按整段 100 s 选级, 而不是退化为一个桶
+        series = read_series(self.test_dir, "rollup_air_rssi", "rssi_mean", max_points=300)
+        self.assertGreater(len(series["x"]), 100)
+        self.assertLessEqual(len(series["x"]), 300)
+
+
+if __name__ == '__main__':
+    unittest.main()
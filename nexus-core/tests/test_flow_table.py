@@ -0,0 +1,94 @@
+import os
+import sys
+import shutil
+import tempfile
+import unittest
+
+# Add project root to path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import numpy as np
+
+from nexus_core.pcap_reader import PcapEngine
+from nexus_core.decoders import decode_ip, IP_SNAPLEN
+from nexus_core.flow_table import FlowTable, UDP_FLOW_KEY, UDP_SOURCE_KEY, DOT11_FLOW_KEY, udp_flow_keys
+from helpers import LINKTYPE_ETHERNET, build_pcap, udp_packet
+
+
+def keys(rows, dtype=DOT11_FLOW_KEY):
+    return np.array(rows, dtype=dtype)
+
+
+class TestFlowTable(unittest.TestCase):
+    def test_counters_across_batches(self):
+        table = FlowTable(DOT11_FLOW_KEY, scores=('data',))
+        slots = table.update(keys([(2, 1, 5), (1, 2, 5), (2, 1, 5)]), nbytes=[10, 20, 30],
+                             ts_ns=[100, 200, 300], scores={'data': [True, False, True]})
+        self.assertEqual(list(slots), [0, 1, 0])
+        slots = table.update(keys([(1, 2, 5), (3, 3, -1), (2, 1, 5)]), nbytes=[1, 2, 3],
+                             ts_ns=[400, 50, 600], scores={'data': [True, True, False]})
+        self.assertEqual(list(slots), [1, 2, 0])
+
+        cols = table.columns()
+        self.assertEqual(len(table), 3)
+        self.assertEqual(list(cols['sa']), [2, 1, 3])
+        self.assertEqual(list(cols['tid']), [5, 5, -1])
+        self.assertEqual(list(cols['packets']), [3, 2, 1])
+        self.assertEqual(list(cols['bytes']), [43, 21, 2])
+        self.assertEqual(list(cols['first_ts']), [100, 200, 50])
+        self.assertEqual(list(cols['last_ts']), [600, 400, 50])
+        self.assertEqual(list(cols['data']), [2, 1, 1])
+        self.assertEqual(table.slot((3, 3, -1)), 2)
+        self.assertIsNone(table.slot((9, 9, 9)))
+
+    def test_mask_and_top(self):
+        table = FlowTable(DOT11_FLOW_KEY)
+        self.assertIsNone(table.top())
+        slots = table.update(keys([(1, 1, 0), (2, 2, 0), (2, 2, 0), (1, 1, 0)]),
+                             nbytes=[100, 1, 1, 100], mask=[True, True, False, True])
+        self.assertEqual(list(slots), [0, 1, -1, 0])
+        self.assertEqual(table.top(), 0)
+        self.assertEqual(table.top('bytes'), 0)
+        table.update(keys([(2, 2, 0)]))
+        # 包数相同时取先出现的流
+        self.assertEqual(table.top(), 0)
+        self.assertEqual(list(table.update(keys([(1, 1, 0)]), mask=[False])), [-1])
+
+    def test_growth(self):
+        table = FlowTable(DOT11_FLOW_KEY, capacity=2)
+        for start in range(0, 100, 7):
+            table.update(keys([(i, 0, 0) for i in range(start, start + 10)]))
+        cols = table.columns()
+        self.assertEqual(list(cols['sa']), list(range(108)))
+        self.assertEqual(cols['packets'].sum(), 150)
+
+    def test_udp_flows_from_capture(self):
+        a, b, c = [10, 0, 0, 1], [10, 0, 0, 2], [10, 0, 0, 3]
+        frames = [udp_packet(a, b, 5000, 6000), udp_packet(c, b, 5000, 6000),
+                  udp_packet(a, b, 5000, 6000), udp_packet(a, b, 5001, 6000)] * 5
+        test_dir = tempfile.mkdtemp()
+        try:
+            path = os.path.join(test_dir, 'wire.pcap')
+            with open(path, 'wb') as f:
+                f.write(build_pcap([(i, f) for i, f in enumerate(frames)], LINKTYPE_ETHERNET))
+            flows = FlowTable(UDP_FLOW_KEY)
+            sources = FlowTable(UDP_SOURCE_KEY)
+            for cols in PcapEngine(path).iter_decode(decode_ip, batch_size=3, snaplen=IP_SNAPLEN):
+                flows.update(udp_flow_keys(cols), nbytes=cols['udp_len'], ts_ns=cols['ts_ns'], mask=cols['is_udp'])
+                sources.update(udp_flow_keys(cols, UDP_SOURCE_KEY), mask=cols['is_udp'])
+        finally:
+            shutil.rmtree(test_dir, ignore_errors=True)
+
+        cols = flows.columns()
+        self.assertEqual(list(cols['packets']), [10, 5, 5])
+        self.assertEqual(list(cols['sport']), [5000, 5000, 5001])
+        self.assertEqual(list(cols['src_lo']), [0x0A000001, 0x0A000003, 0x0A000001])
+        self.assertEqual(list(cols['first_ts']), [0, 1000, 3000])
+        self.assertEqual(list(cols['last_ts']), [18000, 17000, 19000])
+        self.assertEqual(int(cols['bytes'][0]), 10 * 12)
+        self.assertEqual(len(sources), 3)
+        self.assertEqual(sources.top(), 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,273 @@
+import os
+import sys
+import struct
+import shutil
+import sqlite3
+import tempfile
+import unittest
+from contextlib import redirect_stdout
+from io import StringIO
+
+# Add project root to path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import numpy as np
+
+from nexus_core.checkpoint import Checkpoint
+from nexus_core.decoders import decode_dot11, SeqUnwrapper
+from nexus_core.engine import Pipeline
+from nexus_core.pcap_filter import PacketFilter
+from nexus_core.pcap_reader import PcapEngine, ReadPosition
+from nexus_core.rtp_stats import RtpLossSubscriber, SEQ_WINDOW
+from nexus_core.plugins.wifi import ba_analyzer
+from helpers import build_pcap, qos_data, block_ack
+
+try:
+    import pyarrow  # noqa: F401
+    HAS_PYARROW = True
+except ImportError:
+    HAS_PYARROW = False
+
+
+def pcap_record(i, data):
+    return struct.pack('<IIII', 1700000000 + i // 1000, i % 1000, len(data), len(data)) + data
+
+
+def frames(n):
+    """QoS Data 与 BlockAck 交替; 每 50 个 BlockAck 撤销一次已确认的 SN (一致性异常)。"""
+    out = []
+    for i in range(n):
+        if i % 2 == 0:
+            out.append(qos_data(seq=i // 2 % 4096))
+        else:
+            ssn = i // 2 % 4096
+            bitmap = 0xFFFFFFFFFFFFFFFE if i % 100 == 1 and i > 100 else 0xFFFFFFFFFFFFFFFF
+            out.append(block_ack(ssn=ssn, bitmap=bitmap))
+    return out
+
+
+def rtp_packet(seq, sport=5004):
+    """原始 IPv4 (linktype 101) 上的 RTP 包。"""
+    rtp = struct.pack('>BBHII', 0x80, 96, seq, seq * 3000, 0x1234) + b'\x00' * 16
+    udp = struct.pack('>HHHH', sport, 5004, 8 + len(rtp), 0) + rtp
+    return struct.pack('>BBHHHBBH4s4s', 0x45, 0, 20 + len(udp), 0, 0, 64, 17, 0,
+                       bytes([10, 0, 0, 1]), bytes([10, 0, 0, 2])) + udp
+
+
+def ng_block(block_type, body):
+    body += b'\x00' * (-len(body) % 4)
+    return struct.pack('<II', block_type, 12 + len(body)) + body + struct.pack('<I', 12 + len(body))
+
+
+def ng_idb(linktype, tsresol):
+    options = struct.pack('<HH', 9, 1) + bytes([tsresol]) + b'\x00' * 3 + struct.pack('<HH', 0, 0)
+    return ng_block(1, struct.pack('<HHI', linktype, 0, 65535) + options)
+
+
+def ng_epb(iface, ts, data):
+    return ng_block(6, struct.pack('<IIIII', iface, ts >> 32, ts & 0xFFFFFFFF, len(data), len(data)) + data)
+
+
+class TestIncrementalRead(unittest.TestCase):
+    def setUp(self):
+        self.test_dir = tempfile.mkdtemp()
+        self.path = os.path.join(self.test_dir, 'growing.pcap')
+
+    def tearDown(self):
+        shutil.rmtree(self.test_dir, ignore_errors=True)
+
+    def write(self, content, mode='wb'):
+        with open(self.path, mode) as f:
+            f.write(content)
+
+    def read(self, resume=None, batch_size=7):
+        engine = PcapEngine(self.path)
+        nos, seqs = [], []
+        for cols in engine.iter_decode(decode_dot11, batch_size=batch_size, resume=resume):
+            nos += cols['packet_no'].tolist()
+            seqs += cols['seq'].tolist()
+        return engine.position, nos, seqs
+
+    def test_resume_pcap(self):
+        records = [pcap_record(i, f) for i, f in enumerate(frames(60))]
+        # 第一次读取时最后一个记录只写了一半
+        self.write(build_pcap([]) + b''.join(records[:25]) + records[25][:20])
+        position, nos, _ = self.read()
+        self.assertEqual(position.packets, 25)
+        self.assertEqual(nos, list(range(1, 26)))
+
+        self.write(records[25][20:] + b''.join(records[26:40]), 'ab')
+        position, nos, seqs = self.read(resume=position)
+        self.assertEqual(nos, list(range(26, 41)))
+
+        # 没有新数据: 位置不变, 不产出任何行
+        same, nos_empty, _ = self.read(resume=position)
+        self.assertEqual((same.packets, same.offset, nos_empty), (40, position.offset, []))
+
+        self.write(b''.join(records[40:]), 'ab')
+        position, nos, seqs_tail = self.read(resume=ReadPosition.from_dict(position.to_dict()))
+        self.assertEqual(nos, list(range(41, 61)))
+        _, _, full = self.read()
+        self.assertEqual(full[25:40] + full[40:], seqs + seqs_tail)
+
+    def test_resume_pcapng_new_interface(self):
+        shb = ng_block(0x0A0D0D0A, struct.pack('<IHHq', 0x1A2B3C4D, 1, 0, -1))
+        self.path = os.path.join(self.test_dir, 'growing.pcapng')
+        self.write(shb + ng_idb(127, 9) + ng_epb(0, 1000, b'a' * 30))
+        engine = PcapEngine(self.path)
+        list(engine.iter_batches())
+        position = engine.position
+
+        # 续读部分新增了一个接口 (不同的时间精度)
+        self.write(ng_epb(0, 2000, b'b' * 30) + ng_idb(1, 3) + ng_epb(1, 7, b'c' * 30), 'ab')
+        (batch,) = list(engine.iter_batches(resume=position))
+        self.assertEqual(batch.ts_ns.tolist(), [2000, 7000000])
+        self.assertEqual(batch.linktype.tolist(), [127, 1])
+        self.assertEqual(batch.packet_no.tolist(), [2, 3])
+
+        self.write(ng_epb(1, 8, b'd' * 30), 'ab')
+        (batch,) = list(engine.iter_batches(resume=engine.position))
+        self.assertEqual((batch.ts_ns.tolist(), batch.packet_no.tolist()), ([8000000], [4]))
+
+    def test_changed_capture(self):
+        records = [pcap_record(i, f) for i, f in enumerate(frames(20))]
+        self.write(build_pcap([]) + b''.join(records))
+        position, _, _ = self.read()
+        checkpoint = Checkpoint(os.path.join(self.test_dir, 'checkpoint.ba.pkl'), os.path.abspath(self.path),
+                                position, {"x": 1})
+        checkpoint.save()
+        self.assertTrue(Checkpoint.load(self.test_dir, self.path, name="ba").resuming)
+
+        # 抓包被重新开始 (内容不同): 不能续读
+        self.write(build_pcap([]) + b''.join(records[1:]))
+        self.assertFalse(position.matches(self.path))
+        with self.assertRaises(ValueError):
+            self.read(resume=position)
+        self.assertFalse(Checkpoint.load(self.test_dir, self.path, name="ba").resuming)
+        self.assertFalse(Checkpoint.load(self.test_dir, os.path.join(self.test_dir, 'other.pcap'), name="ba").resuming)
+
+    def test_seq_unwrapper(self):
+        seq = (np.arange(200000) + 60000) % 65536
+        seq[5000] = 3
+        full = SeqUnwrapper()(seq)
+        unwrap = SeqUnwrapper()
+        parts = np.concatenate([unwrap(part) for part in np.array_split(seq, 9)])
+        np.testing.assert_array_equal(parts, full)
+        self.assertEqual(int(full[-1]), 60000 + 199999)
+
+
+class TestIncrementalAnalysis(unittest.TestCase):
+    def setUp(self):
+        self.test_dir = tempfile.mkdtemp()
+        self.records = [pcap_record(i, f) for i, f in enumerate(frames(1200))]
+
+    def tearDown(self):
+        shutil.rmtree(self.test_dir, ignore_errors=True)
+
+    def run_analysis(self, pcap, out):
+        with redirect_stdout(StringIO()):
+            return ba_analyzer.analyze_incremental(pcap, out)
+
+    def check(self, backend):
+        from nexus_core.database import DatabaseManager
+        DatabaseManager.default_backend = backend
+        self.addCleanup(setattr, DatabaseManager, "default_backend", "sqlite")
+
+        full_pcap = os.path.join(self.test_dir, 'full.pcap')
+        with open(full_pcap, 'wb') as f:
+            f.write(build_pcap([]) + b''.join(self.records))
+        full_out = os.path.join(self.test_dir, 'full')
+        os.makedirs(full_out)
+        full = self.run_analysis(full_pcap, full_out)
+
+        pcap = os.path.join(self.test_dir, 'growing.pcap')
+        out = os.path.join(self.test_dir, 'inc')
+        os.makedirs(out)
+        with open(pcap, 'wb') as f:
+            f.write(build_pcap([]))
+        cuts = [0, 333, 334, 900, 1200]
+        for lo, hi in zip(cuts, cuts[1:]):
+            with open(pcap, 'ab') as f:
+                f.write(b''.join(self.records[lo:hi]))
+            reports = self.run_analysis(pcap, out)
+        self.assertEqual(reports, full)
+        self.assertGreater(full["consistency"], 5)
+        self.assertEqual(full["trace"], 1200)
+        return full_out, out
+
+    def test_sqlite(self):
+        full_out, out = self.check("sqlite")
+
+        def rows(d, sql):
+            conn = sqlite3.connect(os.path.join(d, 'trace.sqlite'))
+            try:
+                return conn.execute(sql).fetchall()
+            finally:
+                conn.close()
+        for sql in ("SELECT * FROM frames ORDER BY no", "SELECT * FROM frames_flows ORDER BY flow"):
+            self.assertEqual(rows(out, sql), rows(full_out, sql))
+
+    @unittest.skipUnless(HAS_PYARROW, "pyarrow not installed")
+    def test_parquet(self):
+        from nexus_core.trace_store import read_trace
+        full_out, out = self.check("parquet")
+        for table in ("frames", "frames_flows"):
+            got, expected = read_trace(out, table), read_trace(full_out, table)
+            for name in expected:
+                np.testing.assert_array_equal(got[name], expected[name])
+
+
+class TestIncrementalRtp(unittest.TestCase):
+    def setUp(self):
+        self.test_dir = tempfile.mkdtemp()
+        # 序列号跨过 65535 -> 0; 中间丢 3 个, 交换 2 个, 重复 1 个; 另一条流的包被过滤掉
+        seqs = [s % 65536 for s in range(65000, 66500) if s not in (65400, 65533, 65900)]
+        seqs[100], seqs[101] = seqs[101], seqs[100]
+        seqs.insert(300, seqs[299])
+        self.packets = []
+        for i, seq in enumerate(seqs):
+            self.packets.append(rtp_packet(seq))
+            if i % 10 == 0:
+                self.packets.append(rtp_packet(i, sport=6000))
+        self.header = struct.pack('<IHHiIII', 0xA1B2C3D4, 2, 4, 0, 0, 65535, 101)
+
+    def tearDown(self):
+        shutil.rmtree(self.test_dir, ignore_errors=True)
+
+    def run_loss(self, pcap, out):
+        checkpoint = Checkpoint.load(out, pcap, name="rtp")
+        pipe = Pipeline(pcap, packet_filter=PacketFilter(sport=5004, dport=5004))
+        pipe.subscribe("loss", RtpLossSubscriber())
+        report = pipe.run(batch_size=64, checkpoint=checkpoint)["loss"]
+        checkpoint.save()
+        return report
+
+    def test_resume_across_wrap(self):
+        records = [pcap_record(i, p) for i, p in enumerate(self.packets)]
+        full_pcap = os.path.join(self.test_dir, 'full.pcap')
+        with open(full_pcap, 'wb') as f:
+            f.write(self.header + b''.join(records))
+        full = self.run_loss(full_pcap, os.path.join(self.test_dir, 'full'))
+        self.assertEqual(full, {"packets": 1498, "seq_range": [0, 65535], "packets_lost": 3,
+                                "loss_rate_percent": 0.2, "reordered_packets": 1, "duplicates": 1})
+
+        pcap = os.path.join(self.test_dir, 'growing.pcap')
+        out = os.path.join(self.test_dir, 'inc')
+        with open(pcap, 'wb') as f:
+            f.write(self.header)
+        # 一次运行以 65535 结束, 下一次从 0 开始
+        wrap = self.packets.index(rtp_packet(0))
+        cuts = [0, 200, wrap, wrap + 1, len(records)]
+        for lo, hi in zip(cuts, cuts[1:]):
+            with open(pcap, 'ab') as f:
+                f.write(b''.join(records[lo:hi]))
+            report = self.run_loss(pcap, out)
+        self.assertEqual(report, full)
+        state = Checkpoint.load(out, pcap, name="rtp").state["loss"]
+        self.assertEqual((state["offset"], state["last"]), (65536, 66499 - 65536))
+        # 检查点状态大小固定, 不随包数增长
+        self.assertEqual(state["window"].shape, (SEQ_WINDOW,))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,102 @@
+import os
+import sys
+import json
+import struct
+import shutil
+import subprocess
+import tempfile
+import types
+import unittest
+
+# Add project root to path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from nexus_core.lazy import LazyModule, lazy_import, lazy_exports
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+
+
+def loaded_modules(code, modules):
+    """Run ``code`` in a fresh interpreter; which of ``modules`` it imported."""
+    probe = f"{code}\nimport json, sys\nprint(json.dumps([m for m in {list(modules)!r} if m in sys.modules]))"
+    out = subprocess.run([sys.executable, '-c', probe], cwd=ROOT, capture_output=True, text=True, check=True)
+    return json.loads(out.stdout.strip().splitlines()[-1])
+
+
+def build_radiotap_pcap(count):
+    out = [struct.pack('<IHHiIII', 0xA1B2C3D4, 2, 4, 0, 0, 65535, 127)]
+    for i in range(count):
+        radiotap = struct.pack('<BBHI', 0, 0, 8, 0)
+        frame = (radiotap + struct.pack('<BBH', 0x88, 0, 0) + bytes.fromhex('aabbccddeeff')
+                 + bytes.fromhex('001122334455') + bytes.fromhex('aabbccddeeff') + struct.pack('<HH', i << 4, 5))
+        out.append(struct.pack('<IIII', 1700000000 + i, 0, len(frame), len(frame)) + frame)
+    return b''.join(out)
+
+
+class TestLazy(unittest.TestCase):
+    def setUp(self):
+        self.test_dir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.test_dir)
+
+    def test_lazy_module_imports_on_first_attribute(self):
+        name = 'nexus_core_lazy_probe'
+        with open(os.path.join(self.test_dir, f'{name}.py'), 'w') as f:
+            f.write('VALUE = 42\n')
+        sys.path.insert(0, self.test_dir)
+        try:
+            module = LazyModule(name)
+            self.assertNotIn(name, sys.modules)
+            self.assertIn('not loaded', repr(module))
+            self.assertEqual(module.VALUE, 42)
+            self.assertIn(name, sys.modules)
+            module.VALUE = 7
+            self.assertEqual(sys.modules[name].VALUE, 7)
+            self.assertIn('VALUE', dir(module))
+        finally:
+            sys.path.remove(self.test_dir)
+            sys.modules.pop(name, None)
+
+        # 已导入的模块直接返回本身
+        self.assertIs(lazy_import('json'), json)
+
+    def test_lazy_exports(self):
+        package = types.ModuleType('nexus_lazy_pkg')
+        sys.modules[package.__name__] = package
+        try:
+            package.__getattr__, package.__dir__ = lazy_exports(package.__name__, {'dumps': 'json'})
+            self.assertIs(package.dumps, json.dumps)
+            # 解析后缓存在模块上
+            self.assertIs(vars(package)['dumps'], json.dumps)
+            self.assertIn('dumps', package.__dir__())
+            with self.assertRaises(AttributeError):
+                package.loads
+        finally:
+            del sys.modules[package.__name__]
+
+    def test_import_defers_heavy_modules(self):
+        heavy = ('numpy', 'pandas', 'scapy', 'matplotlib')
+        self.assertEqual(loaded_modules('import nexus_core, nexus_core.cli', heavy), [])
+        # 插件模块需要 NumPy, pandas 只在生成报告时导入
+        self.assertEqual(loaded_modules('import nexus_core.plugins.wifi.ba_analyzer', ('pandas', 'scapy')), [])
+        self.assertEqual(loaded_modules('from nexus_core import PcapEngine', ('pandas', 'scapy')), [])
+
+    def test_scapy_mode_skips_scapy_all(self):
+        try:
+            import scapy  # noqa: F401
+        except ImportError:
+            self.skipTest('scapy not installed')
+        path = os.path.join(self.test_dir, 'air.pcap')
+        with open(path, 'wb') as f:
+            f.write(build_radiotap_pcap(3))
+        # 协议层与 scapy.all 相同 (含 DNS 等端口上的应用层), 不导入 scapy.all 本身
+        code = ('from nexus_core import PcapEngine\n'
+                f'pkts = list(PcapEngine({path!r}).stream_packets())\n'
+                'from scapy.layers.dot11 import Dot11\n'
+                'assert len(pkts) == 3 and all(p.haslayer(Dot11) for p in pkts), pkts')
+        self.assertEqual(loaded_modules(code, ('scapy.all', 'scapy.pipetool', 'scapy.layers.dns')),
+                         ['scapy.layers.dns'])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,108 @@
+import os
+import sys
+import shutil
+import tempfile
+import unittest
+
+# Add project root to path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from unittest import mock
+
+from nexus_core import pcap_reader, memory
+from nexus_core.pcap_reader import PcapEngine
+from nexus_core.memory import MemoryBudget, MemoryLimitError, columns_nbytes
+from nexus_core.decoders import decode_ip
+from nexus_core.engine import Pipeline, Subscriber
+from helpers import LINKTYPE_ETHERNET, build_pcap
+
+
+class Count(Subscriber):
+    """Streaming subscriber: keeps only a counter."""
+
+    def __init__(self):
+        super().__init__(decode_ip, ('packet_no',))
+        self.n = 0
+
+    def on_batch(self, cols):
+        self.n += len(cols['packet_no'])
+
+    def finish(self):
+        return self.n
+
+
+def frame(i):
+    return bytes([i % 256]) * (60 + i % 7)
+
+
+class TestMemory(unittest.TestCase):
+    def setUp(self):
+        self.test_dir = tempfile.mkdtemp()
+        self.path = os.path.join(self.test_dir, 'a.pcap')
+        with open(self.path, 'wb') as f:
+            f.write(build_pcap([(1000 * i, frame(i)) for i in range(100)], LINKTYPE_ETHERNET))
+
+    def tearDown(self):
+        shutil.rmtree(self.test_dir, ignore_errors=True)
+
+    def test_budget(self):
+        budget = MemoryBudget(100)
+        budget.charge(60)
+        with self.assertRaises(MemoryLimitError):
+            budget.charge(60)
+        MemoryBudget(None).charge(1 << 40)
+
+    def test_decode_ceiling(self):
+        full = PcapEngine(self.path).decode(decode_ip)
+        engine = PcapEngine(self.path, use_index=False)
+        engine.memory_limit = columns_nbytes(full) // 2
+        with self.assertRaises(MemoryLimitError):
+            engine.decode(decode_ip, batch_size=10)
+
+        # 流式解码不收集结果, 不受上限约束
+        n = sum(len(cols['packet_no']) for cols in engine.iter_decode(decode_ip, batch_size=10))
+        self.assertEqual(n, 100)
+
+        engine.memory_limit = columns_nbytes(full)
+        self.assertEqual(list(engine.decode(decode_ip)['packet_no']), list(full['packet_no']))
+
+    def test_pipeline_ceiling(self):
+        full = PcapEngine(self.path).decode(decode_ip)
+        self.addCleanup(setattr, PcapEngine, 'memory_limit', None)
+        PcapEngine.memory_limit = columns_nbytes(full) // 2
+        pipe = Pipeline(self.path)
+        pipe.subscribe('rows', decode_ip, list(full))
+        with self.assertRaises(MemoryLimitError):
+            pipe.run(batch_size=10)
+
+        # 流式订阅者不收集行, 不受上限约束
+        pipe = Pipeline(self.path)
+        pipe.subscribe('count', Count())
+        self.assertEqual(pipe.run(batch_size=10), {'count': 100})
+
+        # 从检查点恢复的行同样计入
+        sub = Subscriber(decode_ip, list(full))
+        sub.budget = MemoryBudget(PcapEngine.memory_limit)
+        with self.assertRaises(MemoryLimitError):
+            sub.restore(full)
+
+    def test_batches_split_by_bytes(self):
+        with mock.patch.object(pcap_reader, 'MAX_BATCH_BYTES', 500):
+            batches = list(PcapEngine(self.path, use_index=False).iter_batches(batch_size=64))
+        self.assertGreater(len(batches), 2)
+        self.assertTrue(all(len(b.data) <= 500 for b in batches))
+        self.assertEqual([int(n) for b in batches for n in b.packet_no], list(range(1, 101)))
+        self.assertEqual([bytes(b.packet(i)) for b in batches for i in range(len(b))],
+                         [frame(i) for i in range(100)])
+
+    def test_peak_rss(self):
+        peak = memory.peak_rss_mb()
+        if peak is None:
+            self.assertEqual(memory.format_peak_rss(), 'Peak RSS: n/a')
+        else:
+            self.assertGreater(peak, 0)
+            self.assertTrue(memory.format_peak_rss().startswith('Peak RSS: '))
+
+
+if __name__ == '__main__':
+    unittest.main()
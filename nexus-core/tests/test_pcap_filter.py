@@ -0,0 +1,114 @@
+import os
+import sys
+import shutil
+import tempfile
+import unittest
+
+# Add project root to path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from unittest import mock
+
+from nexus_core import pcap_reader
+from nexus_core.pcap_reader import PcapEngine
+from nexus_core.pcap_filter import PacketFilter
+from nexus_core.decoders import decode_dot11, decode_ip
+from helpers import AP, STA, LINKTYPE_ETHERNET, LINKTYPE_RADIOTAP, build_pcap, qos_data, block_ack, udp_packet
+
+try:
+    import scapy.all  # noqa: F401
+    HAS_SCAPY = True
+except ImportError:
+    HAS_SCAPY = False
+
+OTHER = bytes.fromhex('020000000001')
+
+
+class TestPacketFilter(unittest.TestCase):
+    def setUp(self):
+        self.test_dir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.test_dir, ignore_errors=True)
+
+    def write(self, name, frames, linktype):
+        path = os.path.join(self.test_dir, name)
+        with open(path, 'wb') as f:
+            f.write(build_pcap(frames, linktype))
+        return path
+
+    def air_capture(self):
+        frames = [qos_data(AP, STA, 5), qos_data(AP, STA, 3), block_ack(STA, AP),
+                  qos_data(OTHER, OTHER, 5), block_ack(OTHER, OTHER)] * 4
+        return self.write('air.pcap', [(1000 * i, f) for i, f in enumerate(frames)], LINKTYPE_RADIOTAP)
+
+    def test_mac_and_tid(self):
+        path = self.air_capture()
+        cols = PcapEngine(path).decode(decode_dot11, packet_filter=PacketFilter(macs=['00:11:22:33:44:55']))
+        self.assertEqual(list(cols['packet_no'][:3]), [1, 2, 3])
+        self.assertEqual(list(cols['packet_no'][3:6]), [6, 7, 8])
+        self.assertEqual(len(cols['packet_no']), 12)
+
+        cols = PcapEngine(path).decode(decode_dot11, packet_filter=PacketFilter(macs=[STA.hex(':')], tid=5))
+        # BlockAck 没有 QoS Control, 不受 TID 条件影响
+        self.assertEqual(list(cols['packet_no'][:2]), [1, 3])
+        self.assertEqual(set(cols['tid'].tolist()), {5, -1})
+
+    def test_time_range(self):
+        path = self.air_capture()
+        engine = PcapEngine(path)
+        batches = list(engine.iter_batches(batch_size=4, packet_filter=PacketFilter(t0_ns=3000000, t1_ns=9000000)))
+        numbers = [int(n) for b in batches for n in b.packet_no]
+        self.assertEqual(numbers, list(range(4, 10)))
+        self.assertEqual(batches[0].first_index, 3)
+
+        cols = engine.decode(decode_dot11, packet_filter=PacketFilter(t0_ns=3000000, t1_ns=9000000, macs=[AP.hex(':')]))
+        self.assertEqual(list(cols['packet_no']), [6, 7, 8])
+
+    def test_udp_ports_and_ip_pair(self):
+        frames = [udp_packet([10, 0, 0, 1], [10, 0, 0, 2], 5000, 6000),
+                  udp_packet([10, 0, 0, 2], [10, 0, 0, 1], 6000, 5000),
+                  udp_packet([10, 0, 0, 3], [10, 0, 0, 2], 5000, 7000),
+                  udp_packet([10, 0, 0, 1], [10, 0, 0, 2], 53, 53)]
+        path = self.write('wire.pcap', [(i, f) for i, f in enumerate(frames)], LINKTYPE_ETHERNET)
+        engine = PcapEngine(path)
+
+        def numbers(**kwargs):
+            return list(engine.decode(decode_ip, packet_filter=PacketFilter(**kwargs)).get('packet_no', []))
+
+        self.assertEqual(numbers(udp_ports=[5000]), [1, 2, 3])
+        self.assertEqual(numbers(sport=5000, dport=6000), [1])
+        self.assertEqual(numbers(ip_pair=('10.0.0.2', '10.0.0.1')), [1, 2, 4])
+        self.assertEqual(numbers(ip_pair=('10.0.0.1', '10.0.0.2'), udp_ports=[53]), [4])
+        self.assertEqual(numbers(sport=1), [])
+
+    def test_parallel_matches_sequential(self):
+        path = self.air_capture()
+        flt = PacketFilter(t0_ns=2000000, macs=[STA.hex(':')])
+        expected = PcapEngine(path).decode(decode_dot11, packet_filter=flt)
+        with mock.patch.object(pcap_reader, 'MIN_SHARD_BYTES', 1):
+            cols = PcapEngine(path).decode(decode_dot11, packet_filter=flt, jobs=3)
+        self.assertEqual(list(cols['packet_no']), list(expected['packet_no']))
+
+    def test_stream_packets_raw(self):
+        path = self.air_capture()
+        rows = list(PcapEngine(path, mode='raw').stream_packets(PacketFilter(macs=[OTHER.hex(':')])))
+        self.assertEqual(len(rows), 8)
+        self.assertEqual(bytes(rows[0][4]), qos_data(OTHER, OTHER, 5))
+        self.assertEqual(rows[0][0], 3000000)
+
+    @unittest.skipUnless(HAS_SCAPY, "scapy not installed")
+    def test_stream_packets_scapy(self):
+        from scapy.all import Dot11, PcapReader
+        path = self.air_capture()
+        flt = PacketFilter(macs=[AP.hex(':')], tid=3)
+        pkts = list(PcapEngine(path).stream_packets(flt))
+        with PcapReader(path) as reader:
+            expected = [p for i, p in enumerate(reader) if i % 5 in (1, 2)]
+        self.assertEqual([bytes(p) for p in pkts], [bytes(p) for p in expected])
+        self.assertEqual([p.time for p in pkts], [p.time for p in expected])
+        self.assertTrue(pkts[0].haslayer(Dot11))
+
+
+if __name__ == '__main__':
+    unittest.main()
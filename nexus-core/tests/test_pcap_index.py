@@ -0,0 +1,140 @@
+import os
+import sys
+import struct
+import shutil
+import tempfile
+import unittest
+
+# Add project root to path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from unittest import mock
+
+import numpy as np
+
+from nexus_core import pcap_reader
+from nexus_core.pcap_reader import PcapEngine
+from nexus_core.pcap_index import PacketIndex, index_path
+from nexus_core.decoders.common import record_columns
+from helpers import LINKTYPE_ETHERNET, build_pcap
+
+
+def _block(block_type, body):
+    body += b'\x00' * (-len(body) % 4)
+    return struct.pack('<II', block_type, 12 + len(body)) + body + struct.pack('<I', 12 + len(body))
+
+
+def pcapng_section(linktypes, packets):
+    """One section: SHB + one IDB per link type + EPBs of (iface, ts_usec, data)."""
+    out = [_block(0x0A0D0D0A, struct.pack('<IHHq', 0x1A2B3C4D, 1, 0, -1))]
+    out += [_block(1, struct.pack('<HHI', lt, 0, 65535)) for lt in linktypes]
+    for iface, ts, data in packets:
+        out.append(_block(6, struct.pack('<IIIII', iface, ts >> 32, ts & 0xFFFFFFFF,
+                                         len(data), len(data)) + data))
+    return b''.join(out)
+
+
+def frame(i):
+    return bytes([i % 256]) * (20 + i % 5)
+
+
+class TestPacketIndex(unittest.TestCase):
+    def setUp(self):
+        self.test_dir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.test_dir, ignore_errors=True)
+
+    def write(self, name, content):
+        path = os.path.join(self.test_dir, name)
+        with open(path, 'wb') as f:
+            f.write(content)
+        return path
+
+    def test_built_by_full_pass_and_reused(self):
+        path = self.write('a.pcap', build_pcap([(1000 * i, frame(i)) for i in range(10)], LINKTYPE_ETHERNET))
+        list(PcapEngine(path).iter_batches(batch_size=3))
+        self.assertTrue(os.path.exists(index_path(path)))
+
+        with mock.patch.object(pcap_reader, '_walk', side_effect=AssertionError('walked')):
+            index = PcapEngine(path).load_index()
+        self.assertEqual(len(index), 10)
+        self.assertEqual(list(index.ts_ns), [1000000 * i for i in range(10)])
+
+    def test_no_index_written_when_disabled_or_interrupted(self):
+        path = self.write('a.pcap', build_pcap([(i, frame(i)) for i in range(10)], LINKTYPE_ETHERNET))
+        list(PcapEngine(path, use_index=False).iter_batches(batch_size=3))
+        next(PcapEngine(path).iter_batches(batch_size=3))
+        self.assertFalse(os.path.exists(index_path(path)))
+
+    def test_invalidated_when_capture_changes(self):
+        path = self.write('a.pcap', build_pcap([(i, frame(i)) for i in range(4)], LINKTYPE_ETHERNET))
+        self.assertEqual(len(PcapEngine(path).index()), 4)
+        self.write('a.pcap', build_pcap([(i, frame(i)) for i in range(6)], LINKTYPE_ETHERNET))
+        engine = PcapEngine(path)
+        self.assertIsNone(engine.load_index())
+        self.assertEqual(len(engine.index()), 6)
+
+    def test_random_access_and_seek(self):
+        packets = [(1000 * i, frame(i)) for i in range(50)]
+        path = self.write('a.pcap', build_pcap(packets, LINKTYPE_ETHERNET))
+        engine = PcapEngine(path)
+        ts_ns, caplen, _, linktype, data = engine.packet(17)
+        self.assertEqual((ts_ns, caplen, linktype, data), (16000000, len(frame(16)), 1, frame(16)))
+        with self.assertRaises(IndexError):
+            engine.packet(51)
+
+        batches = list(engine.iter_batches(batch_size=4, start=10, stop=21))
+        self.assertEqual([b.first_index for b in batches], [10, 14, 18])
+        self.assertEqual([bytes(b.packet(i)) for b in batches for i in range(len(b))],
+                         [frame(i) for i in range(10, 21)])
+        self.assertEqual(list(batches[-1].packet_no), [19, 20, 21])
+
+        start, stop = engine.packet_range(20000000, 25000000)
+        self.assertEqual((start, stop), (20, 25))
+        self.assertEqual(engine.packet_range(10 ** 12), (50, 50))
+
+    def test_time_range_unsorted(self):
+        ts = np.array([5, 1, 9, 3, 7, 2, 8, 6, 4, 10], dtype=np.int64)
+        index = PacketIndex(np.arange(10, dtype=np.uint64), ts, {}, stride=3)
+        for t0, t1 in [(3, 6), (0, 100), (9, 11), (11, 20), (4, 5)]:
+            start, stop = index.time_range(t0, t1)
+            inside = np.flatnonzero((ts >= t0) & (ts < t1))
+            if len(inside):
+                self.assertLessEqual(start, inside[0])
+                self.assertGreater(stop, inside[-1])
+
+        index = PacketIndex(np.arange(10, dtype=np.uint64), np.sort(ts), {}, stride=3)
+        self.assertEqual(index.time_range(3, 6), (2, 5))
+
+    def test_multi_section_pcapng(self):
+        content = (pcapng_section([1], [(0, 1, frame(1)), (0, 2, frame(2))])
+                   + pcapng_section([105, 127], [(1, 3, frame(3)), (0, 4, frame(4))]))
+        path = self.write('a.pcapng', content)
+        engine = PcapEngine(path)
+        self.assertEqual(engine.packet(3)[3], 127)
+        self.assertEqual(engine.packet(4)[3], 105)
+
+        (batch,) = engine.iter_batches(start=1)
+        self.assertEqual(list(batch.linktype), [1, 127, 105])
+        self.assertEqual(list(engine.iter_slices([2, 4], [0, 0], [3, 3])), [frame(2)[:3], frame(4)[:3]])
+
+    def test_parallel_plan_from_index(self):
+        path = self.write('a.pcap', build_pcap([(i, frame(i)) for i in range(200)], LINKTYPE_ETHERNET))
+        engine = PcapEngine(path)
+        engine.index()
+        with mock.patch.object(pcap_reader, 'MIN_SHARD_BYTES', 1), \
+                mock.patch.object(pcap_reader, '_plan_shards', side_effect=AssertionError('walked')):
+            shards = engine._shards(4)
+        self.assertEqual(len(shards), 4)
+        expected = list(PcapEngine(path, use_index=False).iter_batches())
+        cols = [record_columns(b) for b in expected][0]
+        self.assertEqual([s[2] for s in shards][0], 0)
+        self.assertEqual(shards[-1][1], os.path.getsize(path))
+        for (_, end, _, _), (start, _, first, _) in zip(shards, shards[1:]):
+            self.assertEqual(end, start)
+            self.assertEqual(start, int(cols['offset'][first]))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,282 @@
+import os
+import sys
+import struct
+import shutil
+import tempfile
+import unittest
+
+# Add project root to path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from unittest import mock
+
+import numpy as np
+
+from nexus_core import pcap_reader
+from nexus_core.pcap_reader import PcapEngine, PcapFormatError
+from nexus_core.decoders.common import record_columns
+from nexus_core.pcap_filter import PacketFilter
+from helpers import udp_packet
+
+try:
+    import scapy.all  # noqa: F401
+    HAS_SCAPY = True
+except ImportError:
+    HAS_SCAPY = False
+
+LINKTYPE_ETHERNET = 1
+
+
+def build_pcap(packets, linktype=LINKTYPE_ETHERNET, nanosecond=False, endian='<'):
+    """packets: list of (ts_sec, ts_frac, data)"""
+    magic = 0xA1B23C4D if nanosecond else 0xA1B2C3D4
+    out = [struct.pack(endian + 'IHHiIII', magic, 2, 4, 0, 0, 65535, linktype)]
+    for sec, frac, data in packets:
+        out.append(struct.pack(endian + 'IIII', sec, frac, len(data), len(data) + 4))
+        out.append(data)
+    return b''.join(out)
+
+
+def _pad4(data):
+    return data + b'\x00' * (-len(data) % 4)
+
+
+def build_pcapng(packets, linktype=LINKTYPE_ETHERNET):
+    """packets: list of (ts_usec, data)"""
+    shb_body = struct.pack('<IHHq', 0x1A2B3C4D, 1, 0, -1)
+    out = [struct.pack('<II', 0x0A0D0D0A, 12 + len(shb_body)) + shb_body + struct.pack('<I', 12 + len(shb_body))]
+    idb_body = struct.pack('<HHI', linktype, 0, 65535)
+    out.append(struct.pack('<II', 1, 12 + len(idb_body)) + idb_body + struct.pack('<I', 12 + len(idb_body)))
+    for ts, data in packets:
+        body = struct.pack('<IIIII', 0, ts >> 32, ts & 0xFFFFFFFF, len(data), len(data)) + _pad4(data)
+        out.append(struct.pack('<II', 6, 12 + len(body)) + body + struct.pack('<I', 12 + len(body)))
+    return b''.join(out)
+
+
+def ether_frame(i):
+    return b'\xff' * 6 + b'\x00\x11\x22\x33\x44\x55' + b'\x08\x06' + bytes([i % 256]) * (28 + i % 7)
+
+
+class TestRawReader(unittest.TestCase):
+    def setUp(self):
+        self.test_dir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.test_dir, ignore_errors=True)
+
+    def write(self, name, content):
+        path = os.path.join(self.test_dir, name)
+        with open(path, 'wb') as f:
+            f.write(content)
+        return path
+
+    def test_pcap_usec(self):
+        frames = [(1700000000 + i, i * 1000, ether_frame(i)) for i in range(5)]
+        path = self.write('a.pcap', build_pcap(frames))
+        records = [(ts, caplen, wirelen, lt, bytes(mv)) for ts, caplen, wirelen, lt, mv in PcapEngine(path, mode='raw').iter_raw()]
+
+        self.assertEqual(len(records), 5)
+        ts, caplen, wirelen, lt, data = records[3]
+        self.assertEqual(ts, (1700000003 * 1000000 + 3000) * 1000)
+        self.assertEqual(caplen, len(frames[3][2]))
+        self.assertEqual(wirelen, caplen + 4)
+        self.assertEqual(lt, LINKTYPE_ETHERNET)
+        self.assertEqual(data, frames[3][2])
+
+    def test_pcap_nsec_big_endian(self):
+        frames = [(10, 123456789, ether_frame(1))]
+        path = self.write('b.pcap', build_pcap(frames, nanosecond=True, endian='>'))
+        (ts, _, _, _, mv), = list(PcapEngine(path, mode='raw').stream_packets())
+        self.assertEqual(ts, 10 * 1000000000 + 123456789)
+        self.assertEqual(bytes(mv), frames[0][2])
+
+    def test_pcapng(self):
+        frames = [(1700000000000000 + i * 250, ether_frame(i)) for i in range(4)]
+        path = self.write('c.pcapng', build_pcapng(frames, linktype=127))
+        records = list(PcapEngine(path, mode='raw').iter_raw())
+        self.assertEqual([r[0] for r in records], [ts * 1000 for ts, _ in frames])
+        self.assertEqual([r[3] for r in records], [127] * 4)
+        self.assertEqual([bytes(r[4]) for r in records], [d for _, d in frames])
+
+    def test_truncated_tail_is_ignored(self):
+        content = build_pcap([(1, 0, ether_frame(0)), (2, 0, ether_frame(1))])
+        path = self.write('d.pcap', content[:-5])
+        self.assertEqual(len(list(PcapEngine(path, mode='raw').iter_raw())), 1)
+
+    def test_bad_magic(self):
+        path = self.write('e.pcap', b'\x00' * 64)
+        with self.assertRaises(PcapFormatError):
+            list(PcapEngine(path, mode='raw').iter_raw())
+
+    def test_iter_batches(self):
+        frames = [(1700000000 + i, i, ether_frame(i)) for i in range(10)]
+        path = self.write('g.pcap', build_pcap(frames))
+        batches = list(PcapEngine(path).iter_batches(batch_size=4))
+
+        self.assertEqual([len(b) for b in batches], [4, 4, 2])
+        self.assertEqual(batches[1].first_index, 4)
+        self.assertEqual(list(batches[2].packet_no), [9, 10])
+        self.assertEqual(batches[0].data.size, sum(len(d) for _, _, d in frames[:4]))
+        for b in batches:
+            for i in range(len(b)):
+                sec, frac, data = frames[b.first_index + i]
+                self.assertEqual(bytes(b.packet(i)), data)
+                self.assertEqual(int(b.ts_ns[i]), sec * 10**9 + frac * 1000)
+        # 第一条记录紧跟在 24 字节的全局头之后
+        self.assertEqual(int(batches[0].offset[0]), 24)
+
+    def test_iter_batches_snaplen(self):
+        frames = [(1, 0, ether_frame(i)) for i in range(3)]
+        path = self.write('h.pcap', build_pcap(frames))
+        (batch,) = list(PcapEngine(path).iter_batches(snaplen=16))
+        self.assertEqual(list(batch.records['buf_len']), [16, 16, 16])
+        self.assertEqual(list(batch.caplen), [len(d) for _, _, d in frames])
+        self.assertEqual(bytes(batch.packet(2)), frames[2][2][:16])
+
+    @unittest.skipUnless(HAS_SCAPY, "scapy not installed")
+    def test_matches_scapy(self):
+        frames = [(1700000000 + i, i * 7, ether_frame(i)) for i in range(20)]
+        path = self.write('f.pcap', build_pcap(frames))
+        raw = list(PcapEngine(path, mode='raw').iter_raw())
+        pkts = list(PcapEngine(path).stream_packets())
+        self.assertEqual(len(raw), len(pkts))
+        for (ts, caplen, _, _, mv), pkt in zip(raw, pkts):
+            self.assertEqual(bytes(mv), bytes(pkt))
+            self.assertAlmostEqual(ts / 1e9, float(pkt.time), places=6)
+
+    @unittest.skipUnless(HAS_SCAPY, "scapy not installed")
+    def test_scapy_port_layers(self):
+        # 绑定在端口上的应用层 (此处 UDP/53 的 DNS) 与 scapy.all 的解析一致, 不退化为 Raw
+        from scapy.all import rdpcap
+        from scapy.layers.dns import DNS
+        query = (struct.pack('>HHHHHH', 0x1234, 0x0100, 1, 0, 0, 0)
+                 + b'\x03www\x07example\x03com\x00' + struct.pack('>HH', 1, 1))
+        frames = [(1700000000, 0, udp_packet([10, 0, 0, 1], [10, 0, 0, 53], 5353, 53, payload=query))]
+        path = self.write('dns.pcap', build_pcap(frames))
+        expected = [p.summary() for p in rdpcap(path)]
+        for packet_filter in (None, PacketFilter(dport=53)):
+            pkts = list(PcapEngine(path).stream_packets(packet_filter))
+            self.assertEqual([p.summary() for p in pkts], expected)
+            self.assertEqual(pkts[0][DNS].qd[0].qname, b'www.example.com.')
+
+
+def ng_block(block_type, body, endian='<'):
+    body = _pad4(body)
+    return struct.pack(endian + 'II', block_type, 12 + len(body)) + body + struct.pack(endian + 'I', 12 + len(body))
+
+
+def ng_shb(endian='<'):
+    return ng_block(0x0A0D0D0A, struct.pack(endian + 'IHHq', 0x1A2B3C4D, 1, 0, -1), endian)
+
+
+def ng_idb(linktype, tsresol=None, tsoffset=None, endian='<'):
+    options = b''
+    if tsresol is not None:
+        options += struct.pack(endian + 'HH', 9, 1) + _pad4(bytes([tsresol]))
+    if tsoffset is not None:
+        options += struct.pack(endian + 'HHq', 14, 8, tsoffset)
+    if options:
+        options += struct.pack(endian + 'HH', 0, 0)
+    return ng_block(1, struct.pack(endian + 'HHI', linktype, 0, 65535) + options, endian)
+
+
+def ng_epb(iface, ts, data, endian='<'):
+    return ng_block(6, struct.pack(endian + 'IIIII', iface, ts >> 32, ts & 0xFFFFFFFF,
+                                   len(data), len(data) + 10) + data, endian)
+
+
+class TestPcapng(unittest.TestCase):
+    def setUp(self):
+        self.test_dir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.test_dir, ignore_errors=True)
+
+    def read(self, content):
+        path = os.path.join(self.test_dir, 'x.pcapng')
+        with open(path, 'wb') as f:
+            f.write(content)
+        (batch,) = list(PcapEngine(path).iter_batches())
+        return batch
+
+    def test_interfaces_and_tsresol(self):
+        content = (ng_shb() + ng_idb(127, tsresol=9) + ng_idb(1, tsresol=0x80 | 10, tsoffset=100)
+                   + ng_block(4, b'\x00' * 8)           # Name Resolution Block: 跳过
+                   + ng_epb(0, 1700000000123456789, b'air')
+                   + ng_block(0x0BAD, b'\x01' * 13)      # 未知块: 按长度跳过
+                   + ng_epb(1, 3 * 1024 + 512, b'wire!')
+                   + ng_epb(7, 5, b'?'))                # 未声明的接口
+        batch = self.read(content)
+        self.assertEqual(list(batch.linktype), [127, 1, 0])
+        self.assertEqual(list(batch.interface_id), [0, 1, 7])
+        self.assertEqual(list(batch.ts_ns), [1700000000123456789, 100 * 10**9 + 3 * 10**9 + 500000000, 5000])
+        self.assertEqual(list(batch.records['wirelen']), [13, 15, 11])
+        self.assertEqual([bytes(batch.packet(i)) for i in range(3)], [b'air', b'wire!', b'?'])
+        self.assertEqual(list(record_columns(batch)['interface_id']), [0, 1, 7])
+
+    def test_multiple_sections_and_endianness(self):
+        content = (ng_shb() + ng_idb(105) + ng_epb(0, 2, b'first')
+                   + ng_shb('>') + ng_idb(1, tsresol=3, endian='>') + ng_idb(127, endian='>')
+                   + ng_epb(1, 7, b'second', endian='>') + ng_epb(0, 7, b'third', endian='>'))
+        batch = self.read(content)
+        self.assertEqual(list(batch.linktype), [105, 127, 1])
+        self.assertEqual(list(batch.ts_ns), [2000, 7000, 7000000])
+        self.assertEqual(bytes(batch.packet(2)), b'third')
+
+    def test_simple_and_obsolete_packet_blocks(self):
+        spb = ng_block(3, struct.pack('<I', 9) + b'simple!!!')
+        pb = ng_block(2, struct.pack('<HHIIII', 0, 0, 0, 1500, 4, 4) + b'old!')
+        batch = self.read(ng_shb() + ng_idb(1, tsresol=3) + spb + pb)
+        self.assertEqual([bytes(batch.packet(i)) for i in range(2)], [b'simple!!!', b'old!'])
+        self.assertEqual(list(batch.ts_ns), [0, 1500 * 10**6])
+        self.assertEqual(list(batch.linktype), [1, 1])
+
+
+class TestParallelDecode(unittest.TestCase):
+    def setUp(self):
+        self.test_dir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.test_dir, ignore_errors=True)
+
+    def write(self, name, content):
+        path = os.path.join(self.test_dir, name)
+        with open(path, 'wb') as f:
+            f.write(content)
+        return path
+
+    def assert_same_as_sequential(self, path):
+        sequential = PcapEngine(path).decode(record_columns, batch_size=7, jobs=1)
+        # 强制每个分片只有几百字节
+        with mock.patch.object(pcap_reader, 'MIN_SHARD_BYTES', 1):
+            parallel = PcapEngine(path).decode(record_columns, batch_size=7, jobs=3)
+        self.assertEqual(sorted(parallel), sorted(sequential))
+        for key in sequential:
+            np.testing.assert_array_equal(parallel[key], sequential[key])
+
+    def test_pcap(self):
+        frames = [(1700000000 + i, i, ether_frame(i)) for i in range(100)]
+        self.assert_same_as_sequential(self.write('p.pcap', build_pcap(frames)))
+
+    def test_pcapng(self):
+        frames = [(1700000000000000 + i, ether_frame(i)) for i in range(100)]
+        self.assert_same_as_sequential(self.write('p.pcapng', build_pcapng(frames)))
+
+    def test_plan_is_record_aligned(self):
+        frames = [(1, 0, ether_frame(i)) for i in range(50)]
+        path = self.write('q.pcap', build_pcap(frames))
+        offsets = set(PcapEngine(path).decode(record_columns)['offset'].tolist())
+        with open(path, 'rb') as f:
+            buf = f.read()
+        shards = pcap_reader._plan_shards(buf, pcap_reader._detect_format(buf), 4)
+
+        self.assertEqual(len(shards), 4)
+        self.assertEqual(shards[-1][1], len(buf))
+        for (start, end, first, _), nxt in zip(shards, shards[1:] + [None]):
+            self.assertIn(start, offsets)
+            if nxt is not None:
+                self.assertEqual(end, nxt[0])
+
+
+if __name__ == '__main__':
+    unittest.main()
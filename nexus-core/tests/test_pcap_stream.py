@@ -0,0 +1,106 @@
+import os
+import sys
+import gzip
+import struct
+import shutil
+import tempfile
+import unittest
+
+# Add project root to path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from unittest import mock
+
+from nexus_core import pcap_stream
+from nexus_core.pcap_reader import PcapEngine
+from nexus_core.pcap_filter import PacketFilter
+from nexus_core.decoders import decode_ip
+from helpers import LINKTYPE_ETHERNET, build_pcap
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+try:
+    import lz4.frame as lz4_frame
+except ImportError:
+    lz4_frame = None
+
+
+def udp_frame(i):
+    payload = bytes([i % 256]) * (10 + i % 40)
+    udp = struct.pack('>HHHH', 5000 + i % 3, 6000, 8 + len(payload), 0) + payload
+    ip = struct.pack('>BBHHHBBH4s4s', 0x45, 0, 20 + len(udp), 0, 0, 64, 17, 0,
+                     bytes([10, 0, 0, 1]), bytes([10, 0, 0, 2]))
+    return b'\xff' * 6 + b'\x00\x11\x22\x33\x44\x55' + b'\x08\x00' + ip + udp
+
+
+class TestCompressedCaptures(unittest.TestCase):
+    def setUp(self):
+        self.test_dir = tempfile.mkdtemp()
+        self.content = build_pcap([udp_frame(i) for i in range(300)], LINKTYPE_ETHERNET, start=1700000000)
+        self.plain = self.write('plain.pcap', self.content)
+        # 小块预读, 让记录跨越块边界
+        patcher = mock.patch.object(pcap_stream, 'READ_AHEAD_CHUNK', 1000)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def tearDown(self):
+        shutil.rmtree(self.test_dir, ignore_errors=True)
+
+    def write(self, name, content):
+        path = os.path.join(self.test_dir, name)
+        with open(path, 'wb') as f:
+            f.write(content)
+        return path
+
+    def assert_same_as_plain(self, path):
+        engine = PcapEngine(path)
+        expected = PcapEngine(self.plain).decode(decode_ip)
+        cols = engine.decode(decode_ip, batch_size=64)
+        self.assertEqual(set(cols), set(expected))
+        for key in expected:
+            self.assertEqual(cols[key].tolist(), expected[key].tolist(), key)
+
+        raw = [(r[0], bytes(r[4])) for r in PcapEngine(path, mode='raw').iter_raw()]
+        self.assertEqual(raw, [(r[0], bytes(r[4])) for r in PcapEngine(self.plain, mode='raw').iter_raw()])
+
+    def test_gzip(self):
+        path = self.write('a.pcap.gz', gzip.compress(self.content))
+        engine = PcapEngine(path)
+        self.assertEqual(engine.compression, 'gzip')
+        self.assert_same_as_plain(path)
+
+        batches = list(engine.iter_batches(start=100, stop=103))
+        self.assertEqual([int(n) for b in batches for n in b.packet_no], [101, 102, 103])
+        self.assertEqual(list(engine.iter_slices([2, 250], [0, 0], [14, 14])),
+                         [udp_frame(1)[:14], udp_frame(249)[:14]])
+
+        cols = engine.decode(decode_ip, packet_filter=PacketFilter(sport=5001))
+        self.assertEqual(cols['packet_no'].tolist(), list(range(2, 301, 3)))
+
+        with self.assertRaises(ValueError):
+            engine.packet(1)
+        self.assertFalse(os.path.exists(path + '.nxidx'))
+
+    def test_corrupt_stream(self):
+        path = self.write('bad.pcap.gz', gzip.compress(self.content)[:-300] + b'\x00' * 300)
+        with self.assertRaises(Exception):
+            list(PcapEngine(path).iter_batches())
+
+    @unittest.skipUnless(zstandard, "zstandard not installed")
+    def test_zstd(self):
+        path = self.write('a.pcap.zst', zstandard.ZstdCompressor().compress(self.content))
+        self.assertEqual(PcapEngine(path).compression, 'zstd')
+        self.assert_same_as_plain(path)
+
+    @unittest.skipUnless(lz4_frame, "lz4 not installed")
+    def test_lz4(self):
+        path = self.write('a.pcap.lz4', lz4_frame.compress(self.content))
+        self.assertEqual(PcapEngine(path).compression, 'lz4')
+        self.assert_same_as_plain(path)
+
+
+if __name__ == '__main__':
+    unittest.main()
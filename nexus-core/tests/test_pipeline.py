@@ -0,0 +1,196 @@
+import io
+import os
+import sys
+import json
+import shutil
+import tempfile
+import unittest
+
+# Add project root to path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from contextlib import redirect_stdout
+from unittest import mock
+
+import numpy as np
+
+from nexus_core import cli, pcap_reader
+from nexus_core.database import DatabaseManager
+from nexus_core.decode_cache import DecodeCache, CACHE_DIRNAME
+from nexus_core.engine import Pipeline, Subscriber
+from nexus_core.memory import MemoryLimitError
+from nexus_core.pcap_reader import PcapEngine
+from nexus_core.decoders import decode_dot11, decode_ip, DOT11_SNAPLEN, IP_SNAPLEN
+from helpers import AP, STA, build_pcap, qos_data, block_ack
+
+
+def select_ba(cols):
+    return cols['is_ba']
+
+
+def select_tid(cols):
+    return cols['tid'] == 3
+
+
+class Order(Subscriber):
+    """流式订阅者: 记录收到的包序号 (检验按文件顺序交付)"""
+
+    def __init__(self):
+        super().__init__(decode_dot11, ('packet_no',), snaplen=DOT11_SNAPLEN)
+        self.numbers = []
+
+    def on_batch(self, cols):
+        self.numbers += cols['packet_no'].tolist()
+
+    def finish(self):
+        return self.numbers
+
+
+class Counter(Subscriber):
+    """流式订阅者: 只累计, 不保留行"""
+
+    def __init__(self):
+        super().__init__(decode_dot11, ('caplen',), snaplen=DOT11_SNAPLEN)
+        self.batches = 0
+        self.total = 0
+
+    def on_batch(self, cols):
+        self.batches += 1
+        self.total += int(cols['caplen'].sum())
+
+    def finish(self):
+        return self.batches, self.total
+
+
+class TestPipeline(unittest.TestCase):
+    def setUp(self):
+        self.test_dir = tempfile.mkdtemp()
+        frames = [qos_data(AP, STA, i % 4, i) if i % 3 else block_ack(STA, AP) for i in range(30)]
+        self.path = os.path.join(self.test_dir, 'air.pcap')
+        with open(self.path, 'wb') as f:
+            f.write(build_pcap(frames))
+
+    def tearDown(self):
+        shutil.rmtree(self.test_dir, ignore_errors=True)
+
+    def test_matches_separate_decodes(self):
+        pipe = Pipeline(self.path)
+        pipe.subscribe('ba', decode_dot11, ('packet_no', 'ba_ssn'), select=select_ba, snaplen=DOT11_SNAPLEN)
+        pipe.subscribe('tid', decode_dot11, ('packet_no', 'seq'), report=lambda cols: list(cols['seq']),
+                       select=select_tid, snaplen=DOT11_SNAPLEN)
+        pipe.subscribe('ip', decode_ip, ('is_ip',), snaplen=IP_SNAPLEN)
+        reports = pipe.run(batch_size=7)
+
+        expected = PcapEngine(self.path).decode(decode_dot11, snaplen=DOT11_SNAPLEN, select=select_ba)
+        self.assertEqual(sorted(reports['ba']), ['ba_ssn', 'packet_no'])
+        for column in ('packet_no', 'ba_ssn'):
+            np.testing.assert_array_equal(reports['ba'][column], expected[column])
+        self.assertEqual(list(reports['ba']['packet_no']), list(range(1, 31, 3)))
+        self.assertEqual(reports['tid'], [7, 11, 19, 23])
+        self.assertFalse(reports['ip']['is_ip'].any())
+
+    def test_single_read_and_decode(self):
+        pipe = Pipeline(self.path)
+        decoder = mock.Mock(side_effect=decode_dot11)
+        pipe.subscribe('a', decoder, ('seq',))
+        pipe.subscribe('b', decoder, ('tid',), select=select_tid)
+        pipe.subscribe('count', Counter())
+        with mock.patch.object(PcapEngine, 'iter_batches', autospec=True,
+                               side_effect=PcapEngine.iter_batches) as iter_batches:
+            reports = pipe.run(batch_size=10)
+        self.assertEqual(iter_batches.call_count, 1)
+        # snaplen=None 的订阅者需要完整包
+        self.assertIsNone(iter_batches.call_args[0][2])
+        self.assertEqual(decoder.call_count, 3)
+        self.assertEqual(len(reports['a']['seq']), 30)
+        self.assertEqual(reports['count'], (3, sum(len(qos_data(AP, STA, 0)) if i % 3 else len(block_ack(STA, AP))
+                                                   for i in range(30))))
+
+    def test_duplicate_name(self):
+        pipe = Pipeline(self.path)
+        pipe.subscribe('a', decode_dot11, ('seq',))
+        with self.assertRaises(ValueError):
+            pipe.subscribe('a', decode_dot11, ('tid',))
+
+
+class TestPipelineEngineDefaults(unittest.TestCase):
+    """--jobs / 解码缓存 / --memory-limit 经由 PcapEngine 的进程默认值作用于 Pipeline"""
+
+    def setUp(self):
+        self.test_dir = tempfile.mkdtemp()
+        frames = [qos_data(AP, STA, i % 4, i % 4096) if i % 3 else block_ack(STA, AP) for i in range(40000)]
+        self.path = os.path.join(self.test_dir, 'air.pcap')
+        with open(self.path, 'wb') as f:
+            f.write(build_pcap(frames))
+        for name in ('default_jobs', 'default_cache', 'memory_limit'):
+            self.addCleanup(setattr, PcapEngine, name, getattr(PcapEngine, name))
+        self.addCleanup(setattr, DatabaseManager, 'default_backend', DatabaseManager.default_backend)
+
+    def tearDown(self):
+        shutil.rmtree(self.test_dir, ignore_errors=True)
+
+    def run_pipeline(self):
+        pipe = Pipeline(self.path)
+        pipe.subscribe('ba', decode_dot11, ('packet_no', 'ba_ssn'), select=select_ba, snaplen=DOT11_SNAPLEN)
+        pipe.subscribe('order', Order())
+        return pipe.run(batch_size=4096)
+
+    def test_jobs_and_cache(self):
+        expected = self.run_pipeline()
+        PcapEngine.default_jobs = 3
+        with mock.patch.object(pcap_reader, 'MIN_SHARD_BYTES', 64 * 1024), \
+                mock.patch.object(pcap_reader, 'ProcessPoolExecutor', wraps=pcap_reader.ProcessPoolExecutor) as pool:
+            reports = self.run_pipeline()
+        self.assertEqual(pool.call_count, 1)
+        self.assertEqual(reports['order'], list(range(1, 40001)))
+        np.testing.assert_array_equal(reports['ba']['packet_no'], expected['ba']['packet_no'])
+
+        PcapEngine.default_jobs = 1
+        cache = PcapEngine.default_cache = DecodeCache(os.path.join(self.test_dir, CACHE_DIRNAME))
+        self.run_pipeline()
+        self.assertEqual(len(cache.entries()), 2)
+        # 全部命中: 不再读取抓包
+        with mock.patch.object(PcapEngine, 'iter_batches', side_effect=AssertionError('read')):
+            reports = self.run_pipeline()
+        self.assertEqual(reports['order'], list(range(1, 40001)))
+        np.testing.assert_array_equal(reports['ba']['ba_ssn'], expected['ba']['ba_ssn'])
+
+    def cli(self, *args):
+        argv = ['nexus-core', 'analyze', '--input', self.path, '--no-progress'] + list(args)
+        with mock.patch.object(sys, 'argv', argv), redirect_stdout(io.StringIO()):
+            cli.main()
+
+    def summary(self, out):
+        with open(os.path.join(out, 'summary.json'), encoding='utf-8') as f:
+            summary = json.load(f)
+        return {k: v for k, v in summary.items() if k not in ('peak_rss_mb', 'trace')}
+
+    def test_cli_flags(self):
+        out = os.path.join(self.test_dir, 'ba')
+        self.cli('--plugin', 'wifi.ba', '--output', out)
+        expected = self.summary(out)
+        cache = DecodeCache(os.path.join(out, CACHE_DIRNAME))
+        self.assertEqual(len(cache.entries()), 2)
+
+        # 缓存命中, 不解析抓包
+        with mock.patch.object(PcapEngine, 'iter_batches', side_effect=AssertionError('read')):
+            self.cli('--plugin', 'wifi.ba', '--output', out)
+        self.assertEqual(self.summary(out), expected)
+
+        parallel = os.path.join(self.test_dir, 'ba_jobs')
+        with mock.patch.object(pcap_reader, 'MIN_SHARD_BYTES', 64 * 1024), \
+                mock.patch.object(pcap_reader, 'ProcessPoolExecutor', wraps=pcap_reader.ProcessPoolExecutor) as pool:
+            self.cli('--plugin', 'wifi.ba', '--output', parallel, '--jobs', '2', '--no-cache')
+        self.assertEqual(pool.call_count, 1)
+        self.assertEqual(self.summary(parallel), expected)
+        self.assertFalse(os.path.exists(os.path.join(parallel, CACHE_DIRNAME)))
+
+        # wifi.qos 收集每帧统计列: 1 MB 上限放不下 4 万帧
+        with self.assertRaises(SystemExit) as exit_:
+            self.cli('--plugin', 'wifi.qos', '--output', os.path.join(self.test_dir, 'qos'),
+                     '--memory-limit', '1', '--no-cache')
+        self.assertEqual(exit_.exception.code, 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,126 @@
+import os
+import sys
+import gzip
+import json
+import shutil
+import subprocess
+import tempfile
+import unittest
+
+# Add project root to path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from nexus_core.pcap_reader import PcapEngine, PROGRESS_RECORDS
+from nexus_core.progress import ProgressReporter, reporting, current, parse_line
+from helpers import build_pcap, qos_data
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+
+
+class TestProgress(unittest.TestCase):
+    def setUp(self):
+        self.test_dir = tempfile.mkdtemp()
+        self.events = []
+
+    def tearDown(self):
+        shutil.rmtree(self.test_dir)
+
+    def write(self, name, content):
+        path = os.path.join(self.test_dir, name)
+        with open(path, 'wb') as f:
+            f.write(content)
+        return path
+
+    def reporter(self, interval=0):
+        return ProgressReporter(emit=self.events.append, interval=interval)
+
+    def test_reporter_rates_and_rate_limit(self):
+        reporter = self.reporter(interval=3600)
+        reporter.begin('read', 1000, 200)
+        for offset in range(300, 1000, 100):
+            reporter.update(offset, offset // 10)
+        reporter.end()
+        # 间隔内的更新被合并: 只有开始与结束
+        self.assertEqual([e['progress'] for e in self.events], [0.0, 100.0])
+        last = self.events[-1]
+        self.assertEqual((last['stage'], last['bytes'], last['total_bytes'], last['packets'], last['eta_s']),
+                         ('read', 1000, 1000, 90, 0.0))
+        self.assertGreater(last['mb_per_s'], 0)
+
+        self.events.clear()
+        reporter = self.reporter()
+        reporter.begin('read', 1000)
+        reporter.update(250, 10)
+        self.assertEqual(self.events[-1]['progress'], 25.0)
+        self.assertIsNotNone(self.events[-1]['eta_s'])
+        reporter.set_stage('report')
+        self.assertEqual((self.events[-1]['stage'], self.events[-1]['progress']), ('report', None))
+
+        self.assertIsNone(parse_line('[*] log line'))
+        self.assertEqual(parse_line(json.dumps(self.events[0]) + '\n'), self.events[0])
+
+    def test_engine_reports_passes(self):
+        path = self.write('air.pcap', build_pcap([qos_data(seq=i) for i in range(100)]))
+        size = os.path.getsize(path)
+        engine = PcapEngine(path)
+        self.assertIsNone(current())
+        list(engine.iter_batches(batch_size=10))
+        self.assertEqual(self.events, [])
+
+        with reporting(self.reporter()):
+            self.assertEqual(sum(len(b) for b in engine.iter_batches(batch_size=10)), 100)
+        progress = [e['progress'] for e in self.events]
+        self.assertEqual(progress, sorted(progress))
+        self.assertEqual((progress[0], progress[-1]), (0.0, 100.0))
+        self.assertEqual(len(self.events), 12)
+        self.assertEqual((self.events[-2]['packets'], self.events[-1]['total_bytes']), (100, size))
+        self.assertEqual({e['stage'] for e in self.events}, {'read'})
+
+        # 续读: 只计新追加的部分
+        position = engine.position
+        with open(path, 'ab') as f:
+            f.write(build_pcap([qos_data(seq=i) for i in range(20)])[24:])
+        self.events.clear()
+        with reporting(self.reporter()):
+            list(engine.iter_batches(batch_size=10, resume=position))
+        self.assertEqual([e['packets'] for e in self.events], [0, 10, 20, 20])
+        self.assertEqual((self.events[0]['bytes'], self.events[-1]['progress']), (position.offset, 100.0))
+
+        # 实例上的 progress=False 优先于上下文
+        self.events.clear()
+        with reporting(self.reporter()):
+            list(PcapEngine(path, progress=False).iter_batches())
+        self.assertEqual(self.events, [])
+
+    def test_iter_raw_and_compressed(self):
+        frames = [qos_data(seq=i) for i in range(PROGRESS_RECORDS * 2 + 5)]
+        path = self.write('air.pcap', build_pcap(frames))
+        with reporting(self.reporter()):
+            self.assertEqual(sum(1 for _ in PcapEngine(path, mode='raw').iter_raw()), len(frames))
+        self.assertEqual([e['packets'] for e in self.events],
+                         [0, PROGRESS_RECORDS, PROGRESS_RECORDS * 2, len(frames), len(frames)])
+        self.assertEqual(self.events[-1]['progress'], 100.0)
+
+        # 压缩抓包: 总长度未知, 只有字节数与速率
+        gz = self.write('air.pcap.gz', gzip.compress(build_pcap(frames)))
+        self.events.clear()
+        with reporting(self.reporter()):
+            self.assertEqual(sum(len(b) for b in PcapEngine(gz).iter_batches()), len(frames))
+        self.assertTrue(all(e['progress'] is None and e['eta_s'] is None for e in self.events))
+        self.assertEqual(self.events[-1]['packets'], len(frames))
+
+    def test_cli_prints_json_progress(self):
+        path = self.write('air.pcap', build_pcap([qos_data(seq=i) for i in range(50)]))
+        cmd = [sys.executable, '-m', 'nexus_core.cli', 'analyze', '--plugin', 'wifi.ba', '--input', path,
+               '--output', os.path.join(self.test_dir, 'out')]
+        out = subprocess.run(cmd, cwd=ROOT, capture_output=True, text=True, check=True).stdout
+        events = [e for e in map(parse_line, out.splitlines()) if e]
+        self.assertIn(100.0, [e['progress'] for e in events if e['stage'] == 'read'])
+        self.assertEqual(events[-1]['stage'], 'report')
+
+        out = subprocess.run(cmd + ['--no-progress'], cwd=ROOT, capture_output=True, text=True, check=True).stdout
+        self.assertEqual([e for e in map(parse_line, out.splitlines()) if e], [])
+
+
+if __name__ == '__main__':
+    unittest.main()
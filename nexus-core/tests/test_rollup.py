@@ -0,0 +1,103 @@
+import os
+import sys
+import shutil
+import tempfile
+import unittest
+
+# Add project root to path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import numpy as np
+
+from nexus_core.rollup import Rollup, BASE_BIN_NS, choose_level, query_rollup, write_rollups
+
+try:
+    import pyarrow  # noqa: F401
+    HAS_PYARROW = True
+except ImportError:
+    HAS_PYARROW = False
+
+
+def brute_force(ts_ns, values, width):
+    bins = ts_ns // width
+    out = {}
+    for b in np.unique(bins):
+        v = values[bins == b]
+        out[int(b) * width] = (len(v), v.sum(), v.min(), v.max(), v.mean())
+    return out
+
+
+class TestRollup(unittest.TestCase):
+    def setUp(self):
+        self.test_dir = tempfile.mkdtemp()
+        rng = np.random.default_rng(1)
+        self.ts = 1700000000 * 10 ** 9 + np.sort(rng.integers(0, 5 * 10 ** 9, 5000))
+        self.values = rng.integers(0, 1500, 5000).astype(np.float64)
+
+    def tearDown(self):
+        shutil.rmtree(self.test_dir, ignore_errors=True)
+
+    def build(self, chunks=1):
+        rollup = Rollup(("bytes",))
+        # 批次乱序到达, 结果不受影响
+        for part in reversed(np.array_split(np.arange(len(self.ts)), chunks)):
+            rollup.update(self.ts[part], {"bytes": self.values[part]})
+        return rollup
+
+    def test_levels_match_brute_force(self):
+        levels = self.build(chunks=7).levels()
+        self.assertEqual(len(levels[-1]["bin"]), 1)
+        for k in (0, 3, 9):
+            lv = levels[k]
+            expected = brute_force(self.ts, self.values, BASE_BIN_NS << k)
+            self.assertEqual(lv["bin"].tolist(), sorted(expected))
+            got = zip(lv["count"], lv["bytes_sum"], lv["bytes_min"], lv["bytes_max"], lv["bytes_mean"])
+            for b, row in zip(lv["bin"], got):
+                np.testing.assert_allclose(row, expected[int(b)])
+
+        cols = self.build().columns()
+        self.assertEqual(cols["level"].tolist(), sorted(cols["level"].tolist()))
+        self.assertEqual(int(cols["count"][cols["level"] == 5].sum()), 5000)
+
+    def test_mask(self):
+        rollup = Rollup(("v",))
+        rollup.update([0, 1, 2 * BASE_BIN_NS], {"v": [1, 100, 3]}, mask=[True, False, True])
+        lv = rollup.levels()[0]
+        self.assertEqual(lv["bin"].tolist(), [0, 2 * BASE_BIN_NS])
+        self.assertEqual(lv["v_max"].tolist(), [1, 3])
+        self.assertEqual(Rollup(("v",)).levels(), [])
+
+    def test_choose_level(self):
+        # 1 s 窗口 1000 像素 -> 1 ms; 2 小时窗口 1000 像素 -> 7.2 s -> 4096 ms
+        self.assertEqual(choose_level(0, 10 ** 9, 1000, 40), 0)
+        self.assertEqual(choose_level(0, 7200 * 10 ** 9, 1000, 40), 12)
+        self.assertEqual(choose_level(0, 7200 * 10 ** 9, 1000, 5), 5)
+        self.assertEqual(choose_level(0, 10 ** 6, 1000, 40), 0)
+
+    def query(self, backend):
+        write_rollups(self.test_dir, {"wire": self.build()}, backend=backend)
+        t0, t1 = int(self.ts[1000]), int(self.ts[3000])
+        cols = query_rollup(self.test_dir, "wire", t0, t1, pixels=200)
+        level = choose_level(t0, t1, 200, 40)
+        width = BASE_BIN_NS << level
+        self.assertTrue((cols["level"] == level).all())
+        self.assertGreaterEqual(len(cols["bin"]), 200)
+        self.assertLessEqual(int(cols["bin"][0]), t0)
+        self.assertGreater(int(cols["bin"][0]) + width, t0)
+        self.assertLess(int(cols["bin"][-1]), t1)
+        expected = brute_force(self.ts, self.values, width)
+        self.assertEqual(cols["bin"].tolist(), [b for b in sorted(expected) if b + width > t0 and b < t1])
+        self.assertEqual(cols["count"].tolist(), [expected[b][0] for b in cols["bin"].tolist()])
+        return cols
+
+    def test_query_sqlite(self):
+        self.query("sqlite")
+
+    @unittest.skipUnless(HAS_PYARROW, "pyarrow not installed")
+    def test_query_parquet(self):
+        cols = self.query("parquet")
+        self.assertEqual(cols["bytes_mean"].dtype, np.float64)
+
+
+if __name__ == '__main__':
+    unittest.main()
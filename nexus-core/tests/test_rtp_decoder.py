@@ -0,0 +1,131 @@
+import os
+import sys
+import struct
+import shutil
+import tempfile
+import unittest
+
+# Add project root to path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from nexus_core.pcap_reader import PcapEngine
+from nexus_core.decoders import decode_rtp, format_ips, RTP_SNAPLEN
+from helpers import LINKTYPE_ETHERNET, LINKTYPE_RAW, LINKTYPE_RADIOTAP, build_pcap
+
+LINKTYPE_LINUX_SLL2 = 276
+
+
+def rtp(seq, ts, marker=0, cc=0, ext_words=None, payload=b'\x47' * 16):
+    b0 = 0x80 | cc | (0x10 if ext_words is not None else 0)
+    hdr = struct.pack('>BBHII', b0, (marker << 7) | 33, seq, ts, 0xABCDEF01) + b'\x00\x00\x00\x07' * cc
+    if ext_words is not None:
+        hdr += struct.pack('>HH', 0xBEDE, ext_words) + b'\xee' * 4 * ext_words
+    return hdr + payload
+
+
+def udp(sport, dport, payload):
+    return struct.pack('>HHHH', sport, dport, 8 + len(payload), 0) + payload
+
+
+def ipv4(src, dst, l4, proto=17, frag=0):
+    return struct.pack('>BBHHHBBH4s4s', 0x45, 0, 20 + len(l4), 0, frag, 64, proto, 0,
+                       bytes(src), bytes(dst)) + l4
+
+
+def ipv6(src, dst, l4):
+    # 带一个 8 字节的 Hop-by-Hop 扩展头
+    hbh = struct.pack('>BB6s', 17, 0, b'\x00' * 6)
+    return (struct.pack('>IHBB', 0x60000000, len(hbh) + len(l4), 0, 64) + src + dst + hbh + l4)
+
+
+def ether(l3, ethertype=0x0800, vlan=None):
+    head = b'\xff' * 6 + b'\x00\x11\x22\x33\x44\x55'
+    if vlan is not None:
+        head += struct.pack('>HH', 0x8100, vlan)
+    return head + struct.pack('>H', ethertype) + l3
+
+
+class TestRtpDecoder(unittest.TestCase):
+    def setUp(self):
+        self.test_dir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.test_dir, ignore_errors=True)
+
+    def decode(self, frames, linktype=LINKTYPE_ETHERNET):
+        path = os.path.join(self.test_dir, 'wire.pcap')
+        with open(path, 'wb') as f:
+            f.write(build_pcap(frames, linktype, start=1700000000))
+        self.path = path
+        return PcapEngine(path).decode(decode_rtp, snaplen=RTP_SNAPLEN)
+
+    def test_ethernet_ipv4_rtp(self):
+        cols = self.decode([
+            ether(ipv4([10, 0, 0, 1], [10, 0, 0, 2], udp(5000, 6000, rtp(7, 9000, marker=1)))),
+            ether(ipv4([10, 0, 0, 1], [10, 0, 0, 2], udp(5000, 6000, rtp(8, 9000, cc=2))), vlan=10),
+        ])
+        self.assertEqual(list(cols['is_rtp']), [True, True])
+        self.assertEqual(list(format_ips(cols['ip_version'], cols['src_ip_hi'], cols['src_ip_lo'])),
+                         ['10.0.0.1', '10.0.0.1'])
+        self.assertEqual(list(cols['sport']), [5000, 5000])
+        self.assertEqual(list(cols['dport']), [6000, 6000])
+        self.assertEqual(list(cols['udp_off']), [42, 46])
+        self.assertEqual(list(cols['rtp_seq']), [7, 8])
+        self.assertEqual(list(cols['rtp_marker']), [1, 0])
+        self.assertEqual(list(cols['rtp_pt']), [33, 33])
+        self.assertEqual(int(cols['rtp_ssrc'][0]), 0xABCDEF01)
+        self.assertEqual(list(cols['rtp_hdr_len']), [12, 20])
+        self.assertEqual(list(cols['rtp_payload_len']), [16, 16])
+
+    def test_ipv6_extension_and_rtp_extension(self):
+        src, dst = b'\xfe\x80' + b'\x00' * 13 + b'\x01', b'\x20\x01\x0d\xb8' + b'\x00' * 11 + b'\x02'
+        cols = self.decode([ether(ipv6(src, dst, udp(7, 8, rtp(1, 2, cc=1, ext_words=2))), ethertype=0x86DD)])
+        self.assertTrue(cols['is_udp'][0])
+        self.assertEqual(int(cols['ip_version'][0]), 6)
+        self.assertEqual(list(format_ips(cols['ip_version'], cols['dst_ip_hi'], cols['dst_ip_lo'])),
+                         ['2001:db8::2'])
+        self.assertEqual(int(cols['rtp_hdr_len'][0]), 12 + 4 + 4 + 8)
+
+        # 负载可按偏移从原始抓包中回读
+        off = cols['rtp_payload_off']
+        (payload,) = list(PcapEngine(self.path).iter_slices(cols['packet_no'], off, off + cols['rtp_payload_len']))
+        self.assertEqual(payload, b'\x47' * 16)
+
+    def test_other_link_types(self):
+        l3 = ipv4([1, 2, 3, 4], [5, 6, 7, 8], udp(11, 22, rtp(3, 4)))
+        self.assertTrue(self.decode([l3], LINKTYPE_RAW)['is_rtp'][0])
+
+        sll2 = struct.pack('>HHIHBB8s', 0x0800, 0, 1, 1, 0, 6, b'\x00' * 8)
+        self.assertTrue(self.decode([sll2 + l3], LINKTYPE_LINUX_SLL2)['is_rtp'][0])
+
+        radiotap = struct.pack('<BBHI', 0, 0, 8, 0)
+        dot11 = struct.pack('<BBH', 0x88, 0x01, 0) + b'\xaa' * 6 + b'\x11' * 6 + b'\xaa' * 6 + struct.pack('<HH', 0, 0)
+        snap = b'\xaa\xaa\x03\x00\x00\x00\x08\x00'
+        cols = self.decode([radiotap + dot11 + snap + l3], LINKTYPE_RADIOTAP)
+        self.assertTrue(cols['is_rtp'][0])
+        self.assertEqual(int(cols['rtp_seq'][0]), 3)
+
+    def test_non_rtp(self):
+        cols = self.decode([
+            ether(ipv4([1, 1, 1, 1], [2, 2, 2, 2], udp(53, 53, b'\x00\x01'))),
+            ether(ipv4([1, 1, 1, 1], [2, 2, 2, 2], b'\x00' * 30, frag=10)),
+            ether(ipv4([1, 1, 1, 1], [2, 2, 2, 2], b'\x00' * 30, proto=6)),
+            ether(b'\x00' * 28, ethertype=0x0806),
+        ])
+        self.assertEqual(list(cols['is_udp']), [True, False, False, False])
+        self.assertEqual(list(cols['is_ip']), [True, True, True, False])
+        self.assertEqual(list(cols['is_rtp']), [False] * 4)
+        self.assertEqual(list(cols['has_rtp_header']), [False] * 4)
+        self.assertEqual(int(cols['udp_len'][0]), 2)
+
+    def test_header_without_version_2(self):
+        # 12 字节以上但版本号不是 2: 头部字段照常读取, is_rtp 为 False
+        header = struct.pack('>BBHII', 0x00, 0x80 | 96, 321, 654, 0x1234)
+        cols = self.decode([ether(ipv4([1, 1, 1, 1], [2, 2, 2, 2], udp(5000, 6000, header + b'\x00' * 4)))])
+        self.assertEqual((bool(cols['has_rtp_header'][0]), bool(cols['is_rtp'][0])), (True, False))
+        self.assertEqual((int(cols['rtp_seq'][0]), int(cols['rtp_ts'][0]), int(cols['rtp_ssrc'][0])), (321, 654, 0x1234))
+        self.assertEqual((int(cols['rtp_marker'][0]), int(cols['rtp_payload_len'][0])), (1, 4))
+
+
+if __name__ == '__main__':
+    unittest.main()
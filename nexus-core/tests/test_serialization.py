@@ -0,0 +1,102 @@
+import os
+import sys
+import json
+import shutil
+import tempfile
+import unittest
+from unittest import mock
+
+# Add project root to path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import numpy as np
+import pandas as pd
+
+from nexus_core import serialization
+from nexus_core.serialization import dumps, dump, load, jsonable, SIDECAR_SUFFIX
+from nexus_core.utils import save_summary
+
+
+def sample():
+    return {
+        "count": np.int64(7),
+        "rate": np.float32(1.5),
+        "ok": np.bool_(True),
+        "seq": np.arange(5, dtype=np.uint16),
+        "strided": np.arange(10)[::3],
+        "tids": {np.int64(5): "video"},
+        "frames": pd.DataFrame({"no": [1, 2], "type": ["I", "P"]}),
+        "sizes": pd.Series([100, 200]),
+        "raw_frames_list": [{"seq": np.int64(1), "nal_types": [np.uint8(5)]}],
+    }
+
+
+EXPECTED = {
+    "count": 7, "rate": 1.5, "ok": True, "seq": [0, 1, 2, 3, 4], "strided": [0, 3, 6, 9],
+    "tids": {"5": "video"}, "frames": [{"no": 1, "type": "I"}, {"no": 2, "type": "P"}],
+    "sizes": [100, 200], "raw_frames_list": [{"seq": 1, "nal_types": [5]}],
+}
+
+
+class TestSerialization(unittest.TestCase):
+    def setUp(self):
+        self.test_dir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.test_dir, ignore_errors=True)
+
+    def test_numpy_and_pandas(self):
+        self.assertEqual(json.loads(dumps(sample())), EXPECTED)
+        self.assertEqual(jsonable(sample()), EXPECTED)
+
+    def test_stdlib_fallback(self):
+        # 没有 orjson 时结果相同
+        with mock.patch.object(serialization, "_dumps", serialization._stdlib_dumps):
+            self.assertEqual(json.loads(dumps(sample(), indent=True)), EXPECTED)
+
+    def test_non_finite_as_null(self):
+        data = {"nan": float("nan"), "inf": np.float32("inf"), "ninf": np.float64("-inf"),
+                "arr": np.array([1.0, np.nan, -np.inf]), "frame": pd.DataFrame({"x": [1.0, np.nan]})}
+        expected = {"nan": None, "inf": None, "ninf": None, "arr": [1.0, None, None],
+                    "frame": [{"x": 1.0}, {"x": None}]}
+        self.assertEqual(json.loads(dumps(data)), expected)
+        # 标准库退回路径同样写 null, 不输出非标准的 NaN / Infinity
+        with mock.patch.object(serialization, "_dumps", serialization._stdlib_dumps):
+            text = dumps(data)
+            self.assertEqual(json.loads(text), expected)
+            self.assertEqual(jsonable(data), expected)
+        self.assertNotIn("NaN", text)
+        self.assertNotIn("Infinity", text)
+
+    def test_sidecar_roundtrip(self):
+        path = os.path.join(self.test_dir, "summary.json")
+        data = {"ts": np.arange(10000, dtype=np.int64), "rssi": [np.full(5000, -40.5, dtype=np.float32)],
+                "small": np.arange(3)}
+        dump(data, path, indent=True)
+        with open(path, encoding="utf-8") as f:
+            raw = json.load(f)
+        self.assertEqual(raw["ts"]["$array"]["dtype"], "<i8")
+        self.assertEqual(raw["rssi"][0]["$array"]["offset"], 80000)
+        self.assertEqual(raw["small"], [0, 1, 2])
+
+        out = load(path)
+        np.testing.assert_array_equal(out["ts"], data["ts"])
+        np.testing.assert_array_equal(out["rssi"][0], data["rssi"][0])
+        self.assertEqual(load(path, mmap=True)["ts"][-1], 9999)
+
+        # 重写为不含大数组的结果时删除旧的旁路文件
+        dump({"small": np.arange(3)}, path)
+        self.assertFalse(os.path.exists(os.path.join(self.test_dir, "summary" + SIDECAR_SUFFIX)))
+
+    def test_save_summary(self):
+        save_summary(self.test_dir, {"frame_sizes": np.arange(100000), "alerts": []})
+        with open(os.path.join(self.test_dir, "summary.json"), encoding="utf-8") as f:
+            raw = json.load(f)
+        self.assertIn("$array", raw["frame_sizes"])
+        self.assertIn("peak_rss_mb", raw)
+        out = load(os.path.join(self.test_dir, "summary.json"))
+        self.assertEqual(int(out["frame_sizes"].sum()), 99999 * 100000 // 2)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,108 @@
+import os
+import sys
+import json
+import shutil
+import tempfile
+import unittest
+
+# Add project root to path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import numpy as np
+
+from nexus_core.database import DatabaseManager, TableSchema
+from nexus_core.flow_table import DOT11_FLOW_KEY
+from nexus_core.utils import save_summary
+
+try:
+    import pyarrow  # noqa: F401
+    HAS_PYARROW = True
+except ImportError:
+    HAS_PYARROW = False
+
+STA = 0x001122334455
+AP = 0xAABBCCDDEEFF
+
+SCHEMA = TableSchema("frames", [("no", "packet_no"), ("timestamp", "ts_ns"), ("seq", "seq"),
+                                ("is_retry", "retry"), ("ba_bitmap", "ba_bitmap")],
+                     flow_key=DOT11_FLOW_KEY, flow_columns={"sa": "addr2", "da": "addr1", "tid": "tid"})
+
+
+def batch(start, n):
+    i = np.arange(start, start + n)
+    return {"packet_no": i + 1, "ts_ns": i * 1000, "seq": (i % 4096).astype(np.int32),
+            "retry": i % 5 == 0, "ba_bitmap": np.full(n, 0xFFFFFFFFFFFFFFFF, dtype=np.uint64),
+            "addr2": np.where(i % 2, STA, AP).astype(np.uint64),
+            "addr1": np.where(i % 2, AP, STA).astype(np.uint64), "tid": np.full(n, 5, dtype=np.int8)}
+
+
+@unittest.skipUnless(HAS_PYARROW, "pyarrow not installed")
+class TestTraceStore(unittest.TestCase):
+    def setUp(self):
+        self.test_dir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.test_dir, ignore_errors=True)
+
+    def load(self, row_group_rows=100):
+        from nexus_core.trace_store import ParquetWriter
+        with ParquetWriter(self.test_dir, [SCHEMA], row_group_rows=row_group_rows) as writer:
+            for start in range(0, 1000, 64):
+                writer.write("frames", batch(start, min(64, 1000 - start)))
+        return writer
+
+    def test_roundtrip_and_row_groups(self):
+        from nexus_core.trace_store import TraceReader, trace_path
+        self.load()
+        reader = TraceReader(trace_path(self.test_dir, "frames"))
+        self.assertEqual(len(reader), 1000)
+        self.assertEqual(reader.file.num_row_groups, 10)
+        cols = reader.read()
+        self.assertEqual(cols["no"].tolist(), list(range(1, 1001)))
+        self.assertEqual(cols["ba_bitmap"].dtype, np.uint64)
+        self.assertEqual(int(cols["ba_bitmap"][0]), 0xFFFFFFFFFFFFFFFF)
+        self.assertEqual(cols["flow"][:4].tolist(), [0, 1, 0, 1])
+        self.assertFalse(any(name.endswith(".tmp") for name in os.listdir(self.test_dir)))
+
+    def test_projection_time_and_flow_pushdown(self):
+        from nexus_core.trace_store import TraceReader, read_trace, find_flows, trace_path
+        self.load()
+        reader = TraceReader(trace_path(self.test_dir, "frames"))
+        self.assertEqual(reader.row_groups(t0_ns=250000, t1_ns=420000), [2, 3, 4])
+        self.assertEqual(reader.row_groups(t0_ns=10 ** 9), [])
+
+        cols = read_trace(self.test_dir, "frames", columns=["timestamp", "seq", "is_retry"],
+                          t0_ns=250000, t1_ns=420000)
+        self.assertEqual(sorted(cols), ["is_retry", "seq", "timestamp"])
+        self.assertEqual(cols["timestamp"].tolist(), list(range(250000, 420000, 1000)))
+        self.assertEqual(cols["is_retry"].tolist(), [i % 5 == 0 for i in range(250, 420)])
+
+        self.assertEqual(find_flows(self.test_dir, sa="00:11:22:33:44:55").tolist(), [1])
+        self.assertEqual(find_flows(self.test_dir, tid=[5, 6]).tolist(), [0, 1])
+        cols = read_trace(self.test_dir, "frames", columns=["no"], t1_ns=10000, flows={"sa": STA})
+        self.assertEqual(cols["no"].tolist(), [2, 4, 6, 8, 10])
+        cols = read_trace(self.test_dir, "frames", columns=["no"], t0_ns=10 ** 9)
+        self.assertEqual(len(cols["no"]), 0)
+
+        flows = read_trace(self.test_dir, "frames_flows")
+        self.assertEqual(flows["packets"].tolist(), [500, 500])
+        self.assertEqual(flows["last_ts"].tolist(), [998000, 999000])
+
+    def test_output_contract(self):
+        db = DatabaseManager(self.test_dir, backend="parquet")
+        with db.writer([SCHEMA]) as writer:
+            writer.write("frames", batch(0, 0))
+        save_summary(self.test_dir, {"alerts": []}, trace=db)
+        with open(os.path.join(self.test_dir, "summary.json"), encoding="utf-8") as f:
+            summary = json.load(f)
+        self.assertEqual(summary["trace"], {"backend": "parquet",
+                                            "files": ["trace.frames.parquet", "trace.frames_flows.parquet"]})
+        from nexus_core.trace_store import read_trace
+        self.assertEqual(len(read_trace(self.test_dir, "frames")["no"]), 0)
+
+        with self.assertRaises(ValueError):
+            DatabaseManager(self.test_dir, backend="csv")
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -67,6 +67,10 @@ from backend.managers.version import VersionManager
 from backend.managers.automation import AutomationManager
 from backend.managers.wireless_capture import WirelessCaptureManager
 from backend.managers.universal import UniversalManager
+from nexus_core.pcap_reader import PcapEngine
+from nexus_core.decode_cache import DecodeCache, CACHE_DIRNAME
+from nexus_core.downsample import read_series, DEFAULT_MAX_POINTS
+from nexus_core.serialization import jsonable
 
 class Api:
     def __init__(self):
@@ -78,6 +82,9 @@ class Api:
             self.base_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
             
         self._window_manager = WindowManager()
+
+        # 同一抓包的重复分析 (RTP / BA / H.264 / 抖动) 复用已解码的列式结果
+        PcapEngine.default_cache = DecodeCache(os.path.join(self.base_dir, 'output', CACHE_DIRNAME))
         
         # Initialize Logger with API reference for frontend communication
         setup_logger(self)
@@ -385,7 +392,8 @@ class Api:
         """
         if payload is None:
             payload = {}
-        return self._universal_manager.invoke(tool_id, action, payload)
+        # 工具结果可能含 NumPy / pandas 值, 转成 pywebview 可直接编码的形式
+        return jsonable(self._universal_manager.invoke(tool_id, action, payload))
 
     def universal_get_metadata(self):
         """
@@ -393,6 +401,57 @@ class Api:
         """
         return self._universal_manager.get_all_tools_metadata()
 
+    # --- Trace Series (downsampled chart data) ---
+    def _output_dir(self, trace):
+        """output/<trace> resolved; ValueError for absolute paths or anything outside output/."""
+        root = os.path.realpath(os.path.join(self.base_dir, 'output'))
+        path = os.path.realpath(os.path.join(root, trace))
+        # trace 来自前端: 拒绝绝对路径与 ../ 或符号链接逃出 output/
+        if os.path.isabs(trace) or os.path.commonpath([root, path]) != root:
+            raise ValueError(f"Trace '{trace}' is not inside the output directory")
+        return path
+
+    def get_series(self, trace, column, t0=None, t1=None, max_points=DEFAULT_MAX_POINTS, method="lttb"):
+        """
+        One trace column for a chart, at most ``max_points`` points.
+        ``trace`` is an analysis output directory (relative to output/),
+        ``column`` is '<table>.<column>' (table defaults to 'frames'),
+        ``t0`` / ``t1`` and the returned ``x`` are capture times in seconds.
+        """
+        try:
+            output_dir = self._output_dir(trace)
+            table, _, name = column.rpartition('.')
+            t0_ns = None if t0 is None else int(round(float(t0) * 1e9))
+            t1_ns = None if t1 is None else int(round(float(t1) * 1e9))
+            series = read_series(output_dir, table or 'frames', name, t0_ns, t1_ns,
+                                 max_points=int(max_points), method=method)
+            return jsonable({
+                "status": "success",
+                "x": series["x"] / 1e9,
+                "y": series["y"],
+                "total": series["total"],
+            })
+        except Exception as e:
+            logging.error(f"get_series failed: {e}")
+            return {"status": "error", "message": str(e)}
+
+    def get_live_series(self, tool_id, instance_id, max_points=DEFAULT_MAX_POINTS, method="lttb"):
+        """
+        History of a running (or finished) iperf / ping instance for a chart,
+        at most ``max_points`` points; ``x`` is the wall-clock time in seconds.
+        ``tool_id`` is 'iperf' or a universal tool id (e.g. 'nexus.network.ping').
+        """
+        try:
+            tool = self._iperf_manager.tool if tool_id == 'iperf' else self._universal_manager.get_instance(tool_id)
+            live = getattr(tool, 'series', {}).get(instance_id)
+            if live is None:
+                return {"status": "error", "message": f"No series for '{tool_id}' instance '{instance_id}'"}
+            series = live.series(max_points=int(max_points), method=method)
+            return jsonable({"status": "success", "x": series["x"], "y": series["y"], "total": series["total"]})
+        except Exception as e:
+            logging.error(f"get_live_series failed: {e}")
+            return {"status": "error", "message": str(e)}
+
     # --- iPerf Integration ---
     def get_iperf_versions(self):
         return self._iperf_manager.get_versions()
@@ -1,78 +1,72 @@
-import struct
-from scapy.all import rdpcap, Dot11, Dot11QoS, PcapReader
 import datetime
 
+import numpy as np
+
+from nexus_core.pcap_reader import PcapEngine
+from nexus_core.pcap_filter import PacketFilter
+from nexus_core.flow_table import FlowTable, DOT11_FLOW_KEY
+from nexus_core.decoders import decode_dot11, mac_to_int, int_to_mac, DOT11_SNAPLEN
+
+
+def _select_data_ba(cols):
+    """Keep QoS Data and BlockAck frames (the only ones BA analysis looks at)."""
+    is_qos = (cols['fc_type'] == 2) & (cols['fc_subtype'] == 8)
+    return cols['is_dot11'] & (is_qos | cols['is_ba'])
+
+
 class BaAnalyzer:
     def __init__(self, pcap_path):
         self.pcap_path = pcap_path
 
+    @staticmethod
+    def _add_flow_columns(cols):
+        cols['is_qos'] = (cols['fc_type'] == 2) & (cols['fc_subtype'] == 8)
+        # Note: BA TID is taken from BA Control bits 2-5 here (kept from the original script)
+        cols['flow_tid'] = np.where(cols['is_qos'], np.maximum(cols['tid'], 0),
+                                    (cols['ba_control'] >> 2) & 0x0F).astype(np.int64)
+        return cols
+
+    def _load(self, packet_filter=None):
+        cols = PcapEngine(self.pcap_path).decode(decode_dot11, snaplen=DOT11_SNAPLEN,
+                                                  select=_select_data_ba, packet_filter=packet_filter)
+        if not cols:
+            return None
+        return self._add_flow_columns(cols)
+
     def detect_flows(self):
         """
         Scan PCAP for distinct (SA, DA, TID) flows.
         Returns a list of flow dicts.
         """
-        flows = {} # Key: (sa, da, tid), Value: {count, type_counts}
-        
         try:
-            # Use PcapReader for memory efficiency on scan
-            with PcapReader(self.pcap_path) as pcap_reader:
-                for packet in pcap_reader:
-                    if not packet.haslayer(Dot11):
-                        continue
-                        
-                    dot11 = packet[Dot11]
-                    try:
-                        type_val = dot11.type
-                        subtype_val = dot11.subtype
-                        addr1 = dot11.addr1 # RA (Receiver)
-                        addr2 = dot11.addr2 # TA (Transmitter)
-                    except AttributeError:
-                        continue
-                        
-                    if not addr1 or not addr2:
-                        continue
-
-                    # 1. QoS Data (Type 2, Subtype 8)
-                    if type_val == 2 and subtype_val == 8:
-                        tid = 0
-                        if packet.haslayer(Dot11QoS):
-                            tid = packet[Dot11QoS].TID
-                        
-                        key = (addr2, addr1, tid) # SA -> DA, TID
-                        if key not in flows:
-                            flows[key] = {'sa': addr2, 'da': addr1, 'tid': tid, 'packets': 0, 'data_count': 0, 'ba_count': 0}
-                        
-                        flows[key]['packets'] += 1
-                        flows[key]['data_count'] += 1
-
-                    # 2. BlockAck (Type 1, Subtype 9)
-                    elif type_val == 1 and subtype_val == 9:
-                        # Payload parsing for TID
-                        try:
-                            payload_bytes = bytes(packet[Dot11].payload)
-                            if len(payload_bytes) >= 2:
-                                ba_control = struct.unpack('<H', payload_bytes[:2])[0]
-                                tid = (ba_control >> 2) & 0x0F
-                                
-                                # Note: For BA, TA is the BA Sender (Receiver of Data), RA is BA Receiver (Sender of Data)
-                                # So flow direction is RA(Data Sender) -> TA(Data Receiver) for the *Stream*
-                                # But the BA packet travels TA -> RA.
-                                # To group them into the *same* flow entry as Data, we must reverse the MACs for the key.
-                                # Data: SA -> DA. BA: DA -> SA.
-                                # Key should be (DataSender, DataReceiver, TID).
-                                # Here, BA's addr1 is DataSender (RA), BA's addr2 is DataReceiver (TA).
-                                key = (addr1, addr2, tid) 
-                                
-                                if key not in flows:
-                                     flows[key] = {'sa': addr1, 'da': addr2, 'tid': tid, 'packets': 0, 'data_count': 0, 'ba_count': 0}
-
-                                flows[key]['packets'] += 1
-                                flows[key]['ba_count'] += 1
-                        except Exception:
-                            pass
-                            
-            return list(flows.values())
-            
+            # Streamed batch by batch into the shared flow table: no frame is kept in memory
+            table = FlowTable(DOT11_FLOW_KEY, scores=('data',))
+            engine = PcapEngine(self.pcap_path)
+            for cols in engine.iter_decode(decode_dot11, snaplen=DOT11_SNAPLEN, select=_select_data_ba):
+                cols = self._add_flow_columns(cols)
+                is_qos = cols['is_qos']
+                # Note: For BA, TA is the BA Sender (Receiver of Data), RA is BA Receiver (Sender of Data)
+                # To group them into the *same* flow entry as Data, we must reverse the MACs for the key.
+                # Key should be (DataSender, DataReceiver, TID).
+                keys = np.empty(len(is_qos), dtype=DOT11_FLOW_KEY)
+                keys['sa'] = np.where(is_qos, cols['addr2'], cols['addr1'])
+                keys['da'] = np.where(is_qos, cols['addr1'], cols['addr2'])
+                keys['tid'] = cols['flow_tid']
+                # QoS Data / BlockAck 都必须同时带 RA 和 TA
+                table.update(keys, scores={'data': is_qos}, mask=cols['has_addr2'])
+
+            # 按首次出现顺序输出, 与逐包扫描时的字典插入顺序一致
+            flows = table.columns()
+            return [{
+                'sa': int_to_mac(sa),
+                'da': int_to_mac(da),
+                'tid': int(tid),
+                'packets': int(packets),
+                'data_count': int(data),
+                'ba_count': int(packets - data),
+            } for sa, da, tid, packets, data in zip(flows['sa'], flows['da'], flows['tid'],
+                                                     flows['packets'], flows['data'])]
+
         except Exception as e:
             print(f"Error detecting flows: {e}")
             return []
@@ -92,108 +86,77 @@ class BaAnalyzer:
         session_acked_sns = set()
         
         try:
-            # We must load all packets to sort/process? Or assume they are sorted in PCAP.
-            # Using rdpcap assuming file fits in memory (as per original script)
-            # Or PcapReader to stream. Let's use PcapReader to be safe but we need to return a list.
-            # Paginating in backend vs frontend? User asked for "list out all packets, 10 per page".
-            # Usually we send all metadata to frontend and frontend paginates, unless it's huge.
-            # Let's limit to say 10000 packets or stream them. For now, list all.
-            
-            with PcapReader(self.pcap_path) as pcap_reader:
-                for i, packet in enumerate(pcap_reader):
-                    meta = {
-                        'id': i + 1,
-                        'time': float(packet.time),
-                        'time_str': datetime.datetime.fromtimestamp(float(packet.time)).strftime('%H:%M:%S.%f')[:-3],
-                        'type': '',
-                        'sn': None,
-                        'ssn': None,
-                        'bitmap': '',
-                        'valid': True,
-                        'anomaly': None
-                    }
-                    
-                    if not packet.haslayer(Dot11):
-                        continue
-                    
-                    dot11 = packet[Dot11]
-                    try:
-                        type_val = dot11.type
-                        subtype_val = dot11.subtype
-                        addr1 = dot11.addr1.lower() if dot11.addr1 else None # RA
-                        addr2 = dot11.addr2.lower() if dot11.addr2 else None # TA
-                    except AttributeError:
-                        continue
-                        
-                    # Filter: Match Data direction (SA->DA) or BA direction (DA->SA) and TID
-                    is_data = (addr2 == sa and addr1 == da)
-                    is_ba = (addr2 == da and addr1 == sa) # BA response comes from DataDst -> DataSrc
+            # Only frames between SA and DA (and QoS Data of this TID) reach the decoder
+            cols = self._load(PacketFilter(macs=[sa, da], tid=tid))
+            if cols is None:
+                return {"packets": [], "anomalies": 0}
+
+            sa_int, da_int = mac_to_int(sa), mac_to_int(da)
+            has_ta = cols['has_addr2']
+            # Filter: Match Data direction (SA->DA) or BA direction (DA->SA) and TID
+            is_data = cols['is_qos'] & has_ta & (cols['addr2'] == sa_int) & (cols['addr1'] == da_int)
+            is_ba = cols['is_ba'] & has_ta & (cols['addr2'] == da_int) & (cols['addr1'] == sa_int)
+            rows = np.flatnonzero((is_data | is_ba) & (cols['flow_tid'] == tid))
+
+            # 只有命中的帧才需要逐条生成元数据 (通常远少于总包数)
+            is_data = is_data[rows]
+            packet_no = cols['packet_no'][rows].tolist()
+            times = (cols['ts_ns'][rows] / 1e9).tolist()
+            seq = cols['seq'][rows].tolist()
+            retry = cols['retry'][rows].tolist()
+            # QoS Data 的 MAC 头为 24 字节 (四地址帧再加 6 字节)
+            four_addr = (cols['fc_flags'][rows] & 0x03) == 0x03
+            payload_len = (cols['dot11_len'][rows] - np.where(four_addr, 30, 24)).tolist()
+            ssn = cols['ba_ssn'][rows].tolist()
+            bitmaps = cols['ba_bitmap'][rows].tolist()
+
+            for j in range(len(rows)):
+                meta = {
+                    'id': packet_no[j],
+                    'time': times[j],
+                    'time_str': datetime.datetime.fromtimestamp(times[j]).strftime('%H:%M:%S.%f')[:-3],
+                    'type': '',
+                    'sn': None,
+                    'ssn': None,
+                    'bitmap': '',
+                    'valid': True,
+                    'anomaly': None
+                }
+
+                # 1. QoS Data analysis
+                if is_data[j]:
+                    meta.update({
+                        'type': 'QoS-Data',
+                        'sa': sa,
+                        'da': da,
+                        'tid': tid,
+                        'sn': seq[j],
+                        'retry': bool(retry[j]),
+                        'len': payload_len[j] # Rough data size
+                    })
+                    packets_data.append(meta)
+
+                # 2. BlockAck analysis
+                else:
+                    bitmap_int = bitmaps[j]
+                    meta.update({
+                        'type': 'BlockAck',
+                        'sa': da, # BA Sender (Data Dst)
+                        'da': sa, # BA Receiver (Data Src)
+                        'tid': tid,
+                        'ssn': ssn[j],
+                        'bitmap': self._format_bitmap(bitmap_int),
+                        'raw_bitmap': bitmap_int
+                    })
                     
-                    if not (is_data or is_ba):
-                        continue
-
-                    # 1. QoS Data analysis
-                    if type_val == 2 and subtype_val == 8 and is_data:
-                        pkt_tid = -1
-                        if packet.haslayer(Dot11QoS):
-                            pkt_tid = packet[Dot11QoS].TID
-                        
-                        if pkt_tid != tid:
-                            continue
-                            
-                        # Extract Sequence
-                        sc = dot11.SC
-                        if sc is not None:
-                            seq_num = (sc >> 4)
-                        else:
-                            seq_num = -1
-                        
-                        fc = dot11.FCfield
-                        retry = 1 if (fc & 0x08) else 0
-                        
-                        amenity_len = len(packet[Dot11].payload) # Rough data size
+                    # check consistency
+                    anomaly_msg = self._check_anomaly(ssn[j], bitmap_int, session_acked_sns)
+                    if anomaly_msg:
+                        meta['anomaly'] = anomaly_msg
+                        meta['valid'] = False
+                        anomalies.append(meta) # Store ref
                         
-                        meta.update({
-                            'type': 'QoS-Data',
-                            'sa': addr2,
-                            'da': addr1,
-                            'tid': pkt_tid,
-                            'sn': seq_num,
-                            'retry': bool(retry),
-                            'len': amenity_len
-                        })
-                        packets_data.append(meta)
-
-                    # 2. BlockAck analysis
-                    elif type_val == 1 and subtype_val == 9 and is_ba:
-                        payload_bytes = bytes(packet[Dot11].payload)
-                        if len(payload_bytes) >= 12:
-                            ba_control, ba_ssc, bitmap_int = struct.unpack('<HHQ', payload_bytes[:12])
-                            pkt_tid = (ba_control >> 2) & 0x0F
-                            
-                            if pkt_tid != tid:
-                                continue
-                                
-                            ssn = (ba_ssc >> 4) & 0x0FFF
-                            
-                            meta.update({
-                                'type': 'BlockAck',
-                                'sa': addr2, # BA Sender (Data Dst)
-                                'da': addr1, # BA Receiver (Data Src)
-                                'tid': pkt_tid,
-                                'ssn': ssn,
-                                'bitmap': self._format_bitmap(bitmap_int),
-                                'raw_bitmap': bitmap_int
-                            })
-                            
-                            # check consistency
-                            anomaly_msg = self._check_anomaly(ssn, bitmap_int, session_acked_sns)
-                            if anomaly_msg:
-                                meta['anomaly'] = anomaly_msg
-                                meta['valid'] = False
-                                anomalies.append(meta) # Store ref
-                                
-                            packets_data.append(meta)
+                    packets_data.append(meta)
 
             return {
                 "packets": packets_data,
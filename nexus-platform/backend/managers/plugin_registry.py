@@ -0,0 +1,184 @@
+import importlib
+import inspect
+import json
+import os
+import sys
+import traceback
+
+# 缓存格式变化时递增, 旧缓存整体失效
+REGISTRY_VERSION = 1
+
+# 只有源码中出现这些标记的模块才可能定义工具; 其余 (分析脚本) 不导入
+TOOL_MARKERS = (b"ITool", b"nexus_node")
+
+
+def _plain(value):
+    """Metadata as JSON-safe values (nexus_node inputs / outputs hold type objects)."""
+    if isinstance(value, dict):
+        return {str(k): _plain(v) for k, v in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [_plain(v) for v in value]
+    if value is None or isinstance(value, (str, int, float, bool)):
+        return value
+    if isinstance(value, type):
+        return value.__name__
+    return str(value)
+
+
+def _node_metadata(meta):
+    # NodeMetadata 是 pydantic 模型 (v2: model_dump, v1: dict)
+    if hasattr(meta, "model_dump"):
+        return meta.model_dump()
+    if hasattr(meta, "dict"):
+        return meta.dict()
+    return dict(meta)
+
+
+class PluginRegistry:
+    """
+    Tool metadata of every module under a plugin package, cached in a JSON
+    file keyed by module path, mtime and size.
+
+    Only new or modified modules are imported (and only if their source
+    mentions ``ITool`` / ``nexus_node``); an unchanged tree is served from
+    the cache without importing any plugin. Each record names the module
+    and attribute, so the tool itself can be loaded on first use.
+    """
+
+    def __init__(self, cache_path, package_name="nexus_core.plugins", base_dir=None):
+        self.cache_path = cache_path
+        self.package_name = package_name
+        self.base_dir = base_dir
+        self.errors = {}
+
+    def _environment(self):
+        # 解释器或其环境变了 (依赖装上/卸载) 时, 缓存的导入结果不再可信
+        return {"version": REGISTRY_VERSION, "python": sys.executable, "python_version": sys.version}
+
+    def _modules(self):
+        """(module name, file path, stat) of every module, walking the package like pkgutil does."""
+        package = importlib.import_module(self.package_name)
+        stack = [(self.package_name, list(package.__path__))]
+        while stack:
+            prefix, paths = stack.pop()
+            for path in paths:
+                try:
+                    names = sorted(os.listdir(path))
+                except OSError:
+                    continue
+                for name in names:
+                    full = os.path.join(path, name)
+                    if name.endswith(".py"):
+                        modname = prefix if name == "__init__.py" else f"{prefix}.{name[:-3]}"
+                        if name == "__init__.py" and prefix == self.package_name:
+                            continue
+                        yield modname, full, os.stat(full)
+                    elif (not name.startswith((".", "__")) and os.path.isdir(full)
+                          and os.path.exists(os.path.join(full, "__init__.py"))):
+                        stack.append((f"{prefix}.{name}", [full]))
+
+    def _read_cache(self):
+        try:
+            with open(self.cache_path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return {}
+        if not isinstance(data, dict) or data.get("environment") != self._environment():
+            return {}
+        return data.get("modules", {})
+
+    def _write_cache(self, modules):
+        os.makedirs(os.path.dirname(self.cache_path) or ".", exist_ok=True)
+        tmp = f"{self.cache_path}.{os.getpid()}.tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump({"environment": self._environment(), "modules": modules}, f, indent=1)
+        os.replace(tmp, self.cache_path)
+
+    def _inspect(self, modname, path):
+        """Cache entry of one module: the tools it defines, or the import error."""
+        with open(path, "rb") as f:
+            source = f.read()
+        if not any(marker in source for marker in TOOL_MARKERS):
+            return {"tools": []}
+        try:
+            module = importlib.import_module(modname)
+        except BaseException as e:
+            # 插件在导入时 sys.exit / 出错不能拖垮平台
+            if isinstance(e, KeyboardInterrupt):
+                raise
+            return {"tools": [], "error": f"{type(e).__name__}: {e}"}
+
+        from nexus_core.interfaces import ITool
+        tools = []
+        for attr, obj in inspect.getmembers(module):
+            # 只登记本模块定义的对象, 包的 __init__ 再导出的不重复登记
+            if getattr(obj, "__module__", None) != modname:
+                continue
+            if inspect.isclass(obj) and issubclass(obj, ITool) and not inspect.isabstract(obj):
+                try:
+                    metadata = obj(self.base_dir).get_metadata()
+                except Exception as e:
+                    print(f"[UniversalManager] Failed to instantiate {attr}: {e}")
+                    continue
+                tools.append({"id": metadata.get("id"), "kind": "tool", "attr": attr,
+                              "metadata": _plain(metadata)})
+            elif callable(obj) and hasattr(obj, "_nexus_meta"):
+                metadata = _plain(_node_metadata(obj._nexus_meta))
+                tools.append({"id": metadata.get("id"), "kind": "node", "attr": attr, "metadata": metadata})
+        return {"tools": tools}
+
+    def _manifest_records(self):
+        """Analysis plugins declared by plugin.yaml manifests (only the manifests are read)."""
+        from nexus_core.dispatcher import PluginDispatcher
+
+        records = []
+        for root in importlib.import_module(self.package_name).__path__:
+            dispatcher = PluginDispatcher(root, self.package_name)
+            for m in dispatcher.list_plugins():
+                records.append({"id": m.plugin_id, "kind": "plugin", "module": m.module, "attr": m.function_name,
+                                "root": root, "metadata": {"id": m.plugin_id, **m.fields}})
+            for error in dispatcher.errors:
+                print(f"[UniversalManager] Skipped invalid plugin manifest {error}")
+        return records
+
+    def load(self, refresh=False):
+        """
+        ``{tool_id: record}`` with record keys ``id`` / ``kind`` ("tool" for
+        ``ITool`` classes, "node" for ``nexus_node`` functions, "plugin" for
+        manifest-declared analyses run through ``PluginDispatcher`` from
+        ``root``) / ``module`` / ``attr`` / ``metadata``. ``refresh``
+        re-imports every candidate module.
+        """
+        cached = {} if refresh else self._read_cache()
+        modules, changed = {}, refresh or not cached
+        for modname, path, st in self._modules():
+            entry = cached.get(modname)
+            if entry is None or entry.get("path") != path or entry.get("mtime_ns") != st.st_mtime_ns \
+                    or entry.get("size") != st.st_size:
+                try:
+                    entry = self._inspect(modname, path)
+                except Exception:
+                    traceback.print_exc()
+                    entry = {"tools": [], "error": "inspection failed"}
+                entry.update(path=path, mtime_ns=st.st_mtime_ns, size=st.st_size)
+                changed = True
+            modules[modname] = entry
+        if changed or set(modules) != set(cached):
+            try:
+                self._write_cache(modules)
+            except OSError as e:
+                print(f"[UniversalManager] Could not write plugin registry cache: {e}")
+
+        records, self.errors = {}, {}
+        for modname, entry in modules.items():
+            if entry.get("error"):
+                self.errors[modname] = entry["error"]
+            for tool in entry["tools"]:
+                if not tool["id"]:
+                    print(f"[UniversalManager] Warning: Tool {tool['attr']} has no ID in metadata. Skipping.")
+                    continue
+                records.setdefault(tool["id"], {**tool, "module": modname})
+        # 同一 id 已由工具 / 节点提供时以其为准
+        for record in self._manifest_records():
+            records.setdefault(record["id"], record)
+        return records
@@ -1,85 +1,127 @@
+import contextlib
 import importlib
-import pkgutil
-import inspect
+import os
 import threading
 import traceback
-from typing import Dict, Any, Type
+from typing import Dict, Any
 from backend.managers.base import BaseManager
+from backend.managers.plugin_registry import PluginRegistry
 # Try importing from installed package, fallback to relative if needed, 
 # but considering strict environment it should be installed or in path.
 try:
     from nexus_core.interfaces import ITool
-    import nexus_core.plugins
+    from nexus_core.progress import ProgressReporter, reporting
+    from nexus_core.cancel import AnalysisCancelled, CancelToken, cancellable
 except ImportError:
     # Safe fallback for partial environments
     ITool = None
+    AnalysisCancelled = None
     pass
 
+# 分析进度事件 (<tool_id>:progress) 的最短间隔, 秒
+PROGRESS_INTERVAL = 0.25
+
 class UniversalManager(BaseManager):
     """
     The Universal Router for the Dynamic Plugin System.
     Core Philosophy: Platform is Router.
+
+    Tool metadata comes from the plugin registry cache
+    (config/plugin_registry.json); a tool is imported and instantiated on
+    its first invoke.
     """
     def __init__(self, base_dir):
         super().__init__(base_dir)
-        self._registry: Dict[str, ITool] = {}
+        # tool_id -> 注册表记录 (module / attr / metadata), 启动时不导入插件
+        self._registry: Dict[str, Dict[str, Any]] = {}
+        # tool_id -> 已实例化的 ITool 或 nexus_node 函数
+        self._instances: Dict[str, Any] = {}
+        # tool_id -> 进行中分析的 CancelToken, 'stop' 时取消
+        self._runs: Dict[str, set] = {}
+        self._lock = threading.Lock()
+        self.plugin_registry = PluginRegistry(os.path.join(self.base_dir, 'config', 'plugin_registry.json'),
+                                              base_dir=self.base_dir)
         # Scan and load plugins
         self.load_plugins()
 
-    def load_plugins(self):
+    def load_plugins(self, refresh=False):
         """
-        Dynamically discover and load all ITool implementations from nexus_core.plugins.
+        Discover all ITool implementations and nexus_node functions in nexus_core.plugins.
+        Unchanged modules are served from the registry cache; refresh=True re-imports them.
         """
         if ITool is None:
             print("[UniversalManager] Error: nexus_core not found. functionality disabled.")
             return
 
         print("[UniversalManager] Starting plugin discovery...")
-        
-        # 1. Walk through the nexus_core.plugins package
-        stack = [nexus_core.plugins]
-        
-        while stack:
-            current_pkg = stack.pop()
-            if not hasattr(current_pkg, '__path__'):
-                continue
-                
-            for importer, modname, ispkg in pkgutil.iter_modules(current_pkg.__path__, current_pkg.__name__ + "."):
-                try:
-                    module = importlib.import_module(modname)
-                    if ispkg:
-                        stack.append(module)
-                    else:
-                        self._inspect_module_for_tools(module)
-                except Exception as e:
-                    print(f"[UniversalManager] Failed to import module {modname}: {e}")
-
-        print(f"[UniversalManager] Discovery complete. Loaded {len(self._registry)} tools: {list(self._registry.keys())}")
-
-    def _inspect_module_for_tools(self, module):
+        registry = self.plugin_registry.load(refresh=refresh)
+        for modname, error in self.plugin_registry.errors.items():
+            print(f"[UniversalManager] Failed to import module {modname}: {error}")
+
+        with self._lock:
+            self._registry = registry
+            # 重新发现后, 已不存在或改由其他模块提供的工具下次调用时重新加载
+            self._instances = {tool_id: inst for tool_id, inst in self._instances.items()
+                               if tool_id in registry}
+        print(f"[UniversalManager] Discovery complete. Found {len(self._registry)} tools: {list(self._registry.keys())}")
+
+    def _get_tool(self, tool_id):
+        """The tool instance (ITool) or node function of tool_id, loaded on first use."""
+        with self._lock:
+            if tool_id in self._instances:
+                return self._instances[tool_id]
+            record = self._registry[tool_id]
+            obj = getattr(importlib.import_module(record['module']), record['attr'])
+            if record['kind'] == 'tool':
+                obj = obj(self.base_dir)
+                print(f"[UniversalManager] Instantiated tool: {tool_id} from {record['attr']}")
+            self._instances[tool_id] = obj
+            return obj
+
+    def get_instance(self, tool_id):
+        """The tool instance of tool_id if it has been loaded, else None (never imports)."""
+        with self._lock:
+            return self._instances.get(tool_id)
+
+    def _progress(self, tool_id):
         """
-        Inspect a module for classes implementing ITool.
+        Reporter for the in-process analyses of one run: PcapEngine passes
+        become '<tool_id>:progress' events (percent, packets/s, MB/s, ETA, stage).
         """
-        for name, obj in inspect.getmembers(module):
-            if inspect.isclass(obj) and issubclass(obj, ITool) and obj is not ITool:
-                # Avoid abstract classes (simplistic check, better to check for abstract methods)
-                if inspect.isabstract(obj):
-                    continue
-                
-                try:
-                    # Instantiate the tool
-                    tool_instance = obj(self.base_dir)
-                    metadata = tool_instance.get_metadata()
-                    tool_id = metadata.get('id')
-                    
-                    if not tool_id:
-                        print(f"[UniversalManager] Warning: Tool {name} has no ID in metadata. Skipping.")
-                        continue
-                        
-                    self._registry[tool_id] = tool_instance
-                    print(f"[UniversalManager] Registered tool: {tool_id} from {name}")
-                except Exception as e:
-                    print(f"[UniversalManager] Failed to instantiate {name}: {e}")
+        def emit(event):
+            self.send_to_js({"type": f"{tool_id}:progress", "detail": event})
+        return ProgressReporter(emit=emit, interval=PROGRESS_INTERVAL)
+
+    @contextlib.contextmanager
+    def _run_scope(self, tool_id, deadline_s=None):
+        """
+        Progress reporting and a CancelToken for one in-process run of tool_id;
+        'stop' cancels the token, so PcapEngine aborts at its next batch.
+        """
+        token = CancelToken(deadline_s)
+        with self._lock:
+            self._runs.setdefault(tool_id, set()).add(token)
+        try:
+            with reporting(self._progress(tool_id)), cancellable(token):
+                yield token
+        finally:
+            with self._lock:
+                self._runs[tool_id].discard(token)
+
+    def _cancel_runs(self, tool_id):
+        """Cancel the in-process runs of tool_id; returns how many there were."""
+        with self._lock:
+            tokens = list(self._runs.get(tool_id, ()))
+        for token in tokens:
+            token.cancel(f"'{tool_id}' stopped")
+        return len(tokens)
+
+    def _run_plugin(self, tool_id, record, payload):
+        """Run a manifest-declared analysis plugin: payload holds input_path / output_dir / params."""
+        from nexus_core.dispatcher import PluginDispatcher
+        dispatcher = PluginDispatcher(record['root'], self.plugin_registry.package_name)
+        return dispatcher.run_plugin(tool_id, payload.get('input_path'), payload.get('output_dir'),
+                                     payload.get('params'))
 
     def invoke(self, tool_id: str, action: str, payload: Dict[str, Any]) -> Dict[str, Any]:
         """
@@ -88,11 +130,36 @@ class UniversalManager(BaseManager):
         :param action: The action to perform ('run', 'stop', 'get_metadata')
         :param payload: The data dictionary to pass to the tool
         """
-        tool = self._registry.get(tool_id)
-        if not tool:
+        record = self._registry.get(tool_id)
+        if not record:
             return {"status": "error", "message": f"Tool '{tool_id}' not found."}
 
         try:
+            if action == 'get_metadata':
+                # 元数据来自注册表, 不需要加载工具
+                return record['metadata']
+
+            if action == 'stop':
+                cancelled = self._cancel_runs(tool_id)
+                if record['kind'] != 'tool' or tool_id not in self._instances:
+                    # 从未运行过的工具没有可停止的实例
+                    return {"status": "stopped", "cancelled": cancelled} if cancelled else {"status": "no_process"}
+
+            if record['kind'] == 'plugin':
+                if action != 'run':
+                    return {"status": "error", "message": f"Unknown action '{action}' for plugin '{tool_id}'"}
+                # payload 中的 deadline_s: 到时以已读部分给出结果并标记 truncated
+                with self._run_scope(tool_id, payload.get('deadline_s')) as token:
+                    result = self._run_plugin(tool_id, record, payload)
+                return {"status": "success", "result": result, "truncated": token.truncated}
+
+            tool = self._get_tool(tool_id)
+            if record['kind'] == 'node':
+                if action != 'run':
+                    return {"status": "error", "message": f"Unknown action '{action}' for node '{tool_id}'"}
+                with self._run_scope(tool_id):
+                    return {"status": "success", "result": tool(**payload)}
+
             if action == 'run':
                 # Bridge the callback to the frontend
                 config = payload
@@ -111,20 +178,21 @@ class UniversalManager(BaseManager):
                 # Most existing tools in Nexus seem to thread internally or rely on creating background tasks.
                 # However, universal manager should probably guard against blocking main thread.
                 
-                result = tool.run(config, callback=bridge_callback)
+                # 在本线程内完成的分析同样以 <tool_id>:progress 事件上报进度, 并可被 stop 取消
+                with self._run_scope(tool_id):
+                    result = tool.run(config, callback=bridge_callback)
                 return result
 
             elif action == 'stop':
                 instance_id = payload.get('instance_id')
                 return tool.stop(instance_id)
 
-            elif action == 'get_metadata':
-                return tool.get_metadata()
-            
             else:
                 return {"status": "error", "message": f"Unknown action '{action}'"}
 
         except Exception as e:
+            if AnalysisCancelled is not None and isinstance(e, AnalysisCancelled):
+                return {"status": "cancelled", "message": str(e)}
             traceback.print_exc()
             return {"status": "error", "message": str(e)}
 
@@ -132,4 +200,4 @@ class UniversalManager(BaseManager):
         """
         Helper for Frontend to discover available tools.
         """
-        return [tool.get_metadata() for tool in self._registry.values()]
+        return [record['metadata'] for record in self._registry.values()]
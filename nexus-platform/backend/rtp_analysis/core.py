@@ -1,9 +1,16 @@
-from scapy.all import *
 import sys
 import os
 from collections import Counter
 import json
 
+from nexus_core.pcap_reader import PcapEngine
+from nexus_core.pcap_filter import PacketFilter
+from nexus_core.decoders import decode_rtp, take_columns, SeqUnwrapper, RTP_SNAPLEN
+from nexus_core.memory import peak_rss_mb
+
+def _select_udp(cols):
+    return cols['is_udp']
+
 class RTPAnalyzer:
     def __init__(self, pcap_file):
         self.pcap_file = pcap_file
@@ -15,7 +22,9 @@ class RTPAnalyzer:
     def load_pcap(self):
         print(f"Reading {self.pcap_file}...")
         try:
-            self.packets = rdpcap(self.pcap_file)
+            # 只保留 UDP 包的头部解码列 (不再构造 Scapy 对象)
+            self.packets = PcapEngine(self.pcap_file).decode(
+                decode_rtp, snaplen=RTP_SNAPLEN, select=_select_udp)
             return True
         except FileNotFoundError:
             print(f"Error: File {self.pcap_file} not found.")
@@ -26,97 +35,45 @@ class RTPAnalyzer:
 
     def filter_flow(self, src_port, dst_port):
         print(f"Filtering for flow {src_port} -> {dst_port}...")
-        if not self.packets:
-            return False
-            
-        self.target_packets = []
-        for pkt in self.packets:
-            if UDP in pkt and pkt[UDP].sport == src_port and pkt[UDP].dport == dst_port:
-                self.target_packets.append(pkt)
+        if self.packets is None:
+            # load_pcap 未调用: 端口条件下推到读取阶段, 只解码该流的包
+            try:
+                self.target_packets = PcapEngine(self.pcap_file).decode(
+                    decode_rtp, snaplen=RTP_SNAPLEN,
+                    packet_filter=PacketFilter(sport=src_port, dport=dst_port))
+            except Exception as e:
+                print(f"Error reading pcap: {e}")
+                return False
+            count = len(self.target_packets.get('packet_no', []))
+        else:
+            if not self.packets:
+                return False
+            mask = (self.packets['sport'] == src_port) & (self.packets['dport'] == dst_port)
+            self.target_packets = take_columns(self.packets, mask)
+            count = int(mask.sum())
         
-        if not self.target_packets:
+        if count == 0:
             print("No packets found for the specified flow.")
             return False
             
-        print(f"Found {len(self.target_packets)} packets.")
+        print(f"Found {count} packets.")
         return True
 
     def analyze(self):
-        if not self.target_packets:
+        if not self.target_packets or len(self.target_packets['packet_no']) == 0:
             return None
 
-        seq_numbers = []
-        timestamps = []
-        packet_sizes = []
-        marker_bits = []
-        rtp_timestamps = []
-        ssrcs = []
-        nal_types = []
+        # 与按 Scapy 解析时相同: 至少 12 字节的 UDP 负载都按 RTP 头读取, 不检查版本号
+        cols = take_columns(self.target_packets, self.target_packets['has_rtp_header'])
 
-        # Extract RTP Data
-        for pkt in self.target_packets:
-            if Raw in pkt:
-                payload = pkt[Raw].load
-                if len(payload) >= 12: # Min RTP header size
-                    # Extract Sequence Number (Big Endian)
-                    seq = (payload[2] << 8) | payload[3]
-                    seq_numbers.append(seq)
-                    timestamps.append(float(pkt.time))
-                    packet_sizes.append(len(payload))
-                    
-                    # Extract Marker Bit
-                    marker = (payload[1] & 0x80) >> 7
-                    marker_bits.append(marker)
-                    
-                    # Extract RTP Timestamp (Big Endian)
-                    rtp_ts = (payload[4] << 24) | (payload[5] << 16) | (payload[6] << 8) | payload[7]
-                    rtp_timestamps.append(rtp_ts)
-                    
-                    # Extract SSRC
-                    ssrc = (payload[8] << 24) | (payload[9] << 16) | (payload[10] << 8) | payload[11]
-                    ssrcs.append(ssrc)
-                    
-                    # Extract NAL Type (H.264)
-                    # RTP Header is 12 bytes (usually, assuming no CSRC or extensions for simplicity)
-                    # TODO: Handle CSRC count (CC) and Extension bit (X) for robust parsing
-                    # CC is low 4 bits of byte 0. Extension is bit 4 of byte 0.
-                    v_p_x_cc = payload[0]
-                    cc = v_p_x_cc & 0x0F
-                    x = (v_p_x_cc & 0x10) >> 4
-                    header_len = 12 + (cc * 4)
-                    
-                    if x:
-                        # If extension bit is set, we need to skip extension header
-                        # Extension header: [Profile:2][Length:2][HeaderData...]
-                        if len(payload) >= header_len + 4:
-                            ext_len = (payload[header_len+2] << 8) | payload[header_len+3]
-                            header_len += 4 + (ext_len * 4)
-                    
-                    # Extract PT
-                    pt = payload[1] & 0x7F
-                    
-                    found_types = set()
-                    if len(payload) > header_len:
-                        rtp_payload = payload[header_len:]
-                        
-                        # Scan for H.264 Start Codes (00 00 01) in the payload
-                        # This handles both raw H.264 (if any) and MPEG-TS (by scanning through TS/PES headers)
-                        cursor = 0
-                        pl_len = len(rtp_payload)
-                        while cursor < pl_len - 3:
-                            idx = rtp_payload.find(b'\x00\x00\x01', cursor)
-                            if idx == -1:
-                                break
-                            
-                            if idx + 3 < pl_len:
-                                nal_header = rtp_payload[idx+3]
-                                n_type = nal_header & 0x1F
-                                if n_type > 0: # Filter out 0
-                                    found_types.add(n_type)
-                            
-                            cursor = idx + 3
-                    
-                    nal_types.append(list(found_types))
+        # Extract RTP Data (头部字段均来自 decode_rtp, 已处理 CSRC 与扩展头)
+        seq_numbers = cols['rtp_seq'].tolist()
+        timestamps = (cols['ts_ns'] / 1e9).tolist()
+        packet_sizes = cols['udp_len'].tolist()
+        marker_bits = cols['rtp_marker'].tolist()
+        rtp_timestamps = cols['rtp_ts'].tolist()
+        ssrcs = cols['rtp_ssrc'].tolist()
+        nal_types = self._scan_nal_types(cols)
 
         if not seq_numbers:
             print("Could not extract sequence numbers. Is this RTP?")
@@ -158,10 +115,11 @@ class RTPAnalyzer:
 
         self.analysis_results = {
             "basic_stats": {
-                "total_packets": len(self.target_packets),
+                "total_packets": len(self.target_packets['packet_no']),
                 "duration_sec": duration,
                 "throughput_mbps": throughput_bps / 1e6,
-                "ssrcs": unique_ssrcs
+                "ssrcs": unique_ssrcs,
+                "peak_rss_mb": peak_rss_mb()
             },
             "loss_stats": {
                 "seq_range": [min(seq_numbers), max(seq_numbers)],
@@ -180,19 +138,58 @@ class RTPAnalyzer:
         
         return self.analysis_results
 
+    def analyze_incremental(self, output_dir, src_port, dst_port):
+        """
+        Loss / reordering of one flow of a capture that keeps growing: each
+        call reads only the records written since the last call on the same
+        output_dir; the sequence unwrap state is kept in its checkpoint.
+        """
+        from nexus_core.checkpoint import Checkpoint
+        from nexus_core.engine import Pipeline
+        from nexus_core.rtp_stats import RtpLossSubscriber
+
+        checkpoint = Checkpoint.load(output_dir, self.pcap_file, name="rtp")
+        if checkpoint.resuming:
+            print(f"[*] Resuming {self.pcap_file} after packet {checkpoint.position.packets}")
+        pipe = Pipeline(self.pcap_file, packet_filter=PacketFilter(sport=src_port, dport=dst_port))
+        pipe.subscribe("loss", RtpLossSubscriber())
+        report = pipe.run(checkpoint=checkpoint)["loss"]
+        checkpoint.save()
+        return report
+
+    def _scan_nal_types(self, cols):
+        """
+        Scan every RTP payload for H.264 start codes (00 00 01).
+        This handles both raw H.264 (if any) and MPEG-TS (by scanning through TS/PES headers).
+        Payload bytes are read back from the capture for the selected packets only.
+        """
+        start = cols['rtp_payload_off']
+        payloads = PcapEngine(self.pcap_file).iter_slices(
+            cols['packet_no'], start, start + cols['rtp_payload_len'])
+
+        nal_types = []
+        for rtp_payload in payloads:
+            found_types = set()
+            cursor = 0
+            pl_len = len(rtp_payload)
+            while cursor < pl_len - 3:
+                idx = rtp_payload.find(b'\x00\x00\x01', cursor)
+                if idx == -1:
+                    break
+                
+                if idx + 3 < pl_len:
+                    nal_header = rtp_payload[idx+3]
+                    n_type = nal_header & 0x1F
+                    if n_type > 0: # Filter out 0
+                        found_types.add(n_type)
+                
+                cursor = idx + 3
+            nal_types.append(list(found_types))
+        return nal_types
+
     def _unwrap_sequence_numbers(self, seq_numbers):
-        unwrapped_seq = []
-        wrap_offset = 0
-        last_seq = seq_numbers[0]
-        
-        for seq in seq_numbers:
-            if seq < last_seq - 30000:
-                wrap_offset += 65536
-            elif last_seq < seq - 30000:
-                 wrap_offset -= 65536
-            unwrapped_seq.append(seq + wrap_offset)
-            last_seq = seq
-        return unwrapped_seq
+        # 每次分析从头展开: 回绕状态不能带到下一条流
+        return SeqUnwrapper()(seq_numbers).tolist()
 
     def _count_reordering(self, unwrapped_seq):
         max_seen = -1
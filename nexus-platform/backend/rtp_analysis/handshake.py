@@ -1,15 +1,48 @@
-from scapy.all import *
+import re
+from decimal import Decimal
+
+from nexus_core.pcap_reader import PcapEngine, scapy_conf
+
+# re 可直接在 memoryview 上搜索, 不必先把每个包复制成 bytes
+_RTSP = re.compile(b'RTSP')
+
+def _rtsp_candidates(pcap_file):
+    """
+    Stream the capture and dissect only packets whose raw bytes contain
+    'RTSP' (at most a few hundred in a session), so memory does not grow
+    with the capture. Yields (index, packet) with the packet's 0-based index.
+    """
+    # Scapy 只在真正解析候选包时导入, 协议层与 scapy.all 相同
+    conf = None
+    for i, (ts_ns, _, wirelen, linktype, data) in enumerate(PcapEngine(pcap_file, mode="raw").iter_raw()):
+        if _RTSP.search(data) is None:
+            continue
+        raw = bytes(data)
+        if conf is None:
+            conf = scapy_conf()
+        cls = conf.l2types.num2layer.get(linktype, conf.raw_layer)
+        try:
+            pkt = cls(raw)
+        except Exception:
+            pkt = conf.raw_layer(raw)
+        pkt.time = Decimal(ts_ns) / 1000000000
+        pkt.wirelen = wirelen
+        yield i, pkt
 
 def parse_handshake(pcap_file):
     try:
-        packets = rdpcap(pcap_file)
+        packets = list(_rtsp_candidates(pcap_file))
     except Exception as e:
         return []
 
     conversation = []
     cseq_map = {} # Map CSeq to Method (for responses)
+    if not packets:
+        return conversation
+    from scapy.layers.inet import IP, TCP
+    from scapy.packet import Raw
     
-    for i, pkt in enumerate(packets):
+    for i, pkt in packets:
         if TCP in pkt and Raw in pkt:
             payload = pkt[Raw].load
             
@@ -1,91 +1,84 @@
-from scapy.all import *
-from collections import Counter
+from nexus_core.pcap_reader import PcapEngine
+from nexus_core.decoders import decode_ip, format_ips, IP_SNAPLEN
+from nexus_core.decoders.common import packet_bounds, fits, u8
+from nexus_core.flow_table import FlowTable, UDP_FLOW_KEY, udp_flow_keys
+from nexus_core.memory import format_peak_rss
+
+
+def detect_packet_protocol(batch, cols):
+    """
+    Heuristic to detect protocol based on UDP payload.
+    Vectorized over a decoded batch: returns (is_rtp, is_rtcp) masks; other
+    UDP packets count as "UDP".
+    """
+    start, end = packet_bounds(batch)
+    p = start + cols['udp_off']
+    # Payloads shorter than 2 bytes are plain UDP
+    has = fits(p, 2, end, cols['is_udp'] & (cols['udp_len'] >= 2))
 
-def detect_packet_protocol(pkt):
-    """Heuristic to detect protocol based on UDP payload."""
-    if not pkt.haslayer(UDP):
-        return "Unknown"
-    
-    payload = bytes(pkt[UDP].payload)
-    if len(payload) < 2:
-        return "UDP"
-    
     # Check for RTP/RTCP (Version 2)
     # Byte 0: 10.. .... (Version = 2) -> 0x80 to 0xBF
-    b0 = payload[0]
-    version = (b0 & 0xC0) >> 6
-    
-    if version == 2:
-        b1 = payload[1]
-        # RTCP Packet Types are typically 200-213 (in the second byte)
-        if 200 <= b1 <= 213:
-            return "RTCP"
-        
-        # RTP Payload Type is in the second byte (masked with 0x7F)
-        # Valid PTs are 0-127.
-        # This is a weak check, but combined with Version=2, it's likely RTP.
-        return "RTP"
-        
-    return "UDP"
+    v2 = has & ((u8(batch.data, p, has) >> 6) == 2)
+    # RTCP Packet Types are typically 200-213 (in the second byte)
+    b1 = u8(batch.data, p + 1, v2)
+    is_rtcp = v2 & (b1 >= 200) & (b1 <= 213)
+    # RTP Payload Type is in the second byte (masked with 0x7F)
+    # This is a weak check, but combined with Version=2, it's likely RTP.
+    return v2 & ~is_rtcp, is_rtcp
+
 
 def find_all_udp_flows(pcap_file):
+    # Flow counters are aggregated batch by batch; packets are never kept in memory
+    table = FlowTable(UDP_FLOW_KEY, scores=("RTP", "RTCP"))
     try:
-        packets = rdpcap(pcap_file)
+        for batch in PcapEngine(pcap_file).iter_batches(snaplen=IP_SNAPLEN):
+            cols = decode_ip(batch)
+            is_rtp, is_rtcp = detect_packet_protocol(batch, cols)
+            table.update(udp_flow_keys(cols), nbytes=cols['caplen'], ts_ns=cols['ts_ns'],
+                         scores={"RTP": is_rtp, "RTCP": is_rtcp},
+                         mask=cols['is_udp'] & (cols['ip_version'] == 4))
     except Exception as e:
         print(f"Error reading pcap: {e}")
         return []
 
-    flows = {}
-    
-    for pkt in packets:
-        if UDP in pkt and IP in pkt:
-            flow_key = (pkt[IP].src, pkt[UDP].sport, pkt[IP].dst, pkt[UDP].dport)
-            pkt_len = len(pkt)
-            
-            if flow_key not in flows:
-                flows[flow_key] = {
-                    "src_ip": flow_key[0],
-                    "sport": flow_key[1],
-                    "dst_ip": flow_key[2],
-                    "dport": flow_key[3],
-                    "packet_count": 0,
-                    "total_bytes": 0,
-                    "start_time": float(pkt.time),
-                    "end_time": float(pkt.time),
-                    "proto_scores": {"RTP": 0, "RTCP": 0, "UDP": 0}
-                }
-            
-            flows[flow_key]["packet_count"] += 1
-            flows[flow_key]["total_bytes"] += pkt_len
-            flows[flow_key]["end_time"] = float(pkt.time)
-            
-            # Sample first 20 packets for protocol detection to save time, or check all?
-            # Checking all is safer for accuracy.
-            proto = detect_packet_protocol(pkt)
-            flows[flow_key]["proto_scores"][proto] += 1
+    flows = table.columns()
+    src_ips = format_ips(flows['ip_version'], flows['src_hi'], flows['src_lo'])
+    dst_ips = format_ips(flows['ip_version'], flows['dst_hi'], flows['dst_lo'])
 
     result = []
-    for key, stats in flows.items():
-        duration = float(stats["end_time"] - stats["start_time"])
-        throughput_bps = (stats["total_bytes"] * 8) / duration if duration > 0 else 0
-        
-        stats["duration_sec"] = duration
-        stats["throughput_mbps"] = throughput_bps / 1e6
-        
+    for i in range(len(table)):
+        total = int(flows['packets'][i])
+        start_time = flows['first_ts'][i] / 1e9
+        end_time = flows['last_ts'][i] / 1e9
+        duration = float(end_time - start_time)
+        total_bytes = int(flows['bytes'][i])
+        throughput_bps = (total_bytes * 8) / duration if duration > 0 else 0
+
         # Determine final protocol
-        scores = stats.pop("proto_scores")
-        total = stats["packet_count"]
-        if scores["RTP"] > total * 0.5:
-            stats["protocol"] = "RTP"
-        elif scores["RTCP"] > total * 0.5:
-            stats["protocol"] = "RTCP"
+        if flows['RTP'][i] > total * 0.5:
+            protocol = "RTP"
+        elif flows['RTCP'][i] > total * 0.5:
+            protocol = "RTCP"
         else:
-            stats["protocol"] = "UDP"
-            
-        result.append(stats)
-        
+            protocol = "UDP"
+
+        result.append({
+            "src_ip": src_ips[i],
+            "sport": int(flows['sport'][i]),
+            "dst_ip": dst_ips[i],
+            "dport": int(flows['dport'][i]),
+            "packet_count": total,
+            "total_bytes": total_bytes,
+            "start_time": float(start_time),
+            "end_time": float(end_time),
+            "duration_sec": duration,
+            "throughput_mbps": throughput_bps / 1e6,
+            "protocol": protocol,
+        })
+
     # Sort by packet count descending
     result.sort(key=lambda x: x["packet_count"], reverse=True)
+    print(f"Found {len(result)} UDP flows ({format_peak_rss()})")
     return result
 
 def find_main_udp_flow(pcap_file):
@@ -1,8 +1,12 @@
 import pandas as pd
 import plotly.graph_objects as go
 from plotly.subplots import make_subplots
+from nexus_core.downsample import lttb, minmax
 
-def create_interactive_sequence_plot(rtp_results):
+# 图中每条曲线最多绘制的点数; 返回的 df 仍包含全部帧
+MAX_PLOT_POINTS = 4000
+
+def create_interactive_sequence_plot(rtp_results, max_points=MAX_PLOT_POINTS):
     if not rtp_results or not rtp_results.get('frame_stats'):
         return None, None
 
@@ -44,22 +48,31 @@ def create_interactive_sequence_plot(rtp_results):
         })
     
     df = pd.DataFrame(data)
+
+    # 长抓包降采样: 趋势线用 LTTB 保形; 标记保留全部 I 帧与异常帧; RTP 差值用每桶最值保留尖峰
+    times, sizes = df['Time (s)'].values, df['Size (KB)'].values
+    trend = df.iloc[lttb(times, sizes, max_points)]
+    marked = df['Symbol'].values != 'circle'
+    keep = marked.copy()
+    keep[lttb(times, sizes, max(max_points - int(marked.sum()), 3))] = True
+    points = df[keep]
+    diffs = df.iloc[minmax(times, df['RTP Diff'].values, max_points)]
     
     # Plotly Chart
     fig = make_subplots(rows=2, cols=1, shared_xaxes=True, vertical_spacing=0.1,
                         subplot_titles=("Frame Sizes & Types", "RTP Timestamp Differences"),
                         row_heights=[0.7, 0.3])
 
-    fig.add_trace(go.Scatter(x=df['Time (s)'], y=df['Size (KB)'], mode='lines',
+    fig.add_trace(go.Scatter(x=trend['Time (s)'], y=trend['Size (KB)'], mode='lines',
                                 line=dict(color='gray', width=1, dash='dot'), name='Trend', hoverinfo='skip'), row=1, col=1)
 
-    fig.add_trace(go.Scatter(x=df['Time (s)'], y=df['Size (KB)'], mode='markers',
-                                marker=dict(color=df['Color'], symbol=df['Symbol'], size=df['MarkerSize'], line=dict(width=1, color='DarkSlateGrey')),
-                                text=df.apply(lambda row: f"Frame #{row['Frame Index']}<br>Type: {row['Type']}<br>Size: {row['Size (KB)']:.2f} KB<br>Packets: {row['Packets']}<br>NALs: {row['NAL Units']}", axis=1),
+    fig.add_trace(go.Scatter(x=points['Time (s)'], y=points['Size (KB)'], mode='markers',
+                                marker=dict(color=points['Color'], symbol=points['Symbol'], size=points['MarkerSize'], line=dict(width=1, color='DarkSlateGrey')),
+                                text=points.apply(lambda row: f"Frame #{row['Frame Index']}<br>Type: {row['Type']}<br>Size: {row['Size (KB)']:.2f} KB<br>Packets: {row['Packets']}<br>NALs: {row['NAL Units']}", axis=1),
                                 hoverinfo='text', name='Frames'), row=1, col=1)
 
-    colors = ['green' if x < 3500 else 'red' for x in df['RTP Diff']]
-    fig.add_trace(go.Bar(x=df['Time (s)'], y=df['RTP Diff'], marker_color=colors, text=df['RTP Diff'], name='RTP Diff'), row=2, col=1)
+    colors = ['green' if x < 3500 else 'red' for x in diffs['RTP Diff']]
+    fig.add_trace(go.Bar(x=diffs['Time (s)'], y=diffs['RTP Diff'], marker_color=colors, text=diffs['RTP Diff'], name='RTP Diff'), row=2, col=1)
 
     fig.add_hline(y=3000, line_dash="dash", line_color="green", annotation_text="30 FPS", row=2, col=1)
     fig.add_hline(y=6000, line_dash="dash", line_color="red", annotation_text="Drop Threshold", row=2, col=1)
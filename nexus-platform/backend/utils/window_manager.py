@@ -3,7 +3,7 @@ import threading
 import time
 import logging
 
-import json
+from nexus_core.serialization import dumps
 
 class WindowManager:
     _instance = None
@@ -58,7 +58,8 @@ class WindowManager:
                     if self.windows:
                         try:
                             # Send batch as JSON to a single JS function
-                            json_data = json.dumps(batch)
+                            # 事件中的 NumPy / pandas 值直接编码
+                            json_data = dumps(batch)
                             code = f"window.processEvents({json_data})"
                             
                             # Broadcast to all active windows
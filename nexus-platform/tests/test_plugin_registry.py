@@ -0,0 +1,202 @@
+import os
+import sys
+import shutil
+import struct
+import tempfile
+import threading
+import time
+import unittest
+from contextlib import redirect_stdout
+from io import StringIO
+
+# Add project root to path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..', 'nexus-core')))
+
+from backend.managers.plugin_registry import PluginRegistry
+from backend.managers.universal import UniversalManager
+
+TOOL = '''
+from nexus_core.interfaces import ITool
+
+class EchoTool(ITool):
+    def __init__(self, base_dir):
+        super().__init__(base_dir)
+        self.runs = []
+
+    def get_metadata(self):
+        return {"id": "test.echo", "name": "Echo", "inputs": {"text": {"type": "string"}}}
+
+    def run(self, config, callback=None):
+        self.runs.append(config)
+        return {"status": "started", "runs": len(self.runs)}
+
+    def stop(self, instance_id):
+        return {"status": "stopped"}
+'''
+
+NODE = '''
+def add(a, b=1):
+    return a + b
+
+# nexus_node 装饰器挂到函数上的元数据
+add._nexus_meta = {"id": "test.add", "category": "Math", "inputs": {"a": int, "b": int}}
+'''
+
+SCRIPT = '''
+raise RuntimeError("analysis scripts must not be imported at startup")
+'''
+
+# 清单声明的分析插件: 用 PcapEngine 读取输入
+ANALYSIS_MANIFEST = '''
+plugin_id: "test.count"
+version: "1.0"
+entry_point: "analysis:run"
+'''
+
+ANALYSIS = '''
+from nexus_core.pcap_reader import PcapEngine
+
+def run(input_path, output_dir, batch_size=4):
+    return {"packets": sum(len(b) for b in PcapEngine(input_path).iter_batches(batch_size))}
+'''
+
+BROKEN = '''
+from nexus_core.interfaces import ITool
+import module_that_does_not_exist
+'''
+
+
+class TestPluginRegistry(unittest.TestCase):
+    def setUp(self):
+        self.test_dir = tempfile.mkdtemp()
+        self.package = f"nx_registry_test_{os.getpid()}"
+        self.root = os.path.join(self.test_dir, self.package)
+        os.makedirs(os.path.join(self.root, 'sub'))
+        for rel, text in (('__init__.py', ''), ('sub/__init__.py', ''), ('sub/tools.py', TOOL),
+                          ('node.py', NODE), ('script.py', SCRIPT), ('broken.py', BROKEN),
+                          ('analysis.py', ANALYSIS), ('analysis.plugin.yaml', ANALYSIS_MANIFEST)):
+            self.write(rel, text)
+        sys.path.insert(0, self.test_dir)
+        self.cache = os.path.join(self.test_dir, 'config', 'plugin_registry.json')
+
+    def tearDown(self):
+        sys.path.remove(self.test_dir)
+        self.unload()
+        shutil.rmtree(self.test_dir, ignore_errors=True)
+
+    def write(self, rel, text):
+        with open(os.path.join(self.root, rel), 'w', encoding='utf-8') as f:
+            f.write(text)
+
+    def unload(self):
+        for name in [m for m in sys.modules if m.startswith(self.package)]:
+            del sys.modules[name]
+
+    def loaded(self):
+        return sorted(m for m in sys.modules if m.startswith(self.package + '.'))
+
+    def registry(self):
+        return PluginRegistry(self.cache, self.package, base_dir=self.test_dir)
+
+    def test_cache(self):
+        registry = self.registry()
+        with redirect_stdout(StringIO()):
+            records = registry.load()
+        self.assertEqual(sorted(records), ['test.add', 'test.count', 'test.echo'])
+        self.assertEqual(records['test.count']['kind'], 'plugin')
+        self.assertEqual(records['test.echo']['module'], f'{self.package}.sub.tools')
+        self.assertEqual(records['test.add']['metadata']['inputs'], {"a": "int", "b": "int"})
+        self.assertIn(f'{self.package}.broken', registry.errors)
+        # 不含工具标记的脚本从未被导入
+        self.assertNotIn(f'{self.package}.script', self.loaded())
+
+        # 未变化的模块只从缓存读取
+        self.unload()
+        records = self.registry().load()
+        self.assertEqual(sorted(records), ['test.add', 'test.count', 'test.echo'])
+        self.assertEqual(self.loaded(), [])
+
+        # 修改过的模块重新导入, 其余仍来自缓存
+        self.write('node.py', NODE.replace('test.add', 'test.plus'))
+        st = os.stat(os.path.join(self.root, 'node.py'))
+        os.utime(os.path.join(self.root, 'node.py'), ns=(st.st_atime_ns, st.st_mtime_ns + 10 ** 9))
+        records = self.registry().load()
+        self.assertEqual(sorted(records), ['test.count', 'test.echo', 'test.plus'])
+        self.assertEqual(self.loaded(), [f'{self.package}.node'])
+
+    def test_manager_lazy_instances(self):
+        with redirect_stdout(StringIO()):
+            manager = UniversalManager(self.test_dir)
+            manager.plugin_registry = self.registry()
+            manager.load_plugins()
+        self.unload()
+
+        metadata = {m['id']: m for m in manager.get_all_tools_metadata()}
+        self.assertEqual(metadata['test.echo']['name'], 'Echo')
+        self.assertEqual(manager.invoke('test.echo', 'get_metadata', {})['name'], 'Echo')
+        self.assertEqual(manager.invoke('test.echo', 'stop', {'instance_id': 'x'}), {"status": "no_process"})
+        self.assertEqual(self.loaded(), [])
+
+        with redirect_stdout(StringIO()):
+            self.assertEqual(manager.invoke('test.echo', 'run', {'id': 'a'})['runs'], 1)
+            self.assertEqual(manager.invoke('test.echo', 'run', {'id': 'b'})['runs'], 2)
+        self.assertEqual(manager.invoke('test.echo', 'stop', {'instance_id': 'a'}), {"status": "stopped"})
+        self.assertEqual(manager.invoke('test.add', 'run', {'a': 2}), {"status": "success", "result": 3})
+        self.assertEqual(manager.invoke('test.none', 'run', {})['status'], 'error')
+
+
+    def test_plugin_progress_events(self):
+        with redirect_stdout(StringIO()):
+            manager = UniversalManager(self.test_dir)
+            manager.plugin_registry = self.registry()
+            manager.load_plugins()
+        events = []
+        manager.send_to_js = events.append
+
+        pcap = os.path.join(self.test_dir, 'a.pcap')
+        with open(pcap, 'wb') as f:
+            f.write(struct.pack('<IHHiIII', 0xA1B2C3D4, 2, 4, 0, 0, 65535, 1))
+            for i in range(10):
+                f.write(struct.pack('<IIII', 0, i, 60, 60) + bytes(60))
+        result = manager.invoke('test.count', 'run', {'input_path': pcap, 'output_dir': self.test_dir,
+                                                      'params': {'batch_size': 4}})
+        self.assertEqual(result, {"status": "success", "result": {"packets": 10}, "truncated": False})
+        self.assertEqual({e['type'] for e in events}, {'test.count:progress'})
+        self.assertEqual(events[-1]['detail']['progress'], 100.0)
+        self.assertEqual(events[-1]['detail']['stage'], 'read')
+        self.assertEqual(manager.invoke('test.count', 'get_metadata', {})['version'], '1.0')
+
+    def test_stop_cancels_plugin_run(self):
+        with redirect_stdout(StringIO()):
+            manager = UniversalManager(self.test_dir)
+            manager.plugin_registry = self.registry()
+            manager.load_plugins()
+        started = threading.Event()
+        manager.send_to_js = lambda event: started.set()
+        self.assertEqual(manager.invoke('test.count', 'stop', {}), {"status": "no_process"})
+
+        pcap = os.path.join(self.test_dir, 'big.pcap')
+        with open(pcap, 'wb') as f:
+            f.write(struct.pack('<IHHiIII', 0xA1B2C3D4, 2, 4, 0, 0, 65535, 1))
+            f.write((struct.pack('<IIII', 0, 0, 60, 60) + bytes(60)) * 200000)
+        payload = {'input_path': pcap, 'output_dir': self.test_dir, 'params': {'batch_size': 4}}
+        results = []
+        worker = threading.Thread(target=lambda: results.append(manager.invoke('test.count', 'run', payload)))
+        worker.start()
+        self.assertTrue(started.wait(10))
+        stopped_at = time.monotonic()
+        self.assertEqual(manager.invoke('test.count', 'stop', {}), {"status": "stopped", "cancelled": 1})
+        worker.join(10)
+        self.assertLess(time.monotonic() - stopped_at, 1.0)
+        self.assertEqual(results[0]['status'], 'cancelled')
+        self.assertEqual(manager._runs['test.count'], set())
+
+        # 截止时间: 以已读部分给出结果
+        result = manager.invoke('test.count', 'run', dict(payload, deadline_s=0))
+        self.assertEqual((result['status'], result['truncated']), ('success', True))
+        self.assertLess(result['result']['packets'], 200000)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,93 @@
+import os
+import sys
+import shutil
+import struct
+import tempfile
+import unittest
+import importlib.util
+from contextlib import redirect_stdout
+from io import StringIO
+
+# Add project root to path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..', 'nexus-core')))
+
+
+def load(name):
+    # backend.rtp_analysis 包会导入 plotly (可视化); 这里直接加载单个模块
+    spec = importlib.util.spec_from_file_location(
+        'rtp_analysis_' + name, os.path.join(os.path.dirname(__file__), '..', 'backend', 'rtp_analysis', name + '.py'))
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+core = load('core')
+handshake = load('handshake')
+
+
+def ip_frame(proto, l4, src=(10, 0, 0, 1), dst=(10, 0, 0, 2)):
+    ip = struct.pack('>BBHHHBBH4s4s', 0x45, 0, 20 + len(l4), 0, 0, 64, proto, 0, bytes(src), bytes(dst)) + l4
+    return b'\xff' * 6 + b'\x00\x11\x22\x33\x44\x55' + b'\x08\x00' + ip
+
+
+def udp_frame(payload):
+    return ip_frame(17, struct.pack('>HHHH', 5004, 5006, 8 + len(payload), 0) + payload)
+
+
+def tcp_frame(payload, sport, dport, src, dst):
+    return ip_frame(6, struct.pack('>HHIIBBHHH', sport, dport, 1, 0, 0x50, 0x18, 65535, 0, 0) + payload, src, dst)
+
+
+def write_pcap(path, frames):
+    with open(path, 'wb') as f:
+        f.write(struct.pack('<IHHiIII', 0xA1B2C3D4, 2, 4, 0, 0, 65535, 1))
+        for i, data in enumerate(frames):
+            f.write(struct.pack('<IIII', 1700000000, i * 20000, len(data), len(data)) + data)
+
+
+def rtp_frame(seq, version=2, marker=0, payload=b'\x00' * 8):
+    return udp_frame(struct.pack('>BBHII', version << 6, (marker << 7) | 96, seq, seq * 3000, 0x1234) + payload)
+
+
+class TestRTPAnalyzer(unittest.TestCase):
+    def setUp(self):
+        self.test_dir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.test_dir, ignore_errors=True)
+
+    def test_any_12_byte_udp_payload_counts(self):
+        # 与按 Scapy 解析时相同: 版本号不是 2 的 12 字节以上负载也计入; 不足 12 字节的不计入
+        frames = [rtp_frame(seq, version=0 if seq in (3, 6) else 2, marker=seq % 2) for seq in range(10)]
+        frames.insert(5, udp_frame(b'\x80\x60\x00\x63'))
+        path = os.path.join(self.test_dir, 'flow.pcap')
+        write_pcap(path, frames)
+
+        analyzer = core.RTPAnalyzer(path)
+        with redirect_stdout(StringIO()):
+            self.assertTrue(analyzer.filter_flow(5004, 5006))
+            results = analyzer.analyze()
+        self.assertEqual(results['basic_stats']['total_packets'], 11)
+        self.assertEqual(results['loss_stats'], {"seq_range": [0, 9], "packets_lost": 0,
+                                                 "loss_rate_percent": 0.0, "reordered_packets": 0})
+        self.assertEqual(len(analyzer.raw_data['timestamps']), 10)
+
+
+    def test_handshake(self):
+        client, server = (10, 0, 0, 1), (10, 0, 0, 2)
+        path = os.path.join(self.test_dir, 'rtsp.pcap')
+        write_pcap(path, [
+            rtp_frame(0),
+            tcp_frame(b'OPTIONS rtsp://10.0.0.2/ RTSP/1.0\r\nCSeq: 1\r\n\r\n', 50000, 554, client, server),
+            rtp_frame(1),
+            tcp_frame(b'RTSP/1.0 200 OK\r\nCSeq: 1\r\n\r\n', 554, 50000, server, client),
+        ])
+        messages = handshake.parse_handshake(path)
+        self.assertEqual([(m['index'], m['type'], m['method'], m['src'], m['status']) for m in messages],
+                         [(2, 'request', 'OPTIONS', '10.0.0.1', ''), (4, 'response', 'OPTIONS', '10.0.0.2', '200 OK')])
+        self.assertEqual(messages[0]['headers'], {'CSeq': '1'})
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,6 +1,21 @@
-from .types import NXPath, NXTable, NXImage, NXSignal, NXReport, NXSerializable
-from .decorators import nexus_node, NodeMetadata
-from .exceptions import NexusError, NexusPluginError, DataValidationError
+import importlib
+from typing import Any
+
+# Names are imported from their submodule on first access (PEP 562), so
+# `import nexus_sdk` does not pull in pandas, numpy or pydantic.
+_EXPORTS = {
+    "NXPath": ".types",
+    "NXTable": ".types",
+    "NXImage": ".types",
+    "NXSignal": ".types",
+    "NXReport": ".types",
+    "NXSerializable": ".types",
+    "nexus_node": ".decorators",
+    "NodeMetadata": ".decorators",
+    "NexusError": ".exceptions",
+    "NexusPluginError": ".exceptions",
+    "DataValidationError": ".exceptions",
+}
 
 __all__ = [
     "NXPath",
@@ -15,3 +30,15 @@ __all__ = [
     "NexusPluginError",
     "DataValidationError"
 ]
+
+
+def __getattr__(name: str) -> Any:
+    if name not in _EXPORTS:
+        raise AttributeError(f"module '{__name__}' has no attribute '{name}'")
+    value = getattr(importlib.import_module(_EXPORTS[name], __name__), name)
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted(set(globals()) | set(_EXPORTS))
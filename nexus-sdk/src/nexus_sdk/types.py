@@ -1,7 +1,10 @@
-from typing import TypeAlias, Dict, Any, Union
+from typing import TypeAlias, Dict, Any, Union, TYPE_CHECKING
 from pathlib import Path
-import pandas as pd
-import numpy as np
+import importlib
+
+if TYPE_CHECKING:
+    import pandas as pd
+    import numpy as np
 
 # --- Core Data Types (NDXP) ---
 
@@ -10,14 +13,13 @@ import numpy as np
 NXPath: TypeAlias = Path
 
 # Tabular Data: Structured data for analysis results.
-# Equivalent to pandas.DataFrame.
-NXTable: TypeAlias = pd.DataFrame
+# Equivalent to pandas.DataFrame (resolved on first access, see __getattr__).
 
 # Image Data: Binary content of an image or path to image file.
 NXImage: TypeAlias = Union[bytes, Path]
 
 # Signal Data: Raw signal arrays (e.g., CSI data, Audio pcm).
-NXSignal: TypeAlias = np.ndarray
+# Equivalent to numpy.ndarray (resolved on first access, see __getattr__).
 
 # Report Data: Structured dictionary for hierarchical reporting.
 NXReport: TypeAlias = Dict[str, Any]
@@ -33,3 +35,25 @@ class NXSerializable:
     @classmethod
     def from_dict(cls, data: dict) -> "NXSerializable":
         raise NotImplementedError
+
+
+# --- Lazily resolved aliases ---
+# pandas / numpy take ~0.5 s to import; plugins that never touch NXTable or
+# NXSignal should not pay for them (PEP 562 module __getattr__).
+_LAZY_ALIASES = {
+    "NXTable": ("pandas", "DataFrame"),
+    "NXSignal": ("numpy", "ndarray"),
+}
+
+
+def __getattr__(name: str) -> Any:
+    if name not in _LAZY_ALIASES:
+        raise AttributeError(f"module '{__name__}' has no attribute '{name}'")
+    module, attr = _LAZY_ALIASES[name]
+    value = getattr(importlib.import_module(module), attr)
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted(set(globals()) | set(_LAZY_ALIASES))